@@ -1,16 +1,27 @@
 from django.contrib import admin
 from .models import (
-    Cliente, Recorrencia, ConfiguracaoFinanceira, Parceiro,
-    FechamentoMensal, ComissaoIndicador, ComissaoSocio
+    Cliente, Recorrencia, Cobranca, ConfiguracaoFinanceira, Parceiro,
+    FechamentoMensal, ComissaoIndicador, ComissaoSocio, SaldoParceiro,
+    ArquivoFechamento, MensagemWhatsApp, CampanhaCobranca, LimiteEnvio, ModeloMensagem,
+    SincronizacaoLote, SincronizacaoItem, Reajuste, ReajusteItem, AlteracaoRecorrencia, ChaveIdempotencia
 )
+from .outbox_service import reenfileirar
 
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
-    list_display = ['name', 'cpfCnpj', 'email', 'phone', 'parceiro_indicador', 'synced_with_asaas', 'created_at']
+    list_display = ['name', 'cpfCnpj', 'email', 'phone', 'telefone_e164', 'parceiro_indicador', 'synced_with_asaas', 'created_at']
     list_filter = ['synced_with_asaas', 'parceiro_indicador', 'created_at']
-    search_fields = ['name', 'cpfCnpj', 'email']
-    readonly_fields = ['asaas_id', 'created_at', 'updated_at']
+    search_fields = ['name', 'cpfCnpj', 'email', 'telefone_e164']
+    readonly_fields = ['asaas_id', 'telefone_e164', 'alterado_em', 'sincronizado_em', 'created_at', 'updated_at']
+
+
+class AlteracaoRecorrenciaInline(admin.TabularInline):
+    model = AlteracaoRecorrencia
+    extra = 0
+    can_delete = False
+    fields = ['registrada_em', 'origem', 'criada', 'campos', 'assinatura']
+    readonly_fields = fields
 
 
 @admin.register(Recorrencia)
@@ -18,7 +29,18 @@ class RecorrenciaAdmin(admin.ModelAdmin):
     list_display = ['description', 'cliente', 'value', 'cycle', 'status', 'next_due_date', 'synced_with_asaas']
     list_filter = ['status', 'cycle', 'billing_type', 'synced_with_asaas', 'created_at']
     search_fields = ['description', 'cliente__name']
-    readonly_fields = ['asaas_id', 'created_at', 'updated_at']
+    readonly_fields = ['asaas_id', 'alterado_em', 'sincronizado_em', 'created_at', 'updated_at']
+    raw_id_fields = ['link_pagamento']
+    inlines = [AlteracaoRecorrenciaInline]
+
+
+@admin.register(Cobranca)
+class CobrancaAdmin(admin.ModelAdmin):
+    list_display = ['asaas_id', 'recorrencia', 'valor', 'vencimento', 'status', 'billing_type', 'sincronizada_em']
+    list_filter = ['status', 'billing_type', 'vencimento']
+    search_fields = ['asaas_id', 'assinatura_asaas_id', 'cliente_asaas_id', 'recorrencia__description']
+    raw_id_fields = ['recorrencia']
+    readonly_fields = ['sincronizada_em', 'created_at', 'updated_at']
 
 
 @admin.register(ConfiguracaoFinanceira)
@@ -57,3 +79,101 @@ class ComissaoSocioAdmin(admin.ModelAdmin):
     search_fields = ['parceiro__nome']
     readonly_fields = ['created_at', 'updated_at']
 
+
+@admin.register(SaldoParceiro)
+class SaldoParceiroAdmin(admin.ModelAdmin):
+    list_display = ['parceiro', 'total_acumulado', 'total_pago', 'total_pendente', 'ultimo_fechamento', 'updated_at']
+    list_filter = ['parceiro__tipo']
+    search_fields = ['parceiro__nome']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(ArquivoFechamento)
+class ArquivoFechamentoAdmin(admin.ModelAdmin):
+    list_display = ['fechamento', 'quantidade_comissoes', 'total_comissoes_indicador', 'tamanho_bytes', 'created_at']
+    exclude = ['dados']
+    readonly_fields = ['fechamento', 'parceiro_ids', 'quantidade_comissoes', 'total_comissoes_indicador', 'tamanho_bytes', 'created_at']
+
+
+@admin.register(CampanhaCobranca)
+class CampanhaCobrancaAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'filtro', 'tipo_mensagem', 'status', 'total_selecionadas', 'total_enfileiradas', 'total_ignoradas', 'created_at']
+    list_filter = ['status', 'filtro', 'tipo_mensagem']
+    search_fields = ['nome']
+    readonly_fields = ['ignoradas', 'tempo_preparacao', 'created_at', 'updated_at']
+
+
+@admin.register(MensagemWhatsApp)
+class MensagemWhatsAppAdmin(admin.ModelAdmin):
+    list_display = [
+        'telefone', 'origem', 'status', 'status_entrega', 'tentativas', 'latencia_ms', 'proxima_tentativa', 'enviada_em', 'created_at'
+    ]
+    list_filter = ['status', 'status_entrega', 'origem', 'modelo', 'url_alternativa', 'campanha']
+    search_fields = ['telefone', 'mensagem', 'chave_deduplicacao', 'provedor_id', 'recorrencia__description']
+    readonly_fields = [
+        'resposta', 'enviada_em', 'provedor_id', 'latencia_ms', 'url_alternativa', 'entregue_em', 'lida_em',
+        'created_at', 'updated_at'
+    ]
+    actions = ['reenfileirar_mensagens']
+
+    @admin.action(description='Reenfileirar mensagens com falha')
+    def reenfileirar_mensagens(self, request, queryset):
+        total = reenfileirar(queryset)
+        self.message_user(request, f'{total} mensagem(ns) devolvida(s) para a fila.')
+
+
+@admin.register(LimiteEnvio)
+class LimiteEnvioAdmin(admin.ModelAdmin):
+    list_display = ['chave', 'tokens', 'atualizado_em']
+    search_fields = ['chave']
+
+
+@admin.register(ModeloMensagem)
+class ModeloMensagemAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'codigo', 'versao', 'updated_at']
+    search_fields = ['nome', 'codigo']
+    readonly_fields = ['versao', 'created_at', 'updated_at']
+
+
+class SincronizacaoItemInline(admin.TabularInline):
+    model = SincronizacaoItem
+    extra = 0
+    can_delete = False
+    fields = ['tipo', 'objeto_id', 'descricao', 'status', 'erro', 'processado_em']
+    readonly_fields = fields
+
+
+@admin.register(SincronizacaoLote)
+class SincronizacaoLoteAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'status', 'total', 'total_sincronizados', 'total_erros', 'created_at', 'concluida_em']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['total', 'total_sincronizados', 'total_erros', 'concluida_em', 'created_at', 'updated_at']
+    inlines = [SincronizacaoItemInline]
+
+
+class ReajusteItemInline(admin.TabularInline):
+    model = ReajusteItem
+    extra = 0
+    can_delete = False
+    fields = ['recorrencia', 'valor_anterior', 'valor_novo', 'status', 'erro', 'processado_em']
+    readonly_fields = fields
+
+
+@admin.register(Reajuste)
+class ReajusteAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'tipo', 'percentual', 'total', 'total_enviados', 'total_erros', 'status', 'created_at']
+    list_filter = ['status', 'tipo', 'created_at']
+    search_fields = ['nome']
+    readonly_fields = [
+        'status', 'total', 'total_enviados', 'total_erros', 'receita_mensal_anterior', 'receita_mensal_nova',
+        'usuario', 'concluido_em', 'created_at', 'updated_at',
+    ]
+    inlines = [ReajusteItemInline]
+
+
+@admin.register(ChaveIdempotencia)
+class ChaveIdempotenciaAdmin(admin.ModelAdmin):
+    list_display = ['chave', 'endpoint', 'status', 'asaas_id', 'atualizada_em']
+    list_filter = ['status', 'endpoint']
+    search_fields = ['chave', 'asaas_id']
+    readonly_fields = ['chave', 'endpoint', 'asaas_id', 'resposta', 'created_at', 'atualizada_em']
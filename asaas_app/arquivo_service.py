@@ -0,0 +1,170 @@
+"""
+Arquivamento de fechamentos mensais
+
+Move as comissões de indicadores de fechamentos FECHADOS (que nunca mais são
+alteradas) para um snapshot compactado por fechamento, mantendo a tabela
+ComissaoIndicador pequena. A leitura é transparente: as páginas consultam
+as funções deste módulo, que decidem entre a tabela viva e o arquivo.
+"""
+import json
+import zlib
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from django.db import transaction
+from django.db.models import Sum
+from .models import ComissaoIndicador, ArquivoFechamento
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Colunas gravadas no snapshot (formato colunar: uma lista por coluna)
+COLUNAS = [
+    'id', 'parceiro_id', 'parceiro_nome', 'parceiro_cpfCnpj', 'cliente_id', 'cliente_nome', 'cliente_cpfCnpj',
+    'movimentacao_id', 'movimentacao_data', 'movimentacao_descricao',
+    'valor_pagamento', 'percentual', 'valor_comissao',
+    'mes_referencia', 'ano_referencia', 'status',
+]
+
+
+class ComissaoArquivada:
+    """Comissão lida de um arquivo, com os mesmos atributos usados nos templates"""
+
+    STATUS_DISPLAY = dict(ComissaoIndicador.STATUS_CHOICES)
+
+    def __init__(self, row, fechamento=None):
+        self.id = row['id']
+        self.pk = row['id']
+        self.parceiro_id = row['parceiro_id']
+        self.parceiro = SimpleNamespace(id=row['parceiro_id'], nome=row['parceiro_nome'], cpfCnpj=row['parceiro_cpfCnpj'])
+        self.cliente_id = row['cliente_id']
+        self.cliente = SimpleNamespace(id=row['cliente_id'], name=row['cliente_nome'], cpfCnpj=row['cliente_cpfCnpj'])
+        self.movimentacao = None
+        if row['movimentacao_id']:
+            self.movimentacao = SimpleNamespace(
+                id=row['movimentacao_id'],
+                data=date.fromisoformat(row['movimentacao_data']) if row['movimentacao_data'] else None,
+                descricao=row['movimentacao_descricao'],
+            )
+        self.fechamento = fechamento
+        self.valor_pagamento = Decimal(row['valor_pagamento'])
+        self.percentual = Decimal(row['percentual'])
+        self.valor_comissao = Decimal(row['valor_comissao'])
+        self.mes_referencia = row['mes_referencia']
+        self.ano_referencia = row['ano_referencia']
+        self.status = row['status']
+
+    def get_status_display(self):
+        return self.STATUS_DISPLAY.get(self.status, self.status)
+
+
+def _compactar(comissoes):
+    """Serializa as comissões em JSON colunar compactado com zlib"""
+    colunas = {nome: [] for nome in COLUNAS}
+    for c in comissoes:
+        mov = c.movimentacao
+        colunas['id'].append(c.id)
+        colunas['parceiro_id'].append(c.parceiro_id)
+        colunas['parceiro_nome'].append(c.parceiro.nome)
+        colunas['parceiro_cpfCnpj'].append(c.parceiro.cpfCnpj)
+        colunas['cliente_id'].append(c.cliente_id)
+        colunas['cliente_nome'].append(c.cliente.name)
+        colunas['cliente_cpfCnpj'].append(c.cliente.cpfCnpj)
+        colunas['movimentacao_id'].append(mov.id if mov else None)
+        colunas['movimentacao_data'].append(mov.data.isoformat() if mov else None)
+        colunas['movimentacao_descricao'].append(mov.descricao if mov else None)
+        colunas['valor_pagamento'].append(str(c.valor_pagamento))
+        colunas['percentual'].append(str(c.percentual))
+        colunas['valor_comissao'].append(str(c.valor_comissao))
+        colunas['mes_referencia'].append(c.mes_referencia)
+        colunas['ano_referencia'].append(c.ano_referencia)
+        colunas['status'].append(c.status)
+    payload = json.dumps({'versao': 2, 'colunas': colunas}, separators=(',', ':'))
+    return zlib.compress(payload.encode('utf-8'), 9)
+
+
+def _descompactar(dados):
+    """Converte o snapshot colunar de volta em linhas (dicts)"""
+    payload = json.loads(zlib.decompress(bytes(dados)).decode('utf-8'))
+    colunas = payload['colunas']
+    total = len(colunas['id'])
+    for i in range(total):
+        yield {nome: colunas[nome][i] for nome in COLUNAS}
+
+
+def arquivar_fechamento(fechamento):
+    """
+    Arquiva as comissões de indicadores de um fechamento FECHADO
+
+    Returns:
+        ArquivoFechamento criado, ou None se o fechamento não puder ser arquivado
+    """
+    if fechamento.status != 'FECHADO':
+        logger.warning(f'Fechamento {fechamento} não está FECHADO, arquivamento ignorado')
+        return None
+    if ArquivoFechamento.objects.filter(fechamento=fechamento).exists():
+        return None
+
+    with transaction.atomic():
+        comissoes = list(
+            ComissaoIndicador.objects.filter(fechamento=fechamento)
+            .select_related('parceiro', 'cliente', 'movimentacao')
+            .order_by('parceiro__nome', 'id')
+        )
+        dados = _compactar(comissoes)
+        arquivo = ArquivoFechamento.objects.create(
+            fechamento=fechamento,
+            dados=dados,
+            parceiro_ids=sorted({c.parceiro_id for c in comissoes}),
+            quantidade_comissoes=len(comissoes),
+            total_comissoes_indicador=sum((c.valor_comissao for c in comissoes), Decimal('0.00')),
+            tamanho_bytes=len(dados),
+        )
+        ComissaoIndicador.objects.filter(pk__in=[c.pk for c in comissoes]).delete()
+
+    logger.info(f'Fechamento {fechamento.mes:02d}/{fechamento.ano} arquivado: {len(comissoes)} comissões, {len(dados)} bytes')
+    return arquivo
+
+
+def comissoes_arquivadas(fechamento):
+    """Lista as comissões de indicadores arquivadas de um fechamento"""
+    try:
+        arquivo = fechamento.arquivo
+    except ArquivoFechamento.DoesNotExist:
+        return []
+    return [ComissaoArquivada(row, fechamento) for row in _descompactar(arquivo.dados)]
+
+
+def comissoes_indicador_fechamento(fechamento):
+    """
+    Comissões de indicadores de um fechamento, lendo do arquivo quando ele existir
+
+    Returns:
+        Tupla (comissões, total)
+    """
+    if ArquivoFechamento.objects.filter(fechamento=fechamento).exists():
+        return comissoes_arquivadas(fechamento), fechamento.arquivo.total_comissoes_indicador
+
+    comissoes = ComissaoIndicador.objects.filter(fechamento=fechamento).select_related('parceiro', 'cliente')
+    total = comissoes.aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00')
+    return comissoes, total
+
+
+def iterar_comissoes_arquivadas(parceiro_id=None, mais_recentes_primeiro=True):
+    """
+    Percorre as comissões arquivadas carregando um arquivo por vez
+
+    Args:
+        parceiro_id: Restringe às comissões de um parceiro (None = todas)
+        mais_recentes_primeiro: Ordem dos fechamentos (False = cronológica)
+    """
+    arquivos = ArquivoFechamento.objects.select_related('fechamento').defer('dados')
+    if not mais_recentes_primeiro:
+        arquivos = arquivos.order_by('fechamento__ano', 'fechamento__mes')
+    for arquivo in arquivos.iterator():
+        if parceiro_id is not None and parceiro_id not in arquivo.parceiro_ids:
+            continue
+        dados = ArquivoFechamento.objects.values_list('dados', flat=True).get(pk=arquivo.pk)
+        for row in _descompactar(dados):
+            if parceiro_id is None or row['parceiro_id'] == parceiro_id:
+                yield ComissaoArquivada(row, arquivo.fechamento)
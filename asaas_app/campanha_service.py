@@ -0,0 +1,204 @@
+"""
+Campanhas de lembrete de cobrança pelo WhatsApp
+
+Seleciona as recorrências da campanha, lê a última cobrança de cada
+assinatura no espelho local (Cobranca), buscando em paralelo no Asaas só as
+assinaturas que ainda não estão nele, monta as mensagens (renderizadas em
+lote a partir do modelo da campanha) e as grava na fila de saída
+(MensagemWhatsApp) já espaçadas no tempo, para que o worker respeite o
+limite de envios por minuto.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Min, Max, OuterRef, Q, Subquery, Value, When
+from .models import Cobranca, Recorrencia, MensagemWhatsApp
+from .services import AsaasService
+from .mensagem_service import contexto_boleto, contexto_link, renderizar_lote
+from .outbox_service import TAMANHO_LOTE, chave_deduplicacao, chaves_recentes, enfileirar_lote
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Consultas simultâneas ao Asaas ao buscar as cobranças das assinaturas
+CONCORRENCIA_ASAAS = getattr(settings, 'ASAAS_CONCORRENCIA', 8)
+# Ritmo máximo de envio das mensagens de uma campanha
+MENSAGENS_POR_MINUTO = getattr(settings, 'WHATSAPP_CAMPANHA_MENSAGENS_POR_MINUTO', 20)
+# Cobranças já pagas não recebem lembrete
+STATUS_PAGOS = {'RECEIVED', 'CONFIRMED', 'RECEIVED_IN_CASH'}
+
+
+def selecionar_recorrencias(campanha):
+    """Recorrências ativas que atendem ao filtro da campanha"""
+    recorrencias = Recorrencia.objects.filter(status='ACTIVE').select_related('cliente', 'link_pagamento')
+    hoje = date.today()
+
+    if campanha.filtro == 'VENCENDO':
+        recorrencias = recorrencias.filter(next_due_date__gte=hoje, next_due_date__lte=hoje + timedelta(days=campanha.dias))
+    elif campanha.filtro == 'VENCIDAS':
+        recorrencias = recorrencias.filter(next_due_date__lt=hoje)
+    elif campanha.filtro == 'CICLO':
+        recorrencias = recorrencias.filter(cycle=campanha.ciclo)
+
+    return list(recorrencias.order_by('next_due_date', 'pk'))
+
+
+def _ultimas_cobrancas_locais(asaas_ids):
+    """
+    Última cobrança de cada assinatura no espelho local, uma consulta por lote de ids
+
+    As removidas no Asaas só são escolhidas quando a assinatura não tem outra;
+    elas indicam que a assinatura está no espelho mas sem cobrança (None).
+
+    Returns:
+        Dict {asaas_id: dict da cobrança ou None}, só das assinaturas presentes no espelho
+    """
+    ultima = Cobranca.objects.filter(assinatura_asaas_id=OuterRef('assinatura_asaas_id')).order_by(
+        Case(When(status='DELETED', then=Value(1)), default=Value(0), output_field=IntegerField()),
+        '-vencimento', '-pk',
+    ).values('pk')[:1]
+
+    cobrancas = {}
+    for i in range(0, len(asaas_ids), TAMANHO_LOTE):
+        for cobranca in Cobranca.objects.filter(
+            assinatura_asaas_id__in=asaas_ids[i:i + TAMANHO_LOTE], pk=Subquery(ultima)
+        ):
+            cobrancas[cobranca.assinatura_asaas_id] = None if cobranca.status == 'DELETED' else cobranca.como_payment()
+    return cobrancas
+
+
+def buscar_ultimas_cobrancas(asaas_ids, concorrencia=None):
+    """
+    Última cobrança de cada assinatura
+
+    Vem do espelho local; só as assinaturas que ainda não têm nenhuma cobrança
+    nele são buscadas no Asaas, em paralelo.
+
+    Returns:
+        Dict {asaas_id: dict da cobrança ou None}
+    """
+    asaas_ids = list(asaas_ids)
+    cobrancas = _ultimas_cobrancas_locais(asaas_ids)
+    faltando = [asaas_id for asaas_id in asaas_ids if asaas_id not in cobrancas]
+    if not faltando:
+        return cobrancas
+    asaas_service = AsaasService()
+
+    def buscar(asaas_id):
+        result = asaas_service.list_subscription_payments(asaas_id, limit=1)
+        if result.get('success') and result['data'].get('data'):
+            return result['data']['data'][0]
+        return None
+
+    with ThreadPoolExecutor(max_workers=concorrencia or CONCORRENCIA_ASAAS) as executor:
+        cobrancas.update(zip(faltando, executor.map(buscar, faltando)))
+    return cobrancas
+
+
+def executar_campanha(campanha):
+    """
+    Prepara e enfileira as mensagens da campanha
+
+    Returns:
+        A campanha com os totais atualizados
+    """
+    inicio = time.monotonic()
+    ignoradas = []
+    mensagens = []
+
+    def ignorar(recorrencia, motivo):
+        ignoradas.append({'recorrencia': recorrencia.pk, 'descricao': str(recorrencia), 'motivo': motivo})
+
+    recorrencias = selecionar_recorrencias(campanha)
+    candidatas = []
+    for r in recorrencias:
+        if not r.cliente.telefone_e164:
+            ignorar(r, 'Cliente sem telefone válido')
+        elif campanha.tipo_mensagem == 'BOLETO' and not r.asaas_id:
+            ignorar(r, 'Recorrência não sincronizada com o Asaas')
+        else:
+            candidatas.append(r)
+
+    if campanha.tipo_mensagem == 'BOLETO':
+        cobrancas = buscar_ultimas_cobrancas([r.asaas_id for r in candidatas])
+        for r in candidatas:
+            boleto = cobrancas.get(r.asaas_id)
+            if not boleto or not boleto.get('bankSlipUrl'):
+                ignorar(r, 'Nenhum boleto encontrado')
+            elif boleto.get('status') in STATUS_PAGOS:
+                ignorar(r, 'Última cobrança já paga')
+            else:
+                mensagens.append((r, contexto_boleto(r, boleto), boleto.get('id')))
+    else:
+        for r in candidatas:
+            if r.link_pagamento is None or not r.link_pagamento.url:
+                ignorar(r, 'Nenhum link de pagamento encontrado')
+            else:
+                mensagens.append((r, contexto_link(r, r.link_pagamento), r.link_pagamento_id))
+
+    # Não repete o mesmo boleto/link enviado há pouco (ex: campanha disparada duas vezes)
+    chaves = {
+        r.pk: chave_deduplicacao(r.cliente.telefone_e164, 'campanha', referencia)
+        for r, _, referencia in mensagens
+    }
+    recentes = chaves_recentes(chaves.values())
+    for r, _, _ in mensagens:
+        if chaves[r.pk] in recentes:
+            ignorar(r, 'Mensagem já enviada recentemente')
+    mensagens = [m for m in mensagens if chaves[m[0].pk] not in recentes]
+
+    # Modelo buscado e compilado uma vez para toda a campanha
+    codigo = 'boleto_recorrencia' if campanha.tipo_mensagem == 'BOLETO' else 'link_recorrencia'
+    textos = renderizar_lote(codigo, [contexto for _, contexto, _ in mensagens])
+
+    # Espaça os envios para respeitar o limite por minuto
+    enfileirar_lote([
+        MensagemWhatsApp(
+            telefone=r.cliente.telefone_e164,
+            mensagem=texto,
+            origem='campanha',
+            modelo=codigo,
+            recorrencia=r,
+            campanha=campanha,
+            chave_deduplicacao=chaves[r.pk],
+        )
+        for (r, _, _), texto in zip(mensagens, textos)
+    ], MENSAGENS_POR_MINUTO)
+
+    campanha.status = 'CONCLUIDA'
+    campanha.total_selecionadas = len(recorrencias)
+    campanha.total_enfileiradas = len(mensagens)
+    campanha.total_ignoradas = len(ignoradas)
+    campanha.ignoradas = ignoradas
+    campanha.tempo_preparacao = round(time.monotonic() - inicio, 2)
+    campanha.save()
+
+    logger.info(
+        f'Campanha {campanha.pk} preparada: {len(mensagens)} mensagens enfileiradas, '
+        f'{len(ignoradas)} ignoradas em {campanha.tempo_preparacao}s'
+    )
+    return campanha
+
+
+def relatorio_campanha(campanha):
+    """
+    Situação de entrega das mensagens da campanha
+
+    Returns:
+        Dict com contagens por status e vazão (mensagens por minuto)
+    """
+    relatorio = campanha.mensagens.aggregate(
+        pendentes=Count('id', filter=Q(status__in=['PENDENTE', 'ENVIANDO'])),
+        enviadas=Count('id', filter=Q(status='ENVIADA')),
+        falhas=Count('id', filter=Q(status='FALHA')),
+        primeiro_envio=Min('enviada_em'),
+        ultimo_envio=Max('enviada_em'),
+    )
+
+    relatorio['vazao'] = None
+    if relatorio['enviadas'] > 1:
+        minutos = (relatorio['ultimo_envio'] - relatorio['primeiro_envio']).total_seconds() / 60
+        if minutos > 0:
+            relatorio['vazao'] = round(relatorio['enviadas'] / minutos, 1)
+    return relatorio
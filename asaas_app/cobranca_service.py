@@ -0,0 +1,215 @@
+"""
+Espelho local das cobranças (payments) do Asaas
+
+As cobranças ficam na tabela Cobranca, indexadas por recorrência e
+vencimento, para que as telas e os envios de boleto não dependam de uma
+chamada ao Asaas a cada acesso. A tabela é mantida por sincronização em
+lote (páginas buscadas em paralelo e gravadas com upsert) e pelo webhook
+de cobranças do Asaas; quando uma recorrência ainda não tem nenhuma
+cobrança local, as dela são buscadas na hora. Depois disso a recorrência só
+é atualizada pelo webhook e pelo comando sincronizar_cobrancas, que deve
+rodar periodicamente para cobrir eventos perdidos.
+
+Cada cobrança guarda em sincronizada_em o momento da informação gravada (o
+início da busca em lote ou a data do evento), e eventos do webhook mais
+antigos que ela são ignorados: o Asaas não garante a ordem de entrega.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Cobranca, Recorrencia
+from .services import AsaasService
+from .outbox_service import TAMANHO_LOTE
+from .campanha_service import CONCORRENCIA_ASAAS
+import logging
+
+logger = logging.getLogger(__name__)
+
+POR_PAGINA = 100
+CAMPOS_ATUALIZADOS = [
+    'assinatura_asaas_id', 'cliente_asaas_id', 'recorrencia', 'valor', 'vencimento', 'status',
+    'billing_type', 'url_boleto', 'url_fatura', 'data_pagamento', 'sincronizada_em', 'updated_at',
+]
+
+
+def buscar_paginas(listar, prazo=None, concorrencia=None, por_pagina=None):
+    """
+    Busca todas as páginas de uma listagem do Asaas
+
+    A primeira página informa o total; as demais são buscadas em paralelo.
+    Páginas que não couberem no prazo (time.monotonic) são descartadas.
+
+    Args:
+        listar: Função (offset) -> resultado do AsaasService
+        por_pagina: Registros por página pedidos por `listar` (padrão: POR_PAGINA)
+
+    Returns:
+        Tupla (lista de registros, busca completa)
+    """
+    def pagina(offset):
+        if prazo is not None and time.monotonic() > prazo:
+            return {'success': False, 'error': 'Tempo máximo atingido'}
+        return listar(offset)
+
+    por_pagina = por_pagina or POR_PAGINA
+    primeira = pagina(0)
+    if not primeira.get('success'):
+        logger.error(f'Erro ao buscar página do Asaas: {primeira.get("error")}')
+        return [], False
+
+    registros = list(primeira['data'].get('data', []))
+    completa = True
+    offsets = range(por_pagina, primeira['data'].get('totalCount', 0), por_pagina)
+    with ThreadPoolExecutor(max_workers=concorrencia or CONCORRENCIA_ASAAS) as executor:
+        for result in executor.map(pagina, offsets):
+            if result.get('success'):
+                registros.extend(result['data'].get('data', []))
+            else:
+                completa = False
+    return registros, completa
+
+
+def _data(valor):
+    return date.fromisoformat(valor) if valor else None
+
+
+def _recorrencias_por_assinatura(assinaturas):
+    """{asaas_id da assinatura: pk da recorrência}, em consultas de até TAMANHO_LOTE ids"""
+    assinaturas = list(assinaturas)
+    recorrencias = {}
+    for i in range(0, len(assinaturas), TAMANHO_LOTE):
+        recorrencias.update(
+            Recorrencia.objects.filter(asaas_id__in=assinaturas[i:i + TAMANHO_LOTE]).values_list('asaas_id', 'pk')
+        )
+    return recorrencias
+
+
+def salvar_cobrancas(payments, momento=None):
+    """
+    Grava as cobranças recebidas do Asaas (insere as novas e atualiza as existentes)
+
+    Args:
+        momento: Quando a informação foi lida no Asaas (padrão: agora)
+
+    Returns:
+        Quantidade de cobranças gravadas
+    """
+    payments = [p for p in payments if p.get('id') and p.get('dueDate')]
+    if not payments:
+        return 0
+
+    recorrencias = _recorrencias_por_assinatura({p['subscription'] for p in payments if p.get('subscription')})
+    momento = momento or timezone.now()
+    cobrancas = {}
+    for p in payments:
+        cobrancas[p['id']] = Cobranca(
+            asaas_id=p['id'],
+            assinatura_asaas_id=p.get('subscription') or '',
+            cliente_asaas_id=p.get('customer') or '',
+            recorrencia_id=recorrencias.get(p.get('subscription')),
+            valor=Decimal(str(p.get('value') or 0)),
+            vencimento=_data(p['dueDate']),
+            status='DELETED' if p.get('deleted') else p.get('status') or 'PENDING',
+            billing_type=p.get('billingType') or '',
+            url_boleto=p.get('bankSlipUrl') or '',
+            url_fatura=p.get('invoiceUrl') or '',
+            data_pagamento=_data(p.get('paymentDate') or p.get('clientPaymentDate')),
+            sincronizada_em=momento,
+        )
+
+    Cobranca.objects.bulk_create(
+        cobrancas.values(), batch_size=TAMANHO_LOTE,
+        update_conflicts=True, unique_fields=['asaas_id'], update_fields=CAMPOS_ATUALIZADOS,
+    )
+    return len(cobrancas)
+
+
+def sincronizar_cobrancas(vencimento_de=None, vencimento_ate=None, concorrencia=None):
+    """
+    Sincroniza em lote as cobranças do Asaas (todas ou as do período de vencimento)
+
+    Returns:
+        Dict com o total de cobranças gravadas e se a busca foi completa
+    """
+    asaas_service = AsaasService()
+    inicio = timezone.now()
+    if vencimento_de or vencimento_ate:
+        vencimento_de = (vencimento_de or date.min).isoformat()
+        vencimento_ate = (vencimento_ate or date.max).isoformat()
+        listar = lambda offset: asaas_service.list_payments_by_due_date(
+            vencimento_de, vencimento_ate, limit=POR_PAGINA, offset=offset
+        )
+    else:
+        listar = lambda offset: asaas_service.list_payments(limit=POR_PAGINA, offset=offset)
+
+    payments, completa = buscar_paginas(listar, concorrencia=concorrencia)
+    total = salvar_cobrancas(payments, inicio)
+    logger.info(f'Cobranças sincronizadas: {total} (completa: {completa})')
+    return {'total': total, 'completa': completa}
+
+
+def sincronizar_recorrencia(recorrencia):
+    """Busca no Asaas as cobranças de uma assinatura e atualiza o espelho local"""
+    asaas_service = AsaasService()
+    inicio = timezone.now()
+    payments, completa = buscar_paginas(
+        lambda offset: asaas_service.list_subscription_payments(recorrencia.asaas_id, POR_PAGINA, offset)
+    )
+    salvar_cobrancas(payments, inicio)
+    return completa
+
+
+def cobrancas_da_recorrencia(recorrencia):
+    """
+    Cobranças locais da recorrência (as removidas no Asaas ficam de fora)
+
+    Se a recorrência ainda não tem nenhuma cobrança no espelho, busca as dela
+    no Asaas antes de responder; depois disso vale o que o webhook e o comando
+    sincronizar_cobrancas gravaram.
+    """
+    if recorrencia.asaas_id and not recorrencia.cobrancas.exists():
+        sincronizar_recorrencia(recorrencia)
+    return recorrencia.cobrancas.exclude(status='DELETED')
+
+
+def _momento_evento(payload):
+    """Data do evento do webhook (dateCreated, no fuso do Asaas); agora se ausente ou inválida"""
+    try:
+        momento = parse_datetime(str(payload.get('dateCreated') or ''))
+    except ValueError:
+        momento = None
+    if momento is None:
+        return timezone.now()
+    return timezone.make_aware(momento) if timezone.is_naive(momento) else momento
+
+
+def processar_webhook(payload):
+    """
+    Aplica um evento do webhook de cobranças do Asaas (PAYMENT_*)
+
+    Eventos mais antigos que a informação já gravada (ex: um PAYMENT_CREATED
+    entregue depois do PAYMENT_RECEIVED) são ignorados.
+
+    Returns:
+        True se o evento atualizou o espelho
+    """
+    evento = payload.get('event') or ''
+    payment = payload.get('payment')
+    if not evento.startswith('PAYMENT_') or not isinstance(payment, dict):
+        return False
+    if evento == 'PAYMENT_DELETED':
+        payment = {**payment, 'deleted': True}
+
+    momento = _momento_evento(payload)
+    with transaction.atomic():
+        gravada = Cobranca.objects.select_for_update().filter(asaas_id=payment.get('id')).values_list(
+            'sincronizada_em', flat=True
+        ).first()
+        if gravada and gravada > momento:
+            logger.info(f'Evento {evento} da cobrança {payment.get("id")} ignorado: anterior ao já gravado')
+            return False
+        return salvar_cobrancas([payment], momento) > 0
@@ -0,0 +1,196 @@
+"""
+Livro-razão de comissões por parceiro
+
+Mantém a tabela SaldoParceiro atualizada de forma transacional sempre que
+comissões são geradas, estornadas (recálculo de prévia) ou pagas, evitando
+agregações sobre todas as comissões a cada página de parceiro.
+"""
+from decimal import Decimal
+from itertools import chain
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from .models import Parceiro, ComissaoIndicador, ComissaoSocio, SaldoParceiro
+from .arquivo_service import iterar_comissoes_arquivadas
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _totais_por_parceiro(fechamento, status=None):
+    """
+    Soma as comissões (indicador + sócio) de um fechamento agrupadas por parceiro
+
+    Returns:
+        Dict {parceiro_id: Decimal}
+    """
+    totais = {}
+    for model in (ComissaoIndicador, ComissaoSocio):
+        comissoes = model.objects.filter(fechamento=fechamento)
+        if status:
+            comissoes = comissoes.filter(status=status)
+        for row in comissoes.values('parceiro_id').annotate(total=Sum('valor_comissao')).order_by():
+            totais[row['parceiro_id']] = totais.get(row['parceiro_id'], Decimal('0.00')) + (row['total'] or Decimal('0.00'))
+    return totais
+
+
+def _aplicar(totais, acumulado=0, pago=0, pendente=0, fechamento=None):
+    """
+    Aplica variações (multiplicadores -1/0/1 sobre o total) no saldo de cada parceiro
+
+    O último fechamento só avança: recalcular um mês anterior não o substitui.
+    """
+    for parceiro_id, total in totais.items():
+        SaldoParceiro.objects.get_or_create(parceiro_id=parceiro_id)
+        SaldoParceiro.objects.filter(parceiro_id=parceiro_id).update(
+            total_acumulado=F('total_acumulado') + total * acumulado,
+            total_pago=F('total_pago') + total * pago,
+            total_pendente=F('total_pendente') + total * pendente,
+        )
+
+    if fechamento is not None:
+        SaldoParceiro.objects.filter(parceiro_id__in=totais).filter(
+            Q(ultimo_fechamento__isnull=True)
+            | Q(ultimo_fechamento__ano__lt=fechamento.ano)
+            | Q(ultimo_fechamento__ano=fechamento.ano, ultimo_fechamento__mes__lte=fechamento.mes)
+        ).update(ultimo_fechamento=fechamento)
+
+
+def registrar_comissoes(fechamento):
+    """Lança no saldo dos parceiros as comissões recém-criadas de um fechamento"""
+    with transaction.atomic():
+        _aplicar(_totais_por_parceiro(fechamento, 'PENDENTE'), acumulado=1, pendente=1, fechamento=fechamento)
+        _aplicar(_totais_por_parceiro(fechamento, 'PAGO'), acumulado=1, pago=1, fechamento=fechamento)
+
+
+def estornar_comissoes(fechamento):
+    """Remove do saldo dos parceiros as comissões de um fechamento (antes de excluí-las)"""
+    with transaction.atomic():
+        _aplicar(_totais_por_parceiro(fechamento, 'PENDENTE'), acumulado=-1, pendente=-1)
+        _aplicar(_totais_por_parceiro(fechamento, 'PAGO'), acumulado=-1, pago=-1)
+
+
+def liquidar_comissoes(fechamento):
+    """
+    Marca como pagas as comissões pendentes de um fechamento e move os valores
+    de pendente para pago no saldo dos parceiros
+    """
+    with transaction.atomic():
+        totais = _totais_por_parceiro(fechamento, 'PENDENTE')
+        ComissaoIndicador.objects.filter(fechamento=fechamento, status='PENDENTE').update(status='PAGO')
+        ComissaoSocio.objects.filter(fechamento=fechamento, status='PENDENTE').update(status='PAGO')
+        _aplicar(totais, pago=1, pendente=-1)
+
+
+def get_saldo(parceiro):
+    """Retorna o saldo do parceiro, criando-o (zerado) se ainda não existir"""
+    saldo, _ = SaldoParceiro.objects.get_or_create(parceiro=parceiro)
+    return saldo
+
+
+def reconstruir_saldos():
+    """
+    Recalcula todos os saldos a partir das comissões existentes
+    Usado para carga inicial e para corrigir divergências (ex: edições pelo admin)
+
+    Returns:
+        Quantidade de saldos reconstruídos
+    """
+    acumulado = {}
+    pago = {}
+    ultimo = {}
+
+    # Comissões já arquivadas (sempre de fechamentos anteriores aos vivos)
+    for c in iterar_comissoes_arquivadas(mais_recentes_primeiro=False):
+        acumulado[c.parceiro_id] = acumulado.get(c.parceiro_id, Decimal('0.00')) + c.valor_comissao
+        if c.status == 'PAGO':
+            pago[c.parceiro_id] = pago.get(c.parceiro_id, Decimal('0.00')) + c.valor_comissao
+        ultimo[c.parceiro_id] = c.fechamento.pk
+
+    for model in (ComissaoIndicador, ComissaoSocio):
+        linhas = model.objects.values('parceiro_id', 'status').annotate(total=Sum('valor_comissao')).order_by()
+        for row in linhas:
+            total = row['total'] or Decimal('0.00')
+            acumulado[row['parceiro_id']] = acumulado.get(row['parceiro_id'], Decimal('0.00')) + total
+            if row['status'] == 'PAGO':
+                pago[row['parceiro_id']] = pago.get(row['parceiro_id'], Decimal('0.00')) + total
+
+        fechamentos = model.objects.filter(fechamento__isnull=False).order_by(
+            'parceiro_id', 'fechamento__ano', 'fechamento__mes'
+        ).values_list('parceiro_id', 'fechamento_id')
+        for parceiro_id, fechamento_id in fechamentos:
+            ultimo[parceiro_id] = fechamento_id
+
+    with transaction.atomic():
+        parceiro_ids = list(Parceiro.objects.values_list('id', flat=True))
+        existentes = {s.parceiro_id: s for s in SaldoParceiro.objects.select_for_update()}
+        novos = []
+        for parceiro_id in parceiro_ids:
+            saldo = existentes.get(parceiro_id) or SaldoParceiro(parceiro_id=parceiro_id)
+            saldo.total_acumulado = acumulado.get(parceiro_id, Decimal('0.00'))
+            saldo.total_pago = pago.get(parceiro_id, Decimal('0.00'))
+            saldo.total_pendente = saldo.total_acumulado - saldo.total_pago
+            saldo.ultimo_fechamento_id = ultimo.get(parceiro_id)
+            if saldo.pk is None:
+                novos.append(saldo)
+
+        SaldoParceiro.objects.bulk_create(novos)
+        SaldoParceiro.objects.bulk_update(
+            existentes.values(),
+            ['total_acumulado', 'total_pago', 'total_pendente', 'ultimo_fechamento']
+        )
+
+    logger.info(f'{len(parceiro_ids)} saldo(s) de parceiros reconstruído(s)')
+    return len(parceiro_ids)
+
+
+# ==================== EXTRATO DE COMISSÕES ====================
+
+EXTRATO_CABECALHO = [
+    'Tipo', 'Parceiro', 'CPF/CNPJ Parceiro', 'Mês Referência', 'Ano Referência',
+    'Cliente', 'CPF/CNPJ Cliente', 'Data Movimentação', 'Descrição Movimentação',
+    'Valor Base', '% Comissão', 'Valor Comissão', 'Status', 'Status Fechamento',
+]
+
+
+def iterar_extrato(parceiro=None, chunk_size=2000):
+    """
+    Gera as linhas do extrato de comissões (indicador e sócio) em memória constante
+
+    Args:
+        parceiro: Parceiro para filtrar (None = todos os parceiros)
+        chunk_size: Tamanho do lote lido do banco por vez
+
+    Yields:
+        Listas de valores na ordem de EXTRATO_CABECALHO
+    """
+    comissoes_indicador = ComissaoIndicador.objects.select_related(
+        'parceiro', 'cliente', 'movimentacao', 'fechamento'
+    ).order_by('parceiro__nome', 'ano_referencia', 'mes_referencia', 'id')
+    comissoes_socio = ComissaoSocio.objects.select_related(
+        'parceiro', 'fechamento'
+    ).order_by('parceiro__nome', 'fechamento__ano', 'fechamento__mes', 'id')
+
+    if parceiro is not None:
+        comissoes_indicador = comissoes_indicador.filter(parceiro=parceiro)
+        comissoes_socio = comissoes_socio.filter(parceiro=parceiro)
+
+    arquivadas = iterar_comissoes_arquivadas(
+        parceiro.pk if parceiro is not None else None, mais_recentes_primeiro=False
+    )
+    for c in chain(arquivadas, comissoes_indicador.iterator(chunk_size=chunk_size)):
+        mov = c.movimentacao
+        yield [
+            'INDICADOR', c.parceiro.nome, c.parceiro.cpfCnpj, c.mes_referencia, c.ano_referencia,
+            c.cliente.name, c.cliente.cpfCnpj,
+            mov.data.strftime('%d/%m/%Y') if mov else '', mov.descricao if mov else '',
+            c.valor_pagamento, c.percentual, c.valor_comissao, c.get_status_display(),
+            c.fechamento.get_status_display() if c.fechamento else '',
+        ]
+
+    for c in comissoes_socio.iterator(chunk_size=chunk_size):
+        yield [
+            'SOCIO', c.parceiro.nome, c.parceiro.cpfCnpj, c.fechamento.mes, c.fechamento.ano,
+            '', '', '', '',
+            c.resultado_distribuivel, c.percentual, c.valor_comissao, c.get_status_display(),
+            c.fechamento.get_status_display(),
+        ]
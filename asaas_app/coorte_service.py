@@ -0,0 +1,227 @@
+"""
+Coortes de recorrências (retenção e receita por mês de entrada e por parceiro indicador)
+
+Os pagamentos vêm do espelho local das cobranças do Asaas (Cobranca,
+mantido pela sincronização paginada e pelo webhook) e das movimentações
+PAYMENT. O recálculo é incremental em duas etapas:
+
+1. AtividadeRecorrencia guarda, por recorrência e mês, o valor pago e o
+   período desde a entrada; só são recalculadas as recorrências cujas
+   cobranças, movimentações, cadastro ou cliente mudaram desde a última
+   atualização. A entrada é o mês de cadastro da recorrência, ou o do
+   primeiro pagamento quando anterior (recorrências importadas do Asaas).
+2. Coorte e CoortePeriodo são refeitas a partir dela com agregações no
+   banco, para que o relatório leia apenas as tabelas de resumo.
+"""
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from .models import (
+    Recorrencia, Cobranca, Movimentacao, AtividadeRecorrencia, Coorte, CoortePeriodo, AtualizacaoCoortes
+)
+from .outbox_service import TAMANHO_LOTE
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Períodos exibidos no relatório (meses após a entrada)
+PERIODOS_RELATORIO = 12
+
+
+def _mes(valor):
+    """Primeiro dia do mês de uma data ou datetime (em horário local)"""
+    if hasattr(valor, 'tzinfo'):
+        valor = timezone.localtime(valor).date()
+    return valor.replace(day=1)
+
+
+def _periodo(coorte, mes):
+    return (mes.year - coorte.year) * 12 + mes.month - coorte.month
+
+
+def _recorrencias_alteradas(desde):
+    """Ids das recorrências com pagamentos, cadastro ou cliente alterados desde `desde`"""
+    ids = set(Recorrencia.objects.filter(
+        Q(updated_at__gt=desde) | Q(alterado_em__gt=desde) | Q(cliente__updated_at__gt=desde)
+    ).values_list('pk', flat=True))
+    ids.update(Cobranca.objects.filter(updated_at__gt=desde, recorrencia__isnull=False).values_list('recorrencia_id', flat=True))
+
+    pagamentos = Movimentacao.objects.filter(tipo='PAYMENT', updated_at__gt=desde)
+    ids.update(pagamentos.filter(recorrencia__isnull=False).values_list('recorrencia_id', flat=True))
+    clientes = pagamentos.filter(recorrencia__isnull=True, cliente__isnull=False).values('cliente_id')
+    ids.update(Recorrencia.objects.filter(cliente_id__in=clientes).values_list('pk', flat=True))
+    return ids
+
+
+def _recorrencia_unica_por_cliente(clientes):
+    """{cliente_id: recorrência} dos clientes com uma única recorrência (destino dos pagamentos sem recorrência)"""
+    unicas = (
+        Recorrencia.objects.filter(cliente_id__in=clientes).values('cliente_id')
+        .annotate(total=Count('pk')).filter(total=1).values_list('cliente_id', flat=True)
+    )
+    return dict(Recorrencia.objects.filter(cliente_id__in=unicas).values_list('cliente_id', 'pk'))
+
+
+def _recalcular_atividades(ids):
+    """Refaz as atividades mensais de um grupo de recorrências"""
+    recorrencias = {
+        pk: (_mes(created_at), parceiro_id)
+        for pk, created_at, parceiro_id in Recorrencia.objects.filter(pk__in=ids).values_list(
+            'pk', 'created_at', 'cliente__parceiro_indicador_id'
+        )
+    }
+
+    # Valor pago por (recorrência, mês) segundo as cobranças do Asaas
+    pagos = {}
+    cobrancas = (
+        Cobranca.objects.filter(recorrencia_id__in=recorrencias, status__in=Cobranca.STATUS_PAGOS)
+        .annotate(mes=TruncMonth(Coalesce('data_pagamento', 'vencimento')))
+        .values('recorrencia_id', 'mes').annotate(total=Sum('valor'))
+    )
+    for linha in cobrancas:
+        pagos[(linha['recorrencia_id'], linha['mes'])] = linha['total']
+
+    # Movimentações PAYMENT completam os meses sem cobrança no espelho
+    por_cliente = _recorrencia_unica_por_cliente(
+        Recorrencia.objects.filter(pk__in=recorrencias).values('cliente_id')
+    )
+    movimentacoes = (
+        Movimentacao.objects.filter(tipo='PAYMENT', valor__gt=0).exclude(status='CANCELLED')
+        .filter(Q(recorrencia_id__in=recorrencias) | Q(recorrencia__isnull=True, cliente_id__in=list(por_cliente)))
+        .annotate(mes=TruncMonth('data'))
+        .values('recorrencia_id', 'cliente_id', 'mes').annotate(total=Sum('valor'))
+    )
+    por_movimentacao = {}
+    for linha in movimentacoes:
+        recorrencia_id = linha['recorrencia_id'] or por_cliente.get(linha['cliente_id'])
+        chave = (recorrencia_id, linha['mes'])
+        por_movimentacao[chave] = por_movimentacao.get(chave, 0) + linha['total']
+    for chave, total in por_movimentacao.items():
+        pagos.setdefault(chave, total)
+
+    entradas = {pk: cadastro for pk, (cadastro, _) in recorrencias.items()}
+    for recorrencia_id, mes in pagos:
+        entradas[recorrencia_id] = min(entradas[recorrencia_id], mes)
+
+    atividades = []
+    for (recorrencia_id, mes), valor in pagos.items():
+        coorte, parceiro_id = entradas[recorrencia_id], recorrencias[recorrencia_id][1]
+        atividades.append(AtividadeRecorrencia(
+            recorrencia_id=recorrencia_id, mes=mes, coorte=coorte, periodo=_periodo(coorte, mes),
+            parceiro_id=parceiro_id, valor=valor,
+        ))
+
+    with transaction.atomic():
+        AtividadeRecorrencia.objects.filter(recorrencia_id__in=recorrencias).delete()
+        AtividadeRecorrencia.objects.bulk_create(atividades, batch_size=TAMANHO_LOTE)
+    return len(recorrencias)
+
+
+def _refazer_resumos():
+    """Refaz as tabelas Coorte e CoortePeriodo a partir das atividades (agregações no banco)"""
+    coortes = []
+    periodos = []
+
+    # Tamanho de cada coorte: a entrada das recorrências com pagamento vem das atividades
+    entradas = dict(AtividadeRecorrencia.objects.values_list('recorrencia_id', 'coorte').distinct())
+    tamanhos = {}
+    recorrencias = Recorrencia.objects.values_list('pk', 'created_at', 'status', 'cliente__parceiro_indicador_id')
+    for pk, created_at, status, parceiro_id in recorrencias.iterator(chunk_size=TAMANHO_LOTE):
+        for chave in (('MES', entradas.get(pk) or _mes(created_at), None), ('PARCEIRO', None, parceiro_id)):
+            tamanho = tamanhos.setdefault(chave, {'recorrencias': 0, 'ativas': 0})
+            tamanho['recorrencias'] += 1
+            tamanho['ativas'] += status == 'ACTIVE'
+
+    atividades = {}
+    for linha in AtividadeRecorrencia.objects.values('coorte', 'periodo').annotate(
+        pagantes=Count('recorrencia', distinct=True), receita=Sum('valor')
+    ):
+        atividades.setdefault(('MES', linha['coorte'], None), []).append(linha)
+    for linha in AtividadeRecorrencia.objects.values('parceiro', 'periodo').annotate(
+        pagantes=Count('recorrencia', distinct=True), receita=Sum('valor')
+    ):
+        atividades.setdefault(('PARCEIRO', None, linha['parceiro']), []).append(linha)
+
+    for chave, tamanho in tamanhos.items():
+        dimensao, mes, parceiro_id = chave
+        linhas = atividades.get(chave, [])
+        coorte = Coorte(
+            dimensao=dimensao, mes=mes, parceiro_id=parceiro_id, recorrencias=tamanho['recorrencias'],
+            ativas=tamanho['ativas'], receita=sum(l['receita'] for l in linhas),
+        )
+        coortes.append(coorte)
+        periodos.extend(
+            CoortePeriodo(coorte=coorte, periodo=l['periodo'], pagantes=l['pagantes'], receita=l['receita'])
+            for l in linhas
+        )
+
+    with transaction.atomic():
+        Coorte.objects.all().delete()
+        Coorte.objects.bulk_create(coortes, batch_size=TAMANHO_LOTE)
+        CoortePeriodo.objects.bulk_create(periodos, batch_size=TAMANHO_LOTE)
+    return len(coortes)
+
+
+def atualizar_coortes(completo=False):
+    """
+    Recalcula as atividades das recorrências alteradas e refaz as tabelas de coortes
+
+    Args:
+        completo: Recalcula todas as recorrências (ignora a última atualização)
+
+    Returns:
+        A AtualizacaoCoortes registrada
+    """
+    ultima = AtualizacaoCoortes.objects.filter(concluida_em__isnull=False).first()
+    completo = completo or ultima is None
+    atualizacao = AtualizacaoCoortes.objects.create(iniciada_em=timezone.now(), completa=completo)
+
+    if completo:
+        ids = list(Recorrencia.objects.values_list('pk', flat=True))
+    else:
+        ids = sorted(_recorrencias_alteradas(ultima.iniciada_em))
+
+    recalculadas = 0
+    for i in range(0, len(ids), TAMANHO_LOTE):
+        recalculadas += _recalcular_atividades(ids[i:i + TAMANHO_LOTE])
+    total_coortes = _refazer_resumos()
+
+    atualizacao.recorrencias_recalculadas = recalculadas
+    atualizacao.concluida_em = timezone.now()
+    atualizacao.save()
+    logger.info(f'Coortes atualizadas: {recalculadas} recorrência(s) recalculada(s), {total_coortes} coorte(s)')
+    return atualizacao
+
+
+def tabela_coortes(dimensao='MES', periodos=PERIODOS_RELATORIO):
+    """
+    Linhas do relatório de coortes (lidas só das tabelas de resumo)
+
+    Returns:
+        Lista de dicts com a coorte e, por período, pagantes, % do tamanho da coorte e receita
+        (None nos períodos que ainda não ocorreram)
+    """
+    hoje = _mes(timezone.now())
+    coortes = Coorte.objects.filter(dimensao=dimensao).select_related('parceiro').prefetch_related('periodos')
+    linhas = []
+    for coorte in coortes:
+        por_periodo = {p.periodo: p for p in coorte.periodos.all()}
+        decorridos = _periodo(coorte.mes, hoje) if coorte.mes else periodos - 1
+        celulas = []
+        for periodo in range(periodos):
+            if periodo > decorridos:
+                celulas.append(None)
+                continue
+            p = por_periodo.get(periodo)
+            pagantes = p.pagantes if p else 0
+            celulas.append({
+                'pagantes': pagantes,
+                'percentual': round(pagantes * 100 / coorte.recorrencias, 1) if coorte.recorrencias else 0,
+                'receita': p.receita if p else 0,
+            })
+        linhas.append({'coorte': coorte, 'periodos': celulas})
+
+    if dimensao == 'PARCEIRO':
+        linhas.sort(key=lambda l: -l['coorte'].recorrencias)
+    return linhas
@@ -1,13 +1,26 @@
+import uuid
 from django import forms
+from django.template import TemplateSyntaxError
 from .models import (
     Cliente, Recorrencia, PlanoContas, Movimentacao, RegraCategorizacao, 
-    LinkPagamento, Parceiro, ConfiguracaoFinanceira
+    LinkPagamento, Parceiro, ConfiguracaoFinanceira, CampanhaCobranca, ModeloMensagem,
+    Reajuste
 )
 
 
+def campo_chave_envio():
+    """
+    Token oculto gerado a cada formulário novo: vira a chave de idempotência da
+    criação no Asaas, então reenviar o mesmo formulário (duplo clique) não duplica
+    """
+    return forms.CharField(widget=forms.HiddenInput, required=False, initial=lambda: uuid.uuid4().hex)
+
+
 class ClienteForm(forms.ModelForm):
     """Formulário para cadastro de clientes"""
     
+    chave_envio = campo_chave_envio()
+    
     class Meta:
         model = Cliente
         fields = [
@@ -74,6 +87,8 @@ class ClienteForm(forms.ModelForm):
 class RecorrenciaForm(forms.ModelForm):
     """Formulário para cadastro de recorrências"""
     
+    chave_envio = campo_chave_envio()
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Filtrar apenas clientes sincronizados com Asaas
@@ -238,6 +253,8 @@ class RegraCategorizacaoForm(forms.ModelForm):
 class LinkPagamentoForm(forms.ModelForm):
     """Formulário para cadastro de links de pagamento"""
     
+    chave_envio = campo_chave_envio()
+    
     class Meta:
         model = LinkPagamento
         fields = [
@@ -341,3 +358,126 @@ class ConfiguracaoFinanceiraForm(forms.ModelForm):
                 'max': '24'
             }),
         }
+
+
+class CampanhaCobrancaForm(forms.ModelForm):
+    """Formulário para disparo de campanhas de cobrança"""
+    
+    class Meta:
+        model = CampanhaCobranca
+        fields = ['nome', 'filtro', 'dias', 'ciclo', 'tipo_mensagem']
+        widgets = {
+            'nome': forms.TextInput(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+                'placeholder': 'Ex: Lembrete vencimentos da semana'
+            }),
+            'filtro': forms.Select(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+            'dias': forms.NumberInput(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+                'min': '0',
+                'max': '60'
+            }),
+            'ciclo': forms.Select(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+            'tipo_mensagem': forms.Select(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+        }
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('filtro') == 'CICLO' and not cleaned_data.get('ciclo'):
+            self.add_error('ciclo', 'Informe o ciclo das recorrências.')
+        return cleaned_data
+
+
+class ModeloMensagemForm(forms.ModelForm):
+    """Formulário para edição dos textos das mensagens WhatsApp"""
+    
+    class Meta:
+        model = ModeloMensagem
+        fields = ['nome', 'conteudo']
+        widgets = {
+            'nome': forms.TextInput(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+            'conteudo': forms.Textarea(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent font-mono text-sm',
+                'rows': 20
+            }),
+        }
+    
+    def clean_conteudo(self):
+        from .mensagem_service import renderizar_texto
+        conteudo = self.cleaned_data['conteudo']
+        try:
+            renderizar_texto(conteudo, {})
+        except TemplateSyntaxError as e:
+            raise forms.ValidationError(f'Modelo inválido: {e}')
+        return conteudo
+
+
+class ReajusteForm(forms.ModelForm):
+    """Formulário para reajuste de preço em massa das recorrências"""
+    
+    tabela_texto = forms.CharField(
+        label='Tabela de Preços', required=False,
+        help_text='Uma linha por preço: "valor atual = novo valor" (ex: 99,90 = 109,90)',
+        widget=forms.Textarea(attrs={
+            'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent font-mono text-sm',
+            'rows': 6,
+            'placeholder': '99,90 = 109,90\n149,90 = 159,90'
+        })
+    )
+    
+    class Meta:
+        model = Reajuste
+        fields = ['nome', 'tipo', 'percentual', 'ciclo', 'billing_type', 'criadas_ate', 'atualizar_cobrancas_pendentes']
+        widgets = {
+            'nome': forms.TextInput(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+                'placeholder': 'Ex: Reajuste anual IPCA'
+            }),
+            'tipo': forms.Select(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+            'percentual': forms.NumberInput(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+                'step': '0.01'
+            }),
+            'ciclo': forms.Select(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+            'billing_type': forms.Select(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent'
+            }),
+            'criadas_ate': forms.DateInput(attrs={
+                'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent',
+                'type': 'date'
+            }, format='%Y-%m-%d'),
+            'atualizar_cobrancas_pendentes': forms.CheckboxInput(attrs={
+                'class': 'h-4 w-4 text-blue-600 border-gray-300 rounded focus:ring-blue-500'
+            }),
+        }
+    
+    def clean(self):
+        from .reajuste_service import ler_tabela
+        cleaned_data = super().clean()
+        if cleaned_data.get('tipo') == 'PERCENTUAL':
+            percentual = cleaned_data.get('percentual')
+            if percentual is None:
+                self.add_error('percentual', 'Informe o percentual do reajuste.')
+            elif percentual <= -100:
+                self.add_error('percentual', 'O percentual deve ser maior que -100%.')
+        elif cleaned_data.get('tipo') == 'TABELA':
+            try:
+                self.instance.tabela = ler_tabela(cleaned_data.get('tabela_texto') or '')
+            except ValueError as e:
+                self.add_error('tabela_texto', str(e))
+            else:
+                if not self.instance.tabela:
+                    self.add_error('tabela_texto', 'Informe ao menos um preço da tabela.')
+        return cleaned_data
@@ -0,0 +1,81 @@
+"""
+Histórico de alterações das recorrências
+
+Cada mudança de status, valor ou dado enviado ao Asaas gera uma
+AlteracaoRecorrencia com apenas os campos alterados ({campo: [anterior,
+novo]}) e o hash do conteúdo resultante. O conteúdo é normalizado (valores
+com 2 casas, datas ISO) para que o dado vindo da API e o gravado no banco
+produzam o mesmo hash; a importação usa isso para pular as assinaturas que
+não mudaram, sem UPDATE nem registro no histórico.
+"""
+import hashlib
+import json
+from datetime import date
+from decimal import Decimal
+from .models import Recorrencia, AlteracaoRecorrencia
+from .outbox_service import TAMANHO_LOTE
+
+# Campos acompanhados no histórico
+CAMPOS_HISTORICO = Recorrencia.CAMPOS_ASAAS + ('status',)
+
+
+def _normalizar(valor):
+    if isinstance(valor, (Decimal, float)):
+        return str(Decimal(str(valor)).quantize(Decimal('0.01')))
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+def conteudo_recorrencia(recorrencia):
+    """Campos acompanhados, normalizados, de uma Recorrencia ou de um dict com os mesmos nomes"""
+    if isinstance(recorrencia, dict):
+        return {campo: _normalizar(recorrencia.get(campo)) for campo in CAMPOS_HISTORICO}
+    return {campo: _normalizar(getattr(recorrencia, campo)) for campo in CAMPOS_HISTORICO}
+
+
+def assinatura_conteudo(conteudo):
+    return hashlib.sha1(json.dumps(conteudo, sort_keys=True).encode()).hexdigest()
+
+
+def conteudos_por_asaas_id(asaas_ids):
+    """{asaas_id: (pk, conteudo)} das recorrências já importadas, em consultas de até TAMANHO_LOTE ids"""
+    asaas_ids = list(asaas_ids)
+    conteudos = {}
+    for i in range(0, len(asaas_ids), TAMANHO_LOTE):
+        linhas = Recorrencia.objects.filter(asaas_id__in=asaas_ids[i:i + TAMANHO_LOTE]).values(
+            'pk', 'asaas_id', *CAMPOS_HISTORICO
+        )
+        conteudos.update((linha['asaas_id'], (linha['pk'], conteudo_recorrencia(linha))) for linha in linhas)
+    return conteudos
+
+
+def nova_alteracao(recorrencia_id, origem, anterior, atual):
+    """
+    AlteracaoRecorrencia (não gravada) com os campos que mudaram de `anterior` para `atual`
+
+    Args:
+        anterior: Conteúdo antes da mudança, ou None quando a recorrência foi criada
+        atual: Conteúdo depois da mudança
+
+    Returns:
+        A alteração, ou None se nada mudou
+    """
+    campos = {
+        campo: [None if anterior is None else anterior[campo], valor]
+        for campo, valor in atual.items()
+        if anterior is None or anterior[campo] != valor
+    }
+    if not campos:
+        return None
+    return AlteracaoRecorrencia(
+        recorrencia_id=recorrencia_id, origem=origem, campos=campos,
+        assinatura=assinatura_conteudo(atual), criada=anterior is None,
+    )
+
+
+def registrar_alteracoes(alteracoes):
+    """Grava em lote as alterações (ignora os None de nova_alteracao)"""
+    alteracoes = [alteracao for alteracao in alteracoes if alteracao is not None]
+    AlteracaoRecorrencia.objects.bulk_create(alteracoes, batch_size=TAMANHO_LOTE)
+    return len(alteracoes)
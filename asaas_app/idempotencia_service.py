@@ -0,0 +1,107 @@
+"""
+Registro de idempotência das criações no Asaas
+
+Cada criação (cliente, assinatura, link de pagamento) é identificada por
+uma chave explícita de quem chama: o registro local (ex: "recorrencia:12")
+ou o token de envio do formulário. Dados iguais não bastam para reaproveitar
+uma criação: duas assinaturas idênticas cadastradas de propósito são dois
+objetos. A chave é reservada antes do POST e guarda o id e a resposta do
+Asaas quando a criação termina, então uma retentativa (formulário reenviado,
+lote retomado, comando reexecutado) recebe o objeto já criado, marcado com
+'reaproveitada', em vez de criar outro. Quem chama precisa tratar esse caso:
+o registro local daquele objeto pode já existir.
+
+Quando o Asaas recusa a criação a chave é liberada; quando não há resposta
+(timeout, conexão caída) não dá para saber se o objeto foi criado, então
+novas tentativas ficam bloqueadas por IDEMPOTENCIA_ESPERA_SEGUNDOS. As
+chaves valem por IDEMPOTENCIA_VALIDADE_HORAS, e as de objetos removidos do
+Asaas são liberadas com liberar().
+"""
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ChaveIdempotencia
+import logging
+
+logger = logging.getLogger(__name__)
+
+VALIDADE_HORAS = getattr(settings, 'IDEMPOTENCIA_VALIDADE_HORAS', 24)
+ESPERA_SEGUNDOS = getattr(settings, 'IDEMPOTENCIA_ESPERA_SEGUNDOS', 300)
+
+
+def impressao(endpoint, chave):
+    """SHA-256 do endpoint com a chave informada"""
+    return hashlib.sha256(f'{endpoint}:{chave}'.encode()).hexdigest()
+
+
+def reservar(chave, endpoint):
+    """
+    Reserva a chave para uma criação
+
+    Returns:
+        Tupla (ChaveIdempotencia, situação): 'NOVA' (pode enviar), 'CONCLUIDA'
+        (já criado) ou 'EM_ANDAMENTO' (outra tentativa recente sem resposta)
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        registro, criada = ChaveIdempotencia.objects.select_for_update().get_or_create(
+            chave=chave, defaults={'endpoint': endpoint, 'atualizada_em': agora}
+        )
+        if criada:
+            ChaveIdempotencia.objects.filter(atualizada_em__lt=agora - timedelta(hours=VALIDADE_HORAS)).delete()
+            return registro, 'NOVA'
+
+        if registro.atualizada_em < agora - timedelta(hours=VALIDADE_HORAS):
+            registro.status, registro.asaas_id, registro.resposta = 'PENDENTE', '', {}
+        elif registro.status == 'CONCLUIDA':
+            return registro, 'CONCLUIDA'
+        elif registro.atualizada_em > agora - timedelta(seconds=ESPERA_SEGUNDOS):
+            return registro, 'EM_ANDAMENTO'
+
+        registro.atualizada_em = agora
+        registro.save()
+    return registro, 'NOVA'
+
+
+def criar_idempotente(endpoint, enviar, chave):
+    """
+    Executa `enviar()` (o POST de criação) no máximo uma vez por chave
+
+    Args:
+        chave: Identifica o objeto criado (registro local ou token do formulário)
+
+    Returns:
+        Resultado no formato do AsaasService; quando reaproveitado, a resposta
+        da criação original com 'reaproveitada': True
+    """
+    if not chave:
+        raise ValueError(f'Criação em {endpoint} sem chave de idempotência')
+    registro, situacao = reservar(impressao(endpoint, chave), endpoint)
+    if situacao == 'CONCLUIDA':
+        logger.info(f'Criação em {endpoint} reaproveitada: {registro.asaas_id}')
+        return {'success': True, 'data': registro.resposta, 'reaproveitada': True}
+    if situacao == 'EM_ANDAMENTO':
+        return {
+            'success': False,
+            'error': 'Uma criação idêntica está em andamento ou ficou sem resposta do Asaas; confira no Asaas antes de tentar novamente.',
+        }
+
+    result = enviar()
+    if result.get('success'):
+        registro.status = 'CONCLUIDA'
+        registro.asaas_id = result['data'].get('id') or ''
+        registro.resposta = result['data']
+        registro.atualizada_em = timezone.now()
+        registro.save()
+    elif not result.get('sem_resposta'):
+        registro.delete()  # recusada pelo Asaas: nada foi criado
+    return result
+
+
+def liberar(asaas_ids):
+    """Apaga as chaves dos objetos removidos do Asaas (a mesma chave volta a criar um objeto novo)"""
+    asaas_ids = [asaas_id for asaas_id in asaas_ids if asaas_id]
+    if asaas_ids:
+        ChaveIdempotencia.objects.filter(asaas_id__in=asaas_ids).delete()
@@ -0,0 +1,303 @@
+"""
+Importação completa de clientes e assinaturas do Asaas
+
+Todas as páginas são buscadas com buscar_paginas (em paralelo) e gravadas
+em lote: os registros já importados são lidos em consultas de até
+TAMANHO_LOTE ids, os novos entram com bulk_create, os alterados com
+bulk_update e os que não mudaram não são regravados. Cada registro é
+conferido antes da gravação (campos nulos, tamanhos, dígitos): um registro
+inválido conta como erro e fica de fora, sem derrubar o lote. Registros
+alterados localmente depois da última sincronização (ex: reajuste ainda não
+propagado) não são sobrescritos: contam como conflito e continuam pendentes,
+para que a alteração local seja enviada ao Asaas. Os clientes citados pelas
+assinaturas que ainda não existem localmente são buscados no Asaas em
+paralelo antes da gravação das recorrências.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Cliente, Recorrencia
+from .services import AsaasService
+from .telefone_service import primeiro_telefone_valido
+from .outbox_service import TAMANHO_LOTE
+from .campanha_service import CONCORRENCIA_ASAAS
+from .cobranca_service import buscar_paginas, POR_PAGINA
+from .projecao_service import atualizar_projecoes
+from .historico_service import (
+    conteudo_recorrencia, assinatura_conteudo, conteudos_por_asaas_id, nova_alteracao, registrar_alteracoes,
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_CONTROLE = ['alterado_em', 'sincronizado_em', 'synced_with_asaas', 'updated_at']
+
+
+def _em_lotes(ids, consulta):
+    """Executa `consulta(lote)` em lotes de até TAMANHO_LOTE ids e junta as linhas"""
+    ids = list(ids)
+    for i in range(0, len(ids), TAMANHO_LOTE):
+        yield from consulta(ids[i:i + TAMANHO_LOTE])
+
+
+def _pks_por_asaas_id(modelo, asaas_ids):
+    return dict(_em_lotes(asaas_ids, lambda lote: modelo.objects.filter(asaas_id__in=lote).values_list('asaas_id', 'pk')))
+
+
+def _com_alteracao_local(modelo, asaas_ids):
+    """asaas_ids dos registros alterados localmente depois da última sincronização (ainda não enviados ao Asaas)"""
+    return set(_em_lotes(asaas_ids, lambda lote: modelo.objects.filter(
+        asaas_id__in=lote, alterado_em__gt=F('sincronizado_em')
+    ).values_list('asaas_id', flat=True)))
+
+
+def _marcar_inalterados(modelo, pks, momento):
+    """Iguais ao Asaas: só marca como sincronizados os que ainda constavam como pendentes"""
+    for i in range(0, len(pks), TAMANHO_LOTE):
+        modelo.pendentes_sincronizacao().filter(pk__in=pks[i:i + TAMANHO_LOTE]).update(
+            sincronizado_em=momento, synced_with_asaas=True
+        )
+
+
+def _validar(modelo, dados):
+    """Confere os valores que o banco recusaria (nulo em campo obrigatório, tamanho, dígitos); levanta ValidationError"""
+    for nome, valor in dados.items():
+        campo = modelo._meta.get_field(nome)
+        if valor is None:
+            if not campo.null:
+                raise ValidationError(f'{nome}: campo obrigatório sem valor')
+            continue
+        try:
+            campo.run_validators(valor)
+        except ValidationError as e:
+            raise ValidationError(f'{nome}: {"; ".join(e.messages)}')
+
+
+def _dados_cliente(customer):
+    return {campo: customer.get(campo) or '' for campo in Cliente.CAMPOS_ASAAS}
+
+
+def salvar_clientes(customers, momento):
+    """
+    Grava em lote os clientes recebidos do Asaas
+
+    Clientes cujo CPF/CNPJ já pertence a outro cadastro (ou se repete na
+    própria listagem) não são gravados e contam como erro; os alterados
+    localmente e ainda não enviados ao Asaas contam como conflito.
+
+    Args:
+        momento: Quando os dados foram lidos do Asaas (vira a sincronização dos gravados)
+
+    Returns:
+        Dict com as quantidades de importados, atualizados, inalterados, conflitos e erros
+    """
+    customers = {c['id']: c for c in customers if c.get('id')}
+    existentes = {
+        linha['asaas_id']: linha
+        for linha in _em_lotes(customers, lambda lote: Cliente.objects.filter(asaas_id__in=lote).values(
+            'pk', 'asaas_id', *Cliente.CAMPOS_ASAAS
+        ))
+    }
+    dados = {asaas_id: _dados_cliente(customer) for asaas_id, customer in customers.items()}
+    alterados = {
+        asaas_id for asaas_id, valores in dados.items()
+        if asaas_id not in existentes or any((existentes[asaas_id][c] or '') != v for c, v in valores.items())
+    }
+    dono_do_documento = dict(_em_lotes(
+        {dados[asaas_id]['cpfCnpj'] for asaas_id in alterados},
+        lambda lote: Cliente.objects.filter(cpfCnpj__in=lote).values_list('cpfCnpj', 'asaas_id'),
+    ))
+
+    locais = _com_alteracao_local(Cliente, alterados & existentes.keys())
+
+    novos, atualizados, erros = [], [], 0
+    for asaas_id in alterados:
+        if asaas_id in locais:
+            logger.warning(f'Cliente {asaas_id} não importado: tem alterações locais ainda não enviadas ao Asaas')
+            continue
+        valores = dados[asaas_id]
+        dono = dono_do_documento.setdefault(valores['cpfCnpj'], asaas_id)
+        if dono != asaas_id:
+            logger.error(f'Erro ao importar cliente {asaas_id}: CPF/CNPJ {valores["cpfCnpj"]} já cadastrado')
+            erros += 1
+            continue
+        try:
+            _validar(Cliente, valores)
+        except ValidationError as e:
+            logger.error(f'Erro ao importar cliente {asaas_id}: {e.messages[0]}')
+            erros += 1
+            continue
+        cliente = Cliente(
+            asaas_id=asaas_id, **valores,
+            telefone_e164=primeiro_telefone_valido(valores['mobilePhone'], valores['phone']),
+            alterado_em=momento, sincronizado_em=momento, synced_with_asaas=True, updated_at=timezone.now(),
+        )
+        if asaas_id in existentes:
+            cliente.pk = existentes[asaas_id]['pk']
+            atualizados.append(cliente)
+        else:
+            novos.append(cliente)
+
+    inalterados = [linha['pk'] for asaas_id, linha in existentes.items() if asaas_id not in alterados]
+    with transaction.atomic():
+        Cliente.objects.bulk_create(novos, batch_size=TAMANHO_LOTE)
+        Cliente.objects.bulk_update(
+            atualizados, [*Cliente.CAMPOS_ASAAS, 'telefone_e164', *CAMPOS_CONTROLE], batch_size=TAMANHO_LOTE
+        )
+        _marcar_inalterados(Cliente, inalterados, momento)
+
+    return {
+        'importados': len(novos), 'atualizados': len(atualizados), 'inalterados': len(inalterados),
+        'conflitos': len(locais), 'erros': erros,
+    }
+
+
+def buscar_clientes(asaas_ids, concorrencia=None):
+    """Busca no Asaas, em paralelo, os clientes pelos ids (os que falharem ficam de fora)"""
+    asaas_service = AsaasService()
+    with ThreadPoolExecutor(max_workers=concorrencia or CONCORRENCIA_ASAAS) as executor:
+        resultados = list(executor.map(asaas_service.get_customer, asaas_ids))
+    return [r['data'] for r in resultados if r.get('success')]
+
+
+def _dados_recorrencia(subscription, cliente_id):
+    return {
+        'cliente_id': cliente_id,
+        'value': Decimal(str(subscription.get('value') or 0)),
+        'cycle': subscription.get('cycle') or 'MONTHLY',
+        'billing_type': subscription.get('billingType') or 'BOLETO',
+        'description': subscription.get('description') or 'Importado do Asaas',
+        'next_due_date': date.fromisoformat(subscription['nextDueDate']),
+        'end_date': date.fromisoformat(subscription['endDate']) if subscription.get('endDate') else None,
+        'max_payments': subscription.get('maxPayments'),
+        'status': subscription.get('status') or 'ACTIVE',
+    }
+
+
+def salvar_recorrencias(subscriptions, clientes, momento):
+    """
+    Grava em lote as assinaturas recebidas do Asaas e registra o histórico das que mudaram
+
+    As alteradas localmente e ainda não enviadas ao Asaas não são sobrescritas (conflitos).
+
+    Args:
+        clientes: {asaas_id do cliente: pk} dos clientes já gravados
+        momento: Quando os dados foram lidos do Asaas
+
+    Returns:
+        Dict com as quantidades de importadas, atualizadas, inalteradas, conflitos, sem cliente e erros
+    """
+    subscriptions = {s['id']: s for s in subscriptions if s.get('id')}
+    existentes = conteudos_por_asaas_id(subscriptions)
+    locais = _com_alteracao_local(Recorrencia, existentes)
+
+    novas, atualizadas, inalteradas, conteudos = [], [], [], {}
+    sem_cliente = erros = conflitos = 0
+    for asaas_id, subscription in subscriptions.items():
+        cliente_id = clientes.get(subscription.get('customer'))
+        if not cliente_id:
+            sem_cliente += 1
+            continue
+        try:
+            dados = _dados_recorrencia(subscription, cliente_id)
+            _validar(Recorrencia, dados)
+        except (KeyError, TypeError, ValueError, ArithmeticError, ValidationError) as e:
+            logger.error(f'Erro ao importar recorrência {asaas_id}: {"; ".join(getattr(e, "messages", [str(e)]))}')
+            erros += 1
+            continue
+
+        conteudo = conteudo_recorrencia(dados)
+        pk, anterior = existentes.get(asaas_id, (None, None))
+        if anterior is not None and assinatura_conteudo(anterior) == assinatura_conteudo(conteudo):
+            inalteradas.append(pk)
+            continue
+        if asaas_id in locais:
+            logger.warning(f'Recorrência {asaas_id} não importada: tem alterações locais ainda não enviadas ao Asaas')
+            conflitos += 1
+            continue
+        conteudos[asaas_id] = conteudo
+        recorrencia = Recorrencia(
+            pk=pk, asaas_id=asaas_id, **dados,
+            alterado_em=momento, sincronizado_em=momento, synced_with_asaas=True, updated_at=timezone.now(),
+        )
+        (novas if pk is None else atualizadas).append(recorrencia)
+
+    with transaction.atomic():
+        Recorrencia.objects.bulk_create(novas, batch_size=TAMANHO_LOTE)
+        Recorrencia.objects.bulk_update(
+            atualizadas, [*Recorrencia.CAMPOS_ASAAS, 'status', *CAMPOS_CONTROLE], batch_size=TAMANHO_LOTE
+        )
+        _marcar_inalterados(Recorrencia, inalteradas, momento)
+
+        pks = _pks_por_asaas_id(Recorrencia, [r.asaas_id for r in novas])
+        registrar_alteracoes(
+            nova_alteracao(pks[r.asaas_id], 'IMPORTACAO', None, conteudos[r.asaas_id]) for r in novas
+        )
+        registrar_alteracoes(
+            nova_alteracao(r.pk, 'IMPORTACAO', existentes[r.asaas_id][1], conteudos[r.asaas_id]) for r in atualizadas
+        )
+
+    return {
+        'importadas': len(novas), 'atualizadas': len(atualizadas), 'inalteradas': len(inalteradas),
+        'conflitos': conflitos, 'sem_cliente': sem_cliente, 'erros': erros,
+    }
+
+
+def _prazo(tempo_maximo):
+    return time.monotonic() + tempo_maximo if tempo_maximo else None
+
+
+def importar_clientes(tempo_maximo=None, concorrencia=None):
+    """
+    Importa todos os clientes do Asaas
+
+    Args:
+        tempo_maximo: Segundos para buscar as páginas (as que não couberem ficam de fora)
+
+    Returns:
+        Resultado de salvar_clientes com o total lido e se a busca foi completa
+    """
+    asaas_service = AsaasService()
+    momento = timezone.now()
+    customers, completa = buscar_paginas(
+        lambda offset: asaas_service.list_customers(limit=POR_PAGINA, offset=offset),
+        prazo=_prazo(tempo_maximo), concorrencia=concorrencia, por_pagina=POR_PAGINA,
+    )
+    resultado = salvar_clientes(customers, momento)
+    resultado.update(total=len(customers), completa=completa)
+    logger.info(f'Clientes importados do Asaas: {resultado}')
+    return resultado
+
+
+def importar_recorrencias(tempo_maximo=None, concorrencia=None):
+    """
+    Importa todas as assinaturas do Asaas, trazendo antes os clientes que faltarem
+
+    Returns:
+        Resultado de salvar_recorrencias com o total lido, os clientes importados e se a busca foi completa
+    """
+    asaas_service = AsaasService()
+    momento = timezone.now()
+    subscriptions, completa = buscar_paginas(
+        lambda offset: asaas_service.list_subscriptions(limit=POR_PAGINA, offset=offset),
+        prazo=_prazo(tempo_maximo), concorrencia=concorrencia, por_pagina=POR_PAGINA,
+    )
+
+    referenciados = {s['customer'] for s in subscriptions if s.get('customer')}
+    clientes = _pks_por_asaas_id(Cliente, referenciados)
+    faltantes = referenciados - clientes.keys()
+    clientes_importados = 0
+    if faltantes:
+        clientes_importados = salvar_clientes(buscar_clientes(faltantes, concorrencia), momento)['importados']
+        clientes.update(_pks_por_asaas_id(Cliente, faltantes))
+
+    resultado = salvar_recorrencias(subscriptions, clientes, momento)
+    atualizar_projecoes()
+    resultado.update(total=len(subscriptions), clientes_importados=clientes_importados, completa=completa)
+    logger.info(f'Recorrências importadas do Asaas: {resultado}')
+    return resultado
@@ -0,0 +1,132 @@
+"""
+Limite de envios de WhatsApp e de chamadas ao Asaas (token bucket)
+
+Os baldes ficam na tabela LimiteEnvio e são atualizados com SELECT ... FOR
+UPDATE, então o limite vale para todos os workers do gunicorn e para o
+worker da fila ao mesmo tempo. Para o WhatsApp há um balde global (protege
+o número junto ao provedor) e um por destinatário (evita rajadas para o
+mesmo cliente); as sincronizações em lote com o Asaas usam o balde "asaas".
+Baldes de destinatário parados há mais de uma hora já estão cheios de novo e
+são apagados por limpar_baldes_ociosos (chamado pela fila de saída).
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import LimiteEnvio
+import logging
+
+logger = logging.getLogger(__name__)
+
+LIMITE_GLOBAL_POR_MINUTO = getattr(settings, 'WHATSAPP_LIMITE_GLOBAL_POR_MINUTO', 30)
+LIMITE_DESTINO_POR_HORA = getattr(settings, 'WHATSAPP_LIMITE_DESTINO_POR_HORA', 5)
+LIMITE_ASAAS_POR_MINUTO = getattr(settings, 'ASAAS_LIMITE_POR_MINUTO', 60)
+# Tempo para um balde de destinatário vazio voltar à capacidade total
+REPOSICAO_DESTINO = timedelta(hours=1)
+
+
+def _baldes(telefone):
+    """(chave, capacidade, tokens repostos por segundo) de cada balde envolvido no envio"""
+    return [
+        ('global', LIMITE_GLOBAL_POR_MINUTO, LIMITE_GLOBAL_POR_MINUTO / 60),
+        (f'destino:{telefone}', LIMITE_DESTINO_POR_HORA, LIMITE_DESTINO_POR_HORA / 3600),
+    ]
+
+
+def _reservar(baldes):
+    """
+    Consome um token de cada balde
+
+    O consumo é tudo-ou-nada: se algum balde estiver vazio, nenhum token é gasto.
+
+    Returns:
+        0 se está liberado, senão os segundos até haver token disponível
+    """
+    agora = timezone.now()
+    baldes = sorted(baldes)  # ordem fixa de bloqueio evita deadlock
+
+    for chave, capacidade, _ in baldes:
+        LimiteEnvio.objects.get_or_create(chave=chave, defaults={'tokens': capacidade, 'atualizado_em': agora})
+
+    with transaction.atomic():
+        linhas = {l.chave: l for l in LimiteEnvio.objects.select_for_update().filter(chave__in=[b[0] for b in baldes])}
+
+        espera = 0
+        for chave, capacidade, por_segundo in baldes:
+            if chave not in linhas:
+                # Apagado como ocioso entre a criação e o bloqueio: volta cheio
+                linhas[chave], _ = LimiteEnvio.objects.get_or_create(
+                    chave=chave, defaults={'tokens': capacidade, 'atualizado_em': agora}
+                )
+            linha = linhas[chave]
+            decorrido = max((agora - linha.atualizado_em).total_seconds(), 0)
+            linha.tokens = min(capacidade, linha.tokens + decorrido * por_segundo)
+            linha.atualizado_em = agora
+            if linha.tokens < 1:
+                espera = max(espera, (1 - linha.tokens) / por_segundo)
+
+        if not espera:
+            for linha in linhas.values():
+                linha.tokens -= 1
+        LimiteEnvio.objects.bulk_update(linhas.values(), ['tokens', 'atualizado_em'])
+
+    return espera
+
+
+def limpar_baldes_ociosos():
+    """
+    Apaga os baldes de destinatário sem uso há mais de REPOSICAO_DESTINO
+
+    Um balde assim já está com a capacidade total, igual ao que _reservar
+    cria no próximo envio, então apagar não muda o limite.
+
+    Returns:
+        Quantidade de baldes apagados
+    """
+    apagados, _ = LimiteEnvio.objects.filter(
+        chave__startswith='destino:', atualizado_em__lt=timezone.now() - REPOSICAO_DESTINO
+    ).delete()
+    return apagados
+
+
+def reservar_envio(telefone):
+    """
+    Consome um token do balde global e do balde do destinatário
+
+    Returns:
+        0 se o envio está liberado, senão os segundos até haver token disponível
+    """
+    espera = _reservar(_baldes(telefone))
+    if espera:
+        logger.warning(f'Limite de envio atingido para {telefone}, liberado em {espera:.0f}s')
+    return espera
+
+
+def reservar_chamada_asaas():
+    """
+    Consome um token do balde de chamadas ao Asaas (ASAAS_LIMITE_POR_MINUTO)
+
+    Returns:
+        0 se a chamada está liberada, senão os segundos até haver token disponível
+    """
+    return _reservar([('asaas', LIMITE_ASAAS_POR_MINUTO, LIMITE_ASAAS_POR_MINUTO / 60)])
+
+
+def aguardar_chamada_asaas(prazo):
+    """
+    Espera um token do balde do Asaas
+
+    Args:
+        prazo: Limite da espera (time.monotonic)
+
+    Returns:
+        False se o prazo acabar antes de haver token disponível
+    """
+    while True:
+        espera = reservar_chamada_asaas()
+        if not espera:
+            return True
+        if time.monotonic() + espera > prazo:
+            return False
+        time.sleep(espera)
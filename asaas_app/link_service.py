@@ -0,0 +1,222 @@
+"""
+Links de pagamento das recorrências
+
+Cada recorrência aponta para o seu link (Recorrencia.link_pagamento). Os
+links criados antes dessa relação existir eram encontrados pelo nome
+(descrição da recorrência contida no nome do link, do mesmo cliente);
+vincular_links_recorrencias resolve essa busca uma única vez, em lote.
+
+limpar_links reconcilia a tabela com o Asaas (todas as páginas da
+listagem, em paralelo) e remove, no Asaas e localmente, os links
+duplicados e os inativos há mais de LINKS_DIAS_RETENCAO dias. Links
+apontados por alguma recorrência nunca são removidos.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import LinkPagamento, Recorrencia
+from .services import AsaasService
+from .outbox_service import TAMANHO_LOTE
+from .campanha_service import CONCORRENCIA_ASAAS
+from .cobranca_service import buscar_paginas, POR_PAGINA
+from .limite_service import aguardar_chamada_asaas
+from .sincronizacao_service import TEMPO_MAXIMO
+from .idempotencia_service import liberar as liberar_chaves
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Dias que um link inativo ou expirado fica na tabela antes de ser removido
+LINKS_DIAS_RETENCAO = getattr(settings, 'LINKS_DIAS_RETENCAO', 30)
+
+
+def _escolher_link(recorrencia, links):
+    """Link criado para a recorrência (nome exato) ou, senão, o mais recente cujo nome contém a descrição"""
+    descricao = recorrencia.description.lower()
+    candidatos = [l for l in links if descricao in l.nome.lower()]
+    exato = f'{recorrencia.description} - Recorrência'.lower()
+    return next((l for l in candidatos if l.nome.lower() == exato), candidatos[0] if candidatos else None)
+
+
+def vincular_links_recorrencias(simular=False):
+    """
+    Preenche o link de pagamento das recorrências que ainda não têm um
+
+    Returns:
+        Dict com as quantidades de recorrências vinculadas e sem link encontrado
+    """
+    recorrencias = list(Recorrencia.objects.filter(link_pagamento__isnull=True))
+    por_cliente = {}
+    links = LinkPagamento.objects.filter(
+        cliente_id__in={r.cliente_id for r in recorrencias}
+    ).exclude(url='').exclude(url__isnull=True).order_by('-created_at')
+    for link in links:
+        por_cliente.setdefault(link.cliente_id, []).append(link)
+
+    vinculadas = []
+    for r in recorrencias:
+        link = _escolher_link(r, por_cliente.get(r.cliente_id, []))
+        if link is not None:
+            r.link_pagamento = link
+            vinculadas.append(r)
+
+    if not simular:
+        Recorrencia.objects.bulk_update(vinculadas, ['link_pagamento'], batch_size=TAMANHO_LOTE)
+    logger.info(f'Links de pagamento vinculados a {len(vinculadas)} recorrência(s)')
+    return {'vinculadas': len(vinculadas), 'sem_link': len(recorrencias) - len(vinculadas)}
+
+
+def _status_asaas(data):
+    """Status local de um link da listagem do Asaas (None se foi removido)"""
+    if data.get('deleted'):
+        return None
+    if data.get('status') in dict(LinkPagamento.STATUS_CHOICES):
+        return data['status']
+    if data.get('active') is False:
+        return 'INACTIVE'
+    if data.get('endDate') and date.fromisoformat(data['endDate']) < date.today():
+        return 'EXPIRED'
+    return 'ACTIVE'
+
+
+def _reconciliar(links_asaas, completa, simular):
+    """
+    Atualiza status e URL dos links locais conforme a listagem do Asaas
+
+    Returns:
+        Tupla (quantidade atualizada, pks dos links que não existem mais no Asaas)
+    """
+    remotos = {l['id']: l for l in links_asaas if l.get('id')}
+    atualizados, removidos = [], []
+    locais = LinkPagamento.objects.exclude(asaas_id__isnull=True).exclude(asaas_id='').values_list('pk', 'asaas_id', 'status', 'url')
+    for pk, asaas_id, status, url in locais.iterator(chunk_size=TAMANHO_LOTE):
+        data = remotos.get(asaas_id)
+        if data is None:
+            if completa:  # só uma listagem completa prova que o link sumiu
+                removidos.append(pk)
+            continue
+        novo_status = _status_asaas(data)
+        if novo_status is None:
+            removidos.append(pk)
+        elif (novo_status, data.get('url') or url) != (status, url):
+            atualizados.append(LinkPagamento(
+                pk=pk, status=novo_status, url=data.get('url') or url, synced_with_asaas=True, updated_at=timezone.now(),
+            ))
+
+    if not simular:
+        LinkPagamento.objects.bulk_update(atualizados, ['status', 'url', 'synced_with_asaas', 'updated_at'], batch_size=TAMANHO_LOTE)
+        _apagar(removidos)
+    return len(atualizados), removidos
+
+
+def _apagar(pks):
+    """Apaga os links localmente e libera as chaves de criação deles (o mesmo pedido volta a criar um link novo)"""
+    for i in range(0, len(pks), TAMANHO_LOTE):
+        lote = LinkPagamento.objects.filter(pk__in=pks[i:i + TAMANHO_LOTE])
+        liberar_chaves(lote.values_list('asaas_id', flat=True))
+        lote.delete()
+
+
+def _candidatos(dias, ignorar):
+    """
+    Links a remover: duplicados ativos (mesmo cliente, nome, tipo, valor e forma) e inativos há mais de `dias`
+
+    Entre duplicados fica o apontado por uma recorrência ou, senão, o mais recente.
+
+    Returns:
+        Tupla (duplicados, obsoletos), listas de LinkPagamento
+    """
+    em_uso = Recorrencia.objects.filter(link_pagamento=OuterRef('pk'))
+    links = (
+        LinkPagamento.objects.exclude(pk__in=ignorar).annotate(em_uso=Exists(em_uso))
+        .only('pk', 'asaas_id', 'cliente_id', 'nome', 'charge_type', 'valor', 'billing_type', 'status', 'updated_at')
+        .order_by('-em_uso', '-created_at')
+    )
+    limite = timezone.now() - timedelta(days=dias)
+    vistos = set()
+    duplicados, obsoletos = [], []
+    for link in links.iterator(chunk_size=TAMANHO_LOTE):
+        if link.status != 'ACTIVE':
+            if not link.em_uso and link.updated_at < limite:
+                obsoletos.append(link)
+            continue
+        chave = (link.cliente_id, link.nome, link.charge_type, link.valor, link.billing_type)
+        if chave in vistos and not link.em_uso:
+            duplicados.append(link)
+        vistos.add(chave)
+    return duplicados, obsoletos
+
+
+def _remover(links, prazo, concorrencia):
+    """
+    Remove os links no Asaas (respeitando o limite de chamadas, em paralelo) e localmente
+
+    Returns:
+        Tupla (removidos, erros); os que não couberem no prazo ficam para a próxima execução
+    """
+    asaas_service = AsaasService()
+    removidos = [l.pk for l in links if not l.asaas_id]
+    remotos = [l for l in links if l.asaas_id]
+    erros = 0
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for i in range(0, len(remotos), concorrencia):
+            grupo = []
+            for link in remotos[i:i + concorrencia]:
+                if not aguardar_chamada_asaas(prazo):
+                    break
+                grupo.append(link)
+            resultados = executor.map(lambda l: asaas_service.delete_payment_link(l.asaas_id), grupo)
+            for link, result in zip(grupo, resultados):
+                if result.get('success'):
+                    removidos.append(link.pk)
+                else:
+                    logger.warning(f'Erro ao remover link {link.asaas_id} no Asaas: {result.get("error")}')
+                    erros += 1
+            if len(grupo) < len(remotos[i:i + concorrencia]):
+                break  # prazo acabou esperando o limite
+    _apagar(removidos)
+    return len(removidos), erros
+
+
+def limpar_links(dias=None, tempo_maximo=None, concorrencia=None, simular=False):
+    """
+    Reconcilia os links com o Asaas e remove os duplicados e os inativos antigos
+
+    Args:
+        dias: Dias de retenção dos links inativos ou expirados (padrão: LINKS_DIAS_RETENCAO)
+        simular: Apenas conta o que seria atualizado e removido
+
+    Returns:
+        Dict com as quantidades atualizadas, removidas (no Asaas, duplicadas, obsoletas),
+        com erro e pendentes, e se a listagem do Asaas foi completa
+    """
+    prazo = time.monotonic() + (tempo_maximo or TEMPO_MAXIMO)
+    concorrencia = concorrencia or CONCORRENCIA_ASAAS
+    asaas_service = AsaasService()
+    links_asaas, completa = buscar_paginas(
+        lambda offset: asaas_service.list_payment_links(limit=POR_PAGINA, offset=offset),
+        prazo=prazo, concorrencia=concorrencia, por_pagina=POR_PAGINA,
+    )
+
+    atualizados, removidos_no_asaas = _reconciliar(links_asaas, completa, simular)
+    duplicados, obsoletos = _candidatos(LINKS_DIAS_RETENCAO if dias is None else dias, removidos_no_asaas)
+    resultado = {
+        'atualizados': atualizados,
+        'removidos_no_asaas': len(removidos_no_asaas),
+        'duplicados': len(duplicados),
+        'obsoletos': len(obsoletos),
+        'removidos': 0,
+        'erros': 0,
+        'pendentes': 0,
+        'completa': completa,
+    }
+    if not simular:
+        remover = duplicados + obsoletos
+        resultado['removidos'], resultado['erros'] = _remover(remover, prazo, concorrencia)
+        resultado['pendentes'] = len(remover) - resultado['removidos'] - resultado['erros']
+
+    logger.info(f'Limpeza de links de pagamento: {resultado}')
+    return resultado
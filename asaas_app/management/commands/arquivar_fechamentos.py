@@ -0,0 +1,51 @@
+"""
+Comando para arquivar fechamentos mensais já pagos
+"""
+from datetime import date
+from django.core.management.base import BaseCommand
+from asaas_app.models import FechamentoMensal
+from asaas_app.arquivo_service import arquivar_fechamento
+
+
+class Command(BaseCommand):
+    help = 'Move as comissões de indicadores de fechamentos FECHADOS para snapshots compactados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=3,
+            help='Arquiva apenas fechamentos com pelo menos N meses de idade (padrão: 3)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas lista os fechamentos que seriam arquivados',
+        )
+
+    def handle(self, *args, **options):
+        hoje = date.today()
+        limite = hoje.year * 12 + hoje.month - options['meses']
+        
+        fechamentos = FechamentoMensal.objects.filter(
+            status='FECHADO', arquivo__isnull=True
+        ).order_by('ano', 'mes')
+        
+        arquivados = 0
+        for fechamento in fechamentos:
+            if fechamento.ano * 12 + fechamento.mes > limite:
+                continue
+            
+            if options['dry_run']:
+                self.stdout.write(f'  Seria arquivado: {fechamento.mes:02d}/{fechamento.ano}')
+                continue
+            
+            arquivo = arquivar_fechamento(fechamento)
+            if arquivo:
+                arquivados += 1
+                self.stdout.write(self.style.SUCCESS(
+                    f'[OK] {fechamento.mes:02d}/{fechamento.ano}: {arquivo.quantidade_comissoes} comissões '
+                    f'({arquivo.tamanho_bytes} bytes)'
+                ))
+        
+        self.stdout.write(self.style.SUCCESS(f'Concluído! {arquivados} fechamento(s) arquivado(s).'))
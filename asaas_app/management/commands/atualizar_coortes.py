@@ -0,0 +1,34 @@
+"""
+Comando para recalcular as coortes de recorrências (agendar periodicamente, ex: cron diário após sincronizar_cobrancas)
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.coorte_service import atualizar_coortes
+from asaas_app.cobranca_service import sincronizar_cobrancas
+
+
+class Command(BaseCommand):
+    help = 'Atualiza as tabelas de coortes com as recorrências e pagamentos alterados desde a última execução'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sincronizar',
+            action='store_true',
+            help='Sincroniza antes as cobranças do Asaas (todas as páginas)',
+        )
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Recalcula todas as recorrências, não só as alteradas',
+        )
+
+    def handle(self, *args, **options):
+        if options['sincronizar']:
+            resultado = sincronizar_cobrancas()
+            self.stdout.write(self.style.SUCCESS(f"[OK] {resultado['total']} cobrança(s) sincronizada(s)"))
+            if not resultado['completa']:
+                self.stdout.write(self.style.WARNING('Algumas páginas falharam; as coortes podem ficar incompletas.'))
+
+        atualizacao = atualizar_coortes(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] Coortes atualizadas: {atualizacao.recorrencias_recalculadas} recorrência(s) recalculada(s)'
+        ))
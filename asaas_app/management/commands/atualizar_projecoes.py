@@ -0,0 +1,13 @@
+"""
+Comando para recalcular a projeção de receita (agendar periodicamente, ex: cron diário logo após a meia-noite)
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.projecao_service import atualizar_projecoes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as projeções das recorrências alteradas (todas na virada do mês)'
+
+    def handle(self, *args, **options):
+        total = atualizar_projecoes()
+        self.stdout.write(self.style.SUCCESS(f'[OK] Projeção de receita atualizada: {total} recorrência(s) recalculada(s)'))
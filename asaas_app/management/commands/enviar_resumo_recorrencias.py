@@ -0,0 +1,20 @@
+"""
+Comando para enviar o resumo periódico de novas recorrências
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.outbox_service import enfileirar_resumo_recorrencias
+
+
+class Command(BaseCommand):
+    help = 'Enfileira para WHATSAPP_NUMBERS um resumo das recorrências criadas desde o último resumo'
+
+    def handle(self, *args, **options):
+        quantidade, mensagens = enfileirar_resumo_recorrencias()
+        if not quantidade:
+            self.stdout.write('Nenhuma recorrência nova desde o último resumo.')
+        elif not mensagens:
+            self.stdout.write(self.style.WARNING('Nenhum número configurado em WHATSAPP_NUMBERS.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'[OK] Resumo de {quantidade} recorrência(s) enfileirado para {len(mensagens)} número(s)'
+            ))
@@ -0,0 +1,43 @@
+"""
+Comando para executar a régua de cobrança (agendar periodicamente, ex: cron de hora em hora)
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.regua_service import executar_regua, ETAPAS
+
+
+class Command(BaseCommand):
+    help = 'Enfileira as mensagens da régua de cobrança para as cobranças em aberto no Asaas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tempo-maximo',
+            type=int,
+            default=None,
+            help='Segundos disponíveis para a execução (padrão: WHATSAPP_REGUA_TEMPO_MAXIMO ou 300)',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Apenas mostra o que seria enviado, sem enfileirar',
+        )
+
+    def handle(self, *args, **options):
+        etapas = ', '.join(f'D{e:+d}' if e else 'D0' for e in ETAPAS)
+        self.stdout.write(f'Executando régua de cobrança ({etapas})...')
+        resumo = executar_regua(tempo_maximo=options['tempo_maximo'], simular=options['simular'])
+
+        acao = 'a enfileirar' if options['simular'] else 'enfileirada(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {resumo['cobrancas']} cobrança(s) em aberto, {resumo['enfileiradas']} mensagem(ns) {acao} "
+            f"em {resumo['tempo']}s"
+        ))
+        for etapa, total in resumo['por_etapa'].items():
+            self.stdout.write(f'  {etapa}: {total}')
+        self.stdout.write(
+            f"Ignoradas: {resumo['ja_enviadas']} já enviada(s), {resumo['fora_da_etapa']} fora da etapa, "
+            f"{resumo['sem_recorrencia']} sem recorrência ativa, {resumo['sem_telefone']} sem telefone válido"
+        )
+        if resumo['interrompida']:
+            self.stdout.write(self.style.WARNING(
+                'Execução incompleta (tempo máximo ou erro no Asaas); o restante será processado na próxima.'
+            ))
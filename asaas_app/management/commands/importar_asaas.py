@@ -0,0 +1,59 @@
+"""
+Comando para importar todos os clientes e assinaturas do Asaas (contas grandes, sem o limite de tempo da tela)
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.importacao_service import importar_clientes, importar_recorrencias
+
+
+class Command(BaseCommand):
+    help = 'Importa do Asaas todas as páginas de clientes e assinaturas, gravando em lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--somente-clientes',
+            action='store_true',
+            help='Importa apenas os clientes',
+        )
+        parser.add_argument(
+            '--somente-recorrencias',
+            action='store_true',
+            help='Importa apenas as assinaturas (e os clientes delas que ainda não existem)',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=None,
+            help='Chamadas ao Asaas em paralelo (padrão: ASAAS_CONCORRENCIA ou 8)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['somente_recorrencias']:
+            self.stdout.write('Importando clientes...')
+            resultado = importar_clientes(concorrencia=options['concorrencia'])
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] {resultado['total']} cliente(s) lido(s): {resultado['importados']} importado(s), "
+                f"{resultado['atualizados']} atualizado(s), {resultado['inalterados']} sem alterações"
+            ))
+            self._avisos(resultado)
+
+        if not options['somente_clientes']:
+            self.stdout.write('Importando recorrências...')
+            resultado = importar_recorrencias(concorrencia=options['concorrencia'])
+            self.stdout.write(self.style.SUCCESS(
+                f"[OK] {resultado['total']} recorrência(s) lida(s): {resultado['importadas']} importada(s), "
+                f"{resultado['atualizadas']} atualizada(s), {resultado['inalteradas']} sem alterações, "
+                f"{resultado['clientes_importados']} cliente(s) novo(s)"
+            ))
+            if resultado['sem_cliente']:
+                self.stdout.write(self.style.WARNING(f"{resultado['sem_cliente']} recorrência(s) sem cliente no Asaas"))
+            self._avisos(resultado)
+
+    def _avisos(self, resultado):
+        if resultado['conflitos']:
+            self.stdout.write(self.style.WARNING(
+                f"{resultado['conflitos']} registro(s) com alterações locais não enviadas mantido(s); rode sincronizar_alteracoes"
+            ))
+        if resultado['erros']:
+            self.stdout.write(self.style.WARNING(f"{resultado['erros']} erro(s); veja o log"))
+        if not resultado['completa']:
+            self.stdout.write(self.style.WARNING('Algumas páginas falharam; execute novamente para completar.'))
@@ -0,0 +1,54 @@
+"""
+Comando para limpar a tabela de links de pagamento (agendar periodicamente, ex: cron diário)
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.link_service import limpar_links, LINKS_DIAS_RETENCAO
+
+
+class Command(BaseCommand):
+    help = 'Atualiza os status dos links pelo Asaas e remove (no Asaas e localmente) os duplicados e os inativos antigos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=LINKS_DIAS_RETENCAO,
+            help=f'Remove links inativos ou expirados há mais de N dias (padrão: {LINKS_DIAS_RETENCAO})',
+        )
+        parser.add_argument(
+            '--tempo-maximo',
+            type=int,
+            default=None,
+            help='Tempo máximo da execução em segundos (padrão: 300); o restante fica para a próxima',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=None,
+            help='Chamadas ao Asaas em paralelo (padrão: ASAAS_CONCORRENCIA ou 8)',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Apenas mostra o que seria atualizado e removido',
+        )
+
+    def handle(self, *args, **options):
+        resultado = limpar_links(options['dias'], options['tempo_maximo'], options['concorrencia'], options['simular'])
+
+        if options['simular']:
+            self.stdout.write(
+                f"Simulação: {resultado['atualizados']} link(s) a atualizar, {resultado['removidos_no_asaas']} removido(s) no Asaas, "
+                f"{resultado['duplicados']} duplicado(s) e {resultado['obsoletos']} inativo(s) a remover"
+            )
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {resultado['atualizados']} link(s) atualizado(s), "
+            f"{resultado['removidos_no_asaas'] + resultado['removidos']} removido(s) "
+            f"({resultado['duplicados']} duplicado(s), {resultado['obsoletos']} inativo(s))"
+        ))
+        if resultado['erros']:
+            self.stdout.write(self.style.WARNING(f"{resultado['erros']} link(s) não puderam ser removidos no Asaas"))
+        if resultado['pendentes'] or not resultado['completa']:
+            self.stdout.write(self.style.WARNING('Limpeza incompleta; execute novamente para continuar.'))
@@ -0,0 +1,36 @@
+"""
+Comando para normalizar (E.164) e validar os telefones de clientes e parceiros
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.telefone_service import normalizar_telefones, relatorio_telefones
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os telefones normalizados (E.164) e exibe o relatório de números inválidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Lista os registros com telefone inválido',
+        )
+        parser.add_argument(
+            '--somente-relatorio',
+            action='store_true',
+            help='Apenas exibe o relatório, sem recalcular',
+        )
+
+    def handle(self, *args, **options):
+        if not options['somente_relatorio']:
+            for modelo, total in normalizar_telefones().items():
+                self.stdout.write(self.style.SUCCESS(f'[OK] {modelo}: {total} telefone(s) atualizado(s)'))
+
+        for modelo, situacao in relatorio_telefones().items():
+            self.stdout.write(
+                f"{modelo}: {situacao['validos']} válido(s), {situacao['invalidos']} inválido(s), "
+                f"{situacao['sem_telefone']} sem telefone"
+            )
+            if options['listar']:
+                for registro in situacao['invalidos_lista']:
+                    numeros = ', '.join(str(v) for k, v in registro.items() if k != 'pk' and v)
+                    self.stdout.write(self.style.WARNING(f"  #{registro['pk']}: {numeros}"))
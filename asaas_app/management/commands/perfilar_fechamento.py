@@ -0,0 +1,43 @@
+"""
+Comando para reexecutar o cálculo de um fechamento sob o perfilador
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from asaas_app.models import FechamentoMensal
+from asaas_app.perfil_service import PerfilCalculo
+
+
+class Command(BaseCommand):
+    help = 'Reexecuta o cálculo de um mês e exibe tempo/consultas SQL por etapa (sem gravar nada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', type=int, required=True, help='Mês (1-12)')
+        parser.add_argument('--ano', type=int, required=True, help='Ano (ex: 2025)')
+
+    def handle(self, *args, **options):
+        from asaas_app.views import _calcular_fechamento
+        
+        mes = options['mes']
+        ano = options['ano']
+        if not 1 <= mes <= 12:
+            raise CommandError('Mês inválido.')
+        
+        perfil = PerfilCalculo()
+        self.stdout.write(f'Reexecutando cálculo de {mes:02d}/{ano}...')
+        
+        # Tudo roda em uma transação desfeita ao final: o fechamento existente
+        # é removido apenas para permitir o recálculo e volta intacto
+        with transaction.atomic():
+            FechamentoMensal.objects.filter(mes=mes, ano=ano).delete()
+            _calcular_fechamento(mes, ano, perfil=perfil)
+            transaction.set_rollback(True)
+        
+        resumo = perfil.resumo()
+        self.stdout.write('')
+        self.stdout.write(f'{"Etapa":<25}{"Tempo (ms)":>12}{"Consultas":>12}{"SQL (ms)":>12}')
+        for e in resumo['etapas']:
+            self.stdout.write(f'{e["etapa"]:<25}{e["tempo_ms"]:>12}{e["queries"]:>12}{e["sql_ms"]:>12}')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Total: {resumo["total_ms"]} ms, {resumo["total_queries"]} consultas ({resumo["total_sql_ms"]} ms em SQL)'
+        ))
@@ -0,0 +1,52 @@
+"""
+Comando para drenar a fila de saída de mensagens WhatsApp
+"""
+import time
+from django.core.management.base import BaseCommand
+from asaas_app.outbox_service import processar_fila
+
+
+class Command(BaseCommand):
+    help = 'Envia as mensagens WhatsApp pendentes na fila (uma vez ou em loop contínuo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=50,
+            help='Quantidade máxima de mensagens por lote (padrão: 50)',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=None,
+            help='Envios simultâneos (padrão: WHATSAPP_OUTBOX_CONCORRENCIA ou 4)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua rodando e verifica a fila periodicamente',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera quando a fila está vazia no modo --loop (padrão: 5)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            resumo = processar_fila(options['lote'], options['concorrencia'])
+            total = sum(resumo.values())
+            if total:
+                self.stdout.write(self.style.SUCCESS(
+                    f"[OK] {resumo['enviadas']} enviada(s), {resumo['reagendadas']} reagendada(s), "
+                    f"{resumo['falhas']} falha(s) definitiva(s)"
+                ))
+            elif not options['loop']:
+                self.stdout.write('Nenhuma mensagem pendente na fila.')
+
+            if not options['loop']:
+                break
+            if total < options['lote']:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,38 @@
+"""
+Comando para continuar o envio ao Asaas dos reajustes de preço em andamento (agendar periodicamente, ex: cron a cada 10 minutos)
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.reajuste_service import propagar_reajustes
+
+
+class Command(BaseCommand):
+    help = 'Envia ao Asaas os valores pendentes dos reajustes de preço em aplicação ou reversão'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tempo-maximo',
+            type=int,
+            default=None,
+            help='Tempo máximo por reajuste em segundos (padrão: 300); o restante fica para a próxima',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=None,
+            help='Envios em paralelo (padrão: ASAAS_CONCORRENCIA ou 8)',
+        )
+
+    def handle(self, *args, **options):
+        reajustes = propagar_reajustes(options['tempo_maximo'], options['concorrencia'])
+        if not reajustes:
+            self.stdout.write(self.style.SUCCESS('[OK] Nenhum reajuste em andamento'))
+            return
+
+        for reajuste in reajustes:
+            self.stdout.write(self.style.SUCCESS(
+                f'[OK] {reajuste.nome}: {reajuste.get_status_display()}, '
+                f'{reajuste.total_enviados} enviada(s), {reajuste.total_erros} erro(s)'
+            ))
+            pendentes = reajuste.itens_a_enviar().count()
+            if pendentes:
+                self.stdout.write(self.style.WARNING(f'{pendentes} recorrência(s) pendente(s); execute novamente para continuar.'))
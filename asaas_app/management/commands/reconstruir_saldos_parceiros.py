@@ -0,0 +1,14 @@
+"""
+Comando para reconstruir os saldos de comissões dos parceiros
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.comissao_service import reconstruir_saldos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o saldo (acumulado, pago, pendente) de todos os parceiros a partir das comissões'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconstruindo saldos dos parceiros...')
+        total = reconstruir_saldos()
+        self.stdout.write(self.style.SUCCESS(f'[OK] {total} saldo(s) reconstruído(s).'))
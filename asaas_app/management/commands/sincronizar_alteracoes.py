@@ -0,0 +1,37 @@
+"""
+Comando para enviar ao Asaas os clientes e recorrências alterados localmente (agendar periodicamente, ex: cron de hora em hora)
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.sincronizacao_service import sincronizar_alteracoes
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza em lote com o Asaas os clientes e recorrências com alterações pendentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tempo-maximo',
+            type=int,
+            default=None,
+            help='Tempo máximo da execução em segundos (padrão: 300); o restante fica para a próxima',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=None,
+            help='Envios em paralelo (padrão: ASAAS_CONCORRENCIA ou 8)',
+        )
+
+    def handle(self, *args, **options):
+        lote = sincronizar_alteracoes(options['tempo_maximo'], options['concorrencia'])
+        if lote is None:
+            self.stdout.write(self.style.SUCCESS('[OK] Nenhuma alteração pendente'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[OK] Sincronização {lote.pk}: {lote.total_sincronizados} sincronizado(s), {lote.total_erros} erro(s)'
+        ))
+        if lote.pendentes:
+            self.stdout.write(self.style.WARNING(
+                f'{lote.pendentes} item(ns) pendente(s); execute novamente para continuar.'
+            ))
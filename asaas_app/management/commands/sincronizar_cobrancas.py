@@ -0,0 +1,39 @@
+"""
+Comando para sincronizar o espelho local das cobranças do Asaas (agendar periodicamente, ex: cron diário)
+"""
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from asaas_app.cobranca_service import sincronizar_cobrancas
+
+
+class Command(BaseCommand):
+    help = 'Atualiza em lote a tabela local de cobranças com as cobranças do Asaas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Sincroniza apenas cobranças com vencimento até N dias antes ou depois de hoje (padrão: todas)',
+        )
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=None,
+            help='Páginas buscadas em paralelo (padrão: ASAAS_CONCORRENCIA ou 8)',
+        )
+
+    def handle(self, *args, **options):
+        vencimento_de = vencimento_ate = None
+        if options['dias'] is not None:
+            hoje = date.today()
+            vencimento_de = hoje - timedelta(days=options['dias'])
+            vencimento_ate = hoje + timedelta(days=options['dias'])
+            self.stdout.write(f'Sincronizando cobranças com vencimento entre {vencimento_de:%d/%m/%Y} e {vencimento_ate:%d/%m/%Y}...')
+        else:
+            self.stdout.write('Sincronizando todas as cobranças...')
+
+        resultado = sincronizar_cobrancas(vencimento_de, vencimento_ate, options['concorrencia'])
+        self.stdout.write(self.style.SUCCESS(f"[OK] {resultado['total']} cobrança(s) sincronizada(s)"))
+        if not resultado['completa']:
+            self.stdout.write(self.style.WARNING('Algumas páginas falharam; execute novamente para completar.'))
@@ -0,0 +1,22 @@
+"""
+Comando para vincular às recorrências os links de pagamento criados antes da relação explícita
+"""
+from django.core.management.base import BaseCommand
+from asaas_app.link_service import vincular_links_recorrencias
+
+
+class Command(BaseCommand):
+    help = 'Preenche o link de pagamento das recorrências a partir dos links existentes (pelo nome)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Apenas mostra quantas recorrências seriam vinculadas',
+        )
+
+    def handle(self, *args, **options):
+        resultado = vincular_links_recorrencias(simular=options['simular'])
+        acao = 'seriam vinculada(s)' if options['simular'] else 'vinculada(s)'
+        self.stdout.write(self.style.SUCCESS(f"[OK] {resultado['vinculadas']} recorrência(s) {acao}"))
+        self.stdout.write(f"{resultado['sem_link']} recorrência(s) sem link de pagamento encontrado")
@@ -0,0 +1,337 @@
+"""
+Textos das mensagens WhatsApp de cobrança
+
+Os textos ficam na tabela ModeloMensagem (editáveis pelos operadores) e usam
+a sintaxe de templates do Django. Cada modelo é compilado uma única vez por
+versão e mantido em memória, então renderizar milhares de mensagens de uma
+campanha custa apenas a substituição das variáveis.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from django.template import Context, Engine
+from .models import ModeloMensagem
+
+_engine = Engine()
+
+# Templates compilados: {codigo: (versao, Template)}
+_compilados = {}
+
+PADROES = {
+    'boleto_recorrencia': ('Boleto da recorrência', """Olá *{{ primeiro_nome }}*! 👋
+
+🔔 *Cobrança Recorrente - {{ descricao }}*
+
+💰 Valor: R$ {{ valor }}
+📅 Vencimento: {{ vencimento }}
+
+📄 *Acesse seu boleto:*
+{{ url_boleto }}
+
+Você também pode pagar via PIX usando o QR Code que está no boleto.
+
+✅ Após o pagamento, você receberá a confirmação automaticamente.
+
+Dúvidas? Estamos à disposição!
+
+Atenciosamente,
+Equipe de Cobrança"""),
+
+    'link_recorrencia': ('Link de pagamento da recorrência', """Olá *{{ primeiro_nome }}*! 👋
+
+🔗 *Link de Pagamento - {{ descricao }}*
+
+💰 Valor: R$ {{ valor }}
+🔄 Frequência: {{ ciclo }}
+
+📲 *Clique no link abaixo para pagar:*
+{{ url_link }}
+
+✅ Escolha sua forma de pagamento preferida:
+• PIX (instantâneo)
+• Boleto Bancário
+• Cartão de Crédito
+
+Após o pagamento, você receberá a confirmação automaticamente.
+
+Dúvidas? Estamos à disposição!
+
+Atenciosamente,
+Equipe de Cobrança"""),
+
+    'nova_recorrencia': ('Recorrência criada (cliente)', """Olá {{ cliente_nome }}! 👋
+
+Sua recorrência foi criada com sucesso! ✅
+
+📋 *Detalhes da Recorrência:*
+• Descrição: {{ descricao }}
+• Valor: R$ {{ valor }}
+• Ciclo: {{ ciclo }}
+• Forma de Pagamento: {{ forma_pagamento }}
+• Próximo Vencimento: {{ vencimento }}
+{% if data_termino %}• Data de Término: {{ data_termino }}
+{% endif %}{% if total_cobrancas %}• Total de Cobranças: {{ total_cobrancas }}
+{% endif %}{% if url_link %}
+🔗 *Link de Pagamento:*
+{{ url_link }}
+
+💡 *Como usar:*
+Clique no link acima para realizar o pagamento da sua recorrência.
+{% endif %}
+📌 *Próximos Passos:*
+Fique atento ao vencimento para garantir o pagamento em dia.
+
+Em caso de dúvidas, entre em contato conosco.
+
+Atenciosamente,
+Equipe de Cobrança
+"""),
+
+    'notificacao_recorrencia': ('Recorrência criada (notificação interna)', """🔔 *Nova Recorrência Criada*
+
+📋 *Detalhes:*
+• Cliente: {{ cliente_nome }}
+• Descrição: {{ descricao }}
+• Valor: R$ {{ valor }}
+• Ciclo: {{ ciclo }}
+• Próximo Vencimento: {{ vencimento }}
+{% if url_link %}• Link de Pagamento: {{ url_link }}
+{% endif %}
+Sistema de Gestão Asaas
+"""),
+
+    'link_inicial_recorrencia': ('Primeira cobrança da assinatura', """🔔 *Primeira Cobrança da sua Assinatura*
+
+Olá, {{ cliente_nome }}!
+
+📋 *Detalhes:*
+• Descrição: {{ descricao }}
+• Valor: R$ {{ valor }}
+• Vencimento: {{ vencimento }}
+
+💳 *Link de Pagamento:*
+{{ url_fatura }}
+
+Esta é a primeira cobrança da sua assinatura.
+
+_Sistema de Gestão Asaas_"""),
+
+    'cobranca_lembrete': ('Régua: lembrete antes do vencimento', """Olá *{{ primeiro_nome }}*! 👋
+
+Passando para lembrar que a cobrança de *{{ descricao }}* vence em {{ dias }} dia(s).
+
+💰 Valor: R$ {{ valor }}
+📅 Vencimento: {{ vencimento }}
+
+💳 *Link de Pagamento:*
+{{ url_fatura }}
+
+Se já pagou, desconsidere esta mensagem.
+
+Atenciosamente,
+Equipe de Cobrança"""),
+
+    'cobranca_vencimento': ('Régua: dia do vencimento', """Olá *{{ primeiro_nome }}*! 👋
+
+A cobrança de *{{ descricao }}* vence *hoje*.
+
+💰 Valor: R$ {{ valor }}
+
+💳 *Link de Pagamento:*
+{{ url_fatura }}
+
+Você pode pagar via PIX, boleto ou cartão pelo link acima.
+
+Atenciosamente,
+Equipe de Cobrança"""),
+
+    'cobranca_atraso': ('Régua: cobrança em atraso', """Olá *{{ primeiro_nome }}*,
+
+Não identificamos o pagamento de *{{ descricao }}*, vencido há {{ dias }} dia(s).
+
+💰 Valor: R$ {{ valor }}
+📅 Vencimento: {{ vencimento }}
+
+💳 *Link de Pagamento:*
+{{ url_fatura }}
+
+Se já pagou, desconsidere esta mensagem. Em caso de dúvidas, estamos à disposição.
+
+Atenciosamente,
+Equipe de Cobrança"""),
+
+    'resumo_recorrencias': ('Resumo de novas recorrências (notificação interna)', """🔔 *{{ quantidade }} Nova(s) Recorrência(s)*
+
+💰 Total: R$ {{ valor_total }}
+
+{% for r in recorrencias %}• {{ r.cliente_nome }} - {{ r.descricao }}: R$ {{ r.valor }} ({{ r.ciclo }}, vence {{ r.vencimento }})
+{% endfor %}
+Sistema de Gestão Asaas
+"""),
+}
+
+# Variáveis disponíveis em cada modelo (exibidas na tela de edição)
+VARIAVEIS_COMUNS = ['cliente_nome', 'primeiro_nome', 'descricao', 'valor', 'ciclo', 'forma_pagamento', 'vencimento']
+VARIAVEIS = {
+    'boleto_recorrencia': VARIAVEIS_COMUNS + ['url_boleto'],
+    'link_recorrencia': VARIAVEIS_COMUNS + ['url_link'],
+    'nova_recorrencia': VARIAVEIS_COMUNS + ['data_termino', 'total_cobrancas', 'url_link'],
+    'notificacao_recorrencia': VARIAVEIS_COMUNS + ['url_link'],
+    'link_inicial_recorrencia': VARIAVEIS_COMUNS + ['url_fatura'],
+    'cobranca_lembrete': VARIAVEIS_COMUNS + ['dias', 'url_fatura'],
+    'cobranca_vencimento': VARIAVEIS_COMUNS + ['dias', 'url_fatura'],
+    'cobranca_atraso': VARIAVEIS_COMUNS + ['dias', 'url_fatura'],
+    'resumo_recorrencias': ['quantidade', 'valor_total', 'recorrencias'],
+}
+
+
+def _valor(valor):
+    return f'{Decimal(str(valor)):.2f}'
+
+
+def _data(valor):
+    """Formata datas do modelo (date) ou do Asaas ('YYYY-MM-DD') como dd/mm/aaaa"""
+    if isinstance(valor, str):
+        valor = datetime.strptime(valor, '%Y-%m-%d').date()
+    return valor.strftime('%d/%m/%Y') if isinstance(valor, date) else ''
+
+
+def primeiro_nome(cliente):
+    return cliente.name.split()[0]
+
+
+# ==================== CONTEXTOS ====================
+
+def contexto_recorrencia(recorrencia):
+    """Variáveis comuns a todas as mensagens de uma recorrência"""
+    return {
+        'cliente_nome': recorrencia.cliente.name,
+        'primeiro_nome': primeiro_nome(recorrencia.cliente),
+        'descricao': recorrencia.description,
+        'valor': _valor(recorrencia.value),
+        'ciclo': recorrencia.get_cycle_display(),
+        'forma_pagamento': recorrencia.get_billing_type_display(),
+        'vencimento': _data(recorrencia.next_due_date),
+    }
+
+
+def contexto_boleto(recorrencia, boleto):
+    contexto = contexto_recorrencia(recorrencia)
+    contexto.update({
+        'valor': _valor(boleto.get('value', recorrencia.value)),
+        'vencimento': _data(boleto.get('dueDate', recorrencia.next_due_date)),
+        'url_boleto': boleto.get('bankSlipUrl'),
+    })
+    return contexto
+
+
+def contexto_link(recorrencia, link):
+    contexto = contexto_recorrencia(recorrencia)
+    contexto['url_link'] = link.url if link else ''
+    return contexto
+
+
+def contexto_nova_recorrencia(recorrencia, link):
+    contexto = contexto_link(recorrencia, link)
+    contexto.update({
+        'data_termino': _data(recorrencia.end_date) if recorrencia.end_date else '',
+        'total_cobrancas': recorrencia.max_payments or '',
+    })
+    return contexto
+
+
+def contexto_primeira_cobranca(recorrencia, cobranca):
+    contexto = contexto_recorrencia(recorrencia)
+    contexto.update({
+        'valor': _valor(cobranca.get('value', recorrencia.value)),
+        'vencimento': _data(cobranca.get('dueDate', recorrencia.next_due_date)),
+        'url_fatura': cobranca.get('invoiceUrl'),
+    })
+    return contexto
+
+
+def contexto_exemplo(codigo, recorrencia=None):
+    """Variáveis para pré-visualizar um modelo, com dados da recorrência ou fictícios"""
+    if recorrencia is not None:
+        contexto = contexto_nova_recorrencia(recorrencia, recorrencia.link_pagamento)
+    else:
+        contexto = {
+            'cliente_nome': 'Maria da Silva',
+            'primeiro_nome': 'Maria',
+            'descricao': 'Mensalidade',
+            'valor': '150.00',
+            'ciclo': 'Mensal',
+            'forma_pagamento': 'Boleto Bancário',
+            'vencimento': _data(date.today()),
+            'data_termino': '',
+            'total_cobrancas': '',
+            'url_link': 'https://www.asaas.com/c/exemplo',
+        }
+    contexto.setdefault('url_boleto', 'https://www.asaas.com/b/pdf/exemplo')
+    contexto.setdefault('url_fatura', 'https://www.asaas.com/i/exemplo')
+    contexto.setdefault('dias', 3)
+    contexto.update({'quantidade': 1, 'valor_total': contexto['valor'], 'recorrencias': [dict(contexto)]})
+    return {chave: contexto.get(chave, '') for chave in VARIAVEIS[codigo]}
+
+
+def contexto_cobranca(recorrencia, cobranca, dias):
+    """Variáveis das mensagens da régua de cobrança (dias antes ou depois do vencimento)"""
+    contexto = contexto_primeira_cobranca(recorrencia, cobranca)
+    contexto['dias'] = abs(dias)
+    return contexto
+
+
+def contexto_resumo(recorrencias):
+    """Variáveis do resumo periódico de novas recorrências"""
+    return {
+        'quantidade': len(recorrencias),
+        'valor_total': _valor(sum(r.value for r in recorrencias)),
+        'recorrencias': [contexto_recorrencia(r) for r in recorrencias],
+    }
+
+
+# ==================== RENDERIZAÇÃO ====================
+
+def obter_modelo(codigo):
+    """Modelo de mensagem do banco, criado com o texto padrão na primeira utilização"""
+    nome, conteudo = PADROES[codigo]
+    modelo, _ = ModeloMensagem.objects.get_or_create(codigo=codigo, defaults={'nome': nome, 'conteudo': conteudo})
+    return modelo
+
+
+def _contexto(variaveis):
+    # Sem autoescape: as mensagens são texto puro (URLs com & intactas)
+    return Context(variaveis, autoescape=False)
+
+
+def compilar(modelo):
+    """Template compilado do modelo, reaproveitado enquanto a versão não mudar"""
+    versao, template = _compilados.get(modelo.codigo, (None, None))
+    if versao != modelo.versao:
+        template = _engine.from_string(modelo.conteudo)
+        _compilados[modelo.codigo] = (modelo.versao, template)
+    return template
+
+
+def renderizar_texto(conteudo, contexto):
+    """Renderiza um conteúdo avulso (pré-visualização), sem cache"""
+    return _engine.from_string(conteudo).render(_contexto(contexto))
+
+
+def renderizar(codigo, contexto):
+    return compilar(obter_modelo(codigo)).render(_contexto(contexto))
+
+
+def renderizar_lote(codigo, contextos):
+    """Renderiza várias mensagens do mesmo modelo com uma única consulta e compilação"""
+    template = compilar(obter_modelo(codigo))
+    return [template.render(_contexto(contexto)) for contexto in contextos]
+
+
+def mensagem_boleto(recorrencia, boleto):
+    """Mensagem com o boleto de uma cobrança da recorrência"""
+    return renderizar('boleto_recorrencia', contexto_boleto(recorrencia, boleto))
+
+
+def mensagem_link(recorrencia, link):
+    """Mensagem com o link de pagamento da recorrência"""
+    return renderizar('link_recorrencia', contexto_link(recorrencia, link))
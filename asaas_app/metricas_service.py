@@ -0,0 +1,69 @@
+"""
+Métricas de envio de mensagens WhatsApp
+
+Agrega a tabela MensagemWhatsApp (que também serve de log de envios):
+vazão diária, latência (média e p95), taxa de falha, taxa de entrega e uso
+da URL alternativa do provedor.
+"""
+import math
+from datetime import timedelta
+from django.db.models import Avg, Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import MensagemWhatsApp
+
+
+def _contagens():
+    return {
+        'total': Count('id'),
+        'enviadas': Count('id', filter=Q(status='ENVIADA')),
+        'falhas': Count('id', filter=Q(status='FALHA')),
+        'entregues': Count('id', filter=Q(status_entrega__in=['ENTREGUE', 'LIDA'])),
+        'lidas': Count('id', filter=Q(status_entrega='LIDA')),
+        'latencia_media': Avg('latencia_ms'),
+    }
+
+
+def _percentual(parte, total):
+    return round(parte * 100 / total, 1) if total else None
+
+
+def percentil_latencia(inicio, percentil=95):
+    """
+    Latência (ms) no percentil informado dos envios desde `inicio`
+
+    Usa o índice (enviada_em, latencia_ms): uma contagem e a leitura de uma
+    única linha na posição do percentil, sem carregar as latências.
+    """
+    latencias = MensagemWhatsApp.objects.filter(enviada_em__gte=inicio, latencia_ms__isnull=False)
+    total = latencias.count()
+    if not total:
+        return None
+    posicao = max(math.ceil(total * percentil / 100) - 1, 0)
+    return latencias.order_by('latencia_ms').values_list('latencia_ms', flat=True)[posicao]
+
+
+def metricas_whatsapp(dias=30):
+    """
+    Métricas das mensagens criadas nos últimos `dias` dias
+
+    Returns:
+        Dict com os totais do período, a série diária e os totais por modelo
+    """
+    inicio = timezone.now() - timedelta(days=dias)
+    mensagens = MensagemWhatsApp.objects.filter(created_at__gte=inicio)
+
+    totais = mensagens.aggregate(url_alternativa=Count('id', filter=Q(url_alternativa=True)), **_contagens())
+    totais['taxa_falha'] = _percentual(totais['falhas'], totais['enviadas'] + totais['falhas'])
+    totais['taxa_entrega'] = _percentual(totais['entregues'], totais['enviadas'])
+    totais['latencia_p95'] = percentil_latencia(inicio)
+
+    por_dia = list(
+        mensagens.annotate(dia=TruncDate('created_at')).values('dia').annotate(**_contagens()).order_by('-dia')
+    )
+    for linha in por_dia:
+        linha['taxa_falha'] = _percentual(linha['falhas'], linha['enviadas'] + linha['falhas'])
+
+    por_modelo = list(mensagens.values('modelo').annotate(**_contagens()).order_by('-total'))
+
+    return {'dias': dias, 'totais': totais, 'por_dia': por_dia, 'por_modelo': por_modelo}
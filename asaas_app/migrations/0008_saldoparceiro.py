@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal
+
+
+def popular_saldos(apps, schema_editor):
+    """Carga inicial dos saldos a partir das comissões existentes"""
+    Parceiro = apps.get_model('asaas_app', 'Parceiro')
+    SaldoParceiro = apps.get_model('asaas_app', 'SaldoParceiro')
+    ComissaoIndicador = apps.get_model('asaas_app', 'ComissaoIndicador')
+    ComissaoSocio = apps.get_model('asaas_app', 'ComissaoSocio')
+
+    for parceiro in Parceiro.objects.all():
+        acumulado = Decimal('0.00')
+        pago = Decimal('0.00')
+        ultimo = None
+        for model in (ComissaoIndicador, ComissaoSocio):
+            for comissao in model.objects.filter(parceiro=parceiro).select_related('fechamento'):
+                acumulado += comissao.valor_comissao
+                if comissao.status == 'PAGO':
+                    pago += comissao.valor_comissao
+                f = comissao.fechamento
+                if f and (ultimo is None or (f.ano, f.mes) > (ultimo.ano, ultimo.mes)):
+                    ultimo = f
+        SaldoParceiro.objects.create(
+            parceiro=parceiro,
+            total_acumulado=acumulado,
+            total_pago=pago,
+            total_pendente=acumulado - pago,
+            ultimo_fechamento=ultimo,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0007_planocontas_excluir_do_fechamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoParceiro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_acumulado', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Acumulado')),
+                ('total_pago', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Pago')),
+                ('total_pendente', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Pendente')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('parceiro', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='saldo', to='asaas_app.parceiro', verbose_name='Parceiro')),
+                ('ultimo_fechamento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='asaas_app.fechamentomensal', verbose_name='Último Fechamento')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Parceiro',
+                'verbose_name_plural': 'Saldos de Parceiros',
+                'ordering': ['parceiro__tipo', 'parceiro__nome'],
+            },
+        ),
+        migrations.RunPython(popular_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0008_saldoparceiro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArquivoFechamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dados', models.BinaryField(verbose_name='Dados Compactados')),
+                ('parceiro_ids', models.JSONField(default=list, verbose_name='Parceiros no Arquivo')),
+                ('quantidade_comissoes', models.IntegerField(default=0, verbose_name='Quantidade de Comissões')),
+                ('total_comissoes_indicador', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Comissões Indicadores')),
+                ('tamanho_bytes', models.IntegerField(default=0, verbose_name='Tamanho (bytes)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Arquivado em')),
+                ('fechamento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='arquivo', to='asaas_app.fechamentomensal', verbose_name='Fechamento')),
+            ],
+            options={
+                'verbose_name': 'Arquivo de Fechamento',
+                'verbose_name_plural': 'Arquivos de Fechamentos',
+                'ordering': ['-fechamento__ano', '-fechamento__mes'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0009_arquivofechamento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fechamentomensal',
+            name='perfil_calculo',
+            field=models.JSONField(blank=True, help_text='Tempo e consultas SQL de cada etapa do cálculo', null=True, verbose_name='Perfil do Cálculo'),
+        ),
+    ]
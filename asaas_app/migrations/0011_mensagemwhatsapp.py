@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0010_fechamentomensal_perfil_calculo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MensagemWhatsApp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('telefone', models.CharField(max_length=30, verbose_name='Telefone')),
+                ('mensagem', models.TextField(verbose_name='Mensagem')),
+                ('origem', models.CharField(blank=True, help_text='Ponto do sistema que gerou a mensagem', max_length=50, verbose_name='Origem')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('ENVIANDO', 'Enviando'), ('ENVIADA', 'Enviada'), ('FALHA', 'Falha Definitiva')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('tentativas', models.IntegerField(default=0, verbose_name='Tentativas')),
+                ('proxima_tentativa', models.DateTimeField(blank=True, null=True, verbose_name='Próxima Tentativa')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('resposta', models.JSONField(blank=True, null=True, verbose_name='Resposta da API')),
+                ('enviada_em', models.DateTimeField(blank=True, null=True, verbose_name='Enviada em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('recorrencia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mensagens_whatsapp', to='asaas_app.recorrencia', verbose_name='Recorrência')),
+            ],
+            options={
+                'verbose_name': 'Mensagem WhatsApp',
+                'verbose_name_plural': 'Mensagens WhatsApp',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='mensagem_wa_fila_idx')],
+            },
+        ),
+    ]
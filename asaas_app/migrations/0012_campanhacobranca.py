@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0011_mensagemwhatsapp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampanhaCobranca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome')),
+                ('filtro', models.CharField(choices=[('VENCENDO', 'Vencendo nos próximos dias'), ('VENCIDAS', 'Vencidas'), ('CICLO', 'Por ciclo')], default='VENCENDO', max_length=20, verbose_name='Selecionar Recorrências')),
+                ('dias', models.IntegerField(default=5, help_text='Para "Vencendo": vencimento até N dias a partir de hoje', verbose_name='Dias')),
+                ('ciclo', models.CharField(blank=True, choices=[('WEEKLY', 'Semanal'), ('BIWEEKLY', 'Quinzenal'), ('MONTHLY', 'Mensal'), ('QUARTERLY', 'Trimestral'), ('SEMIANNUALLY', 'Semestral'), ('YEARLY', 'Anual')], max_length=20, verbose_name='Ciclo')),
+                ('tipo_mensagem', models.CharField(choices=[('BOLETO', 'Boleto da última cobrança'), ('LINK', 'Link de pagamento')], default='BOLETO', max_length=20, verbose_name='Mensagem')),
+                ('status', models.CharField(choices=[('PROCESSANDO', 'Processando'), ('CONCLUIDA', 'Concluída'), ('ERRO', 'Erro')], default='PROCESSANDO', max_length=20, verbose_name='Status')),
+                ('total_selecionadas', models.IntegerField(default=0, verbose_name='Recorrências Selecionadas')),
+                ('total_enfileiradas', models.IntegerField(default=0, verbose_name='Mensagens Enfileiradas')),
+                ('total_ignoradas', models.IntegerField(default=0, verbose_name='Ignoradas')),
+                ('ignoradas', models.JSONField(blank=True, default=list, verbose_name='Motivos das Ignoradas')),
+                ('tempo_preparacao', models.FloatField(default=0, verbose_name='Tempo de Preparação (s)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Campanha de Cobrança',
+                'verbose_name_plural': 'Campanhas de Cobrança',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='campanha',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mensagens', to='asaas_app.campanhacobranca', verbose_name='Campanha'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0012_campanhacobranca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LimiteEnvio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(help_text='"global" ou "destino:<telefone>"', max_length=100, unique=True, verbose_name='Chave')),
+                ('tokens', models.FloatField(verbose_name='Tokens Disponíveis')),
+                ('atualizado_em', models.DateTimeField(verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Limite de Envio',
+                'verbose_name_plural': 'Limites de Envio',
+                'ordering': ['chave'],
+            },
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='chave_deduplicacao',
+            field=models.CharField(blank=True, db_index=True, help_text='Telefone + origem + referência (ex: id da cobrança)', max_length=150, verbose_name='Chave de Deduplicação'),
+        ),
+    ]
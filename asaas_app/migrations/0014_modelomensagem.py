@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0013_limite_envio_deduplicacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModeloMensagem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.SlugField(unique=True, verbose_name='Código')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome')),
+                ('conteudo', models.TextField(help_text='Use {{ variavel }} e {% if variavel %}...{% endif %}', verbose_name='Conteúdo')),
+                ('versao', models.IntegerField(default=1, editable=False, verbose_name='Versão')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Modelo de Mensagem',
+                'verbose_name_plural': 'Modelos de Mensagens',
+                'ordering': ['nome'],
+            },
+        ),
+    ]
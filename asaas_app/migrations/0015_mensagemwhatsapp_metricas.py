@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0014_modelomensagem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='entregue_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Entregue em'),
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='latencia_ms',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Latência (ms)'),
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='lida_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Lida em'),
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='modelo',
+            field=models.CharField(blank=True, help_text='Código do modelo de mensagem usado', max_length=50, verbose_name='Modelo'),
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='provedor_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, verbose_name='ID no Provedor'),
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='status_entrega',
+            field=models.CharField(blank=True, choices=[('SERVIDOR', 'Recebida pelo servidor'), ('ENTREGUE', 'Entregue'), ('LIDA', 'Lida'), ('ERRO', 'Erro na entrega')], max_length=20, verbose_name='Status de Entrega'),
+        ),
+        migrations.AddField(
+            model_name='mensagemwhatsapp',
+            name='url_alternativa',
+            field=models.BooleanField(default=False, verbose_name='Usou URL Alternativa'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagemwhatsapp',
+            index=models.Index(fields=['created_at', 'status'], name='mensagem_wa_dia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensagemwhatsapp',
+            index=models.Index(fields=['enviada_em', 'latencia_ms'], name='mensagem_wa_latencia_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:10
+
+from django.db import migrations, models
+from asaas_app.telefone_service import normalizar_telefone, primeiro_telefone_valido
+
+
+def popular_telefones(apps, schema_editor):
+    Cliente = apps.get_model('asaas_app', 'Cliente')
+    Parceiro = apps.get_model('asaas_app', 'Parceiro')
+
+    clientes = list(Cliente.objects.only('pk', 'mobilePhone', 'phone'))
+    for cliente in clientes:
+        cliente.telefone_e164 = primeiro_telefone_valido(cliente.mobilePhone, cliente.phone)
+    Cliente.objects.bulk_update(clientes, ['telefone_e164'], batch_size=1000)
+
+    parceiros = list(Parceiro.objects.only('pk', 'telefone'))
+    for parceiro in parceiros:
+        parceiro.telefone_e164 = normalizar_telefone(parceiro.telefone)
+    Parceiro.objects.bulk_update(parceiros, ['telefone_e164'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0015_mensagemwhatsapp_metricas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='telefone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Celular (ou telefone) normalizado; vazio quando nenhum número é válido', max_length=16, verbose_name='WhatsApp (E.164)'),
+        ),
+        migrations.AddField(
+            model_name='parceiro',
+            name='telefone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Telefone normalizado; vazio quando o número é inválido', max_length=16, verbose_name='Telefone (E.164)'),
+        ),
+        migrations.RunPython(popular_telefones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0016_telefone_e164'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cobranca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asaas_id', models.CharField(max_length=50, unique=True, verbose_name='ID Asaas')),
+                ('assinatura_asaas_id', models.CharField(blank=True, db_index=True, max_length=50, verbose_name='ID da Assinatura (Asaas)')),
+                ('cliente_asaas_id', models.CharField(blank=True, max_length=50, verbose_name='ID do Cliente (Asaas)')),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor')),
+                ('vencimento', models.DateField(verbose_name='Vencimento')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('OVERDUE', 'Vencida'), ('RECEIVED', 'Recebida'), ('CONFIRMED', 'Confirmada'), ('RECEIVED_IN_CASH', 'Recebida em Dinheiro'), ('REFUNDED', 'Estornada'), ('REFUND_REQUESTED', 'Estorno Solicitado'), ('CHARGEBACK_REQUESTED', 'Chargeback Solicitado'), ('AWAITING_RISK_ANALYSIS', 'Em Análise de Risco'), ('DELETED', 'Removida')], max_length=30, verbose_name='Status')),
+                ('billing_type', models.CharField(blank=True, max_length=20, verbose_name='Forma de Pagamento')),
+                ('url_boleto', models.URLField(blank=True, max_length=500, verbose_name='URL do Boleto')),
+                ('url_fatura', models.URLField(blank=True, max_length=500, verbose_name='URL da Fatura')),
+                ('data_pagamento', models.DateField(blank=True, null=True, verbose_name='Data do Pagamento')),
+                ('sincronizada_em', models.DateTimeField(verbose_name='Sincronizada em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('recorrencia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cobrancas', to='asaas_app.recorrencia', verbose_name='Recorrência')),
+            ],
+            options={
+                'verbose_name': 'Cobrança',
+                'verbose_name_plural': 'Cobranças',
+                'ordering': ['-vencimento'],
+                'indexes': [models.Index(fields=['recorrencia', 'vencimento'], name='cobranca_recorrencia_venc_idx'), models.Index(fields=['status', 'vencimento'], name='cobranca_status_venc_idx')],
+            },
+        ),
+    ]
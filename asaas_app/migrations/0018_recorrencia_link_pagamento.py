@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0017_cobranca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recorrencia',
+            name='link_pagamento',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recorrencias', to='asaas_app.linkpagamento', verbose_name='Link de Pagamento'),
+        ),
+    ]
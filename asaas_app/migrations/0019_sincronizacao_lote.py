@@ -0,0 +1,86 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F
+
+
+def marcar_sincronizados(apps, schema_editor):
+    """Registros já sincronizados não ficam pendentes; os demais entram na primeira sincronização em lote"""
+    for nome in ('Cliente', 'Recorrencia'):
+        modelo = apps.get_model('asaas_app', nome)
+        modelo.objects.update(alterado_em=F('updated_at'))
+        modelo.objects.filter(synced_with_asaas=True).update(sincronizado_em=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0018_recorrencia_link_pagamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SincronizacaoLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('EXECUTANDO', 'Em execução'), ('CONCLUIDA', 'Concluída')], default='EXECUTANDO', max_length=20, verbose_name='Status')),
+                ('total', models.IntegerField(default=0, verbose_name='Registros')),
+                ('total_sincronizados', models.IntegerField(default=0, verbose_name='Sincronizados')),
+                ('total_erros', models.IntegerField(default=0, verbose_name='Erros')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Sincronização em Lote',
+                'verbose_name_plural': 'Sincronizações em Lote',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='alterado_em',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Alterado em'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='sincronizado_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Sincronizado em'),
+        ),
+        migrations.AddField(
+            model_name='recorrencia',
+            name='alterado_em',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Alterado em'),
+        ),
+        migrations.AddField(
+            model_name='recorrencia',
+            name='sincronizado_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Sincronizado em'),
+        ),
+        migrations.AlterField(
+            model_name='limiteenvio',
+            name='chave',
+            field=models.CharField(help_text='"global", "destino:<telefone>" ou "asaas"', max_length=100, unique=True, verbose_name='Chave'),
+        ),
+        migrations.CreateModel(
+            name='SincronizacaoItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CLIENTE', 'Cliente'), ('RECORRENCIA', 'Recorrência')], max_length=20, verbose_name='Tipo')),
+                ('objeto_id', models.PositiveIntegerField(verbose_name='ID do Registro')),
+                ('descricao', models.CharField(max_length=255, verbose_name='Descrição')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('OK', 'Sincronizado'), ('IGNORADO', 'Já sincronizado'), ('ERRO', 'Erro')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='asaas_app.sincronizacaolote', verbose_name='Lote')),
+            ],
+            options={
+                'verbose_name': 'Item de Sincronização',
+                'verbose_name_plural': 'Itens de Sincronização',
+                'ordering': ['pk'],
+                'indexes': [models.Index(fields=['lote', 'tipo', 'status'], name='sincronizacao_item_idx')],
+            },
+        ),
+        migrations.RunPython(marcar_sincronizados, migrations.RunPython.noop),
+    ]
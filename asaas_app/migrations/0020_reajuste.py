@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('asaas_app', '0019_sincronizacao_lote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reajuste',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100, verbose_name='Nome')),
+                ('tipo', models.CharField(choices=[('PERCENTUAL', 'Percentual'), ('TABELA', 'Tabela de preços')], default='PERCENTUAL', max_length=20, verbose_name='Tipo')),
+                ('percentual', models.DecimalField(blank=True, decimal_places=2, help_text='Para "Percentual": ex. 4.62 para o IPCA de 4,62%', max_digits=6, null=True, verbose_name='Percentual (%)')),
+                ('tabela', models.JSONField(blank=True, default=dict, help_text='Para "Tabela": {"valor atual": "novo valor"}; valores fora da tabela não mudam', verbose_name='Tabela de Preços')),
+                ('ciclo', models.CharField(blank=True, choices=[('WEEKLY', 'Semanal'), ('BIWEEKLY', 'Quinzenal'), ('MONTHLY', 'Mensal'), ('QUARTERLY', 'Trimestral'), ('SEMIANNUALLY', 'Semestral'), ('YEARLY', 'Anual')], max_length=20, verbose_name='Ciclo')),
+                ('billing_type', models.CharField(blank=True, choices=[('BOLETO', 'Boleto Bancário'), ('CREDIT_CARD', 'Cartão de Crédito'), ('PIX', 'Pix'), ('UNDEFINED', 'Perguntar ao Cliente')], max_length=20, verbose_name='Forma de Pagamento')),
+                ('criadas_ate', models.DateField(blank=True, help_text='Apenas recorrências cadastradas até esta data', null=True, verbose_name='Criadas até')),
+                ('atualizar_cobrancas_pendentes', models.BooleanField(default=True, help_text='Aplica o novo valor também às cobranças já geradas e ainda não pagas no Asaas', verbose_name='Atualizar Cobranças Pendentes')),
+                ('status', models.CharField(choices=[('ENVIANDO', 'Enviando ao Asaas'), ('CONCLUIDO', 'Concluído'), ('REVERTENDO', 'Revertendo'), ('REVERTIDO', 'Revertido')], default='ENVIANDO', max_length=20, verbose_name='Status')),
+                ('total', models.IntegerField(default=0, verbose_name='Recorrências Reajustadas')),
+                ('total_enviados', models.IntegerField(default=0, verbose_name='Enviadas ao Asaas')),
+                ('total_erros', models.IntegerField(default=0, verbose_name='Erros')),
+                ('receita_mensal_anterior', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita Mensal Anterior')),
+                ('receita_mensal_nova', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita Mensal Nova')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Aplicado por')),
+            ],
+            options={
+                'verbose_name': 'Reajuste de Preço',
+                'verbose_name_plural': 'Reajustes de Preço',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReajusteItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor_anterior', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor Anterior')),
+                ('valor_novo', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor Novo')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('OK', 'Enviado'), ('LOCAL', 'Sem assinatura no Asaas'), ('ERRO', 'Erro (valor anterior restaurado)'), ('REVERTIDO', 'Revertido')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+                ('reajuste', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='asaas_app.reajuste', verbose_name='Reajuste')),
+                ('recorrencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reajustes', to='asaas_app.recorrencia', verbose_name='Recorrência')),
+            ],
+            options={
+                'verbose_name': 'Item de Reajuste',
+                'verbose_name_plural': 'Itens de Reajuste',
+                'ordering': ['pk'],
+                'indexes': [models.Index(fields=['reajuste', 'status'], name='reajuste_item_status_idx')],
+            },
+        ),
+    ]
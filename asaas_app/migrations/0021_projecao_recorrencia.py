@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0020_reajuste'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjecaoRecorrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assinatura', models.CharField(help_text='Hash dos dados usados no cálculo; muda quando a recorrência muda', max_length=40, verbose_name='Assinatura dos Dados')),
+                ('mes_base', models.DateField(verbose_name='Primeiro Mês')),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor')),
+                ('ciclo', models.CharField(choices=[('WEEKLY', 'Semanal'), ('BIWEEKLY', 'Quinzenal'), ('MONTHLY', 'Mensal'), ('QUARTERLY', 'Trimestral'), ('SEMIANNUALLY', 'Semestral'), ('YEARLY', 'Anual')], max_length=20, verbose_name='Ciclo')),
+                ('billing_type', models.CharField(choices=[('BOLETO', 'Boleto Bancário'), ('CREDIT_CARD', 'Cartão de Crédito'), ('PIX', 'Pix'), ('UNDEFINED', 'Perguntar ao Cliente')], max_length=20, verbose_name='Forma de Pagamento')),
+                ('cobrancas', models.JSONField(default=list, verbose_name='Cobranças por Mês')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('recorrencia', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='projecao', to='asaas_app.recorrencia', verbose_name='Recorrência')),
+            ],
+            options={
+                'verbose_name': 'Projeção de Recorrência',
+                'verbose_name_plural': 'Projeções de Recorrências',
+            },
+        ),
+    ]
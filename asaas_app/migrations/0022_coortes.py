@@ -0,0 +1,82 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0021_projecao_recorrencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtualizacaoCoortes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('iniciada_em', models.DateTimeField(verbose_name='Iniciada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('completa', models.BooleanField(default=False, verbose_name='Recálculo Completo')),
+                ('recorrencias_recalculadas', models.IntegerField(default=0, verbose_name='Recorrências Recalculadas')),
+            ],
+            options={
+                'verbose_name': 'Atualização de Coortes',
+                'verbose_name_plural': 'Atualizações de Coortes',
+                'ordering': ['-iniciada_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Coorte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('MES', 'Mês de entrada'), ('PARCEIRO', 'Parceiro indicador')], max_length=20, verbose_name='Dimensão')),
+                ('mes', models.DateField(blank=True, null=True, verbose_name='Mês de Entrada')),
+                ('recorrencias', models.IntegerField(default=0, verbose_name='Recorrências')),
+                ('ativas', models.IntegerField(default=0, verbose_name='Ativas Hoje')),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita Total')),
+                ('parceiro', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coortes', to='asaas_app.parceiro', verbose_name='Parceiro Indicador')),
+            ],
+            options={
+                'verbose_name': 'Coorte',
+                'verbose_name_plural': 'Coortes',
+                'ordering': ['dimensao', 'mes', 'parceiro'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CoortePeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.IntegerField(verbose_name='Período')),
+                ('pagantes', models.IntegerField(default=0, verbose_name='Recorrências Pagantes')),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita')),
+                ('coorte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periodos', to='asaas_app.coorte', verbose_name='Coorte')),
+            ],
+            options={
+                'verbose_name': 'Período de Coorte',
+                'verbose_name_plural': 'Períodos de Coorte',
+                'ordering': ['coorte', 'periodo'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AtividadeRecorrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês')),
+                ('coorte', models.DateField(help_text='Mês de cadastro da recorrência', verbose_name='Mês de Entrada')),
+                ('periodo', models.IntegerField(help_text='Meses desde a entrada (0 = mês de entrada)', verbose_name='Período')),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor Pago')),
+                ('parceiro', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='atividades_indicadas', to='asaas_app.parceiro', verbose_name='Parceiro Indicador')),
+                ('recorrencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='atividades', to='asaas_app.recorrencia', verbose_name='Recorrência')),
+            ],
+            options={
+                'verbose_name': 'Atividade de Recorrência',
+                'verbose_name_plural': 'Atividades de Recorrências',
+                'indexes': [models.Index(fields=['coorte', 'periodo'], name='atividade_coorte_idx'), models.Index(fields=['parceiro', 'periodo'], name='atividade_parceiro_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='atividaderecorrencia',
+            constraint=models.UniqueConstraint(fields=('recorrencia', 'mes'), name='atividade_recorrencia_mes_unica'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0022_coortes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlteracaoRecorrencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(choices=[('IMPORTACAO', 'Importação do Asaas'), ('EDICAO', 'Edição')], max_length=20, verbose_name='Origem')),
+                ('campos', models.JSONField(default=dict, help_text='{campo: [anterior, novo]}; na criação o anterior é nulo', verbose_name='Campos Alterados')),
+                ('assinatura', models.CharField(help_text='Hash dos campos acompanhados após a alteração', max_length=40, verbose_name='Assinatura do Conteúdo')),
+                ('criada', models.BooleanField(default=False, verbose_name='Criação')),
+                ('registrada_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Registrada em')),
+                ('recorrencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alteracoes', to='asaas_app.recorrencia', verbose_name='Recorrência')),
+            ],
+            options={
+                'verbose_name': 'Alteração de Recorrência',
+                'verbose_name_plural': 'Alterações de Recorrências',
+                'ordering': ['-registrada_em', '-pk'],
+                'indexes': [models.Index(fields=['recorrencia', 'registrada_em'], name='alteracao_recorrencia_idx')],
+            },
+        ),
+    ]
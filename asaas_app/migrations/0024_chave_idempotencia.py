@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0023_alteracao_recorrencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(help_text='SHA-256 do endpoint com a chave informada ou com os dados enviados', max_length=64, unique=True, verbose_name='Chave')),
+                ('endpoint', models.CharField(max_length=50, verbose_name='Endpoint')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('CONCLUIDA', 'Concluída')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('asaas_id', models.CharField(blank=True, max_length=50, verbose_name='ID Asaas')),
+                ('resposta', models.JSONField(blank=True, default=dict, verbose_name='Resposta do Asaas')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('atualizada_em', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Última Tentativa')),
+            ],
+            options={
+                'verbose_name': 'Chave de Idempotência',
+                'verbose_name_plural': 'Chaves de Idempotência',
+                'ordering': ['-atualizada_em'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0024_chave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chaveidempotencia',
+            name='chave',
+            field=models.CharField(help_text='SHA-256 do endpoint com a chave informada', max_length=64, unique=True, verbose_name='Chave'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0025_chave_idempotencia_help_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sincronizacaoitem',
+            name='reservado_em',
+            field=models.DateTimeField(blank=True, help_text='Quando uma execução reservou o item para envio', null=True, verbose_name='Reservado em'),
+        ),
+        migrations.AlterField(
+            model_name='sincronizacaoitem',
+            name='status',
+            field=models.CharField(choices=[('PENDENTE', 'Pendente'), ('ENVIANDO', 'Enviando'), ('OK', 'Sincronizado'), ('IGNORADO', 'Já sincronizado'), ('ERRO', 'Erro')], default='PENDENTE', max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:04
+
+from django.db import migrations, models
+
+
+def descartar_duplicadas(apps, schema_editor):
+    MensagemWhatsApp = apps.get_model('asaas_app', 'MensagemWhatsApp')
+
+    vistas = set()
+    duplicadas = []
+    na_fila = MensagemWhatsApp.objects.filter(status__in=['PENDENTE', 'ENVIANDO']).exclude(chave_deduplicacao='')
+    for pk, chave in na_fila.order_by('created_at', 'pk').values_list('pk', 'chave_deduplicacao'):
+        if chave in vistas:
+            duplicadas.append(pk)
+        vistas.add(chave)
+    MensagemWhatsApp.objects.filter(pk__in=duplicadas).update(status='FALHA', ultimo_erro='Mensagem duplicada na fila')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asaas_app', '0026_sincronizacao_item_reserva'),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='mensagemwhatsapp',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDENTE', 'ENVIANDO']), models.Q(('chave_deduplicacao', ''), _negated=True)), fields=('chave_deduplicacao',), name='mensagem_wa_chave_na_fila'),
+        ),
+    ]
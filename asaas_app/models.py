@@ -1,5 +1,9 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .telefone_service import normalizar_telefone, primeiro_telefone_valido
 
 
 class ConfiguracaoFinanceira(models.Model):
@@ -35,6 +39,63 @@ class ConfiguracaoFinanceira(models.Model):
         return config
 
 
+class SincronizavelAsaas(models.Model):
+    """
+    Marca de alteração local para a sincronização em lote com o Asaas
+
+    alterado_em muda apenas quando algum dos CAMPOS_ASAAS (os enviados ao
+    Asaas) é alterado por save(); quem altera em massa (update/bulk_update)
+    deve preencher alterado_em. O registro está pendente enquanto a alteração
+    for mais recente que a última sincronização.
+    """
+
+    CAMPOS_ASAAS = ()
+
+    alterado_em = models.DateTimeField('Alterado em', null=True, blank=True, db_index=True, editable=False)
+    sincronizado_em = models.DateTimeField('Sincronizado em', null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_asaas = instance._valores_sincronizados()
+        return instance
+
+    def _valores_sincronizados(self):
+        return {campo: self.__dict__.get(campo) for campo in self.CAMPOS_ASAAS}
+
+    def save(self, *args, **kwargs):
+        if getattr(self, '_valores_asaas', None) != self._valores_sincronizados():
+            self.alterado_em = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'alterado_em'}
+        super().save(*args, **kwargs)
+        self._valores_asaas = self._valores_sincronizados()
+
+    @property
+    def pendente_sincronizacao(self):
+        return self.sincronizado_em is None or (self.alterado_em is not None and self.alterado_em > self.sincronizado_em)
+
+    @classmethod
+    def pendentes_sincronizacao(cls):
+        return cls.objects.filter(Q(sincronizado_em__isnull=True) | Q(alterado_em__gt=F('sincronizado_em')))
+
+    def marcar_sincronizado(self, momento, **campos):
+        """
+        Registra a sincronização sem passar por save() (não gera nova alteração)
+
+        Args:
+            momento: Quando os dados enviados foram lidos; alterações posteriores continuam pendentes
+            campos: Outros campos a gravar junto (ex: asaas_id)
+        """
+        campos.update(sincronizado_em=momento, synced_with_asaas=True)
+        type(self).objects.filter(pk=self.pk).update(**campos)
+        for campo, valor in campos.items():
+            setattr(self, campo, valor)
+
+
 class Parceiro(models.Model):
     """Modelo para parceiros (indicadores e sócios)"""
     
@@ -47,6 +108,10 @@ class Parceiro(models.Model):
     cpfCnpj = models.CharField('CPF/CNPJ', max_length=18, unique=True)
     email = models.EmailField('E-mail')
     telefone = models.CharField('Telefone', max_length=20, blank=True, null=True)
+    telefone_e164 = models.CharField(
+        'Telefone (E.164)', max_length=16, blank=True, db_index=True, editable=False,
+        help_text='Telefone normalizado; vazio quando o número é inválido'
+    )
     
     tipo = models.CharField('Tipo', max_length=20, choices=TIPO_CHOICES)
     percentual_comissao = models.DecimalField(
@@ -75,11 +140,22 @@ class Parceiro(models.Model):
     
     def __str__(self):
         return f"{self.nome} ({self.get_tipo_display()}) - {self.percentual_comissao}%"
+    
+    def save(self, *args, **kwargs):
+        self.telefone_e164 = normalizar_telefone(self.telefone)
+        if kwargs.get('update_fields') is not None and 'telefone' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'telefone_e164'}
+        super().save(*args, **kwargs)
 
 
-class Cliente(models.Model):
+class Cliente(SincronizavelAsaas):
     """Modelo para armazenar informações de clientes"""
     
+    CAMPOS_ASAAS = (
+        'name', 'cpfCnpj', 'email', 'phone', 'mobilePhone', 'address', 'addressNumber',
+        'complement', 'province', 'postalCode', 'observations',
+    )
+    
     # Campos obrigatórios
     name = models.CharField('Nome', max_length=255)
     cpfCnpj = models.CharField('CPF/CNPJ', max_length=18, unique=True)
@@ -88,6 +164,10 @@ class Cliente(models.Model):
     # Campos opcionais
     phone = models.CharField('Telefone', max_length=20, blank=True, null=True)
     mobilePhone = models.CharField('Celular', max_length=20, blank=True, null=True)
+    telefone_e164 = models.CharField(
+        'WhatsApp (E.164)', max_length=16, blank=True, db_index=True, editable=False,
+        help_text='Celular (ou telefone) normalizado; vazio quando nenhum número é válido'
+    )
     address = models.CharField('Endereço', max_length=255, blank=True, null=True)
     addressNumber = models.CharField('Número', max_length=10, blank=True, null=True)
     complement = models.CharField('Complemento', max_length=100, blank=True, null=True)
@@ -116,11 +196,27 @@ class Cliente(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.cpfCnpj}"
+    
+    def save(self, *args, **kwargs):
+        self.telefone_e164 = primeiro_telefone_valido(self.mobilePhone, self.phone)
+        if kwargs.get('update_fields') is not None and {'mobilePhone', 'phone'} & {*kwargs['update_fields']}:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'telefone_e164'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def por_telefone(cls, numero):
+        """Cliente dono do número (ex: remetente de uma mensagem recebida)"""
+        telefone = normalizar_telefone(numero)
+        return cls.objects.filter(telefone_e164=telefone).first() if telefone else None
 
 
-class Recorrencia(models.Model):
+class Recorrencia(SincronizavelAsaas):
     """Modelo para armazenar informações de recorrências (assinaturas)"""
     
+    CAMPOS_ASAAS = (
+        'cliente_id', 'value', 'cycle', 'billing_type', 'description', 'next_due_date', 'end_date', 'max_payments',
+    )
+    
     CYCLE_CHOICES = [
         ('WEEKLY', 'Semanal'),
         ('BIWEEKLY', 'Quinzenal'),
@@ -143,6 +239,16 @@ class Recorrencia(models.Model):
         ('EXPIRED', 'Expirada'),
     ]
     
+    # Cobranças por mês em cada ciclo (normaliza o valor para receita mensal)
+    COBRANCAS_POR_MES = {
+        'WEEKLY': Decimal(52) / 12,
+        'BIWEEKLY': Decimal(26) / 12,
+        'MONTHLY': Decimal(1),
+        'QUARTERLY': Decimal(1) / 3,
+        'SEMIANNUALLY': Decimal(1) / 6,
+        'YEARLY': Decimal(1) / 12,
+    }
+    
     # Relacionamento com cliente
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='recorrencias', verbose_name='Cliente')
     
@@ -159,6 +265,12 @@ class Recorrencia(models.Model):
     # Configurações adicionais
     max_payments = models.IntegerField('Número Máximo de Cobranças', blank=True, null=True, help_text='Deixe em branco para cobranças ilimitadas')
     
+    # Link de pagamento enviado ao cliente
+    link_pagamento = models.ForeignKey(
+        'LinkPagamento', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='recorrencias', verbose_name='Link de Pagamento'
+    )
+    
     # Campos de controle
     asaas_id = models.CharField('ID Asaas', max_length=50, blank=True, null=True, unique=True)
     status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
@@ -173,6 +285,78 @@ class Recorrencia(models.Model):
     
     def __str__(self):
         return f"{self.description} - {self.cliente.name} - R$ {self.value}"
+    
+    @property
+    def valor_mensal(self):
+        """Valor equivalente por mês, conforme o ciclo"""
+        return self.value * self.COBRANCAS_POR_MES.get(self.cycle, 1)
+
+
+class Cobranca(models.Model):
+    """Espelho local das cobranças (payments) do Asaas, mantido por sincronização em lote e webhook"""
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendente'),
+        ('OVERDUE', 'Vencida'),
+        ('RECEIVED', 'Recebida'),
+        ('CONFIRMED', 'Confirmada'),
+        ('RECEIVED_IN_CASH', 'Recebida em Dinheiro'),
+        ('REFUNDED', 'Estornada'),
+        ('REFUND_REQUESTED', 'Estorno Solicitado'),
+        ('CHARGEBACK_REQUESTED', 'Chargeback Solicitado'),
+        ('AWAITING_RISK_ANALYSIS', 'Em Análise de Risco'),
+        ('DELETED', 'Removida'),
+    ]
+
+    STATUS_PAGOS = ('RECEIVED', 'CONFIRMED', 'RECEIVED_IN_CASH')
+
+    asaas_id = models.CharField('ID Asaas', max_length=50, unique=True)
+    assinatura_asaas_id = models.CharField('ID da Assinatura (Asaas)', max_length=50, blank=True, db_index=True)
+    cliente_asaas_id = models.CharField('ID do Cliente (Asaas)', max_length=50, blank=True)
+    recorrencia = models.ForeignKey(
+        Recorrencia, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='cobrancas', verbose_name='Recorrência'
+    )
+
+    valor = models.DecimalField('Valor', max_digits=10, decimal_places=2)
+    vencimento = models.DateField('Vencimento')
+    status = models.CharField('Status', max_length=30, choices=STATUS_CHOICES)
+    billing_type = models.CharField('Forma de Pagamento', max_length=20, blank=True)
+    url_boleto = models.URLField('URL do Boleto', max_length=500, blank=True)
+    url_fatura = models.URLField('URL da Fatura', max_length=500, blank=True)
+    data_pagamento = models.DateField('Data do Pagamento', blank=True, null=True)
+
+    sincronizada_em = models.DateTimeField('Sincronizada em')
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Cobrança'
+        verbose_name_plural = 'Cobranças'
+        ordering = ['-vencimento']
+        indexes = [
+            models.Index(fields=['recorrencia', 'vencimento'], name='cobranca_recorrencia_venc_idx'),
+            models.Index(fields=['status', 'vencimento'], name='cobranca_status_venc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asaas_id} - R$ {self.valor} - {self.vencimento:%d/%m/%Y}"
+
+    @property
+    def paga(self):
+        return self.status in self.STATUS_PAGOS
+
+    def como_payment(self):
+        """Cobrança no formato da API do Asaas (usado pelos textos das mensagens)"""
+        return {
+            'id': self.asaas_id,
+            'value': self.valor,
+            'dueDate': self.vencimento,
+            'status': self.status,
+            'billingType': self.billing_type,
+            'bankSlipUrl': self.url_boleto,
+            'invoiceUrl': self.url_fatura,
+        }
 
 
 class PlanoContas(models.Model):
@@ -442,6 +626,11 @@ class FechamentoMensal(models.Model):
     
     status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PREVIO')
     
+    perfil_calculo = models.JSONField(
+        'Perfil do Cálculo', blank=True, null=True,
+        help_text='Tempo e consultas SQL de cada etapa do cálculo'
+    )
+    
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
@@ -522,3 +711,545 @@ class ComissaoSocio(models.Model):
     
     def __str__(self):
         return f"{self.parceiro.nome} - R$ {self.valor_comissao} ({self.fechamento})"
+
+
+
+class ArquivoFechamento(models.Model):
+    """Snapshot compactado (JSON colunar + zlib) das comissões de indicadores de um fechamento FECHADO"""
+    
+    fechamento = models.OneToOneField(FechamentoMensal, on_delete=models.CASCADE, related_name='arquivo', verbose_name='Fechamento')
+    
+    dados = models.BinaryField('Dados Compactados')
+    parceiro_ids = models.JSONField('Parceiros no Arquivo', default=list)
+    quantidade_comissoes = models.IntegerField('Quantidade de Comissões', default=0)
+    total_comissoes_indicador = models.DecimalField('Total Comissões Indicadores', max_digits=12, decimal_places=2, default=0)
+    tamanho_bytes = models.IntegerField('Tamanho (bytes)', default=0)
+    
+    created_at = models.DateTimeField('Arquivado em', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Arquivo de Fechamento'
+        verbose_name_plural = 'Arquivos de Fechamentos'
+        ordering = ['-fechamento__ano', '-fechamento__mes']
+    
+    def __str__(self):
+        return f"Arquivo {self.fechamento.mes:02d}/{self.fechamento.ano} - {self.quantidade_comissoes} comissões"
+
+
+class SaldoParceiro(models.Model):
+    """Saldo consolidado de comissões por parceiro (atualizado a cada fechamento/pagamento)"""
+    
+    parceiro = models.OneToOneField(Parceiro, on_delete=models.CASCADE, related_name='saldo', verbose_name='Parceiro')
+    
+    total_acumulado = models.DecimalField('Total Acumulado', max_digits=12, decimal_places=2, default=0)
+    total_pago = models.DecimalField('Total Pago', max_digits=12, decimal_places=2, default=0)
+    total_pendente = models.DecimalField('Total Pendente', max_digits=12, decimal_places=2, default=0)
+    
+    ultimo_fechamento = models.ForeignKey(
+        FechamentoMensal, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', verbose_name='Último Fechamento'
+    )
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Saldo de Parceiro'
+        verbose_name_plural = 'Saldos de Parceiros'
+        ordering = ['parceiro__tipo', 'parceiro__nome']
+    
+    def __str__(self):
+        return f"{self.parceiro.nome} - Pendente: R$ {self.total_pendente}"
+
+
+class ModeloMensagem(models.Model):
+    """Texto editável de uma mensagem WhatsApp (sintaxe de templates do Django)"""
+    
+    codigo = models.SlugField('Código', max_length=50, unique=True)
+    nome = models.CharField('Nome', max_length=100)
+    conteudo = models.TextField('Conteúdo', help_text='Use {{ variavel }} e {% if variavel %}...{% endif %}')
+    versao = models.IntegerField('Versão', default=1, editable=False)
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Modelo de Mensagem'
+        verbose_name_plural = 'Modelos de Mensagens'
+        ordering = ['nome']
+    
+    def __str__(self):
+        return f"{self.nome} (v{self.versao})"
+    
+    def save(self, *args, **kwargs):
+        # Cada alteração gera uma nova versão, invalidando o template compilado em cache
+        if self.pk:
+            self.versao += 1
+        super().save(*args, **kwargs)
+
+
+class CampanhaCobranca(models.Model):
+    """Campanha de lembretes de cobrança enviados em lote pelo WhatsApp"""
+    
+    FILTRO_CHOICES = [
+        ('VENCENDO', 'Vencendo nos próximos dias'),
+        ('VENCIDAS', 'Vencidas'),
+        ('CICLO', 'Por ciclo'),
+    ]
+    
+    TIPO_MENSAGEM_CHOICES = [
+        ('BOLETO', 'Boleto da última cobrança'),
+        ('LINK', 'Link de pagamento'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('PROCESSANDO', 'Processando'),
+        ('CONCLUIDA', 'Concluída'),
+        ('ERRO', 'Erro'),
+    ]
+    
+    nome = models.CharField('Nome', max_length=100)
+    filtro = models.CharField('Selecionar Recorrências', max_length=20, choices=FILTRO_CHOICES, default='VENCENDO')
+    dias = models.IntegerField('Dias', default=5, help_text='Para "Vencendo": vencimento até N dias a partir de hoje')
+    ciclo = models.CharField('Ciclo', max_length=20, choices=Recorrencia.CYCLE_CHOICES, blank=True)
+    tipo_mensagem = models.CharField('Mensagem', max_length=20, choices=TIPO_MENSAGEM_CHOICES, default='BOLETO')
+    
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PROCESSANDO')
+    total_selecionadas = models.IntegerField('Recorrências Selecionadas', default=0)
+    total_enfileiradas = models.IntegerField('Mensagens Enfileiradas', default=0)
+    total_ignoradas = models.IntegerField('Ignoradas', default=0)
+    ignoradas = models.JSONField('Motivos das Ignoradas', default=list, blank=True)
+    tempo_preparacao = models.FloatField('Tempo de Preparação (s)', default=0)
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Campanha de Cobrança'
+        verbose_name_plural = 'Campanhas de Cobrança'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.nome} ({self.created_at:%d/%m/%Y})"
+
+
+class MensagemWhatsApp(models.Model):
+    """Fila de saída (outbox) de mensagens WhatsApp, drenada pelo comando processar_fila_whatsapp"""
+    
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('ENVIANDO', 'Enviando'),
+        ('ENVIADA', 'Enviada'),
+        ('FALHA', 'Falha Definitiva'),
+    ]
+    
+    STATUS_ENTREGA_CHOICES = [
+        ('SERVIDOR', 'Recebida pelo servidor'),
+        ('ENTREGUE', 'Entregue'),
+        ('LIDA', 'Lida'),
+        ('ERRO', 'Erro na entrega'),
+    ]
+    
+    telefone = models.CharField('Telefone', max_length=30)
+    mensagem = models.TextField('Mensagem')
+    origem = models.CharField('Origem', max_length=50, blank=True, help_text='Ponto do sistema que gerou a mensagem')
+    modelo = models.CharField('Modelo', max_length=50, blank=True, help_text='Código do modelo de mensagem usado')
+    chave_deduplicacao = models.CharField(
+        'Chave de Deduplicação', max_length=150, blank=True, db_index=True,
+        help_text='Telefone + origem + referência (ex: id da cobrança)'
+    )
+    recorrencia = models.ForeignKey(
+        Recorrencia, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='mensagens_whatsapp', verbose_name='Recorrência'
+    )
+    campanha = models.ForeignKey(
+        CampanhaCobranca, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='mensagens', verbose_name='Campanha'
+    )
+    
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    tentativas = models.IntegerField('Tentativas', default=0)
+    proxima_tentativa = models.DateTimeField('Próxima Tentativa', null=True, blank=True)
+    ultimo_erro = models.TextField('Último Erro', blank=True)
+    resposta = models.JSONField('Resposta da API', null=True, blank=True)
+    enviada_em = models.DateTimeField('Enviada em', null=True, blank=True)
+    
+    # Métricas do envio e status de entrega (atualizado pelo webhook do provedor)
+    provedor_id = models.CharField('ID no Provedor', max_length=100, blank=True, db_index=True)
+    latencia_ms = models.PositiveIntegerField('Latência (ms)', null=True, blank=True)
+    url_alternativa = models.BooleanField('Usou URL Alternativa', default=False)
+    status_entrega = models.CharField('Status de Entrega', max_length=20, choices=STATUS_ENTREGA_CHOICES, blank=True)
+    entregue_em = models.DateTimeField('Entregue em', null=True, blank=True)
+    lida_em = models.DateTimeField('Lida em', null=True, blank=True)
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Mensagem WhatsApp'
+        verbose_name_plural = 'Mensagens WhatsApp'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa'], name='mensagem_wa_fila_idx'),
+            models.Index(fields=['created_at', 'status'], name='mensagem_wa_dia_idx'),
+            models.Index(fields=['enviada_em', 'latencia_ms'], name='mensagem_wa_latencia_idx'),
+        ]
+        constraints = [
+            # Só uma mensagem na fila por chave de deduplicação, mesmo com enfileiramentos simultâneos
+            models.UniqueConstraint(
+                fields=['chave_deduplicacao'],
+                condition=Q(status__in=['PENDENTE', 'ENVIANDO']) & ~Q(chave_deduplicacao=''),
+                name='mensagem_wa_chave_na_fila',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.telefone} - {self.get_status_display()} ({self.created_at:%d/%m/%Y %H:%M})"
+
+
+class SincronizacaoLote(models.Model):
+    """Execução da sincronização em lote das alterações locais de clientes e recorrências com o Asaas"""
+    
+    STATUS_CHOICES = [
+        ('EXECUTANDO', 'Em execução'),
+        ('CONCLUIDA', 'Concluída'),
+    ]
+    
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='EXECUTANDO')
+    total = models.IntegerField('Registros', default=0)
+    total_sincronizados = models.IntegerField('Sincronizados', default=0)
+    total_erros = models.IntegerField('Erros', default=0)
+    concluida_em = models.DateTimeField('Concluída em', null=True, blank=True)
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Sincronização em Lote'
+        verbose_name_plural = 'Sincronizações em Lote'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Sincronização {self.pk} ({self.created_at:%d/%m/%Y %H:%M}) - {self.get_status_display()}"
+    
+    @property
+    def pendentes(self):
+        return self.total - self.total_sincronizados - self.total_erros
+
+
+class SincronizacaoItem(models.Model):
+    """Resultado da sincronização de um cliente ou recorrência dentro de um lote"""
+    
+    TIPO_CHOICES = [
+        ('CLIENTE', 'Cliente'),
+        ('RECORRENCIA', 'Recorrência'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('ENVIANDO', 'Enviando'),
+        ('OK', 'Sincronizado'),
+        ('IGNORADO', 'Já sincronizado'),
+        ('ERRO', 'Erro'),
+    ]
+    
+    lote = models.ForeignKey(SincronizacaoLote, on_delete=models.CASCADE, related_name='itens', verbose_name='Lote')
+    tipo = models.CharField('Tipo', max_length=20, choices=TIPO_CHOICES)
+    objeto_id = models.PositiveIntegerField('ID do Registro')
+    descricao = models.CharField('Descrição', max_length=255)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    erro = models.TextField('Erro', blank=True)
+    reservado_em = models.DateTimeField('Reservado em', null=True, blank=True, help_text='Quando uma execução reservou o item para envio')
+    processado_em = models.DateTimeField('Processado em', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Item de Sincronização'
+        verbose_name_plural = 'Itens de Sincronização'
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['lote', 'tipo', 'status'], name='sincronizacao_item_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.objeto_id} - {self.get_status_display()}"
+
+
+class LimiteEnvio(models.Model):
+    """Balde de tokens (token bucket) compartilhado entre processos para limitar envios de WhatsApp e chamadas ao Asaas"""
+    
+    chave = models.CharField('Chave', max_length=100, unique=True, help_text='"global", "destino:<telefone>" ou "asaas"')
+    tokens = models.FloatField('Tokens Disponíveis')
+    atualizado_em = models.DateTimeField('Atualizado em')
+    
+    class Meta:
+        verbose_name = 'Limite de Envio'
+        verbose_name_plural = 'Limites de Envio'
+        ordering = ['chave']
+    
+    def __str__(self):
+        return f"{self.chave}: {self.tokens:.2f} tokens"
+
+
+class Reajuste(models.Model):
+    """Reajuste de preço em massa das recorrências, aplicado localmente e propagado ao Asaas em lote"""
+    
+    TIPO_CHOICES = [
+        ('PERCENTUAL', 'Percentual'),
+        ('TABELA', 'Tabela de preços'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('ENVIANDO', 'Enviando ao Asaas'),
+        ('CONCLUIDO', 'Concluído'),
+        ('REVERTENDO', 'Revertendo'),
+        ('REVERTIDO', 'Revertido'),
+    ]
+    
+    nome = models.CharField('Nome', max_length=100)
+    tipo = models.CharField('Tipo', max_length=20, choices=TIPO_CHOICES, default='PERCENTUAL')
+    percentual = models.DecimalField(
+        'Percentual (%)', max_digits=6, decimal_places=2, null=True, blank=True,
+        help_text='Para "Percentual": ex. 4.62 para o IPCA de 4,62%'
+    )
+    tabela = models.JSONField(
+        'Tabela de Preços', default=dict, blank=True,
+        help_text='Para "Tabela": {"valor atual": "novo valor"}; valores fora da tabela não mudam'
+    )
+    
+    # Filtro das recorrências (ativas)
+    ciclo = models.CharField('Ciclo', max_length=20, choices=Recorrencia.CYCLE_CHOICES, blank=True)
+    billing_type = models.CharField('Forma de Pagamento', max_length=20, choices=Recorrencia.BILLING_TYPE_CHOICES, blank=True)
+    criadas_ate = models.DateField('Criadas até', null=True, blank=True, help_text='Apenas recorrências cadastradas até esta data')
+    
+    atualizar_cobrancas_pendentes = models.BooleanField(
+        'Atualizar Cobranças Pendentes', default=True,
+        help_text='Aplica o novo valor também às cobranças já geradas e ainda não pagas no Asaas'
+    )
+    
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='ENVIANDO')
+    total = models.IntegerField('Recorrências Reajustadas', default=0)
+    total_enviados = models.IntegerField('Enviadas ao Asaas', default=0)
+    total_erros = models.IntegerField('Erros', default=0)
+    receita_mensal_anterior = models.DecimalField('Receita Mensal Anterior', max_digits=14, decimal_places=2, default=0)
+    receita_mensal_nova = models.DecimalField('Receita Mensal Nova', max_digits=14, decimal_places=2, default=0)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Aplicado por')
+    concluido_em = models.DateTimeField('Concluído em', null=True, blank=True)
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Reajuste de Preço'
+        verbose_name_plural = 'Reajustes de Preço'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.nome} ({self.created_at:%d/%m/%Y})"
+    
+    @property
+    def impacto_mensal(self):
+        return self.receita_mensal_nova - self.receita_mensal_anterior
+
+    def itens_a_enviar(self):
+        """Itens que ainda precisam ser enviados ao Asaas (na reversão, os já enviados com o valor novo)"""
+        return self.itens.filter(status='OK' if self.status == 'REVERTENDO' else 'PENDENTE')
+
+
+class ReajusteItem(models.Model):
+    """Valor anterior e novo de uma recorrência no reajuste, com o resultado do envio ao Asaas"""
+    
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('OK', 'Enviado'),
+        ('LOCAL', 'Sem assinatura no Asaas'),
+        ('ERRO', 'Erro (valor anterior restaurado)'),
+        ('REVERTIDO', 'Revertido'),
+    ]
+    
+    reajuste = models.ForeignKey(Reajuste, on_delete=models.CASCADE, related_name='itens', verbose_name='Reajuste')
+    recorrencia = models.ForeignKey(Recorrencia, on_delete=models.CASCADE, related_name='reajustes', verbose_name='Recorrência')
+    valor_anterior = models.DecimalField('Valor Anterior', max_digits=10, decimal_places=2)
+    valor_novo = models.DecimalField('Valor Novo', max_digits=10, decimal_places=2)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    erro = models.TextField('Erro', blank=True)
+    processado_em = models.DateTimeField('Processado em', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Item de Reajuste'
+        verbose_name_plural = 'Itens de Reajuste'
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['reajuste', 'status'], name='reajuste_item_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recorrencia_id}: R$ {self.valor_anterior} -> R$ {self.valor_novo} ({self.get_status_display()})"
+
+
+class ProjecaoRecorrencia(models.Model):
+    """Cobranças futuras de uma recorrência ativa, mês a mês (resumo usado na projeção de receita)"""
+    
+    recorrencia = models.OneToOneField(Recorrencia, on_delete=models.CASCADE, related_name='projecao', verbose_name='Recorrência')
+    assinatura = models.CharField('Assinatura dos Dados', max_length=40, help_text='Hash dos dados usados no cálculo; muda quando a recorrência muda')
+    mes_base = models.DateField('Primeiro Mês')
+    valor = models.DecimalField('Valor', max_digits=10, decimal_places=2)
+    ciclo = models.CharField('Ciclo', max_length=20, choices=Recorrencia.CYCLE_CHOICES)
+    billing_type = models.CharField('Forma de Pagamento', max_length=20, choices=Recorrencia.BILLING_TYPE_CHOICES)
+    cobrancas = models.JSONField('Cobranças por Mês', default=list)
+    
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Projeção de Recorrência'
+        verbose_name_plural = 'Projeções de Recorrências'
+    
+    def __str__(self):
+        return f"Projeção de {self.recorrencia_id} a partir de {self.mes_base:%m/%Y}"
+
+
+class AtividadeRecorrencia(models.Model):
+    """Pagamentos de uma recorrência em um mês (base das coortes, recalculada por recorrência)"""
+    
+    recorrencia = models.ForeignKey(Recorrencia, on_delete=models.CASCADE, related_name='atividades', verbose_name='Recorrência')
+    mes = models.DateField('Mês')
+    coorte = models.DateField('Mês de Entrada', help_text='Mês de cadastro da recorrência')
+    periodo = models.IntegerField('Período', help_text='Meses desde a entrada (0 = mês de entrada)')
+    parceiro = models.ForeignKey(
+        Parceiro, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='atividades_indicadas', verbose_name='Parceiro Indicador'
+    )
+    valor = models.DecimalField('Valor Pago', max_digits=12, decimal_places=2)
+    
+    class Meta:
+        verbose_name = 'Atividade de Recorrência'
+        verbose_name_plural = 'Atividades de Recorrências'
+        constraints = [
+            models.UniqueConstraint(fields=['recorrencia', 'mes'], name='atividade_recorrencia_mes_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['coorte', 'periodo'], name='atividade_coorte_idx'),
+            models.Index(fields=['parceiro', 'periodo'], name='atividade_parceiro_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recorrencia_id} em {self.mes:%m/%Y}: R$ {self.valor}"
+
+
+class Coorte(models.Model):
+    """Grupo de recorrências (por mês de entrada ou parceiro indicador) com o tamanho e as ativas hoje"""
+    
+    DIMENSAO_CHOICES = [
+        ('MES', 'Mês de entrada'),
+        ('PARCEIRO', 'Parceiro indicador'),
+    ]
+    
+    dimensao = models.CharField('Dimensão', max_length=20, choices=DIMENSAO_CHOICES)
+    mes = models.DateField('Mês de Entrada', null=True, blank=True)
+    parceiro = models.ForeignKey(
+        Parceiro, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='coortes', verbose_name='Parceiro Indicador'
+    )
+    recorrencias = models.IntegerField('Recorrências', default=0)
+    ativas = models.IntegerField('Ativas Hoje', default=0)
+    receita = models.DecimalField('Receita Total', max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = 'Coorte'
+        verbose_name_plural = 'Coortes'
+        ordering = ['dimensao', 'mes', 'parceiro']
+    
+    def __str__(self):
+        if self.dimensao == 'MES':
+            return f"Entrada em {self.mes:%m/%Y}"
+        return f"Indicação: {self.parceiro.nome if self.parceiro_id else 'Sem indicação'}"
+    
+    @property
+    def percentual_ativas(self):
+        return round(self.ativas * 100 / self.recorrencias, 1) if self.recorrencias else 0
+
+
+class CoortePeriodo(models.Model):
+    """Recorrências pagantes e receita de uma coorte N meses após a entrada"""
+    
+    coorte = models.ForeignKey(Coorte, on_delete=models.CASCADE, related_name='periodos', verbose_name='Coorte')
+    periodo = models.IntegerField('Período')
+    pagantes = models.IntegerField('Recorrências Pagantes', default=0)
+    receita = models.DecimalField('Receita', max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = 'Período de Coorte'
+        verbose_name_plural = 'Períodos de Coorte'
+        ordering = ['coorte', 'periodo']
+    
+    def __str__(self):
+        return f"{self.coorte} +{self.periodo}: {self.pagantes}"
+
+
+class AtualizacaoCoortes(models.Model):
+    """Execução do recálculo incremental das coortes (a última concluída marca até onde os dados foram lidos)"""
+    
+    iniciada_em = models.DateTimeField('Iniciada em')
+    concluida_em = models.DateTimeField('Concluída em', null=True, blank=True)
+    completa = models.BooleanField('Recálculo Completo', default=False)
+    recorrencias_recalculadas = models.IntegerField('Recorrências Recalculadas', default=0)
+    
+    class Meta:
+        verbose_name = 'Atualização de Coortes'
+        verbose_name_plural = 'Atualizações de Coortes'
+        ordering = ['-iniciada_em']
+    
+    def __str__(self):
+        return f"Coortes em {self.iniciada_em:%d/%m/%Y %H:%M}"
+
+
+class AlteracaoRecorrencia(models.Model):
+    """Registro append-only das mudanças de uma recorrência (apenas os campos alterados)"""
+    
+    ORIGEM_CHOICES = [
+        ('IMPORTACAO', 'Importação do Asaas'),
+        ('EDICAO', 'Edição'),
+    ]
+    
+    recorrencia = models.ForeignKey(Recorrencia, on_delete=models.CASCADE, related_name='alteracoes', verbose_name='Recorrência')
+    origem = models.CharField('Origem', max_length=20, choices=ORIGEM_CHOICES)
+    campos = models.JSONField('Campos Alterados', default=dict, help_text='{campo: [anterior, novo]}; na criação o anterior é nulo')
+    assinatura = models.CharField('Assinatura do Conteúdo', max_length=40, help_text='Hash dos campos acompanhados após a alteração')
+    criada = models.BooleanField('Criação', default=False)
+    registrada_em = models.DateTimeField('Registrada em', default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Alteração de Recorrência'
+        verbose_name_plural = 'Alterações de Recorrências'
+        ordering = ['-registrada_em', '-pk']
+        indexes = [
+            models.Index(fields=['recorrencia', 'registrada_em'], name='alteracao_recorrencia_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recorrencia_id} em {self.registrada_em:%d/%m/%Y %H:%M}: {', '.join(self.campos)}"
+
+
+class ChaveIdempotencia(models.Model):
+    """Criação enviada ao Asaas, identificada por uma chave (evita duplicar o objeto em retentativas)"""
+    
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('CONCLUIDA', 'Concluída'),
+    ]
+    
+    chave = models.CharField('Chave', max_length=64, unique=True, help_text='SHA-256 do endpoint com a chave informada')
+    endpoint = models.CharField('Endpoint', max_length=50)
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    asaas_id = models.CharField('ID Asaas', max_length=50, blank=True)
+    resposta = models.JSONField('Resposta do Asaas', default=dict, blank=True)
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    atualizada_em = models.DateTimeField('Última Tentativa', default=timezone.now, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Chave de Idempotência'
+        verbose_name_plural = 'Chaves de Idempotência'
+        ordering = ['-atualizada_em']
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.chave[:12]}: {self.asaas_id or self.get_status_display()}"
@@ -0,0 +1,332 @@
+"""
+Fila de saída (outbox) de mensagens WhatsApp
+
+As views apenas gravam a mensagem na tabela MensagemWhatsApp e retornam na
+hora; o comando processar_fila_whatsapp drena a fila com concorrência
+limitada, novas tentativas com backoff e falha definitiva (dead-letter)
+após o número máximo de tentativas.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .limite_service import limpar_baldes_ociosos
+from .models import MensagemWhatsApp, Recorrencia
+from .mensagem_service import PADROES, contexto_resumo, renderizar
+from .telefone_service import normalizar_telefone
+from .whatsapp_service import WhatsAppService
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_TENTATIVAS = getattr(settings, 'WHATSAPP_OUTBOX_MAX_TENTATIVAS', 5)
+CONCORRENCIA = getattr(settings, 'WHATSAPP_OUTBOX_CONCORRENCIA', 4)
+# Espera antes da tentativa N (em segundos): 30s, 2min, 10min, 30min...
+BACKOFF_SEGUNDOS = [30, 120, 600, 1800, 3600]
+# Mensagens presas em ENVIANDO por mais que isso (worker morto) voltam para a fila
+TEMPO_MAXIMO_ENVIANDO = timedelta(minutes=10)
+# Mesma mensagem (telefone + origem + referência) não é enfileirada de novo dentro desta janela
+JANELA_DEDUPLICACAO = timedelta(seconds=getattr(settings, 'WHATSAPP_JANELA_DEDUPLICACAO', 1800))
+# Tamanho dos lotes de consulta e gravação em massa
+TAMANHO_LOTE = 1000
+# Status em que a mensagem ainda está na fila (únicos por chave de deduplicação)
+STATUS_NA_FILA = ['PENDENTE', 'ENVIANDO']
+
+
+def chave_deduplicacao(telefone, origem, referencia):
+    """Chave que identifica a mesma mensagem para o mesmo destinatário (ex: mesmo boleto)"""
+    if referencia is None:
+        return ''
+    numero = re.sub(r'\D', '', telefone)
+    return f'{numero}:{origem}:{referencia}'
+
+
+def chaves_recentes(chaves, desde=None):
+    """
+    Chaves que já têm mensagem na fila ou enviada desde `desde`
+    (padrão: dentro da janela de deduplicação)
+    """
+    chaves = [c for c in chaves if c]
+    desde = desde or timezone.now() - JANELA_DEDUPLICACAO
+    recentes = set()
+    for i in range(0, len(chaves), TAMANHO_LOTE):
+        recentes.update(MensagemWhatsApp.objects.filter(
+            chave_deduplicacao__in=chaves[i:i + TAMANHO_LOTE],
+            created_at__gte=desde,
+        ).exclude(status='FALHA').values_list('chave_deduplicacao', flat=True))
+    return recentes
+
+
+def enfileirar_mensagem(telefone, mensagem, origem='', recorrencia=None, referencia=None):
+    """
+    Grava uma mensagem na fila de saída para envio assíncrono
+
+    Args:
+        referencia: Identificador do conteúdo (ex: id da cobrança); quando informado,
+            a mesma mensagem não é enfileirada duas vezes dentro de JANELA_DEDUPLICACAO
+
+    A consulta em chaves_recentes cobre a janela inteira; a restrição única
+    mensagem_wa_chave_na_fila garante que duas requisições simultâneas não
+    deixem a mesma mensagem duas vezes na fila.
+
+    Returns:
+        Tupla (MensagemWhatsApp, criada) - criada=False quando é duplicada
+    """
+    telefone = normalizar_telefone(telefone) or telefone
+    chave = chave_deduplicacao(telefone, origem, referencia)
+    if chave and chave in chaves_recentes([chave]):
+        logger.info(f'Mensagem WhatsApp duplicada ignorada ({chave})')
+        return MensagemWhatsApp.objects.filter(chave_deduplicacao=chave).latest('created_at'), False
+
+    try:
+        with transaction.atomic():
+            msg = MensagemWhatsApp.objects.create(
+                telefone=telefone,
+                mensagem=mensagem,
+                origem=origem,
+                modelo=origem if origem in PADROES else '',
+                recorrencia=recorrencia,
+                chave_deduplicacao=chave,
+            )
+    except IntegrityError:
+        if not chave:
+            raise
+        # Outra requisição enfileirou a mesma mensagem entre a consulta e a gravação
+        logger.info(f'Mensagem WhatsApp duplicada ignorada ({chave})')
+        return MensagemWhatsApp.objects.filter(
+            chave_deduplicacao=chave, status__in=STATUS_NA_FILA
+        ).latest('created_at'), False
+    logger.info(f'Mensagem WhatsApp #{msg.pk} enfileirada para {telefone} ({origem or "sem origem"})')
+    return msg, True
+
+
+def enfileirar_para_numeros_notificacao(mensagem, origem='', recorrencia=None, referencia=None):
+    """Enfileira uma mensagem para cada número configurado em WHATSAPP_NUMBERS"""
+    numeros = [n.strip() for n in getattr(settings, 'WHATSAPP_NUMBERS', []) if n.strip()]
+    return [enfileirar_mensagem(n, mensagem, origem, recorrencia, referencia) for n in numeros]
+
+
+def enfileirar_lote(mensagens, por_minuto):
+    """
+    Grava em massa mensagens (MensagemWhatsApp não salvas), espaçando os envios
+
+    O agendamento continua depois da última mensagem pendente já agendada, para
+    que disparos consecutivos (campanhas, régua de cobrança) não se sobreponham.
+    Mensagens cuja chave de deduplicação já esteja na fila (disparo simultâneo)
+    são descartadas pelo banco.
+
+    Returns:
+        Quantidade de mensagens enviadas para gravação
+    """
+    agora = timezone.now()
+    ultima = MensagemWhatsApp.objects.filter(status='PENDENTE', proxima_tentativa__gt=agora).order_by(
+        '-proxima_tentativa'
+    ).values_list('proxima_tentativa', flat=True).first()
+    inicio = ultima or agora
+    intervalo = 60 / por_minuto
+
+    for i, msg in enumerate(mensagens):
+        msg.proxima_tentativa = inicio + timedelta(seconds=i * intervalo)
+    MensagemWhatsApp.objects.bulk_create(mensagens, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+    return len(mensagens)
+
+
+def enfileirar_resumo_recorrencias(desde=None):
+    """
+    Enfileira para WHATSAPP_NUMBERS um único resumo das recorrências criadas
+    desde o último resumo (modo WHATSAPP_NOTIFICACAO_RESUMO)
+
+    Args:
+        desde: Início do período; padrão é o último resumo enfileirado (ou as últimas 24h)
+
+    Returns:
+        Tupla (quantidade de recorrências no resumo, mensagens enfileiradas)
+    """
+    agora = timezone.now()
+    if desde is None:
+        desde = MensagemWhatsApp.objects.filter(origem='resumo_recorrencias').order_by('-created_at').values_list(
+            'created_at', flat=True
+        ).first() or agora - timedelta(days=1)
+
+    recorrencias = list(
+        Recorrencia.objects.filter(created_at__gt=desde, created_at__lte=agora).select_related('cliente').order_by('created_at')
+    )
+    if not recorrencias:
+        return 0, []
+
+    mensagem = renderizar('resumo_recorrencias', contexto_resumo(recorrencias))
+    referencia = f'{recorrencias[0].pk}-{recorrencias[-1].pk}'
+    return len(recorrencias), enfileirar_para_numeros_notificacao(mensagem, origem='resumo_recorrencias', referencia=referencia)
+
+
+def _backoff(tentativas):
+    return timedelta(seconds=BACKOFF_SEGUNDOS[min(tentativas, len(BACKOFF_SEGUNDOS)) - 1])
+
+
+def liberar_mensagens_presas():
+    """Devolve para a fila mensagens que ficaram em ENVIANDO (ex: worker interrompido)"""
+    limite = timezone.now() - TEMPO_MAXIMO_ENVIANDO
+    return MensagemWhatsApp.objects.filter(status='ENVIANDO', updated_at__lt=limite).update(
+        status='PENDENTE', updated_at=timezone.now()
+    )
+
+
+def reservar_lote(limite):
+    """
+    Reserva até `limite` mensagens prontas para envio, marcando-as como ENVIANDO
+
+    A reserva é feita com UPDATE condicional por mensagem, então vários workers
+    podem drenar a mesma fila sem enviar a mesma mensagem duas vezes.
+    """
+    agora = timezone.now()
+    candidatas = MensagemWhatsApp.objects.filter(
+        Q(proxima_tentativa__isnull=True) | Q(proxima_tentativa__lte=agora),
+        status='PENDENTE',
+    ).order_by('created_at').values_list('pk', flat=True)[:limite]
+
+    reservadas = [
+        pk for pk in candidatas
+        if MensagemWhatsApp.objects.filter(pk=pk, status='PENDENTE').update(status='ENVIANDO', updated_at=agora)
+    ]
+    return list(MensagemWhatsApp.objects.filter(pk__in=reservadas).order_by('created_at'))
+
+
+def _registrar_resultado(msg, result):
+    """Atualiza a mensagem conforme o resultado do envio (sucesso, nova tentativa ou falha definitiva)"""
+    if result.get('limitado'):
+        # Limite de envio atingido: reagenda sem contar como tentativa
+        msg.status = 'PENDENTE'
+        msg.proxima_tentativa = timezone.now() + timedelta(seconds=result.get('aguardar', 60))
+        msg.save(update_fields=['status', 'proxima_tentativa', 'updated_at'])
+        return
+
+    msg.tentativas += 1
+    msg.latencia_ms = result.get('latencia_ms')
+    msg.url_alternativa = result.get('url_alternativa', False)
+    if result.get('success'):
+        msg.status = 'ENVIADA'
+        msg.enviada_em = timezone.now()
+        msg.resposta = result.get('data')
+        msg.provedor_id = result.get('provedor_id') or ''
+        msg.ultimo_erro = ''
+    elif msg.tentativas >= MAX_TENTATIVAS:
+        msg.status = 'FALHA'
+        msg.ultimo_erro = str(result.get('error', ''))
+        logger.error(f'Mensagem WhatsApp #{msg.pk} descartada após {msg.tentativas} tentativas: {msg.ultimo_erro}')
+    else:
+        msg.status = 'PENDENTE'
+        msg.ultimo_erro = str(result.get('error', ''))
+        msg.proxima_tentativa = timezone.now() + _backoff(msg.tentativas)
+    msg.save(update_fields=[
+        'status', 'tentativas', 'enviada_em', 'resposta', 'provedor_id', 'latencia_ms', 'url_alternativa',
+        'ultimo_erro', 'proxima_tentativa', 'updated_at',
+    ])
+
+
+def _enviar(whatsapp_service, msg):
+    try:
+        return whatsapp_service.send_message(msg.telefone, msg.mensagem, verificar_conexao=False)
+    except Exception as e:
+        logger.error(f'Erro inesperado ao enviar mensagem WhatsApp #{msg.pk}: {str(e)}')
+        return {'success': False, 'error': str(e)}
+    finally:
+        # Cada thread do pool abre sua própria conexão (limite de envio); fecha ao terminar
+        connection.close()
+
+
+def processar_fila(limite=50, concorrencia=None, whatsapp_service=None):
+    """
+    Envia um lote de mensagens pendentes
+
+    A conexão da instância é verificada uma vez por lote; as chamadas HTTP
+    rodam em paralelo (até `concorrencia` simultâneas) e a gravação dos
+    resultados fica na thread principal.
+
+    Returns:
+        Dict com contagens de enviadas, reagendadas e falhas
+    """
+    liberar_mensagens_presas()
+    limpar_baldes_ociosos()
+    lote = reservar_lote(limite)
+    resumo = {'enviadas': 0, 'reagendadas': 0, 'falhas': 0}
+    if not lote:
+        return resumo
+
+    whatsapp_service = whatsapp_service or WhatsAppService()
+    whatsapp_service.garantir_conexao()
+    with ThreadPoolExecutor(max_workers=concorrencia or CONCORRENCIA) as executor:
+        resultados = list(executor.map(lambda m: _enviar(whatsapp_service, m), lote))
+
+    for msg, result in zip(lote, resultados):
+        _registrar_resultado(msg, result)
+        chave = {'ENVIADA': 'enviadas', 'PENDENTE': 'reagendadas', 'FALHA': 'falhas'}[msg.status]
+        resumo[chave] += 1
+
+    logger.info(f'Fila WhatsApp: {resumo}')
+    return resumo
+
+
+# Ordem dos status de entrega: callbacks atrasados não fazem o status regredir
+ORDEM_ENTREGA = {'': 0, 'SERVIDOR': 1, 'ENTREGUE': 2, 'LIDA': 3}
+
+
+def atualizar_status_entrega(atualizacoes):
+    """
+    Aplica os status de entrega recebidos do provedor (webhook)
+
+    Args:
+        atualizacoes: Lista de (id no provedor, status de entrega)
+
+    Returns:
+        Quantidade de mensagens atualizadas
+    """
+    if not atualizacoes:
+        return 0
+    agora = timezone.now()
+    mensagens = {m.provedor_id: m for m in MensagemWhatsApp.objects.filter(provedor_id__in={a[0] for a in atualizacoes})}
+
+    alteradas = {}
+    for provedor_id, status in atualizacoes:
+        msg = mensagens.get(provedor_id)
+        if msg is None or msg.status_entrega == 'ERRO':
+            continue
+        if status != 'ERRO' and ORDEM_ENTREGA[status] <= ORDEM_ENTREGA[msg.status_entrega]:
+            continue
+        msg.status_entrega = status
+        if status in ('ENTREGUE', 'LIDA') and not msg.entregue_em:
+            msg.entregue_em = agora
+        if status == 'LIDA':
+            msg.lida_em = agora
+        msg.updated_at = agora
+        alteradas[msg.pk] = msg
+
+    MensagemWhatsApp.objects.bulk_update(alteradas.values(), ['status_entrega', 'entregue_em', 'lida_em', 'updated_at'])
+    return len(alteradas)
+
+
+def reenfileirar(mensagens):
+    """
+    Devolve mensagens com falha definitiva para a fila, zerando as tentativas
+
+    Por chave de deduplicação volta só a falha mais recente, e nenhuma se a
+    mesma mensagem já estiver na fila de novo.
+    """
+    falhas = mensagens.filter(status='FALHA')
+    na_fila = set(MensagemWhatsApp.objects.filter(
+        status__in=STATUS_NA_FILA, chave_deduplicacao__in=falhas.exclude(chave_deduplicacao='').values('chave_deduplicacao'),
+    ).values_list('chave_deduplicacao', flat=True))
+
+    pks = []
+    for pk, chave in falhas.order_by('-created_at').values_list('pk', 'chave_deduplicacao'):
+        if chave in na_fila:
+            continue
+        if chave:
+            na_fila.add(chave)
+        pks.append(pk)
+
+    return MensagemWhatsApp.objects.filter(pk__in=pks).update(
+        status='PENDENTE', tentativas=0, proxima_tentativa=None, updated_at=timezone.now()
+    )
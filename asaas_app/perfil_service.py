@@ -0,0 +1,54 @@
+"""
+Instrumentação de etapas de cálculo (tempo de parede e consultas SQL por etapa)
+"""
+import time
+from contextlib import contextmanager
+from django.db import connection
+
+
+class PerfilCalculo:
+    """
+    Coleta, por etapa, o tempo total e a quantidade/tempo das consultas SQL executadas
+    
+    Uso:
+        perfil = PerfilCalculo()
+        with perfil.etapa('movimentacoes'):
+            ...
+        perfil.resumo()
+    """
+    
+    def __init__(self):
+        self.etapas = []
+    
+    @contextmanager
+    def etapa(self, nome):
+        stats = {'queries': 0, 'sql_ms': 0.0}
+        
+        def contar_sql(execute, sql, params, many, context):
+            inicio_sql = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats['queries'] += 1
+                stats['sql_ms'] += (time.perf_counter() - inicio_sql) * 1000
+        
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(contar_sql):
+                yield
+        finally:
+            self.etapas.append({
+                'etapa': nome,
+                'tempo_ms': round((time.perf_counter() - inicio) * 1000, 2),
+                'queries': stats['queries'],
+                'sql_ms': round(stats['sql_ms'], 2),
+            })
+    
+    def resumo(self):
+        """Retorna o perfil em formato serializável (para JSONField)"""
+        return {
+            'etapas': self.etapas,
+            'total_ms': round(sum(e['tempo_ms'] for e in self.etapas), 2),
+            'total_queries': sum(e['queries'] for e in self.etapas),
+            'total_sql_ms': round(sum(e['sql_ms'] for e in self.etapas), 2),
+        }
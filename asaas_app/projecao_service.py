@@ -0,0 +1,240 @@
+"""
+Projeção de receita recorrente (MRR/ARR)
+
+Cada recorrência ativa é expandida nas suas cobranças futuras, contadas
+mês a mês ao longo do horizonte, a partir do ciclo, próximo vencimento,
+data de término e número máximo de cobranças. A contagem por mês é feita
+por aritmética sobre o vetor de meses (fatias para ciclos mensais,
+intervalos de índices para ciclos semanais), sem gerar data por data.
+
+O resultado de cada recorrência fica em ProjecaoRecorrencia junto com um
+hash dos dados usados; a cada atualização só as recorrências cujo hash
+mudou (ou todas, na virada do mês) são recalculadas. A atualização roda nos
+caminhos que gravam recorrências (cadastro, edição, importação, reajuste) e
+no comando atualizar_projecoes, agendado para cobrir a virada do mês e as
+alterações feitas por outros caminhos (ex: admin). A leitura da projeção
+não grava nada: os totais agregados ficam em cache por CACHE_TIMEOUT e são
+descartados a cada atualização.
+"""
+import hashlib
+from datetime import date
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from .models import Recorrencia, ProjecaoRecorrencia
+from .outbox_service import TAMANHO_LOTE
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Meses projetados a partir do mês atual
+HORIZONTE_MESES = getattr(settings, 'PROJECAO_HORIZONTE_MESES', 24)
+CACHE_CHAVE = 'projecao_receita'
+CACHE_TIMEOUT = 10 * 60
+
+INTERVALO_MESES = {'MONTHLY': 1, 'QUARTERLY': 3, 'SEMIANNUALLY': 6, 'YEARLY': 12}
+INTERVALO_DIAS = {'WEEKLY': 7, 'BIWEEKLY': 14}
+
+CAMPOS_PROJECAO = ('pk', 'value', 'cycle', 'billing_type', 'next_due_date', 'end_date', 'max_payments')
+
+
+def _indice_mes(data, mes_base):
+    return (data.year - mes_base.year) * 12 + data.month - mes_base.month
+
+
+def expandir_cobrancas(ciclo, proximo_vencimento, data_fim, max_cobrancas, mes_base, meses):
+    """
+    Quantidade de cobranças em cada mês do horizonte
+
+    max_cobrancas conta a partir do próximo vencimento (as cobranças já
+    geradas não são conhecidas localmente).
+
+    Returns:
+        Lista com `meses` inteiros, o primeiro sendo o mês de mes_base
+    """
+    cobrancas = [0] * meses
+
+    if ciclo in INTERVALO_DIAS:
+        passo = INTERVALO_DIAS[ciclo]
+        # Cobrança k vence em proximo_vencimento + k * passo dias
+        ultima = max_cobrancas - 1 if max_cobrancas else None
+        if data_fim:
+            ultima_fim = (data_fim - proximo_vencimento).days // passo
+            ultima = ultima_fim if ultima is None else min(ultima, ultima_fim)
+        for i in range(meses):
+            inicio = (mes_base + relativedelta(months=i) - proximo_vencimento).days
+            fim = (mes_base + relativedelta(months=i + 1) - proximo_vencimento).days - 1
+            primeira = max(0, -(-inicio // passo))
+            derradeira = fim // passo if ultima is None else min(ultima, fim // passo)
+            cobrancas[i] = max(0, derradeira - primeira + 1)
+        return cobrancas
+
+    passo = INTERVALO_MESES.get(ciclo, 1)
+    inicio = _indice_mes(proximo_vencimento, mes_base)
+    fim = meses
+    if max_cobrancas:
+        fim = min(fim, inicio + max_cobrancas * passo)
+    if data_fim:
+        mes_fim = _indice_mes(data_fim, mes_base)
+        no_mes_fim = proximo_vencimento + relativedelta(months=mes_fim - inicio)
+        fim = min(fim, mes_fim + 1 if no_mes_fim <= data_fim else mes_fim)
+    if inicio < 0:
+        inicio += -(inicio // passo) * passo  # primeira cobrança a partir de mes_base
+    if inicio < fim:
+        posicoes = range(inicio, fim, passo)
+        cobrancas[inicio:fim:passo] = [1] * len(posicoes)
+    return cobrancas
+
+
+def _assinatura(linha, mes_base, meses):
+    """Hash dos dados que determinam a projeção de uma recorrência"""
+    return hashlib.sha1(repr((linha[1:], mes_base, meses)).encode()).hexdigest()
+
+
+def mes_atual():
+    return date.today().replace(day=1)
+
+
+def atualizar_projecoes(recorrencias=None, meses=None):
+    """
+    Recalcula as projeções das recorrências ativas que mudaram desde o último cálculo
+
+    Args:
+        recorrencias: pks das recorrências gravadas (padrão: todas); se ainda não
+            há projeção do mês atual, todas são recalculadas
+
+    Returns:
+        Quantidade de recorrências recalculadas ou removidas da projeção
+    """
+    meses = meses or HORIZONTE_MESES
+    mes_base = mes_atual()
+    linhas = Recorrencia.objects.filter(status='ACTIVE')
+    existentes = ProjecaoRecorrencia.objects.all()
+    if recorrencias is not None and ProjecaoRecorrencia.objects.filter(mes_base=mes_base).exists():
+        linhas = linhas.filter(pk__in=recorrencias)
+        existentes = existentes.filter(recorrencia_id__in=recorrencias)
+    linhas = linhas.values_list(*CAMPOS_PROJECAO)
+    existentes = dict(existentes.values_list('recorrencia_id', 'assinatura'))
+
+    projecoes = []
+    ativas = set()
+    for linha in linhas.iterator(chunk_size=TAMANHO_LOTE):
+        pk, valor, ciclo, billing_type, proximo_vencimento, data_fim, max_cobrancas = linha
+        ativas.add(pk)
+        assinatura = _assinatura(linha, mes_base, meses)
+        if existentes.get(pk) == assinatura:
+            continue
+        projecoes.append(ProjecaoRecorrencia(
+            recorrencia_id=pk, assinatura=assinatura, mes_base=mes_base, valor=valor, ciclo=ciclo,
+            billing_type=billing_type,
+            cobrancas=expandir_cobrancas(ciclo, proximo_vencimento, data_fim, max_cobrancas, mes_base, meses),
+        ))
+    removidas = [pk for pk in existentes if pk not in ativas]
+
+    if projecoes or removidas:
+        with transaction.atomic():
+            ProjecaoRecorrencia.objects.filter(recorrencia_id__in=removidas).delete()
+            ProjecaoRecorrencia.objects.bulk_create(
+                projecoes, batch_size=TAMANHO_LOTE, update_conflicts=True, unique_fields=['recorrencia'],
+                update_fields=['assinatura', 'mes_base', 'valor', 'ciclo', 'billing_type', 'cobrancas', 'updated_at'],
+            )
+        logger.info(f'Projeção de receita: {len(projecoes)} recorrência(s) recalculada(s), {len(removidas)} removida(s)')
+    # Também cobre recorrências apagadas, cuja projeção sai junto (CASCADE)
+    cache.delete(CACHE_CHAVE)
+    return len(projecoes) + len(removidas)
+
+
+def _somar(vetor, cobrancas, valor):
+    for i, quantidade in enumerate(cobrancas):
+        if quantidade:
+            vetor[i] += quantidade * valor
+
+
+def _agregar(mes_base, meses):
+    """Totais da projeção por mês, ciclo e forma de pagamento"""
+    total = [Decimal(0)] * meses
+    quantidade = [0] * meses
+    por_ciclo = {}
+    por_forma = {}
+    mrr = Decimal(0)
+    recorrencias = 0
+
+    linhas = ProjecaoRecorrencia.objects.filter(mes_base=mes_base).values_list('valor', 'ciclo', 'billing_type', 'cobrancas')
+    for valor, ciclo, billing_type, cobrancas in linhas.iterator(chunk_size=TAMANHO_LOTE):
+        if not any(cobrancas):
+            continue  # recorrência já encerrada
+        recorrencias += 1
+        mensal = valor * Recorrencia.COBRANCAS_POR_MES.get(ciclo, 1)
+        mrr += mensal
+        _somar(total, cobrancas, valor)
+        for i, q in enumerate(cobrancas):
+            quantidade[i] += q
+        for chave, grupos in ((ciclo, por_ciclo), (billing_type, por_forma)):
+            grupo = grupos.setdefault(chave, {'recorrencias': 0, 'mrr': Decimal(0), 'meses': [Decimal(0)] * meses})
+            grupo['recorrencias'] += 1
+            grupo['mrr'] += mensal
+            _somar(grupo['meses'], cobrancas, valor)
+
+    return {
+        'mes_base': mes_base,
+        'recorrencias': recorrencias,
+        'mrr': mrr,
+        'total': total,
+        'quantidade': quantidade,
+        'por_ciclo': por_ciclo,
+        'por_forma': por_forma,
+    }
+
+
+def projecao_receita(meses=12):
+    """
+    Projeção da receita recorrente para os próximos `meses` (até HORIZONTE_MESES)
+
+    Só lê as projeções gravadas. Antes do primeiro cálculo do mês (virada do
+    mês sem o comando atualizar_projecoes), a projeção parte do mês já calculado.
+
+    Returns:
+        Dict com MRR, ARR, receita e cobranças por mês e os totais por ciclo e forma de pagamento
+    """
+    meses = max(1, min(meses, HORIZONTE_MESES))
+    agregado = cache.get(CACHE_CHAVE)
+    if agregado is None:
+        calculado = ProjecaoRecorrencia.objects.aggregate(mes_base=Max('mes_base'))['mes_base']
+        agregado = _agregar(calculado or mes_atual(), HORIZONTE_MESES)
+        cache.set(CACHE_CHAVE, agregado, CACHE_TIMEOUT)
+    mes_base = agregado['mes_base']
+
+    ciclos = dict(Recorrencia.CYCLE_CHOICES)
+    formas = dict(Recorrencia.BILLING_TYPE_CHOICES)
+    ordem_formas = [f for f in formas if f in agregado['por_forma']]
+
+    def grupos(dados, nomes):
+        return [
+            {
+                'codigo': codigo, 'nome': nomes.get(codigo, codigo), 'recorrencias': g['recorrencias'],
+                'mrr': g['mrr'], 'receita': sum(g['meses'][:meses]),
+            }
+            for codigo, g in sorted(dados.items(), key=lambda item: -item[1]['mrr'])
+        ]
+
+    return {
+        'meses': [
+            {
+                'mes': mes_base + relativedelta(months=i),
+                'cobrancas': agregado['quantidade'][i],
+                'receita': agregado['total'][i],
+                'por_forma': [agregado['por_forma'][f]['meses'][i] for f in ordem_formas],
+            }
+            for i in range(meses)
+        ],
+        'formas': [formas[f] for f in ordem_formas],
+        'por_ciclo': grupos(agregado['por_ciclo'], ciclos),
+        'por_forma': grupos(agregado['por_forma'], formas),
+        'recorrencias': agregado['recorrencias'],
+        'mrr': agregado['mrr'],
+        'arr': agregado['mrr'] * 12,
+        'total': sum(agregado['total'][:meses]),
+    }
@@ -0,0 +1,295 @@
+"""
+Reajuste de preço em massa das recorrências
+
+O reajuste (percentual ou por tabela de preços) é calculado em uma única
+passada sobre os valores das recorrências selecionadas, que pode ser vista
+como prévia do impacto na receita antes de aplicar. Ao aplicar, os valores
+anterior e novo de cada recorrência ficam em ReajusteItem e as recorrências
+são atualizadas em um único UPDATE, dentro da mesma transação. O envio ao
+Asaas sai depois, em lote (paralelo e respeitando o limite de chamadas);
+quando o Asaas recusa, o valor anterior da recorrência é restaurado. O
+reajuste inteiro pode ser revertido pelo mesmo caminho.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+from .models import Recorrencia, Reajuste, ReajusteItem
+from .services import AsaasService
+from .limite_service import aguardar_chamada_asaas
+from .projecao_service import atualizar_projecoes
+from .outbox_service import TAMANHO_LOTE
+from .campanha_service import CONCORRENCIA_ASAAS
+from .sincronizacao_service import TEMPO_MAXIMO, dados_recorrencia
+import logging
+
+logger = logging.getLogger(__name__)
+
+CENTAVOS = Decimal('0.01')
+# Recorrências exibidas na prévia (o impacto considera todas)
+ITENS_PREVIA = 50
+
+
+def _valor(texto):
+    """Valor monetário de um texto ('1.234,56', '99.90' ou número)"""
+    texto = str(texto).strip().replace('R$', '').strip()
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    return Decimal(texto).quantize(CENTAVOS, ROUND_HALF_UP)
+
+
+def ler_tabela(texto):
+    """
+    Converte as linhas "valor atual = novo valor" em tabela de preços
+
+    Raises:
+        ValueError: Linha fora do formato ou valor inválido
+    """
+    tabela = {}
+    for numero, linha in enumerate(texto.splitlines(), start=1):
+        if not linha.strip():
+            continue
+        partes = linha.replace(';', '=').split('=')
+        if len(partes) != 2:
+            raise ValueError(f'Linha {numero}: use "valor atual = novo valor".')
+        try:
+            atual, novo = _valor(partes[0]), _valor(partes[1])
+        except InvalidOperation:
+            raise ValueError(f'Linha {numero}: valor inválido.')
+        if novo <= 0:
+            raise ValueError(f'Linha {numero}: o novo valor deve ser maior que zero.')
+        tabela[str(atual)] = str(novo)
+    return tabela
+
+
+def _calculadora(reajuste):
+    """Função valor atual -> novo valor (None quando a recorrência não muda)"""
+    if reajuste.tipo == 'TABELA':
+        tabela = {_valor(atual): _valor(novo) for atual, novo in reajuste.tabela.items()}
+        return tabela.get
+
+    fator = 1 + reajuste.percentual / 100
+    return lambda valor: (valor * fator).quantize(CENTAVOS, ROUND_HALF_UP)
+
+
+def selecionar_recorrencias(reajuste):
+    """Recorrências ativas que atendem ao filtro do reajuste"""
+    recorrencias = Recorrencia.objects.filter(status='ACTIVE')
+    if reajuste.ciclo:
+        recorrencias = recorrencias.filter(cycle=reajuste.ciclo)
+    if reajuste.billing_type:
+        recorrencias = recorrencias.filter(billing_type=reajuste.billing_type)
+    if reajuste.criadas_ate:
+        recorrencias = recorrencias.filter(created_at__date__lte=reajuste.criadas_ate)
+    return recorrencias
+
+
+def calcular_reajuste(reajuste):
+    """
+    Calcula os novos valores das recorrências selecionadas (nada é gravado)
+
+    Returns:
+        Tupla (lista de dicts por recorrência alterada, resumo do impacto na receita)
+    """
+    novo_valor = _calculadora(reajuste)
+    itens = []
+    receita_anterior = receita_nova = Decimal(0)
+
+    linhas = selecionar_recorrencias(reajuste).order_by('pk').values_list(
+        'pk', 'description', 'cliente__name', 'cycle', 'asaas_id', 'value'
+    )
+    for pk, descricao, cliente, ciclo, asaas_id, valor in linhas.iterator(chunk_size=TAMANHO_LOTE):
+        novo = novo_valor(valor)
+        if novo is None or novo == valor:
+            continue
+        por_mes = Recorrencia.COBRANCAS_POR_MES.get(ciclo, 1)
+        receita_anterior += valor * por_mes
+        receita_nova += novo * por_mes
+        itens.append({
+            'recorrencia_id': pk, 'descricao': descricao, 'cliente': cliente, 'ciclo': ciclo,
+            'asaas_id': asaas_id, 'valor_anterior': valor, 'valor_novo': novo,
+        })
+
+    receita_anterior = receita_anterior.quantize(CENTAVOS, ROUND_HALF_UP)
+    receita_nova = receita_nova.quantize(CENTAVOS, ROUND_HALF_UP)
+    resumo = {
+        'quantidade': len(itens),
+        'receita_mensal_anterior': receita_anterior,
+        'receita_mensal_nova': receita_nova,
+        'impacto_mensal': receita_nova - receita_anterior,
+        'impacto_anual': (receita_nova - receita_anterior) * 12,
+    }
+    return itens, resumo
+
+
+def aplicar_reajuste(reajuste, usuario=None):
+    """
+    Grava o reajuste e os novos valores das recorrências em uma única transação
+
+    As recorrências selecionadas ficam bloqueadas (SELECT ... FOR UPDATE) do
+    cálculo até a gravação, para que uma edição simultânea não seja perdida
+    nem reajustada sobre o valor antigo. Recorrências sem assinatura no Asaas
+    só mudam localmente; as demais ficam pendentes para propagar_reajuste.
+
+    Returns:
+        O reajuste gravado, ou None se nenhuma recorrência muda de valor
+    """
+    with transaction.atomic():
+        list(selecionar_recorrencias(reajuste).select_for_update().values_list('pk', flat=True))
+        itens, resumo = calcular_reajuste(reajuste)
+        if not itens:
+            return None
+
+        reajuste.usuario = usuario
+        reajuste.status = 'ENVIANDO'
+        reajuste.total = resumo['quantidade']
+        reajuste.receita_mensal_anterior = resumo['receita_mensal_anterior']
+        reajuste.receita_mensal_nova = resumo['receita_mensal_nova']
+        reajuste.save()
+
+        ReajusteItem.objects.bulk_create([
+            ReajusteItem(
+                reajuste=reajuste, recorrencia_id=item['recorrencia_id'],
+                valor_anterior=item['valor_anterior'], valor_novo=item['valor_novo'],
+                status='PENDENTE' if item['asaas_id'] else 'LOCAL',
+            )
+            for item in itens
+        ], batch_size=TAMANHO_LOTE)
+
+        valor_novo = ReajusteItem.objects.filter(reajuste=reajuste, recorrencia=OuterRef('pk')).values('valor_novo')[:1]
+        Recorrencia.objects.filter(reajustes__reajuste=reajuste).update(
+            value=Subquery(valor_novo), alterado_em=timezone.now()
+        )
+
+    atualizar_projecoes()
+    logger.info(f'Reajuste {reajuste.pk} aplicado em {reajuste.total} recorrência(s)')
+    return reajuste
+
+
+def _restaurar_valores(itens):
+    """Volta ao valor anterior as recorrências dos itens que ainda estão com o valor do reajuste"""
+    for item in itens:
+        Recorrencia.objects.filter(pk=item.recorrencia_id, value=item.valor_novo).update(
+            value=item.valor_anterior, alterado_em=timezone.now()
+        )
+    atualizar_projecoes([item.recorrencia_id for item in itens])
+
+
+def reverter_reajuste(reajuste):
+    """
+    Restaura os valores anteriores e reenvia ao Asaas as recorrências já enviadas
+
+    Recorrências alteradas depois do reajuste mantêm o valor atual.
+
+    Returns:
+        O reajuste em reversão
+    """
+    with transaction.atomic():
+        reajuste = Reajuste.objects.select_for_update().get(pk=reajuste.pk)
+        if reajuste.status not in ('ENVIANDO', 'CONCLUIDO'):
+            return reajuste
+
+        valor_anterior = ReajusteItem.objects.filter(reajuste=reajuste, recorrencia=OuterRef('pk')).values('valor_anterior')[:1]
+        Recorrencia.objects.filter(
+            reajustes__reajuste=reajuste,
+            reajustes__status__in=['PENDENTE', 'OK', 'LOCAL'],
+            value=F('reajustes__valor_novo'),
+        ).update(value=Subquery(valor_anterior), alterado_em=timezone.now())
+
+        # Itens ainda não enviados não precisam de chamada ao Asaas
+        reajuste.itens.filter(status__in=['PENDENTE', 'LOCAL']).update(status='REVERTIDO', processado_em=timezone.now())
+        reajuste.status = 'REVERTENDO'
+        reajuste.concluido_em = None
+        reajuste.save(update_fields=['status', 'concluido_em', 'updated_at'])
+
+    atualizar_projecoes()
+    logger.info(f'Reajuste {reajuste.pk} em reversão')
+    return reajuste
+
+
+def _enviar(asaas_service, reajuste, recorrencia):
+    """Envia ao Asaas os dados atuais da recorrência (apenas a chamada HTTP; pode rodar em outra thread)"""
+    dados = dados_recorrencia(recorrencia)
+    dados['updatePendingPayments'] = reajuste.atualizar_cobrancas_pendentes
+    return asaas_service.update_subscription(recorrencia.asaas_id, dados)
+
+
+def propagar_reajuste(reajuste, tempo_maximo=None, concorrencia=None):
+    """
+    Envia ao Asaas os valores do reajuste (ou os anteriores, se em reversão)
+
+    Os itens são processados em grupos do tamanho da concorrência, com as
+    chamadas em paralelo e os resultados gravados antes do próximo grupo.
+    Quando o Asaas recusa o novo valor, o valor anterior é restaurado
+    localmente. Itens de recorrências removidas no meio do envio ficam com
+    erro. Itens que não couberem no tempo máximo continuam pendentes.
+
+    Returns:
+        O reajuste com os totais atualizados
+    """
+    prazo = time.monotonic() + (tempo_maximo or TEMPO_MAXIMO)
+    concorrencia = concorrencia or CONCORRENCIA_ASAAS
+    revertendo = reajuste.status == 'REVERTENDO'
+    sucesso = 'REVERTIDO' if revertendo else 'OK'
+    asaas_service = AsaasService()
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        while time.monotonic() < prazo:
+            itens = list(reajuste.itens_a_enviar()[:concorrencia])
+            if not itens:
+                break
+            recorrencias = Recorrencia.objects.select_related('cliente').in_bulk([i.recorrencia_id for i in itens])
+
+            removidos = [i for i in itens if i.recorrencia_id not in recorrencias]
+            for item in removidos:
+                item.status, item.erro, item.processado_em = 'ERRO', 'Recorrência removida', timezone.now()
+            ReajusteItem.objects.bulk_update(removidos, ['status', 'erro', 'processado_em'])
+            itens = [i for i in itens if i.recorrencia_id in recorrencias]
+
+            enviar = []
+            for item in itens:
+                if not aguardar_chamada_asaas(prazo):
+                    break
+                enviar.append((item, recorrencias[item.recorrencia_id]))
+
+            momento = timezone.now()
+            resultados = executor.map(lambda par: _enviar(asaas_service, reajuste, par[1]), enviar)
+            for (item, recorrencia), result in zip(enviar, resultados):
+                item.processado_em = timezone.now()
+                if result.get('success'):
+                    recorrencia.marcar_sincronizado(momento)
+                    item.status, item.erro = sucesso, ''
+                else:
+                    item.status, item.erro = 'ERRO', str(result.get('error', ''))[:1000]
+                    if not revertendo:
+                        _restaurar_valores([item])
+
+            ReajusteItem.objects.bulk_update([i for i, _ in enviar], ['status', 'erro', 'processado_em'])
+            if len(enviar) < len(itens):
+                break  # prazo acabou esperando o limite
+
+    reajuste.total_enviados = reajuste.itens.filter(status='OK').count()
+    reajuste.total_erros = reajuste.itens.filter(status='ERRO').count()
+    if not reajuste.itens_a_enviar().exists():
+        reajuste.status = 'REVERTIDO' if revertendo else 'CONCLUIDO'
+        reajuste.concluido_em = timezone.now()
+    reajuste.save()
+
+    logger.info(
+        f'Reajuste {reajuste.pk} ({reajuste.get_status_display()}): '
+        f'{reajuste.total_enviados} enviado(s), {reajuste.total_erros} erro(s)'
+    )
+    return reajuste
+
+
+def propagar_reajustes(tempo_maximo=None, concorrencia=None):
+    """
+    Continua o envio dos reajustes em andamento (aplicação ou reversão)
+
+    Returns:
+        Lista dos reajustes processados
+    """
+    em_andamento = Reajuste.objects.filter(status__in=['ENVIANDO', 'REVERTENDO']).order_by('created_at')
+    return [propagar_reajuste(reajuste, tempo_maximo, concorrencia) for reajuste in em_andamento]
@@ -0,0 +1,177 @@
+"""
+Régua de cobrança automática (dunning) pelo WhatsApp
+
+A cada execução busca no Asaas, em lote, as cobranças em aberto dentro da
+janela da régua, decide a etapa de cada uma (ex: D-3, D0, D+3, D+10) e
+enfileira em massa as mensagens das etapas ainda não enviadas. A execução
+respeita um tempo máximo: o que não couber fica para a próxima, já que as
+etapas enviadas são reconhecidas pela chave de deduplicação.
+"""
+import time
+from datetime import date, timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import Recorrencia, MensagemWhatsApp
+from .services import AsaasService
+from .mensagem_service import contexto_cobranca, renderizar_lote
+from .outbox_service import TAMANHO_LOTE, chave_deduplicacao, chaves_recentes, enfileirar_lote
+from .campanha_service import MENSAGENS_POR_MINUTO
+from .cobranca_service import POR_PAGINA, buscar_paginas, salvar_cobrancas
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Dias em relação ao vencimento em que a mensagem é enviada (negativo = antes)
+ETAPAS = sorted(getattr(settings, 'WHATSAPP_REGUA_COBRANCA', [-3, 0, 3, 10]))
+# Etapa perdida (ex: scheduler parado) ainda é enviada até esta quantidade de dias depois
+TOLERANCIA_DIAS = 2
+# Tempo máximo de uma execução, em segundos
+TEMPO_MAXIMO = getattr(settings, 'WHATSAPP_REGUA_TEMPO_MAXIMO', 300)
+
+
+def modelo_da_etapa(dias):
+    """Código do modelo de mensagem para a etapa"""
+    if dias < 0:
+        return 'cobranca_lembrete'
+    if dias == 0:
+        return 'cobranca_vencimento'
+    return 'cobranca_atraso'
+
+
+def etapa_atual(dias):
+    """Etapa mais recente já alcançada por uma cobrança vencida há `dias` dias (None antes da primeira)"""
+    alcancadas = [e for e in ETAPAS if e <= dias]
+    return alcancadas[-1] if alcancadas else None
+
+
+def buscar_cobrancas_em_aberto(hoje, prazo, concorrencia=None):
+    """
+    Cobranças pendentes e vencidas com vencimento dentro da janela da régua
+
+    As páginas de cada status são buscadas em paralelo; as que não couberem
+    no prazo são descartadas. As cobranças encontradas também atualizam o
+    espelho local (Cobranca).
+
+    Returns:
+        Tupla (lista de cobranças, busca completa)
+    """
+    asaas_service = AsaasService()
+    vencimento_de = (hoje - timedelta(days=ETAPAS[-1] + TOLERANCIA_DIAS)).isoformat()
+    vencimento_ate = (hoje - timedelta(days=ETAPAS[0])).isoformat()
+
+    cobrancas = []
+    completa = True
+    for status in ('PENDING', 'OVERDUE'):
+        encontradas, status_completa = buscar_paginas(
+            lambda offset: asaas_service.list_payments_by_due_date(vencimento_de, vencimento_ate, status, POR_PAGINA, offset),
+            prazo, concorrencia, POR_PAGINA,
+        )
+        if not status_completa:
+            logger.error(f'Régua de cobrança: busca de cobranças {status} incompleta')
+            completa = False
+        cobrancas.extend(encontradas)
+
+    salvar_cobrancas(cobrancas)
+    return cobrancas, completa
+
+
+def _recorrencias_por_asaas_id(asaas_ids):
+    recorrencias = {}
+    asaas_ids = list(asaas_ids)
+    for i in range(0, len(asaas_ids), TAMANHO_LOTE):
+        recorrencias.update({
+            r.asaas_id: r for r in Recorrencia.objects.filter(
+                asaas_id__in=asaas_ids[i:i + TAMANHO_LOTE], status='ACTIVE'
+            ).select_related('cliente')
+        })
+    return recorrencias
+
+
+def executar_regua(hoje=None, tempo_maximo=None, simular=False):
+    """
+    Executa a régua de cobrança
+
+    Args:
+        hoje: Data de referência (padrão: hoje)
+        tempo_maximo: Segundos disponíveis para a execução (padrão: WHATSAPP_REGUA_TEMPO_MAXIMO)
+        simular: Apenas calcula o que seria enviado, sem enfileirar
+
+    Returns:
+        Dict com as contagens da execução (por etapa e motivos de descarte)
+    """
+    inicio = time.monotonic()
+    prazo = inicio + (tempo_maximo or TEMPO_MAXIMO)
+    hoje = hoje or date.today()
+    resumo = {
+        'cobrancas': 0, 'enfileiradas': 0, 'ja_enviadas': 0, 'fora_da_etapa': 0,
+        'sem_recorrencia': 0, 'sem_telefone': 0, 'por_etapa': {}, 'interrompida': False,
+    }
+
+    cobrancas, completa = buscar_cobrancas_em_aberto(hoje, prazo)
+    resumo['cobrancas'] = len(cobrancas)
+    resumo['interrompida'] = not completa
+
+    # Etapa de cada cobrança de assinatura
+    candidatas = []
+    for cobranca in cobrancas:
+        if not cobranca.get('subscription'):
+            resumo['sem_recorrencia'] += 1
+            continue
+        dias = (hoje - date.fromisoformat(cobranca['dueDate'])).days
+        etapa = etapa_atual(dias)
+        if etapa is None or dias - etapa > TOLERANCIA_DIAS:
+            resumo['fora_da_etapa'] += 1
+            continue
+        candidatas.append((cobranca, dias, etapa))
+
+    recorrencias = _recorrencias_por_asaas_id({c['subscription'] for c, _, _ in candidatas})
+    itens = []
+    for cobranca, dias, etapa in candidatas:
+        r = recorrencias.get(cobranca['subscription'])
+        if r is None:
+            resumo['sem_recorrencia'] += 1
+        elif not r.cliente.telefone_e164:
+            resumo['sem_telefone'] += 1
+        else:
+            chave = chave_deduplicacao(r.cliente.telefone_e164, 'regua_cobranca', f"{cobranca['id']}:{etapa}")
+            itens.append((r, cobranca, dias, etapa, chave))
+
+    # Etapas já enviadas (em qualquer execução dentro do ciclo da régua)
+    ciclo = timedelta(days=ETAPAS[-1] - ETAPAS[0] + TOLERANCIA_DIAS + 1)
+    enviadas = chaves_recentes([item[4] for item in itens], desde=timezone.now() - ciclo)
+    resumo['ja_enviadas'] = sum(1 for item in itens if item[4] in enviadas)
+
+    por_modelo = {}
+    for item in itens:
+        if item[4] not in enviadas:
+            por_modelo.setdefault(modelo_da_etapa(item[3]), []).append(item)
+
+    # Renderiza em lotes (modelo compilado uma vez) até o fim do prazo
+    mensagens = []
+    for codigo, grupo in por_modelo.items():
+        for i in range(0, len(grupo), TAMANHO_LOTE):
+            if time.monotonic() > prazo:
+                resumo['interrompida'] = True
+                break
+            lote = grupo[i:i + TAMANHO_LOTE]
+            for _, _, _, etapa, _ in lote:
+                nome = f'D{etapa:+d}' if etapa else 'D0'
+                resumo['por_etapa'][nome] = resumo['por_etapa'].get(nome, 0) + 1
+            textos = renderizar_lote(codigo, [contexto_cobranca(r, c, dias) for r, c, dias, _, _ in lote])
+            mensagens.extend(
+                MensagemWhatsApp(
+                    telefone=r.cliente.telefone_e164,
+                    mensagem=texto,
+                    origem='regua_cobranca',
+                    modelo=codigo,
+                    recorrencia=r,
+                    chave_deduplicacao=chave,
+                )
+                for (r, _, _, _, chave), texto in zip(lote, textos)
+            )
+
+    resumo['enfileiradas'] = len(mensagens) if simular else enfileirar_lote(mensagens, MENSAGENS_POR_MINUTO)
+    resumo['tempo'] = round(time.monotonic() - inicio, 2)
+
+    logger.info(f'Régua de cobrança{" (simulação)" if simular else ""}: {resumo}')
+    return resumo
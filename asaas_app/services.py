@@ -4,6 +4,7 @@ Serviço de integração com a API do Asaas
 import requests
 from django.conf import settings
 from typing import Dict, Optional
+from .idempotencia_service import criar_idempotente
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,22 +50,31 @@ class AsaasService:
                     error_message = error_data.get('errors', [{}])[0].get('description', str(e))
                 except:
                     error_message = e.response.text or str(e)
+            else:
+                # Sem resposta (timeout, conexão): não dá para saber se a operação foi feita
+                return {'success': False, 'error': error_message, 'sem_resposta': True}
             
             return {'success': False, 'error': error_message}
     
+    def _create(self, endpoint: str, data: Dict, chave_idempotencia: str) -> Dict:
+        """POST de criação protegido pelo registro de idempotência (retentativas não duplicam o objeto)"""
+        return criar_idempotente(endpoint, lambda: self._make_request('POST', endpoint, data), chave_idempotencia)
+    
     # ==================== CLIENTES ====================
     
-    def create_customer(self, customer_data: Dict) -> Dict:
+    def create_customer(self, customer_data: Dict, chave_idempotencia: str) -> Dict:
         """
         Cria um novo cliente no Asaas
         
         Args:
             customer_data: Dicionário com os dados do cliente
+            chave_idempotencia: Identifica o objeto (registro local ou token do formulário);
+                repetir a chave devolve o objeto já criado, com 'reaproveitada': True
         
         Returns:
             Dict com o resultado da operação
         """
-        return self._make_request('POST', 'customers', customer_data)
+        return self._create('customers', customer_data, chave_idempotencia)
     
     def get_customer(self, customer_id: str) -> Dict:
         """Busca um cliente pelo ID"""
@@ -94,17 +104,19 @@ class AsaasService:
     
     # ==================== ASSINATURAS (RECORRÊNCIAS) ====================
     
-    def create_subscription(self, subscription_data: Dict) -> Dict:
+    def create_subscription(self, subscription_data: Dict, chave_idempotencia: str) -> Dict:
         """
         Cria uma nova assinatura (recorrência) no Asaas
         
         Args:
             subscription_data: Dicionário com os dados da assinatura
+            chave_idempotencia: Identifica o objeto (registro local ou token do formulário);
+                repetir a chave devolve o objeto já criado, com 'reaproveitada': True
         
         Returns:
             Dict com o resultado da operação
         """
-        return self._make_request('POST', 'subscriptions', subscription_data)
+        return self._create('subscriptions', subscription_data, chave_idempotencia)
     
     def get_subscription(self, subscription_id: str) -> Dict:
         """Busca uma assinatura pelo ID"""
@@ -162,6 +174,26 @@ class AsaasService:
             params['status'] = status
         return self._make_request('GET', 'payments', params=params)
     
+    def list_payments_by_due_date(self, due_date_from: str, due_date_to: str, status: Optional[str] = None,
+                                  limit: int = 100, offset: int = 0) -> Dict:
+        """
+        Lista as cobranças com vencimento no período
+        
+        Args:
+            due_date_from: Vencimento inicial (formato YYYY-MM-DD)
+            due_date_to: Vencimento final (formato YYYY-MM-DD)
+            status: Status da cobrança (PENDING, OVERDUE, etc)
+            limit: Número máximo de registros por página
+            offset: Número de registros a pular
+        
+        Returns:
+            Dict com a lista de cobranças
+        """
+        params = {'dueDate[ge]': due_date_from, 'dueDate[le]': due_date_to, 'limit': limit, 'offset': offset}
+        if status:
+            params['status'] = status
+        return self._make_request('GET', 'payments', params=params)
+    
     def get_financial_transactions(self, limit: int = 100, offset: int = 0,
                                    date_from: Optional[str] = None, 
                                    date_to: Optional[str] = None) -> Dict:
@@ -200,7 +232,7 @@ class AsaasService:
     
     # ==================== PAYMENT LINKS (LINKS DE PAGAMENTO) ====================
     
-    def create_payment_link(self, payment_link_data: Dict) -> Dict:
+    def create_payment_link(self, payment_link_data: Dict, chave_idempotencia: str) -> Dict:
         """
         Cria um novo link de pagamento no Asaas
         
@@ -214,11 +246,13 @@ class AsaasService:
                     'chargeType': 'DETACHED',
                     'dueDateLimitDays': 10
                 }
+            chave_idempotencia: Identifica o objeto (registro local ou token do formulário);
+                repetir a chave devolve o objeto já criado, com 'reaproveitada': True
         
         Returns:
             Dict com o resultado da operação
         """
-        return self._make_request('POST', 'paymentLinks', payment_link_data)
+        return self._create('paymentLinks', payment_link_data, chave_idempotencia)
     
     def get_payment_link(self, payment_link_id: str) -> Dict:
         """Busca um link de pagamento pelo ID"""
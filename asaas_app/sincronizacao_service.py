@@ -0,0 +1,266 @@
+"""
+Sincronização de clientes e recorrências com o Asaas
+
+Os registros alterados localmente (ver SincronizavelAsaas) são enviados
+em lote: o lote grava um item por registro, os envios saem em paralelo
+respeitando o limite de chamadas ao Asaas (balde compartilhado entre
+processos) e o resultado de cada item fica registrado. Um lote
+interrompido (tempo máximo, deploy, erro) é retomado na próxima execução
+a partir dos itens ainda pendentes. Clientes são enviados antes das
+recorrências, que dependem do asaas_id do cliente.
+
+Execuções simultâneas (tela e cron) dividem o mesmo lote: só o lote mais
+antigo em execução sobrevive, e cada item é reservado (ENVIANDO) com UPDATE
+condicional antes do envio, então nenhum registro é enviado duas vezes.
+Itens presos em ENVIANDO (execução interrompida) voltam a pendentes depois
+de TEMPO_MAXIMO_ENVIANDO.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Cliente, Recorrencia, SincronizacaoLote, SincronizacaoItem
+from .services import AsaasService
+from .limite_service import aguardar_chamada_asaas
+from .outbox_service import TAMANHO_LOTE, TEMPO_MAXIMO_ENVIANDO
+from .campanha_service import CONCORRENCIA_ASAAS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tempo máximo de uma execução, em segundos (o restante fica para a próxima)
+TEMPO_MAXIMO = 300
+
+
+def dados_cliente(cliente):
+    """Cliente no formato da API do Asaas"""
+    return {
+        'name': cliente.name,
+        'cpfCnpj': cliente.cpfCnpj,
+        'email': cliente.email,
+        'phone': cliente.phone or '',
+        'mobilePhone': cliente.mobilePhone or '',
+        'address': cliente.address or '',
+        'addressNumber': cliente.addressNumber or '',
+        'complement': cliente.complement or '',
+        'province': cliente.province or '',
+        'postalCode': cliente.postalCode or '',
+        'observations': cliente.observations or '',
+    }
+
+
+def dados_recorrencia(recorrencia):
+    """Recorrência no formato da API do Asaas (assinatura)"""
+    dados = {
+        'customer': recorrencia.cliente.asaas_id,
+        'billingType': recorrencia.billing_type,
+        'value': float(recorrencia.value),
+        'nextDueDate': recorrencia.next_due_date.strftime('%Y-%m-%d'),
+        'cycle': recorrencia.cycle,
+        'description': recorrencia.description,
+    }
+    if recorrencia.end_date:
+        dados['endDate'] = recorrencia.end_date.strftime('%Y-%m-%d')
+    if recorrencia.max_payments:
+        dados['maxPayments'] = recorrencia.max_payments
+    return dados
+
+
+def _enviar(asaas_service, objeto):
+    """
+    Cria ou atualiza o registro no Asaas (pode rodar em outra thread)
+
+    A criação usa o registro como chave de idempotência: um lote retomado
+    depois de um envio sem resposta não cria o mesmo objeto duas vezes.
+    """
+    if isinstance(objeto, Cliente):
+        dados = dados_cliente(objeto)
+        if objeto.asaas_id:
+            return asaas_service.update_customer(objeto.asaas_id, dados)
+        return asaas_service.create_customer(dados, chave_idempotencia=f'cliente:{objeto.pk}')
+
+    if not objeto.cliente.asaas_id:
+        return {'success': False, 'error': 'O cliente precisa estar sincronizado com o Asaas primeiro.'}
+    dados = dados_recorrencia(objeto)
+    if objeto.asaas_id:
+        return asaas_service.update_subscription(objeto.asaas_id, dados)
+    return asaas_service.create_subscription(dados, chave_idempotencia=f'recorrencia:{objeto.pk}')
+
+
+def _enviar_em_thread(asaas_service, objeto):
+    """_enviar dentro do pool: a thread abre sua própria conexão (registro de idempotência), fechada ao terminar"""
+    try:
+        return _enviar(asaas_service, objeto)
+    except Exception as e:
+        logger.error(f'Erro inesperado ao sincronizar {objeto._meta.model_name} {objeto.pk}: {str(e)}')
+        return {'success': False, 'error': str(e)}
+    finally:
+        connection.close()
+
+
+def _registrar(objeto, result, momento):
+    """Grava o resultado do envio no registro (asaas_id e marca de sincronização)"""
+    if result.get('success'):
+        campos = {} if objeto.asaas_id else {'asaas_id': result['data']['id']}
+        objeto.marcar_sincronizado(momento, **campos)
+    return result
+
+
+def sincronizar_objeto(objeto):
+    """
+    Envia um cliente ou recorrência ao Asaas (criando se ainda não existir lá)
+
+    Returns:
+        Resultado do AsaasService
+    """
+    momento = timezone.now()
+    return _registrar(objeto, _enviar(AsaasService(), objeto), momento)
+
+
+def preparar_lote():
+    """
+    Cria um lote com os clientes e recorrências pendentes de sincronização
+
+    Se outra execução criou um lote ao mesmo tempo, fica só o mais antigo:
+    o criado aqui é descartado e o outro é devolvido.
+
+    Returns:
+        O lote a processar, ou None se não há nada pendente
+    """
+    clientes = Cliente.pendentes_sincronizacao().only('pk', 'name')
+    recorrencias = Recorrencia.pendentes_sincronizacao().only('pk', 'description')
+    itens = [SincronizacaoItem(tipo='CLIENTE', objeto_id=c.pk, descricao=c.name[:255]) for c in clientes]
+    itens += [SincronizacaoItem(tipo='RECORRENCIA', objeto_id=r.pk, descricao=r.description[:255]) for r in recorrencias]
+    if not itens:
+        return None
+
+    with transaction.atomic():
+        lote = SincronizacaoLote.objects.create(total=len(itens))
+        for item in itens:
+            item.lote = lote
+        SincronizacaoItem.objects.bulk_create(itens, batch_size=TAMANHO_LOTE)
+
+    primeiro = lote_em_andamento()
+    if primeiro.pk != lote.pk:
+        lote.delete()
+    return primeiro
+
+
+def reservar_itens(lote, tipo, limite):
+    """
+    Reserva até `limite` itens pendentes do lote, marcando-os como ENVIANDO
+
+    A reserva é feita com UPDATE condicional por item, então execuções
+    simultâneas do mesmo lote não enviam o mesmo registro duas vezes.
+    """
+    agora = timezone.now()
+    candidatos = lote.itens.filter(tipo=tipo, status='PENDENTE').values_list('pk', flat=True)[:limite]
+    reservados = [
+        pk for pk in candidatos
+        if SincronizacaoItem.objects.filter(pk=pk, status='PENDENTE').update(status='ENVIANDO', reservado_em=agora)
+    ]
+    return list(SincronizacaoItem.objects.filter(pk__in=reservados))
+
+
+def processar_lote(lote, tempo_maximo=None, concorrencia=None):
+    """
+    Envia ao Asaas os itens pendentes do lote
+
+    Os itens são processados em grupos do tamanho da concorrência: os itens
+    e os tokens de limite são reservados, as chamadas saem em paralelo e os
+    resultados são gravados antes do próximo grupo. Itens que não couberem
+    no tempo máximo voltam a pendentes.
+
+    Returns:
+        O lote com os totais atualizados
+    """
+    prazo = time.monotonic() + (tempo_maximo or TEMPO_MAXIMO)
+    concorrencia = concorrencia or CONCORRENCIA_ASAAS
+    asaas_service = AsaasService()
+    modelos = {
+        'CLIENTE': Cliente.objects.all(),
+        'RECORRENCIA': Recorrencia.objects.select_related('cliente'),
+    }
+
+    lote.itens.filter(status='ENVIANDO', reservado_em__lt=timezone.now() - TEMPO_MAXIMO_ENVIANDO).update(status='PENDENTE')
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for tipo, queryset in modelos.items():
+            while time.monotonic() < prazo:
+                if not lote.itens.filter(tipo=tipo, status='PENDENTE').exists():
+                    break
+                itens = reservar_itens(lote, tipo, concorrencia)
+                if not itens:
+                    continue  # reservados por outra execução
+                objetos = queryset.in_bulk([i.objeto_id for i in itens])
+
+                enviar = []
+                for item in itens:
+                    objeto = objetos.get(item.objeto_id)
+                    if objeto is None:
+                        item.status, item.erro = 'ERRO', 'Registro removido'
+                    elif not objeto.pendente_sincronizacao:
+                        item.status = 'IGNORADO'
+                    elif aguardar_chamada_asaas(prazo):
+                        enviar.append((item, objeto))
+                    else:
+                        break
+
+                momento = timezone.now()
+                resultados = executor.map(lambda par: _enviar_em_thread(asaas_service, par[1]), enviar)
+                for (item, objeto), result in zip(enviar, resultados):
+                    _registrar(objeto, result, momento)
+                    if result.get('success'):
+                        item.status, item.erro = 'OK', ''
+                    else:
+                        item.status, item.erro = 'ERRO', str(result.get('error', ''))[:1000]
+
+                devolvidos = [i for i in itens if i.status == 'ENVIANDO']
+                for item in itens:
+                    if item.status == 'ENVIANDO':
+                        item.status = 'PENDENTE'
+                    else:
+                        item.processado_em = timezone.now()
+                SincronizacaoItem.objects.bulk_update(itens, ['status', 'erro', 'processado_em'])
+                if devolvidos:
+                    break  # prazo acabou esperando o limite
+
+    itens = lote.itens.all()
+    lote.total_sincronizados = itens.filter(status__in=['OK', 'IGNORADO']).count()
+    lote.total_erros = itens.filter(status='ERRO').count()
+    if not lote.pendentes:
+        lote.status = 'CONCLUIDA'
+        lote.concluida_em = timezone.now()
+    lote.save()
+
+    logger.info(
+        f'Sincronização {lote.pk}: {lote.total_sincronizados} sincronizado(s), '
+        f'{lote.total_erros} erro(s), {lote.pendentes} pendente(s)'
+    )
+    return lote
+
+
+def lote_em_andamento():
+    """Lote interrompido que ainda tem itens pendentes (o mais antigo, se houver mais de um)"""
+    return SincronizacaoLote.objects.filter(status='EXECUTANDO').order_by('created_at', 'pk').first()
+
+
+def sincronizar_alteracoes(tempo_maximo=None, concorrencia=None):
+    """
+    Retoma o lote em andamento ou cria um novo com os registros pendentes e o processa
+
+    Returns:
+        O lote processado, ou None se não há nada a sincronizar
+    """
+    lote = lote_em_andamento() or preparar_lote()
+    if lote is None:
+        return None
+    return processar_lote(lote, tempo_maximo, concorrencia)
+
+
+def pendencias():
+    """Quantidade de clientes e recorrências com alterações ainda não enviadas ao Asaas"""
+    return {
+        'clientes': Cliente.pendentes_sincronizacao().count(),
+        'recorrencias': Recorrencia.pendentes_sincronizacao().count(),
+    }
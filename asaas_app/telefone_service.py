@@ -0,0 +1,96 @@
+"""
+Normalização de telefones brasileiros para o formato E.164 (+55DDNNNNNNNNN)
+
+O número normalizado é gravado no Cliente e no Parceiro ao salvar (e pelo
+comando normalizar_telefones), então envios, campanhas e mensagens recebidas
+usam a coluna indexada em vez de limpar o número a cada uso.
+"""
+import re
+
+
+def normalizar_telefone(numero):
+    """
+    Converte um telefone brasileiro para E.164
+
+    Aceita máscaras, DDD com zero de tronco (0XX) e números com ou sem o
+    código do país. Celulares (9 dígitos) precisam começar com 9.
+
+    Returns:
+        '+55DDNNNNNNNN(N)' ou '' quando o número não é válido
+    """
+    digitos = re.sub(r'\D', '', numero or '').lstrip('0')
+    if len(digitos) in (10, 11):
+        digitos = '55' + digitos
+    if len(digitos) not in (12, 13) or not digitos.startswith('55'):
+        return ''
+
+    ddd, assinante = digitos[2:4], digitos[4:]
+    if ddd[0] == '0' or (len(assinante) == 9 and assinante[0] != '9'):
+        return ''
+    return f'+{digitos}'
+
+
+def primeiro_telefone_valido(*numeros):
+    """E.164 do primeiro número válido (ex: celular antes do fixo)"""
+    for numero in numeros:
+        normalizado = normalizar_telefone(numero)
+        if normalizado:
+            return normalizado
+    return ''
+
+
+def _modelos():
+    # Import tardio: models.py usa as funções de normalização acima
+    from .models import Cliente, Parceiro
+    return [
+        (Cliente, ['mobilePhone', 'phone'], lambda c: primeiro_telefone_valido(c.mobilePhone, c.phone)),
+        (Parceiro, ['telefone'], lambda p: normalizar_telefone(p.telefone)),
+    ]
+
+
+def normalizar_telefones(tamanho_lote=1000):
+    """
+    Recalcula telefone_e164 de clientes e parceiros (backfill), gravando só o que mudou
+
+    Returns:
+        Dict {nome do modelo: registros atualizados}
+    """
+    atualizados = {}
+    for modelo, campos, normalizar in _modelos():
+        alterados = []
+        total = 0
+        for obj in modelo.objects.only('pk', 'telefone_e164', *campos).iterator(chunk_size=tamanho_lote):
+            novo = normalizar(obj)
+            if novo != obj.telefone_e164:
+                obj.telefone_e164 = novo
+                alterados.append(obj)
+            if len(alterados) >= tamanho_lote:
+                modelo.objects.bulk_update(alterados, ['telefone_e164'])
+                total += len(alterados)
+                alterados = []
+        modelo.objects.bulk_update(alterados, ['telefone_e164'])
+        atualizados[modelo._meta.verbose_name_plural] = total + len(alterados)
+    return atualizados
+
+
+def relatorio_telefones():
+    """
+    Situação dos telefones cadastrados, calculada no banco pela coluna normalizada
+
+    Returns:
+        Dict {nome do modelo: {'validos', 'invalidos', 'sem_telefone', 'invalidos_lista'}}
+    """
+    from django.db.models import Q
+    relatorio = {}
+    for modelo, campos, _ in _modelos():
+        tem_telefone = Q()
+        for campo in campos:
+            tem_telefone |= Q(**{f'{campo}__gt': ''})
+        invalidos = modelo.objects.filter(tem_telefone, telefone_e164='')
+        relatorio[modelo._meta.verbose_name_plural] = {
+            'validos': modelo.objects.exclude(telefone_e164='').count(),
+            'invalidos': invalidos.count(),
+            'sem_telefone': modelo.objects.exclude(tem_telefone).count(),
+            'invalidos_lista': list(invalidos.values('pk', *campos)),
+        }
+    return relatorio
@@ -0,0 +1,23 @@
+"""Dados compartilhados pelos testes"""
+from decimal import Decimal
+from datetime import date
+from ..models import Cliente
+
+
+class ParceiroIndicadoMixin:
+    """Indicador com um cliente indicado e um pagamento em 03/2025"""
+    
+    def setUp(self):
+        from ..models import Parceiro, Movimentacao
+        self.indicador = Parceiro.objects.create(
+            nome='Carlos Indicador', cpfCnpj='10120230344', email='carlos@example.com',
+            tipo='INDICADOR', percentual_comissao=Decimal('10.00')
+        )
+        self.cliente = Cliente.objects.create(
+            name='Lucia Lima', cpfCnpj='40450560677', email='lucia@example.com',
+            parceiro_indicador=self.indicador
+        )
+        Movimentacao.objects.create(
+            data=date(2025, 3, 10), descricao='Pagamento', tipo='PAYMENT',
+            valor=Decimal('200.00'), cliente=self.cliente
+        )
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from decimal import Decimal
+from .base import ParceiroIndicadoMixin
+
+
+class ArquivoFechamentoTest(ParceiroIndicadoMixin, TestCase):
+    """Testes para o arquivamento dos fechamentos pagos"""
+    
+    def test_arquivamento_fechamento(self):
+        """Testa o arquivamento de um fechamento FECHADO e a leitura transparente"""
+        from ..views import _calcular_fechamento
+        from ..models import ComissaoIndicador
+        from ..comissao_service import liquidar_comissoes, reconstruir_saldos, iterar_extrato
+        from ..arquivo_service import arquivar_fechamento, comissoes_indicador_fechamento
+        
+        fechamento = _calcular_fechamento(3, 2025)
+        liquidar_comissoes(fechamento)
+        fechamento.status = 'FECHADO'
+        fechamento.save()
+        
+        arquivo = arquivar_fechamento(fechamento)
+        self.assertEqual(arquivo.quantidade_comissoes, 1)
+        self.assertFalse(ComissaoIndicador.objects.filter(fechamento=fechamento).exists())
+        
+        comissoes, total = comissoes_indicador_fechamento(fechamento)
+        self.assertEqual(total, Decimal('20.00'))
+        self.assertEqual(comissoes[0].cliente.name, 'Lucia Lima')
+        
+        # O extrato CSV junta as comissões arquivadas às vivas (por parceiro e de todos)
+        for parceiro in (self.indicador, None):
+            linhas = [l for l in iterar_extrato(parceiro) if l[0] == 'INDICADOR']
+            self.assertEqual(len(linhas), 1)
+            self.assertEqual(linhas[0][1:3], [self.indicador.nome, self.indicador.cpfCnpj])
+            self.assertEqual(linhas[0][5], 'Lucia Lima')
+        
+        reconstruir_saldos()
+        self.indicador.saldo.refresh_from_db()
+        self.assertEqual(self.indicador.saldo.total_pago, Decimal('20.00'))
@@ -0,0 +1,81 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date, timedelta
+
+
+class CampanhaCobrancaTest(TestCase):
+    """Testes para as campanhas de cobrança em lote"""
+    
+    def setUp(self):
+        hoje = date.today()
+        self.cliente = Cliente.objects.create(
+            name='Paula Souza', cpfCnpj='70780890011', email='paula@example.com', mobilePhone='81988887777'
+        )
+        sem_telefone = Cliente.objects.create(name='Rui Alves', cpfCnpj='80890900122', email='rui@example.com')
+        self.recorrencia = Recorrencia.objects.create(
+            cliente=self.cliente, value=Decimal('79.90'), description='Plano Mensal',
+            next_due_date=hoje + timedelta(days=2), asaas_id='sub_1'
+        )
+        Recorrencia.objects.create(
+            cliente=sem_telefone, value=Decimal('50.00'), description='Plano Básico',
+            next_due_date=hoje + timedelta(days=3), asaas_id='sub_2'
+        )
+        # Fora da janela de vencimento
+        Recorrencia.objects.create(
+            cliente=self.cliente, value=Decimal('99.00'), description='Plano Extra',
+            next_due_date=hoje + timedelta(days=30), asaas_id='sub_3'
+        )
+    
+    def test_campanha_boletos(self):
+        """Testa a seleção, o enfileiramento espaçado e os motivos de ignoradas"""
+        from unittest.mock import patch
+        from ..models import CampanhaCobranca
+        from ..campanha_service import executar_campanha, relatorio_campanha
+        
+        campanha = CampanhaCobranca.objects.create(nome='Semana', filtro='VENCENDO', dias=5, tipo_mensagem='BOLETO')
+        cobrancas = {'sub_1': {'value': 79.9, 'dueDate': '2025-03-10', 'status': 'PENDING', 'bankSlipUrl': 'https://asaas/b/1'}}
+        with patch('asaas_app.campanha_service.buscar_ultimas_cobrancas', return_value=cobrancas) as buscar:
+            executar_campanha(campanha)
+        
+        buscar.assert_called_once_with(['sub_1'])
+        self.assertEqual(campanha.total_selecionadas, 2)
+        self.assertEqual(campanha.total_enfileiradas, 1)
+        self.assertEqual(campanha.ignoradas[0]['motivo'], 'Cliente sem telefone válido')
+        
+        mensagem = campanha.mensagens.get()
+        self.assertIn('https://asaas/b/1', mensagem.mensagem)
+        self.assertEqual(mensagem.recorrencia, self.recorrencia)
+        self.assertEqual(relatorio_campanha(campanha)['pendentes'], 1)
+    
+    def test_ultimas_cobrancas_do_espelho(self):
+        """Testa se a última cobrança vem do espelho local e só as assinaturas fora dele vão ao Asaas"""
+        from unittest.mock import patch
+        from django.utils import timezone
+        from ..models import Cobranca
+        from ..campanha_service import buscar_ultimas_cobrancas
+        
+        for asaas_id, assinatura, vencimento, status in [
+            ('pay_1', 'sub_1', date(2025, 3, 10), 'RECEIVED'),
+            ('pay_2', 'sub_1', date(2025, 4, 10), 'PENDING'),
+            ('pay_3', 'sub_1', date(2025, 5, 10), 'DELETED'),
+            ('pay_4', 'sub_2', date(2025, 4, 10), 'DELETED'),
+        ]:
+            Cobranca.objects.create(
+                asaas_id=asaas_id, assinatura_asaas_id=assinatura, valor=Decimal('79.90'), vencimento=vencimento,
+                status=status, url_boleto=f'https://asaas/b/{asaas_id}', sincronizada_em=timezone.now(),
+            )
+        
+        consultadas = []
+        
+        def listar(self, subscription_id, limit, offset=0):
+            consultadas.append(subscription_id)
+            return {'success': True, 'data': {'data': [{'id': 'pay_9', 'bankSlipUrl': 'https://asaas/b/pay_9'}]}}
+        
+        with patch('asaas_app.services.AsaasService.list_subscription_payments', listar):
+            cobrancas = buscar_ultimas_cobrancas(['sub_1', 'sub_2', 'sub_3'])
+        
+        self.assertEqual(consultadas, ['sub_3'])
+        self.assertEqual(cobrancas['sub_1']['id'], 'pay_2')
+        self.assertIsNone(cobrancas['sub_2'])
+        self.assertEqual(cobrancas['sub_3']['id'], 'pay_9')
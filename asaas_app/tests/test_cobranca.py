@@ -0,0 +1,78 @@
+from django.test import TestCase
+from django.urls import reverse
+from ..models import Cliente, Cobranca, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class CobrancaEspelhoTest(TestCase):
+    """Testes para o espelho local das cobranças do Asaas"""
+    
+    def test_sincronizacao_e_webhook(self):
+        """Testa a busca única no Asaas, o upsert das cobranças e a atualização pelo webhook"""
+        import json
+        from unittest.mock import patch
+        from django.test import override_settings
+        from ..cobranca_service import cobrancas_da_recorrencia
+        
+        cliente = Cliente.objects.create(name='Rita Lima', cpfCnpj='52998224725', email='rita@example.com')
+        recorrencia = Recorrencia.objects.create(
+            cliente=cliente, value=Decimal('50.00'), description='Plano', next_due_date=date(2025, 4, 5), asaas_id='sub_1'
+        )
+        payments = [
+            {'id': f'pay_{i}', 'subscription': 'sub_1', 'value': 50, 'dueDate': f'2025-0{i}-05',
+             'status': 'RECEIVED' if i < 3 else 'PENDING', 'bankSlipUrl': f'https://asaas/b/{i}'}
+            for i in range(1, 5)
+        ]
+        chamadas = []
+        
+        def listar(self, subscription_id, limit, offset):
+            chamadas.append(offset)
+            return {'success': True, 'data': {'data': payments[offset:offset + limit], 'totalCount': len(payments)}}
+        
+        with patch('asaas_app.services.AsaasService.list_subscription_payments', listar), \
+                patch('asaas_app.cobranca_service.POR_PAGINA', 3):
+            self.assertEqual(cobrancas_da_recorrencia(recorrencia).count(), 4)
+            # Segunda leitura vem só do banco
+            ultima = cobrancas_da_recorrencia(recorrencia).order_by('-vencimento').first()
+        self.assertEqual(sorted(chamadas), [0, 3])
+        self.assertEqual(ultima.asaas_id, 'pay_4')
+        self.assertEqual(ultima.como_payment()['bankSlipUrl'], 'https://asaas/b/4')
+        
+        url = reverse('asaas_webhook')
+        evento = {'event': 'PAYMENT_RECEIVED', 'payment': {**payments[3], 'status': 'RECEIVED', 'paymentDate': '2025-04-04'}}
+        with override_settings(ASAAS_WEBHOOK_TOKEN='segredo'):
+            self.assertEqual(self.client.post(url, json.dumps(evento), content_type='application/json').status_code, 403)
+            response = self.client.post(
+                url, json.dumps(evento), content_type='application/json', HTTP_ASAAS_ACCESS_TOKEN='segredo'
+            )
+            self.assertTrue(response.json()['atualizada'])
+            removida = {'event': 'PAYMENT_DELETED', 'payment': payments[0]}
+            self.client.post(url, json.dumps(removida), content_type='application/json', HTTP_ASAAS_ACCESS_TOKEN='segredo')
+        
+        ultima.refresh_from_db()
+        self.assertTrue(ultima.paga)
+        self.assertEqual(ultima.data_pagamento, date(2025, 4, 4))
+        self.assertEqual(recorrencia.cobrancas.count(), 4)
+        self.assertEqual(cobrancas_da_recorrencia(recorrencia).count(), 3)
+    
+    def test_webhook_fora_de_ordem(self):
+        """Testa se um evento atrasado não desfaz o pagamento e se corpo que não é objeto JSON dá 400"""
+        import json
+        from django.test import override_settings
+        
+        url = reverse('asaas_webhook')
+        payment = {'id': 'pay_9', 'value': 80, 'dueDate': '2025-05-05'}
+        recebida = {'event': 'PAYMENT_RECEIVED', 'dateCreated': '2025-05-04 10:00:00',
+                    'payment': {**payment, 'status': 'RECEIVED', 'paymentDate': '2025-05-04'}}
+        criada = {'event': 'PAYMENT_CREATED', 'dateCreated': '2025-04-20 08:00:00',
+                  'payment': {**payment, 'status': 'PENDING'}}
+        with override_settings(ASAAS_WEBHOOK_TOKEN='segredo'):
+            enviar = lambda corpo: self.client.post(
+                url, json.dumps(corpo), content_type='application/json', HTTP_ASAAS_ACCESS_TOKEN='segredo'
+            )
+            self.assertTrue(enviar(recebida).json()['atualizada'])
+            self.assertFalse(enviar(criada).json()['atualizada'])
+            self.assertEqual(enviar([recebida]).status_code, 400)
+        
+        self.assertEqual(Cobranca.objects.get(asaas_id='pay_9').status, 'RECEIVED')
@@ -0,0 +1,60 @@
+from django.test import TestCase
+from django.urls import reverse
+from decimal import Decimal
+from .base import ParceiroIndicadoMixin
+
+
+class SaldoParceiroTest(ParceiroIndicadoMixin, TestCase):
+    """Testes para o saldo consolidado de comissões dos parceiros"""
+    
+    def test_saldo_acompanha_fechamento_e_pagamento(self):
+        """Testa se o saldo é lançado no fechamento e liquidado no pagamento"""
+        from ..views import _calcular_fechamento
+        from ..comissao_service import liquidar_comissoes, reconstruir_saldos
+        
+        fechamento = _calcular_fechamento(3, 2025)
+        self.indicador.saldo.refresh_from_db()
+        self.assertEqual(self.indicador.saldo.total_acumulado, Decimal('20.00'))
+        self.assertEqual(self.indicador.saldo.total_pendente, Decimal('20.00'))
+        self.assertEqual(self.indicador.saldo.ultimo_fechamento, fechamento)
+        
+        liquidar_comissoes(fechamento)
+        self.indicador.saldo.refresh_from_db()
+        self.assertEqual(self.indicador.saldo.total_pendente, Decimal('0.00'))
+        self.assertEqual(self.indicador.saldo.total_pago, Decimal('20.00'))
+        
+        reconstruir_saldos()
+        self.indicador.saldo.refresh_from_db()
+        self.assertEqual(self.indicador.saldo.total_pago, Decimal('20.00'))
+        self.assertEqual(self.indicador.saldo.total_acumulado, Decimal('20.00'))
+
+    def test_ultimo_fechamento_so_avanca(self):
+        """Testa se recalcular um mês anterior não faz o último fechamento voltar"""
+        from datetime import date
+        from django.contrib.auth.models import User
+        from ..models import Movimentacao
+        from ..views import _calcular_fechamento
+        
+        Movimentacao.objects.create(
+            data=date(2025, 4, 10), descricao='Pagamento', tipo='PAYMENT', valor=Decimal('100.00'), cliente=self.cliente
+        )
+        marco = _calcular_fechamento(3, 2025)
+        abril = _calcular_fechamento(4, 2025)
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        self.client.post(reverse('fechamento_recalcular', args=[marco.pk]))
+        self.indicador.saldo.refresh_from_db()
+        self.assertEqual(self.indicador.saldo.ultimo_fechamento, abril)
+        self.assertEqual(self.indicador.saldo.total_acumulado, Decimal('30.00'))
+
+    def test_extrato_csv_streaming(self):
+        """Testa a exportação do extrato de comissões em CSV"""
+        from django.contrib.auth.models import User
+        from ..views import _calcular_fechamento
+        
+        _calcular_fechamento(3, 2025)
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        response = self.client.get(reverse('parceiro_extrato', args=[self.indicador.pk]))
+        self.assertEqual(response.status_code, 200)
+        conteudo = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Lucia Lima', conteudo)
+        self.assertIn('20,00', conteudo)
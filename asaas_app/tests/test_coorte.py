@@ -0,0 +1,51 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class CoorteTest(TestCase):
+    """Testes para as coortes de recorrências"""
+    
+    def test_coortes_incrementais(self):
+        """Testa a retenção por mês de entrada e por parceiro e o recálculo só das recorrências alteradas"""
+        from datetime import datetime
+        from django.utils import timezone
+        from ..models import Parceiro, Cobranca, Movimentacao, Coorte
+        from ..coorte_service import atualizar_coortes, tabela_coortes
+        
+        parceiro = Parceiro.objects.create(
+            nome='Indicadora', cpfCnpj='11144477735', email='ind@example.com', tipo='INDICADOR', percentual_comissao=Decimal('10')
+        )
+        ana = Cliente.objects.create(name='Ana', cpfCnpj='52998224725', email='ana@example.com', parceiro_indicador=parceiro)
+        bia = Cliente.objects.create(name='Bia', cpfCnpj='70780890011', email='bia@example.com')
+        r1 = Recorrencia.objects.create(cliente=ana, value=Decimal('100'), description='A', next_due_date=date(2025, 1, 15))
+        r2 = Recorrencia.objects.create(cliente=bia, value=Decimal('50'), description='B', next_due_date=date(2025, 1, 20), status='INACTIVE')
+        Recorrencia.objects.filter(pk__in=[r1.pk, r2.pk]).update(created_at=timezone.make_aware(datetime(2025, 1, 10)))
+        
+        for i, mes in enumerate([1, 2, 3]):
+            Cobranca.objects.create(
+                asaas_id=f'pay_{i}', recorrencia=r1, valor=Decimal('100'), vencimento=date(2025, mes, 15), status='RECEIVED',
+                sincronizada_em=timezone.now()
+            )
+        Cobranca.objects.create(asaas_id='pay_x', recorrencia=r2, valor=Decimal('50'), vencimento=date(2025, 2, 20), status='OVERDUE', sincronizada_em=timezone.now())
+        # Pagamento só no extrato, sem recorrência: vai para a única recorrência da cliente
+        Movimentacao.objects.create(data=date(2025, 1, 21), descricao='Pagamento', tipo='PAYMENT', valor=Decimal('50'), cliente=bia)
+        
+        self.assertTrue(atualizar_coortes().completa)
+        janeiro = Coorte.objects.get(dimensao='MES', mes=date(2025, 1, 1))
+        self.assertEqual((janeiro.recorrencias, janeiro.ativas, janeiro.receita), (2, 1, Decimal('350')))
+        self.assertEqual(
+            list(janeiro.periodos.values_list('periodo', 'pagantes')), [(0, 2), (1, 1), (2, 1)]
+        )
+        linha = tabela_coortes('MES')[0]
+        self.assertEqual(linha['periodos'][1]['percentual'], 50.0)
+        indicadas = Coorte.objects.get(dimensao='PARCEIRO', parceiro=parceiro)
+        self.assertEqual((indicadas.recorrencias, indicadas.receita), (1, Decimal('300')))
+        
+        Cobranca.objects.create(asaas_id='pay_4', recorrencia=r1, valor=Decimal('100'), vencimento=date(2025, 4, 15), status='CONFIRMED', sincronizada_em=timezone.now())
+        atualizacao = atualizar_coortes()
+        self.assertFalse(atualizacao.completa)
+        self.assertEqual(atualizacao.recorrencias_recalculadas, 1)
+        janeiro = Coorte.objects.get(dimensao='MES', mes=date(2025, 1, 1))
+        self.assertEqual(janeiro.periodos.get(periodo=3).pagantes, 1)
@@ -0,0 +1,59 @@
+from django.test import TestCase
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+from .base import ParceiroIndicadoMixin
+
+
+class FechamentoMensalTest(ParceiroIndicadoMixin, TestCase):
+    """Testes para o cálculo e o detalhe do fechamento mensal"""
+    
+    def test_perfil_calculo_salvo(self):
+        """Testa se o perfil de cada etapa do cálculo é salvo no fechamento"""
+        from ..views import _calcular_fechamento
+        from ..models import FechamentoMensal
+        
+        fechamento = _calcular_fechamento(3, 2025)
+        perfil = FechamentoMensal.objects.get(pk=fechamento.pk).perfil_calculo
+        etapas = {e['etapa']: e for e in perfil['etapas']}
+        self.assertIn('comissoes_indicadores', etapas)
+        self.assertGreater(perfil['total_queries'], 0)
+        # A leitura das movimentações (categorias excluídas + agregados) é medida na própria etapa
+        self.assertGreaterEqual(etapas['movimentacoes']['queries'], 3)
+
+    def test_detalhe_fechamento_em_cache(self):
+        """Testa que só o detalhe do fechamento pago (FECHADO) é cacheado"""
+        from django.contrib.auth.models import User
+        from django.core.cache import cache
+        from ..models import Movimentacao
+        from ..views import _calcular_fechamento, _fechamento_cache_key
+        
+        cache.clear()
+        fechamento = _calcular_fechamento(3, 2025)
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        url = reverse('fechamento_mensal_detail', args=[fechamento.pk])
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['qtd_receitas'], 1)
+        self.assertIsNone(cache.get(_fechamento_cache_key(fechamento)))  # PREVIO não é cacheado
+        
+        self.client.post(reverse('fechamento_finalizar', args=[fechamento.pk]))
+        fechamento.refresh_from_db()
+        self.client.get(url)
+        self.assertIsNone(cache.get(_fechamento_cache_key(fechamento)))  # ABERTO ainda muda
+        
+        # Movimentação nova no mês aberto aparece nas contagens, junto com a lista paginada
+        Movimentacao.objects.create(
+            data=date(2025, 3, 20), descricao='Receita extra', tipo='PAYMENT', valor=Decimal('50.00')
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.context['qtd_receitas'], 2)
+        self.assertEqual(response.context['receitas'].paginator.count, 2)
+        
+        self.client.post(reverse('fechamento_marcar_pago', args=[fechamento.pk]))
+        fechamento.refresh_from_db()
+        self.client.get(url)
+        resumo = cache.get(_fechamento_cache_key(fechamento))
+        self.assertEqual(resumo['total_comissoes_indicador'], Decimal('20.00'))
+        self.assertEqual(resumo['qtd_receitas'], 2)
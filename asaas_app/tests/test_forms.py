@@ -0,0 +1,27 @@
+from django.test import TestCase
+
+
+class FormTest(TestCase):
+    """Testes para os formulários"""
+    
+    def test_cliente_form_valid(self):
+        """Testa formulário de cliente válido"""
+        from ..forms import ClienteForm
+        form_data = {
+            'name': 'Ana Costa',
+            'cpfCnpj': '55566677788',
+            'email': 'ana@example.com',
+        }
+        form = ClienteForm(data=form_data)
+        self.assertTrue(form.is_valid())
+    
+    def test_cliente_form_invalid(self):
+        """Testa formulário de cliente inválido"""
+        from ..forms import ClienteForm
+        form_data = {
+            'name': '',  # Nome vazio - inválido
+            'cpfCnpj': '55566677788',
+            'email': 'ana@example.com',
+        }
+        form = ClienteForm(data=form_data)
+        self.assertFalse(form.is_valid())
@@ -0,0 +1,42 @@
+from django.test import TestCase
+from django.urls import reverse
+from ..models import Cliente, Recorrencia
+
+
+class HistoricoRecorrenciaTest(TestCase):
+    """Testes para o histórico de alterações das recorrências"""
+    
+    def test_importacao_registra_so_o_que_mudou(self):
+        """Testa o registro da criação, o pulo das assinaturas inalteradas e o registro só dos campos alterados"""
+        from unittest.mock import patch
+        from django.contrib.auth.models import User
+        from ..models import AlteracaoRecorrencia
+        
+        Cliente.objects.create(name='Ana', cpfCnpj='52998224725', email='ana@example.com', asaas_id='cus_1')
+        assinatura = {
+            'id': 'sub_1', 'customer': 'cus_1', 'value': 109.9, 'cycle': 'MONTHLY', 'billingType': 'PIX',
+            'description': 'Plano', 'nextDueDate': '2025-05-10', 'status': 'ACTIVE',
+        }
+        
+        def importar(*assinaturas):
+            resposta = {'success': True, 'data': {'data': list(assinaturas)}}
+            with patch('asaas_app.services.AsaasService.list_subscriptions', return_value=resposta):
+                self.client.post(reverse('import_recorrencias'))
+        
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        importar(assinatura)
+        recorrencia = Recorrencia.objects.get(asaas_id='sub_1')
+        criacao = AlteracaoRecorrencia.objects.get()
+        self.assertTrue(criacao.criada)
+        self.assertEqual(criacao.campos['value'], [None, '109.90'])
+        
+        importar(assinatura)
+        self.assertEqual(AlteracaoRecorrencia.objects.count(), 1)
+        self.assertEqual(Recorrencia.objects.get(pk=recorrencia.pk).updated_at, recorrencia.updated_at)
+        
+        importar({**assinatura, 'value': 119.9, 'status': 'INACTIVE'})
+        alteracao = AlteracaoRecorrencia.objects.first()
+        self.assertEqual(alteracao.origem, 'IMPORTACAO')
+        self.assertEqual(alteracao.campos, {'value': ['109.90', '119.90'], 'status': ['ACTIVE', 'INACTIVE']})
+        self.assertNotEqual(alteracao.assinatura, criacao.assinatura)
+        self.assertFalse(Recorrencia.objects.get(pk=recorrencia.pk).pendente_sincronizacao)
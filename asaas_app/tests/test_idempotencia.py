@@ -0,0 +1,55 @@
+from django.test import TestCase
+
+
+class IdempotenciaTest(TestCase):
+    """Testes para o registro de idempotência das criações no Asaas"""
+    
+    def test_retentativas_nao_duplicam(self):
+        """Testa o reaproveitamento da criação concluída, a liberação na recusa e o bloqueio quando não houve resposta"""
+        from unittest.mock import patch
+        from ..models import ChaveIdempotencia
+        from ..services import AsaasService
+        
+        service = AsaasService()
+        dados = {'customer': 'cus_1', 'value': 50.0, 'cycle': 'MONTHLY', 'nextDueDate': '2025-05-10'}
+        respostas = [
+            {'success': True, 'data': {'id': 'sub_1'}},
+            {'success': False, 'error': 'Valor inválido'},
+            {'success': True, 'data': {'id': 'sub_2'}},
+            {'success': False, 'error': 'Read timed out', 'sem_resposta': True},
+        ]
+        with patch.object(AsaasService, '_make_request', side_effect=respostas) as enviar:
+            primeira = service.create_subscription(dados, chave_idempotencia='recorrencia:form:abc')
+            repetida = service.create_subscription(dados, chave_idempotencia='recorrencia:form:abc')
+            self.assertEqual(enviar.call_count, 1)
+            self.assertEqual((repetida['data']['id'], repetida['reaproveitada']), (primeira['data']['id'], True))
+            
+            # Recusada pelo Asaas: a chave é liberada e a próxima tentativa envia de novo
+            self.assertFalse(service.create_subscription(dados, chave_idempotencia='recorrencia:7')['success'])
+            segunda = service.create_subscription(dados, chave_idempotencia='recorrencia:7')
+            self.assertEqual((segunda['data']['id'], segunda.get('reaproveitada')), ('sub_2', None))  # dados iguais, chave nova
+            
+            # Sem resposta: não se sabe se foi criado, então a repetição imediata é bloqueada
+            self.assertTrue(service.create_payment_link({'name': 'Link'}, chave_idempotencia='link:recorrencia:3')['sem_resposta'])
+            bloqueada = service.create_payment_link({'name': 'Link'}, chave_idempotencia='link:recorrencia:3')
+            self.assertEqual(enviar.call_count, 4)
+            
+            with self.assertRaises(ValueError):
+                service.create_customer({'name': 'Ana'}, chave_idempotencia='')
+        self.assertFalse(bloqueada['success'])
+        self.assertEqual(ChaveIdempotencia.objects.filter(status='CONCLUIDA').count(), 2)
+        self.assertEqual(ChaveIdempotencia.objects.get(endpoint='paymentLinks').status, 'PENDENTE')
+    
+    def test_liberar_apos_remocao(self):
+        """Testa que a chave de um objeto removido do Asaas volta a criar um objeto novo"""
+        from unittest.mock import patch
+        from ..idempotencia_service import liberar
+        from ..services import AsaasService
+        
+        service = AsaasService()
+        respostas = [{'success': True, 'data': {'id': 'lnk_1'}}, {'success': True, 'data': {'id': 'lnk_2'}}]
+        with patch.object(AsaasService, '_make_request', side_effect=respostas):
+            service.create_payment_link({'name': 'Link'}, chave_idempotencia='link:recorrencia:3')
+            liberar(['lnk_1', None])
+            novo = service.create_payment_link({'name': 'Link'}, chave_idempotencia='link:recorrencia:3')
+        self.assertEqual(novo['data']['id'], 'lnk_2')
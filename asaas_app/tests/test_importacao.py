@@ -0,0 +1,120 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+
+
+class ImportacaoAsaasTest(TestCase):
+    """Testes para a importação completa de clientes e assinaturas do Asaas"""
+    
+    def _paginas(self, registros):
+        def listar(self_service, limit=100, offset=0, **kwargs):
+            return {'success': True, 'data': {'data': registros[offset:offset + limit], 'totalCount': len(registros)}}
+        return listar
+    
+    def test_importa_todas_as_paginas_em_lote(self):
+        """Testa a leitura de todas as páginas, o pulo dos inalterados, o conflito de CPF e a busca dos clientes faltantes"""
+        from unittest.mock import patch
+        from ..importacao_service import importar_clientes, importar_recorrencias
+        
+        Cliente.objects.create(name='Ana', cpfCnpj='52998224725', email='ana@example.com', asaas_id='cus_1')
+        Cliente.objects.create(name='Local', cpfCnpj='70780890011', email='local@example.com')
+        customers = [
+            {'id': 'cus_1', 'name': 'Ana', 'cpfCnpj': '52998224725', 'email': 'ana@example.com'},
+            {'id': 'cus_2', 'name': 'Bruno', 'cpfCnpj': '11144477735', 'email': 'b@example.com', 'mobilePhone': '11987654321'},
+            {'id': 'cus_3', 'name': 'Outra', 'cpfCnpj': '70780890011', 'email': 'o@example.com'},
+        ]
+        with patch('asaas_app.services.AsaasService.list_customers', self._paginas(customers)), \
+                patch('asaas_app.importacao_service.POR_PAGINA', 2):
+            resultado = importar_clientes()
+        self.assertEqual(
+            (resultado['total'], resultado['importados'], resultado['inalterados'], resultado['erros']), (3, 1, 1, 1)
+        )
+        bruno = Cliente.objects.get(asaas_id='cus_2')
+        self.assertEqual(bruno.telefone_e164, '+5511987654321')
+        self.assertFalse(bruno.pendente_sincronizacao)
+        
+        subscriptions = [
+            {'id': 'sub_1', 'customer': 'cus_2', 'value': 50, 'nextDueDate': '2025-05-10'},
+            {'id': 'sub_2', 'customer': 'cus_9', 'value': 70, 'nextDueDate': '2025-05-12', 'cycle': 'YEARLY'},
+            {'id': 'sub_3', 'customer': 'cus_x', 'value': 90, 'nextDueDate': '2025-05-15'},
+        ]
+        
+        def buscar_cliente(self_service, customer_id):
+            if customer_id == 'cus_9':
+                return {'success': True, 'data': {'id': 'cus_9', 'name': 'Nova', 'cpfCnpj': '39053344705', 'email': 'n@example.com'}}
+            return {'success': False, 'error': 'not found'}
+        
+        with patch('asaas_app.services.AsaasService.list_subscriptions', self._paginas(subscriptions)), \
+                patch('asaas_app.services.AsaasService.get_customer', buscar_cliente), \
+                patch('asaas_app.importacao_service.POR_PAGINA', 2):
+            resultado = importar_recorrencias()
+            self.assertEqual(
+                (resultado['importadas'], resultado['clientes_importados'], resultado['sem_cliente']), (2, 1, 1)
+            )
+            
+            subscriptions[0]['value'] = 55
+            resultado = importar_recorrencias()
+        self.assertEqual((resultado['atualizadas'], resultado['inalteradas']), (1, 1))
+        recorrencia = Recorrencia.objects.get(asaas_id='sub_1')
+        self.assertEqual(recorrencia.value, Decimal('55'))
+        self.assertEqual(recorrencia.cliente, bruno)
+        self.assertEqual(recorrencia.alteracoes.first().campos, {'value': ['50.00', '55.00']})
+        self.assertEqual(Recorrencia.objects.get(asaas_id='sub_2').cliente.asaas_id, 'cus_9')
+    
+    def test_registro_invalido_nao_derruba_o_lote(self):
+        """Testa os padrões para campos nulos vindos da API e o pulo (como erro) dos registros inválidos"""
+        from ..importacao_service import salvar_clientes, salvar_recorrencias
+        from django.utils import timezone
+        
+        momento = timezone.now()
+        resultado = salvar_clientes([
+            {'id': 'cus_1', 'name': 'Ana', 'cpfCnpj': '52998224725', 'email': None},
+            {'id': 'cus_2', 'name': 'B' * 300, 'cpfCnpj': '11144477735'},
+        ], momento)
+        self.assertEqual((resultado['importados'], resultado['erros']), (1, 1))
+        
+        cliente = Cliente.objects.get(asaas_id='cus_1')
+        resultado = salvar_recorrencias([
+            {'id': 'sub_1', 'customer': 'cus_1', 'value': 50, 'nextDueDate': '2025-05-10',
+             'description': None, 'cycle': None, 'billingType': None, 'status': None},
+            {'id': 'sub_2', 'customer': 'cus_1', 'value': 10 ** 12, 'nextDueDate': '2025-05-10'},
+            {'id': 'sub_3', 'customer': 'cus_1', 'value': 30, 'nextDueDate': None},
+        ], {'cus_1': cliente.pk}, momento)
+        self.assertEqual((resultado['importadas'], resultado['erros']), (1, 2))
+        recorrencia = Recorrencia.objects.get(asaas_id='sub_1')
+        self.assertEqual(
+            (recorrencia.description, recorrencia.cycle, recorrencia.billing_type, recorrencia.status),
+            ('Importado do Asaas', 'MONTHLY', 'BOLETO', 'ACTIVE'),
+        )
+    
+    def test_alteracao_local_pendente_nao_e_sobrescrita(self):
+        """Testa que a importação não sobrescreve (nem marca como sincronizado) o que ainda não foi enviado ao Asaas"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from ..importacao_service import salvar_clientes, salvar_recorrencias
+        
+        momento = timezone.now() - timedelta(minutes=5)
+        salvar_clientes([{'id': 'cus_1', 'name': 'Ana', 'cpfCnpj': '52998224725', 'email': 'ana@example.com'}], momento)
+        cliente = Cliente.objects.get(asaas_id='cus_1')
+        assinatura = {'id': 'sub_1', 'customer': 'cus_1', 'value': 50, 'nextDueDate': '2025-05-10'}
+        salvar_recorrencias([assinatura], {'cus_1': cliente.pk}, momento)
+        
+        # Reajuste local ainda não propagado e nome editado localmente
+        recorrencia = Recorrencia.objects.get(asaas_id='sub_1')
+        recorrencia.value = Decimal('55.00')
+        recorrencia.save()
+        cliente.name = 'Ana Maria'
+        cliente.save()
+        self.assertTrue(recorrencia.pendente_sincronizacao)
+        
+        agora = timezone.now()
+        resultado = salvar_clientes([{'id': 'cus_1', 'name': 'Ana', 'cpfCnpj': '52998224725', 'email': 'novo@example.com'}], agora)
+        self.assertEqual((resultado['atualizados'], resultado['conflitos']), (0, 1))
+        resultado = salvar_recorrencias([{**assinatura, 'value': 60}], {'cus_1': cliente.pk}, agora)
+        self.assertEqual((resultado['atualizadas'], resultado['conflitos']), (0, 1))
+        
+        recorrencia.refresh_from_db()
+        cliente.refresh_from_db()
+        self.assertEqual((recorrencia.value, cliente.name), (Decimal('55.00'), 'Ana Maria'))
+        self.assertTrue(recorrencia.pendente_sincronizacao)
+        self.assertTrue(cliente.pendente_sincronizacao)
@@ -0,0 +1,60 @@
+from django.test import TestCase
+
+
+class LimiteEnvioTest(TestCase):
+    """Testes para deduplicação e limite de envios de WhatsApp"""
+    
+    def test_deduplicacao_por_referencia(self):
+        """Testa se o mesmo boleto não é enfileirado duas vezes dentro da janela"""
+        from ..outbox_service import enfileirar_mensagem
+        
+        primeira, criada = enfileirar_mensagem('(81) 99999-8888', 'Boleto', origem='boleto_recorrencia', referencia='pay_1')
+        self.assertTrue(criada)
+        repetida, criada = enfileirar_mensagem('81999998888', 'Boleto', origem='boleto_recorrencia', referencia='pay_1')
+        self.assertFalse(criada)
+        self.assertEqual(repetida, primeira)
+        _, criada = enfileirar_mensagem('81999998888', 'Boleto', origem='boleto_recorrencia', referencia='pay_2')
+        self.assertTrue(criada)
+    
+    def test_token_bucket_por_destino(self):
+        """Testa se o balde do destinatário bloqueia após o limite e não gasta o balde global"""
+        from ..models import LimiteEnvio
+        from ..limite_service import reservar_envio, LIMITE_DESTINO_POR_HORA
+        
+        for _ in range(LIMITE_DESTINO_POR_HORA):
+            self.assertEqual(reservar_envio('5581999998888'), 0)
+        
+        global_antes = LimiteEnvio.objects.get(chave='global').tokens
+        espera = reservar_envio('5581999998888')
+        self.assertGreater(espera, 0)
+        self.assertAlmostEqual(LimiteEnvio.objects.get(chave='global').tokens, global_antes, places=1)
+        self.assertEqual(reservar_envio('5581977776666'), 0)
+    
+    def test_deduplicacao_concorrente(self):
+        """Testa se a restrição única segura o enfileiramento simultâneo da mesma mensagem"""
+        from unittest.mock import patch
+        from ..outbox_service import enfileirar_mensagem
+        
+        primeira, _ = enfileirar_mensagem('81999998888', 'Boleto', origem='boleto_recorrencia', referencia='pay_1')
+        # Simula a outra requisição passando pela consulta antes da gravação da primeira
+        with patch('asaas_app.outbox_service.chaves_recentes', return_value=set()):
+            repetida, criada = enfileirar_mensagem('81999998888', 'Boleto', origem='boleto_recorrencia', referencia='pay_1')
+        self.assertFalse(criada)
+        self.assertEqual(repetida, primeira)
+    
+    def test_limpar_baldes_ociosos(self):
+        """Testa se só os baldes de destinatário parados há mais de uma hora são apagados"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from ..models import LimiteEnvio
+        from ..limite_service import limpar_baldes_ociosos
+        
+        antigo = timezone.now() - timedelta(hours=2)
+        LimiteEnvio.objects.create(chave='destino:5581999998888', tokens=5, atualizado_em=antigo)
+        LimiteEnvio.objects.create(chave='destino:5581977776666', tokens=2, atualizado_em=timezone.now())
+        LimiteEnvio.objects.create(chave='global', tokens=30, atualizado_em=antigo)
+        
+        self.assertEqual(limpar_baldes_ociosos(), 1)
+        self.assertEqual(
+            set(LimiteEnvio.objects.values_list('chave', flat=True)), {'destino:5581977776666', 'global'}
+        )
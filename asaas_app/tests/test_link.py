@@ -0,0 +1,67 @@
+from django.test import TestCase
+from django.urls import reverse
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date, timedelta
+
+
+class LimpezaLinksTest(TestCase):
+    """Testes para a limpeza periódica dos links de pagamento"""
+    
+    def test_reconcilia_e_remove_duplicados_e_inativos(self):
+        """Testa a reconciliação com o Asaas, a remoção respeitando os links em uso e o reaproveitamento do checkout"""
+        from unittest.mock import patch
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from ..models import LinkPagamento
+        from ..link_service import limpar_links
+        
+        cliente = Cliente.objects.create(name='Ana', cpfCnpj='52998224725', email='ana@example.com', asaas_id='cus_1')
+        recorrencia = Recorrencia.objects.create(
+            cliente=cliente, value=Decimal('99.90'), description='Plano', next_due_date=date(2025, 5, 10),
+            billing_type='PIX', asaas_id='sub_1',
+        )
+        checkout = {
+            'nome': 'Checkout - Plano', 'charge_type': 'RECURRENT', 'valor': Decimal('99.90'), 'billing_type': 'PIX', 'cliente': cliente,
+        }
+        em_uso = LinkPagamento.objects.create(asaas_id='lnk_1', url='https://asaas.com/c/1', **checkout)
+        duplicado = LinkPagamento.objects.create(asaas_id='lnk_2', url='https://asaas.com/c/2', **checkout)
+        antigo = LinkPagamento.objects.create(nome='Antigo', asaas_id='lnk_3', status='INACTIVE')
+        desativado = LinkPagamento.objects.create(nome='Desativado', asaas_id='lnk_4', url='https://asaas.com/c/4')
+        LinkPagamento.objects.create(nome='Removido no Asaas', asaas_id='lnk_5')
+        LinkPagamento.objects.create(nome='Local', status='EXPIRED')
+        LinkPagamento.objects.filter(nome__in=['Antigo', 'Local']).update(updated_at=timezone.now() - timedelta(days=60))
+        Recorrencia.objects.filter(pk=recorrencia.pk).update(link_pagamento=em_uso)
+        
+        links_asaas = [
+            {'id': 'lnk_1', 'active': True, 'url': 'https://asaas.com/c/1'},
+            {'id': 'lnk_2', 'active': True, 'url': 'https://asaas.com/c/2'},
+            {'id': 'lnk_3', 'active': False},
+            {'id': 'lnk_4', 'active': False, 'url': 'https://asaas.com/c/4'},
+        ]
+        removidos = []
+        
+        def remover(self_service, asaas_id):
+            removidos.append(asaas_id)
+            return {'success': True, 'data': {}} if asaas_id == 'lnk_2' else {'success': False, 'error': 'falhou'}
+        
+        with patch('asaas_app.services.AsaasService.list_payment_links',
+                   return_value={'success': True, 'data': {'data': links_asaas, 'totalCount': 4}}), \
+                patch('asaas_app.services.AsaasService.delete_payment_link', remover), \
+                patch('asaas_app.limite_service.reservar_chamada_asaas', return_value=0):
+            resultado = limpar_links()
+        
+        self.assertEqual(resultado['atualizados'], 1)
+        self.assertEqual(resultado['removidos_no_asaas'], 1)
+        self.assertEqual((resultado['duplicados'], resultado['obsoletos']), (1, 2))
+        self.assertEqual((resultado['removidos'], resultado['erros'], resultado['pendentes']), (2, 1, 0))
+        self.assertEqual(sorted(removidos), ['lnk_2', 'lnk_3'])
+        self.assertEqual(set(LinkPagamento.objects.values_list('pk', flat=True)), {em_uso.pk, antigo.pk, desativado.pk})
+        self.assertEqual(LinkPagamento.objects.get(pk=desativado.pk).status, 'INACTIVE')
+        self.assertFalse(LinkPagamento.objects.filter(pk=duplicado.pk).exists())
+        
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        with patch('asaas_app.services.AsaasService.create_payment_link') as criar:
+            response = self.client.get(reverse('recorrencia_checkout_assinatura', args=[recorrencia.pk]))
+        criar.assert_not_called()
+        self.assertEqual(response['Location'], 'https://asaas.com/c/1')
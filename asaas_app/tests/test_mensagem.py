@@ -0,0 +1,35 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class ModeloMensagemTest(TestCase):
+    """Testes para os modelos de mensagem compilados"""
+    
+    def setUp(self):
+        cliente = Cliente.objects.create(
+            name='Paula Souza', cpfCnpj='70780890011', email='paula@example.com', mobilePhone='81988887777'
+        )
+        self.recorrencia = Recorrencia.objects.create(
+            cliente=cliente, value=Decimal('79.90'), description='Plano Mensal', next_due_date=date(2025, 3, 10)
+        )
+    
+    def test_recompila_apos_edicao(self):
+        """Testa o cache por versão e a renderização em lote"""
+        from ..mensagem_service import obter_modelo, renderizar, renderizar_lote, contexto_boleto
+        
+        boleto = {'value': 79.9, 'dueDate': '2025-03-10', 'bankSlipUrl': 'https://asaas/b/1?a=1&b=2'}
+        texto = renderizar('boleto_recorrencia', contexto_boleto(self.recorrencia, boleto))
+        self.assertIn('Olá *Paula*', texto)
+        self.assertIn('R$ 79.90', texto)
+        self.assertIn('10/03/2025', texto)
+        self.assertIn('https://asaas/b/1?a=1&b=2', texto)
+        
+        modelo = obter_modelo('boleto_recorrencia')
+        modelo.conteudo = '{{ primeiro_nome }} - {{ valor }}'
+        modelo.save()
+        self.assertEqual(modelo.versao, 2)
+        
+        textos = renderizar_lote('boleto_recorrencia', [{'primeiro_nome': 'Ana', 'valor': '1.00'}, {'primeiro_nome': 'Bia', 'valor': '2.00'}])
+        self.assertEqual(textos, ['Ana - 1.00', 'Bia - 2.00'])
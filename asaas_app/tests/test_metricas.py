@@ -0,0 +1,42 @@
+from django.test import TestCase
+from django.urls import reverse
+
+
+class WhatsAppMetricasTest(TestCase):
+    """Testes para o status de entrega (webhook) e as métricas de envio"""
+    
+    def test_webhook_atualiza_status_e_metricas(self):
+        """Testa o callback da Evolution, a ordem dos status e o p95 de latência"""
+        import json
+        from django.test import override_settings
+        from django.utils import timezone
+        from ..models import MensagemWhatsApp
+        from ..metricas_service import metricas_whatsapp
+        
+        for i, latencia in enumerate(range(100, 2100, 100)):
+            MensagemWhatsApp.objects.create(
+                telefone='81999998888', mensagem='Olá', status='ENVIADA', enviada_em=timezone.now(),
+                provedor_id=f'ID{i}', latencia_ms=latencia, modelo='boleto_recorrencia'
+            )
+        MensagemWhatsApp.objects.create(telefone='81999998888', mensagem='Olá', status='FALHA')
+        
+        url = reverse('whatsapp_webhook')
+        lida = {'event': 'messages.update', 'data': {'keyId': 'ID0', 'status': 'READ'}}
+        entregue = {'event': 'messages.update', 'data': {'keyId': 'ID0', 'status': 'DELIVERY_ACK'}}
+        with override_settings(WHATSAPP_WEBHOOK_TOKEN='segredo', WHATSAPP_PROVIDER='evolution'):
+            self.assertEqual(self.client.post(url, json.dumps(lida), content_type='application/json').status_code, 403)
+            response = self.client.post(f'{url}?token=segredo', json.dumps(lida), content_type='application/json')
+            self.assertEqual(response.json()['atualizadas'], 1)
+            # Callback atrasado não faz o status regredir
+            response = self.client.post(f'{url}?token=segredo', json.dumps(entregue), content_type='application/json')
+            self.assertEqual(response.json()['atualizadas'], 0)
+        
+        msg = MensagemWhatsApp.objects.get(provedor_id='ID0')
+        self.assertEqual(msg.status_entrega, 'LIDA')
+        self.assertIsNotNone(msg.entregue_em)
+        
+        totais = metricas_whatsapp(dias=1)['totais']
+        self.assertEqual(totais['enviadas'], 20)
+        self.assertEqual(totais['latencia_p95'], 1900)
+        self.assertEqual(totais['taxa_falha'], 4.8)
+        self.assertEqual(totais['lidas'], 1)
@@ -0,0 +1,114 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date, timedelta
+
+
+class ClienteModelTest(TestCase):
+    """Testes para o modelo Cliente"""
+    
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            name="João Silva",
+            cpfCnpj="12345678901",
+            email="joao@example.com",
+            phone="1234567890",
+            mobilePhone="11987654321"
+        )
+    
+    def test_cliente_creation(self):
+        """Testa se o cliente é criado corretamente"""
+        self.assertTrue(isinstance(self.cliente, Cliente))
+        self.assertEqual(self.cliente.__str__(), "João Silva - 12345678901")
+    
+    def test_cliente_fields(self):
+        """Testa se os campos do cliente estão corretos"""
+        self.assertEqual(self.cliente.name, "João Silva")
+        self.assertEqual(self.cliente.cpfCnpj, "12345678901")
+        self.assertEqual(self.cliente.email, "joao@example.com")
+        self.assertFalse(self.cliente.synced_with_asaas)
+    
+    def test_telefone_normalizado(self):
+        """Testa o telefone E.164 calculado ao salvar e a busca por telefone"""
+        from ..telefone_service import normalizar_telefone
+        
+        self.assertEqual(self.cliente.telefone_e164, '+5511987654321')
+        self.assertEqual(Cliente.por_telefone('5511987654321@s.whatsapp.net'), self.cliente)
+        self.assertEqual(normalizar_telefone('(081) 3222-1111'), '+558132221111')
+        self.assertEqual(normalizar_telefone('11 8765-43210'), '')
+        self.assertEqual(normalizar_telefone('12345'), '')
+        
+        self.cliente.mobilePhone = ''
+        self.cliente.phone = '123'
+        self.cliente.save()
+        self.assertEqual(self.cliente.telefone_e164, '')
+    
+    def test_telefone_normalizado_com_update_fields(self):
+        """Testa se salvar só o telefone também grava o E.164 (cliente e parceiro)"""
+        from ..models import Parceiro
+        
+        self.cliente.mobilePhone = '81988887777'
+        self.cliente.save(update_fields=['mobilePhone'])
+        self.assertEqual(Cliente.objects.get(pk=self.cliente.pk).telefone_e164, '+5581988887777')
+        
+        parceiro = Parceiro.objects.create(
+            nome='Ana', cpfCnpj='10120230344', email='ana@example.com', tipo='INDICADOR', percentual_comissao=Decimal('10.00')
+        )
+        parceiro.telefone = '81977776666'
+        parceiro.save(update_fields=['telefone'])
+        self.assertEqual(Parceiro.objects.get(pk=parceiro.pk).telefone_e164, '+5581977776666')
+
+
+class RecorrenciaModelTest(TestCase):
+    """Testes para o modelo Recorrência"""
+    
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            name="Maria Santos",
+            cpfCnpj="98765432109",
+            email="maria@example.com"
+        )
+        
+        self.recorrencia = Recorrencia.objects.create(
+            cliente=self.cliente,
+            value=Decimal('99.90'),
+            cycle='MONTHLY',
+            billing_type='BOLETO',
+            description='Plano Premium',
+            next_due_date=date.today() + timedelta(days=30)
+        )
+    
+    def test_recorrencia_creation(self):
+        """Testa se a recorrência é criada corretamente"""
+        self.assertTrue(isinstance(self.recorrencia, Recorrencia))
+        self.assertEqual(
+            self.recorrencia.__str__(),
+            "Plano Premium - Maria Santos - R$ 99.90"
+        )
+    
+    def test_recorrencia_fields(self):
+        """Testa se os campos da recorrência estão corretos"""
+        self.assertEqual(self.recorrencia.value, Decimal('99.90'))
+        self.assertEqual(self.recorrencia.cycle, 'MONTHLY')
+        self.assertEqual(self.recorrencia.billing_type, 'BOLETO')
+        self.assertEqual(self.recorrencia.status, 'ACTIVE')
+        self.assertFalse(self.recorrencia.synced_with_asaas)
+
+    def test_vincular_links(self):
+        """Testa o vínculo em lote dos links de pagamento existentes (nome exato tem prioridade)"""
+        from ..models import LinkPagamento
+        from ..link_service import vincular_links_recorrencias
+
+        criado = LinkPagamento.objects.create(
+            nome='Plano Premium - Recorrência', cliente=self.cliente, url='https://asaas/c/1'
+        )
+        LinkPagamento.objects.create(nome='Checkout - Plano Premium', cliente=self.cliente, url='https://asaas/c/2')
+        LinkPagamento.objects.create(nome='Plano Premium - Recorrência', url='https://asaas/c/3')
+        Recorrencia.objects.create(
+            cliente=self.cliente, value=Decimal('10.00'), description='Plano Básico', next_due_date=date.today()
+        )
+
+        self.assertEqual(vincular_links_recorrencias(), {'vinculadas': 1, 'sem_link': 1})
+        self.recorrencia.refresh_from_db()
+        self.assertEqual(self.recorrencia.link_pagamento, criado)
+        self.assertEqual(vincular_links_recorrencias(), {'vinculadas': 0, 'sem_link': 1})
@@ -0,0 +1,72 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class WhatsAppOutboxTest(TestCase):
+    """Testes para a fila de saída de mensagens WhatsApp"""
+    
+    class FakeWhatsApp:
+        def __init__(self, sucesso):
+            self.sucesso = sucesso
+            self.enviadas = []
+            self.verificacoes_conexao = 0
+        
+        def garantir_conexao(self):
+            self.verificacoes_conexao += 1
+        
+        def send_message(self, phone, message, verificar_conexao=True):
+            self.enviadas.append(phone)
+            if self.sucesso:
+                return {'success': True, 'data': {'key': {'id': 'ABC'}}}
+            return {'success': False, 'error': 'Instância desconectada'}
+    
+    def test_envio_com_sucesso(self):
+        """Testa se o worker envia e marca a mensagem como enviada"""
+        from ..outbox_service import enfileirar_mensagem, processar_fila
+        
+        msg, _ = enfileirar_mensagem('81999998888', 'Olá!', origem='teste')
+        enfileirar_mensagem('81977776666', 'Olá!', origem='teste')
+        fake = self.FakeWhatsApp(sucesso=True)
+        resumo = processar_fila(whatsapp_service=fake)
+        
+        msg.refresh_from_db()
+        self.assertEqual(resumo['enviadas'], 2)
+        self.assertEqual(msg.status, 'ENVIADA')
+        self.assertEqual(sorted(fake.enviadas), ['+5581977776666', '+5581999998888'])
+        self.assertEqual(fake.verificacoes_conexao, 1)
+        self.assertEqual(processar_fila(whatsapp_service=fake)['enviadas'], 0)
+    
+    def test_falha_definitiva_apos_tentativas(self):
+        """Testa o reagendamento com backoff e o dead-letter após o máximo de tentativas"""
+        from django.utils import timezone
+        from ..models import MensagemWhatsApp
+        from ..outbox_service import enfileirar_mensagem, processar_fila, MAX_TENTATIVAS
+        
+        msg, _ = enfileirar_mensagem('81999998888', 'Olá!')
+        fake = self.FakeWhatsApp(sucesso=False)
+        for _ in range(MAX_TENTATIVAS):
+            processar_fila(whatsapp_service=fake)
+            MensagemWhatsApp.objects.filter(pk=msg.pk).update(proxima_tentativa=timezone.now())
+        
+        msg.refresh_from_db()
+        self.assertEqual(msg.status, 'FALHA')
+        self.assertEqual(msg.tentativas, MAX_TENTATIVAS)
+        self.assertEqual(msg.ultimo_erro, 'Instância desconectada')
+    
+    def test_resumo_recorrencias(self):
+        """Testa o resumo único das recorrências criadas desde o último resumo"""
+        from django.test import override_settings
+        from ..outbox_service import enfileirar_resumo_recorrencias
+        
+        cliente = Cliente.objects.create(name='Paula Souza', cpfCnpj='70780890011', email='paula@example.com')
+        for valor in ('10.00', '20.00'):
+            Recorrencia.objects.create(cliente=cliente, value=Decimal(valor), description='Plano', next_due_date=date.today())
+        
+        with override_settings(WHATSAPP_NUMBERS=['81911112222', '81933334444']):
+            quantidade, mensagens = enfileirar_resumo_recorrencias()
+        self.assertEqual(quantidade, 2)
+        self.assertEqual(len(mensagens), 2)
+        self.assertIn('R$ 30.00', mensagens[0][0].mensagem)
+        self.assertEqual(enfileirar_resumo_recorrencias(), (0, []))
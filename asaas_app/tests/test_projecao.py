@@ -0,0 +1,53 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class ProjecaoReceitaTest(TestCase):
+    """Testes para a projeção de receita recorrente"""
+    
+    def test_expansao_por_ciclo(self):
+        """Testa a contagem de cobranças por mês para ciclos mensais e semanais com término"""
+        from ..projecao_service import expandir_cobrancas
+        
+        jan = date(2025, 1, 1)
+        self.assertEqual(expandir_cobrancas('MONTHLY', date(2025, 1, 31), None, 4, jan, 6), [1, 1, 1, 1, 0, 0])
+        self.assertEqual(expandir_cobrancas('QUARTERLY', date(2024, 11, 10), None, None, jan, 6), [0, 1, 0, 0, 1, 0])
+        self.assertEqual(expandir_cobrancas('MONTHLY', date(2025, 1, 20), date(2025, 4, 19), None, jan, 6), [1, 1, 1, 0, 0, 0])
+        self.assertEqual(expandir_cobrancas('WEEKLY', date(2025, 1, 1), None, None, jan, 2), [5, 4])
+        self.assertEqual(expandir_cobrancas('BIWEEKLY', date(2024, 12, 25), date(2025, 2, 5), None, jan, 3), [2, 1, 0])
+    
+    def test_recalculo_incremental(self):
+        """Testa MRR/ARR e se apenas a recorrência alterada é recalculada"""
+        from ..projecao_service import projecao_receita, atualizar_projecoes
+        
+        cliente = Cliente.objects.create(name='Lia Prado', cpfCnpj='52998224725', email='lia@example.com')
+        hoje = date.today()
+        mensal = Recorrencia.objects.create(
+            cliente=cliente, value=Decimal('100.00'), cycle='MONTHLY', description='Mensal', next_due_date=hoje
+        )
+        Recorrencia.objects.create(
+            cliente=cliente, value=Decimal('1200.00'), cycle='YEARLY', billing_type='PIX', description='Anual', next_due_date=hoje
+        )
+        Recorrencia.objects.create(
+            cliente=cliente, value=Decimal('50.00'), description='Inativa', next_due_date=hoje, status='INACTIVE'
+        )
+        
+        # A leitura não calcula nada: só as projeções gravadas contam
+        self.assertEqual(projecao_receita(12)['recorrencias'], 0)
+        self.assertEqual(atualizar_projecoes(), 2)
+        projecao = projecao_receita(12)
+        self.assertEqual(projecao['recorrencias'], 2)
+        self.assertEqual(projecao['mrr'], Decimal('200.00'))
+        self.assertEqual(projecao['arr'], Decimal('2400.00'))
+        self.assertEqual(projecao['total'], Decimal('2400.00'))
+        self.assertEqual(projecao['meses'][0]['receita'], Decimal('1300.00'))
+        self.assertEqual(atualizar_projecoes(), 0)
+        
+        Recorrencia.objects.filter(pk=mensal.pk).update(value=Decimal('150.00'))
+        self.assertEqual(atualizar_projecoes(), 1)
+        mensal.status = 'INACTIVE'
+        mensal.save()
+        self.assertEqual(atualizar_projecoes([mensal.pk]), 1)
+        self.assertEqual(projecao_receita(12)['mrr'], Decimal('100.00'))
@@ -0,0 +1,91 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class ReajusteTest(TestCase):
+    """Testes para o reajuste de preço em massa das recorrências"""
+    
+    def setUp(self):
+        cliente = Cliente.objects.create(name='Caio Melo', cpfCnpj='52998224725', email='caio@example.com', asaas_id='cus_1')
+        for descricao, valor, ciclo, asaas_id in [
+            ('Plano 1', '99.90', 'MONTHLY', 'sub_1'),
+            ('Plano 2', '99.90', 'MONTHLY', 'sub_2'),
+            ('Plano 3', '50.00', 'MONTHLY', None),
+            ('Plano Anual', '1200.00', 'YEARLY', 'sub_4'),
+        ]:
+            Recorrencia.objects.create(
+                cliente=cliente, value=Decimal(valor), cycle=ciclo, description=descricao,
+                next_due_date=date(2025, 6, 10), asaas_id=asaas_id
+            )
+    
+    def test_aplicar_e_reverter(self):
+        """Testa a prévia, a restauração do valor recusado pelo Asaas e a reversão do reajuste"""
+        from unittest.mock import patch
+        from ..models import Reajuste
+        from ..reajuste_service import calcular_reajuste, aplicar_reajuste, reverter_reajuste, propagar_reajuste, ler_tabela
+        
+        self.assertEqual(ler_tabela('99,90 = 109,90\n\n1.200,00; 1290'), {'99.90': '109.90', '1200.00': '1290.00'})
+        
+        reajuste = Reajuste(nome='IPCA', tipo='PERCENTUAL', percentual=Decimal('10'), ciclo='MONTHLY')
+        itens, resumo = calcular_reajuste(reajuste)
+        self.assertEqual(resumo['quantidade'], 3)
+        self.assertEqual(resumo['impacto_mensal'], Decimal('24.98'))
+        self.assertEqual(Recorrencia.objects.get(description='Plano 1').value, Decimal('99.90'))
+        
+        enviados = []
+        
+        def atualizar(self, subscription_id, dados):
+            enviados.append((subscription_id, dados['value'], dados['updatePendingPayments']))
+            if subscription_id == 'sub_2':
+                return {'success': False, 'error': 'Assinatura removida'}
+            return {'success': True, 'data': {'id': subscription_id}}
+        
+        with patch('asaas_app.services.AsaasService.update_subscription', atualizar), \
+                patch('asaas_app.limite_service.reservar_chamada_asaas', return_value=0):
+            reajuste = aplicar_reajuste(reajuste)
+            self.assertEqual(Recorrencia.objects.get(description='Plano 1').value, Decimal('109.89'))
+            propagar_reajuste(reajuste, concorrencia=2)
+            
+            self.assertEqual(reajuste.status, 'CONCLUIDO')
+            self.assertEqual((reajuste.total_enviados, reajuste.total_erros), (1, 1))
+            self.assertIn(('sub_1', 109.89, True), enviados)
+            valores = dict(Recorrencia.objects.values_list('description', 'value'))
+            self.assertEqual(valores['Plano 1'], Decimal('109.89'))
+            self.assertEqual(valores['Plano 2'], Decimal('99.90'))
+            self.assertEqual(valores['Plano 3'], Decimal('55.00'))
+            self.assertEqual(valores['Plano Anual'], Decimal('1200.00'))
+            self.assertFalse(Recorrencia.objects.get(description='Plano 1').pendente_sincronizacao)
+            
+            reajuste = reverter_reajuste(reajuste)
+            propagar_reajuste(reajuste)
+        
+        self.assertEqual(reajuste.status, 'REVERTIDO')
+        self.assertEqual(enviados[-1], ('sub_1', 99.9, True))
+        valores = dict(Recorrencia.objects.values_list('description', 'value'))
+        self.assertEqual((valores['Plano 1'], valores['Plano 3']), (Decimal('99.90'), Decimal('50.00')))
+        self.assertEqual(reajuste.itens.filter(status='REVERTIDO').count(), 2)
+    
+    def test_recorrencia_removida_durante_envio(self):
+        """Testa se o item de uma recorrência removida no meio do envio fica com erro sem interromper o lote"""
+        from unittest.mock import patch
+        from django.db.models.query import QuerySet
+        from ..models import Reajuste
+        from ..reajuste_service import aplicar_reajuste, propagar_reajuste
+        
+        removida = Recorrencia.objects.get(description='Plano 2').pk
+        in_bulk = QuerySet.in_bulk
+        
+        def sem_removida(queryset, *args, **kwargs):
+            return {pk: r for pk, r in in_bulk(queryset, *args, **kwargs).items() if pk != removida}
+        
+        with patch('asaas_app.services.AsaasService.update_subscription', return_value={'success': True, 'data': {}}), \
+                patch('asaas_app.limite_service.reservar_chamada_asaas', return_value=0), \
+                patch.object(QuerySet, 'in_bulk', sem_removida):
+            reajuste = aplicar_reajuste(Reajuste(nome='IPCA', tipo='PERCENTUAL', percentual=Decimal('10'), ciclo='MONTHLY'))
+            propagar_reajuste(reajuste)
+        
+        self.assertEqual(reajuste.status, 'CONCLUIDO')
+        self.assertEqual((reajuste.total_enviados, reajuste.total_erros), (1, 1))
+        self.assertEqual(reajuste.itens.get(recorrencia_id=removida).erro, 'Recorrência removida')
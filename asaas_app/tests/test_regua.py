@@ -0,0 +1,55 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class ReguaCobrancaTest(TestCase):
+    """Testes para a régua de cobrança automática"""
+    
+    def test_etapas_e_reexecucao(self):
+        """Testa a escolha da etapa, a paginação e que a mesma etapa não é enviada duas vezes"""
+        from unittest.mock import patch
+        from ..models import MensagemWhatsApp
+        from ..regua_service import executar_regua
+        
+        hoje = date(2025, 3, 10)
+        cliente = Cliente.objects.create(
+            name='Paula Souza', cpfCnpj='70780890011', email='paula@example.com', mobilePhone='81988887777'
+        )
+        Recorrencia.objects.create(
+            cliente=cliente, value=Decimal('79.90'), description='Plano Mensal', next_due_date=hoje, asaas_id='sub_1'
+        )
+        cobrancas = {
+            'PENDING': [
+                {'id': 'pay_1', 'subscription': 'sub_1', 'value': 79.9, 'dueDate': '2025-03-13', 'invoiceUrl': 'https://asaas/i/1'},
+                {'id': 'pay_2', 'subscription': 'sub_1', 'value': 79.9, 'dueDate': '2025-03-12', 'invoiceUrl': 'https://asaas/i/2'},
+            ],
+            'OVERDUE': [
+                {'id': 'pay_3', 'subscription': 'sub_1', 'value': 79.9, 'dueDate': '2025-03-07', 'invoiceUrl': 'https://asaas/i/3'},
+                {'id': 'pay_4', 'subscription': 'sub_1', 'value': 79.9, 'dueDate': '2025-03-02', 'invoiceUrl': 'https://asaas/i/4'},
+                {'id': 'pay_5', 'subscription': 'sub_9', 'value': 10.0, 'dueDate': '2025-03-07', 'invoiceUrl': 'https://asaas/i/5'},
+            ],
+        }
+        
+        def listar(self, de, ate, status, limit, offset):
+            dados = cobrancas[status]
+            return {'success': True, 'data': {'data': dados[offset:offset + limit], 'totalCount': len(dados)}}
+        
+        with patch('asaas_app.services.AsaasService.list_payments_by_due_date', listar), \
+                patch('asaas_app.regua_service.POR_PAGINA', 1):
+            resumo = executar_regua(hoje=hoje)
+            self.assertEqual(resumo['cobrancas'], 5)
+            # pay_2 (D-2) recebe a etapa D-3 perdida; pay_4 (D+8) já passou da tolerância da D+3
+            self.assertEqual(resumo['por_etapa'], {'D-3': 2, 'D+3': 1})
+            self.assertEqual(resumo['fora_da_etapa'], 1)
+            self.assertEqual(resumo['sem_recorrencia'], 1)
+            self.assertFalse(resumo['interrompida'])
+            
+            atraso = MensagemWhatsApp.objects.get(modelo='cobranca_atraso')
+            self.assertIn('vencido há 3 dia(s)', atraso.mensagem)
+            self.assertIn('https://asaas/i/3', atraso.mensagem)
+            
+            resumo = executar_regua(hoje=hoje)
+            self.assertEqual(resumo['enfileiradas'], 0)
+            self.assertEqual(resumo['ja_enviadas'], 3)
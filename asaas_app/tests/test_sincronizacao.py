@@ -0,0 +1,93 @@
+from django.test import TestCase
+from ..models import Cliente, Recorrencia
+from decimal import Decimal
+from datetime import date
+
+
+class SincronizacaoLoteTest(TestCase):
+    """Testes para a sincronização em lote das alterações locais com o Asaas"""
+    
+    def test_alteracoes_pendentes_e_retomada(self):
+        """Testa a marca de alteração, o resultado por item e a retomada do lote interrompido"""
+        from unittest.mock import patch
+        from django.utils import timezone
+        from ..sincronizacao_service import sincronizar_alteracoes, pendencias
+        
+        alterado = Cliente.objects.create(name='Ana Costa', cpfCnpj='52998224725', email='ana@example.com', asaas_id='cus_1')
+        alterado.marcar_sincronizado(timezone.now())
+        alterado = Cliente.objects.get(pk=alterado.pk)
+        alterado.save()
+        self.assertFalse(alterado.pendente_sincronizacao)
+        alterado.name = 'Ana Costa Lima'
+        alterado.save()
+        self.assertTrue(alterado.pendente_sincronizacao)
+        
+        sem_asaas = Cliente.objects.create(name='Bia Reis', cpfCnpj='70780890011', email='bia@example.com')
+        Recorrencia.objects.create(cliente=alterado, value=Decimal('10.00'), description='Plano A', next_due_date=date(2025, 5, 1))
+        Recorrencia.objects.create(cliente=sem_asaas, value=Decimal('20.00'), description='Plano B', next_due_date=date(2025, 5, 1))
+        self.assertEqual(pendencias(), {'clientes': 2, 'recorrencias': 2})
+        
+        def criar_cliente(self, dados, chave_idempotencia=None):
+            return {'success': False, 'error': 'CPF inválido'}
+        
+        def criar_assinatura(self, dados, chave_idempotencia=None):
+            return {'success': True, 'data': {'id': f"sub_{dados['customer']}"}}
+        
+        with patch('asaas_app.services.AsaasService.update_customer', return_value={'success': True, 'data': {}}), \
+                patch('asaas_app.services.AsaasService.create_customer', criar_cliente), \
+                patch('asaas_app.services.AsaasService.create_subscription', criar_assinatura):
+            # O balde esvazia depois de dois envios e o prazo acaba esperando
+            with patch('asaas_app.limite_service.reservar_chamada_asaas', side_effect=[0, 0, 60]):
+                lote = sincronizar_alteracoes(tempo_maximo=1, concorrencia=1)
+            self.assertEqual(lote.status, 'EXECUTANDO')
+            self.assertEqual((lote.total_sincronizados, lote.total_erros, lote.pendentes), (1, 1, 2))
+            
+            with patch('asaas_app.limite_service.reservar_chamada_asaas', return_value=0):
+                retomado = sincronizar_alteracoes(concorrencia=1)
+        
+        self.assertEqual(retomado.pk, lote.pk)
+        self.assertEqual(retomado.status, 'CONCLUIDA')
+        self.assertEqual((retomado.total_sincronizados, retomado.total_erros), (2, 2))
+        self.assertEqual(
+            dict(retomado.itens.values_list('descricao', 'status')),
+            {'Ana Costa Lima': 'OK', 'Bia Reis': 'ERRO', 'Plano A': 'OK', 'Plano B': 'ERRO'}
+        )
+        self.assertEqual(Recorrencia.objects.get(description='Plano A').asaas_id, 'sub_cus_1')
+        self.assertEqual(pendencias(), {'clientes': 1, 'recorrencias': 1})
+    
+    def test_execucoes_simultaneas_nao_duplicam(self):
+        """Testa que um segundo lote simultâneo é descartado e que itens reservados por outra execução não são reenviados"""
+        from datetime import timedelta
+        from unittest.mock import patch
+        from django.utils import timezone
+        from ..models import SincronizacaoLote, SincronizacaoItem
+        from ..sincronizacao_service import preparar_lote, processar_lote, reservar_itens
+        
+        for i, cpf in enumerate(('52998224725', '70780890011', '11144477735')):
+            Cliente.objects.create(name=f'Cliente {i}', cpfCnpj=cpf, email=f'c{i}@example.com')
+        
+        lote = preparar_lote()
+        self.assertEqual(preparar_lote(), lote)  # criado ao mesmo tempo por outra execução: descartado
+        self.assertEqual(SincronizacaoLote.objects.count(), 1)
+        
+        # Outra execução reservou um item agora e outra morreu há muito com um item reservado
+        em_envio, preso = reservar_itens(lote, 'CLIENTE', 2)
+        self.assertEqual([i.status for i in (em_envio, preso)], ['ENVIANDO', 'ENVIANDO'])
+        SincronizacaoItem.objects.filter(pk=preso.pk).update(reservado_em=timezone.now() - timedelta(hours=1))
+        
+        enviados = []
+        
+        def criar_cliente(self, dados, chave_idempotencia=None):
+            enviados.append(dados['name'])
+            return {'success': True, 'data': {'id': f'cus_{len(enviados)}'}}
+        
+        with patch('asaas_app.services.AsaasService.create_customer', criar_cliente), \
+                patch('asaas_app.limite_service.reservar_chamada_asaas', return_value=0):
+            lote = processar_lote(lote, concorrencia=2)
+        
+        self.assertNotIn(em_envio.descricao, enviados)
+        self.assertEqual(sorted(enviados), sorted(
+            SincronizacaoItem.objects.exclude(pk=em_envio.pk).values_list('descricao', flat=True)
+        ))
+        self.assertEqual(SincronizacaoItem.objects.get(pk=em_envio.pk).status, 'ENVIANDO')
+        self.assertEqual((lote.status, lote.pendentes), ('EXECUTANDO', 1))
@@ -0,0 +1,108 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from ..models import Cliente, Recorrencia
+
+
+class ViewsTest(TestCase):
+    """Testes para as views"""
+    
+    def setUp(self):
+        from django.contrib.auth.models import User
+        self.client = Client()
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        self.cliente = Cliente.objects.create(
+            name="Pedro Oliveira",
+            cpfCnpj="11122233344",
+            email="pedro@example.com"
+        )
+    
+    def test_home_view(self):
+        """Testa a view da home"""
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'home.html')
+    
+    def test_cliente_list_view(self):
+        """Testa a listagem de clientes"""
+        response = self.client.get(reverse('cliente_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'clientes/list.html')
+        self.assertContains(response, 'Pedro Oliveira')
+    
+    def test_cliente_create_view_get(self):
+        """Testa o acesso ao formulário de criação de cliente"""
+        response = self.client.get(reverse('cliente_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'clientes/form.html')
+    
+    def test_recorrencia_list_view(self):
+        """Testa a listagem de recorrências"""
+        response = self.client.get(reverse('recorrencia_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'recorrencias/list.html')
+
+
+class RecorrenciaCreateViewTest(TestCase):
+    """Testes para a criação de recorrência pela tela"""
+    
+    def test_cria_no_asaas_grava_e_enfileira_whatsapp(self):
+        """Testa que a recorrência é gravada antes do link e da mensagem de WhatsApp que a referenciam"""
+        from unittest.mock import patch
+        from django.contrib.auth.models import User
+        from django.test import override_settings
+        from ..models import MensagemWhatsApp
+        
+        cliente = Cliente.objects.create(
+            name='Ana', cpfCnpj='52998224725', email='ana@example.com', mobilePhone='11987654321',
+            asaas_id='cus_1', synced_with_asaas=True,
+        )
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        dados = {
+            'cliente': cliente.pk, 'value': '99.90', 'cycle': 'MONTHLY', 'billing_type': 'PIX',
+            'description': 'Plano', 'next_due_date': '2025-05-10',
+        }
+        link = {'success': True, 'data': {'id': 'lnk_1', 'url': 'https://asaas.com/c/1', 'status': 'ACTIVE'}}
+        with patch('asaas_app.services.AsaasService.create_subscription', return_value={'success': True, 'data': {'id': 'sub_1'}}), \
+                patch('asaas_app.services.AsaasService.create_payment_link', return_value=link), \
+                patch('asaas_app.whatsapp_service.WhatsAppService.send_message') as enviar, \
+                override_settings(WHATSAPP_NUMBERS=[]):
+            response = self.client.post(reverse('recorrencia_create'), dados)
+        
+        self.assertRedirects(response, reverse('recorrencia_list'), fetch_redirect_response=False)
+        recorrencia = Recorrencia.objects.get(asaas_id='sub_1')
+        self.assertFalse(recorrencia.pendente_sincronizacao)
+        self.assertEqual(recorrencia.link_pagamento.asaas_id, 'lnk_1')
+        mensagem = MensagemWhatsApp.objects.get(origem='nova_recorrencia')
+        self.assertEqual(mensagem.recorrencia, recorrencia)
+        self.assertTrue(mensagem.chave_deduplicacao.endswith(f':nova_recorrencia:{recorrencia.pk}'))
+        enviar.assert_not_called()  # só enfileirada; o envio é do worker
+    
+    def test_reenvio_do_formulario_nao_duplica(self):
+        """Testa que o mesmo formulário reenviado não duplica, mas uma assinatura idêntica nova é criada"""
+        from unittest.mock import patch
+        from django.contrib.auth.models import User
+        from ..services import AsaasService
+        
+        cliente = Cliente.objects.create(
+            name='Ana', cpfCnpj='52998224725', email='ana@example.com', asaas_id='cus_1', synced_with_asaas=True,
+        )
+        self.client.force_login(User.objects.create_user('admin', password='x'))
+        dados = {
+            'cliente': cliente.pk, 'value': '99.90', 'cycle': 'MONTHLY', 'billing_type': 'PIX',
+            'description': 'Plano', 'next_due_date': '2025-05-10', 'chave_envio': 'form-1',
+        }
+        respostas = iter([{'success': True, 'data': {'id': 'sub_1'}}, {'success': True, 'data': {'id': 'sub_2'}}])
+        
+        def asaas(metodo, endpoint, data=None, params=None):
+            if endpoint == 'subscriptions':
+                return next(respostas)
+            return {'success': False, 'error': 'indisponível'}
+        
+        with patch.object(AsaasService, '_make_request', side_effect=asaas):
+            self.client.post(reverse('recorrencia_create'), dados)
+            response = self.client.post(reverse('recorrencia_create'), dados)
+            self.assertRedirects(response, reverse('recorrencia_list'), fetch_redirect_response=False)
+            self.assertEqual(Recorrencia.objects.count(), 1)
+            
+            self.client.post(reverse('recorrencia_create'), {**dados, 'chave_envio': 'form-2'})
+        self.assertEqual(sorted(Recorrencia.objects.values_list('asaas_id', flat=True)), ['sub_1', 'sub_2'])
@@ -0,0 +1,69 @@
+from django.test import TestCase
+
+
+class WhatsAppConexaoTest(TestCase):
+    """Testes para o cache do estado de conexão da instância Evolution"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def _resposta(self, status_code, data):
+        from unittest.mock import Mock
+        return Mock(status_code=status_code, json=Mock(return_value=data), text=str(data))
+    
+    def _service(self, session):
+        from unittest.mock import patch
+        from django.test import override_settings
+        from ..whatsapp_service import WhatsAppService
+        
+        with override_settings(WHATSAPP_API_URL='http://evo', WHATSAPP_API_KEY='k', WHATSAPP_INSTANCE_ID='inst', WHATSAPP_PROVIDER='evolution'):
+            with patch('asaas_app.whatsapp_service.get_session', return_value=session):
+                return WhatsAppService()
+    
+    def test_envio_sem_reconectar_quando_conectada(self):
+        """Testa se o envio pula o connect quando a instância está conectada em cache"""
+        from unittest.mock import Mock
+        from django.core.cache import cache
+        
+        session = Mock()
+        session.get.return_value = self._resposta(200, [{'name': 'inst', 'connectionStatus': 'open'}])
+        session.post.return_value = self._resposta(201, {'key': {'id': '1'}})
+        service = self._service(session)
+        
+        self.assertTrue(service.send_message('81999998888', 'Olá')['success'])
+        self.assertTrue(service.send_message('81999998888', 'Olá de novo')['success'])
+        
+        # Apenas uma consulta de status (fetchInstances) e nenhum connect
+        self.assertEqual(session.get.call_count, 1)
+        self.assertIn('fetchInstances', session.get.call_args[0][0])
+        self.assertEqual(session.post.call_count, 2)
+        
+        # Falha de envio invalida o estado em cache
+        session.post.return_value = self._resposta(500, {'error': {'message': 'erro'}})
+        self.assertFalse(service.send_message('81999998888', 'Olá')['success'])
+        self.assertIsNone(cache.get(service._estado_conexao_key()))
+    
+    def test_variante_url_descoberta_uma_vez(self):
+        """Testa se a URL alternativa (/api) é descoberta no primeiro 404 e reutilizada"""
+        from unittest.mock import Mock
+        from django.core.cache import cache
+        
+        session = Mock()
+        session.post.side_effect = [
+            self._resposta(404, {}),
+            self._resposta(201, {'key': {'id': '1'}}),
+            self._resposta(201, {'key': {'id': '2'}}),
+        ]
+        service = self._service(session)
+        cache.set(service._estado_conexao_key(), True)
+        
+        self.assertTrue(service.send_message('81999998888', 'Olá')['success'])
+        self.assertTrue(service.send_message('81999998888', 'Olá de novo')['success'])
+        
+        urls = [c[0][0] for c in session.post.call_args_list]
+        self.assertEqual(urls, [
+            'http://evo/message/sendText/inst',
+            'http://evo/api/message/sendText/inst',
+            'http://evo/api/message/sendText/inst',
+        ])
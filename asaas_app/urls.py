@@ -32,6 +32,28 @@ urlpatterns = [
     path('recorrencias/<int:pk>/checkout-assinatura/', views.recorrencia_checkout_assinatura, name='recorrencia_checkout_assinatura'),
     path('recorrencias/importar/', views.import_recorrencias, name='import_recorrencias'),
     
+    # Sincronização em lote com o Asaas
+    path('sincronizacao/', views.sincronizacao_list, name='sincronizacao_list'),
+    path('sincronizacao/<int:pk>/', views.sincronizacao_detail, name='sincronizacao_detail'),
+    
+    # Reajuste de preços em massa
+    path('reajustes/', views.reajuste_list, name='reajuste_list'),
+    path('reajustes/novo/', views.reajuste_create, name='reajuste_create'),
+    path('reajustes/<int:pk>/', views.reajuste_detail, name='reajuste_detail'),
+    
+    # Webhook de status de entrega do WhatsApp
+    path('whatsapp/webhook/', views.whatsapp_webhook, name='whatsapp_webhook'),
+    path('asaas/webhook/', views.asaas_webhook, name='asaas_webhook'),
+    
+    # Campanhas de Cobrança
+    path('campanhas/', views.campanha_list, name='campanha_list'),
+    path('campanhas/nova/', views.campanha_create, name='campanha_create'),
+    path('campanhas/<int:pk>/', views.campanha_detail, name='campanha_detail'),
+    path('campanhas/metricas/', views.whatsapp_metricas, name='whatsapp_metricas'),
+    path('campanhas/modelos/', views.modelo_mensagem_list, name='modelo_mensagem_list'),
+    path('campanhas/modelos/<slug:codigo>/', views.modelo_mensagem_edit, name='modelo_mensagem_edit'),
+    path('campanhas/modelos/<slug:codigo>/preview/', views.modelo_mensagem_preview, name='modelo_mensagem_preview'),
+    
     # Plano de Contas
     path('financeiro/plano-contas/', views.plano_contas_list, name='plano_contas_list'),
     path('financeiro/plano-contas/novo/', views.plano_contas_create, name='plano_contas_create'),
@@ -57,6 +79,8 @@ urlpatterns = [
     
     # Relatórios
     path('financeiro/relatorios/', views.relatorios, name='relatorios'),
+    path('financeiro/relatorios/projecao/', views.projecao_receita, name='projecao_receita'),
+    path('financeiro/relatorios/coortes/', views.relatorio_coortes, name='relatorio_coortes'),
     
     # Links de Pagamento
     path('links-pagamento/', views.link_pagamento_list, name='link_pagamento_list'),
@@ -65,6 +89,7 @@ urlpatterns = [
     path('links-pagamento/<int:pk>/deletar/', views.link_pagamento_delete, name='link_pagamento_delete'),
     path('links-pagamento/<int:pk>/sincronizar/', views.link_pagamento_sync, name='link_pagamento_sync'),
     path('links-pagamento/importar/', views.import_link_pagamento, name='import_link_pagamento'),
+    path('links-pagamento/limpar/', views.link_pagamento_limpar, name='link_pagamento_limpar'),
     
     # Parceiros
     path('parceiros/', views.parceiro_list, name='parceiro_list'),
@@ -72,6 +97,8 @@ urlpatterns = [
     path('parceiros/<int:pk>/editar/', views.parceiro_edit, name='parceiro_edit'),
     path('parceiros/<int:pk>/deletar/', views.parceiro_delete, name='parceiro_delete'),
     path('parceiros/<int:pk>/', views.parceiro_detail, name='parceiro_detail'),
+    path('parceiros/<int:pk>/extrato/', views.parceiro_extrato, name='parceiro_extrato'),
+    path('parceiros/extrato/', views.parceiros_extrato, name='parceiros_extrato'),
     
     # Configuração Financeira
     path('parceiros/configuracao/', views.configuracao_financeira, name='configuracao_financeira'),
@@ -2,23 +2,62 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+from django.template import TemplateSyntaxError
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q, Sum, Count
 from django.db.models.functions import TruncMonth
 from .models import (
     Cliente, Recorrencia, PlanoContas, Movimentacao, RegraCategorizacao, LinkPagamento,
-    Parceiro, ConfiguracaoFinanceira, FechamentoMensal, ComissaoIndicador, ComissaoSocio
+    Parceiro, ConfiguracaoFinanceira, FechamentoMensal, ComissaoIndicador, ComissaoSocio,
+    CampanhaCobranca, SincronizacaoLote, Reajuste, AtualizacaoCoortes
 )
 from .forms import (
     ClienteForm, RecorrenciaForm, PlanoContasForm, MovimentacaoForm, RegraCategorizacaoForm,
-    LinkPagamentoForm, ParceiroForm, ConfiguracaoFinanceiraForm
+    LinkPagamentoForm, ParceiroForm, ConfiguracaoFinanceiraForm, CampanhaCobrancaForm,
+    ModeloMensagemForm, ReajusteForm
 )
 from .services import AsaasService
+from .comissao_service import (
+    registrar_comissoes, estornar_comissoes, liquidar_comissoes, get_saldo,
+    iterar_extrato, EXTRATO_CABECALHO
+)
+from .arquivo_service import comissoes_indicador_fechamento, iterar_comissoes_arquivadas
+from .perfil_service import PerfilCalculo
+from .outbox_service import enfileirar_mensagem, enfileirar_para_numeros_notificacao, atualizar_status_entrega
 from .whatsapp_service import WhatsAppService
+from .metricas_service import metricas_whatsapp
+from .mensagem_service import (
+    mensagem_boleto, mensagem_link, renderizar, renderizar_texto,
+    contexto_nova_recorrencia, contexto_primeira_cobranca, contexto_exemplo, obter_modelo, PADROES, VARIAVEIS,
+)
+from .campanha_service import executar_campanha, relatorio_campanha
+from .cobranca_service import cobrancas_da_recorrencia, sincronizar_recorrencia, processar_webhook
+from .sincronizacao_service import (
+    dados_cliente, dados_recorrencia, sincronizar_objeto, sincronizar_alteracoes, lote_em_andamento, pendencias,
+)
+from .projecao_service import atualizar_projecoes, projecao_receita as calcular_projecao_receita
+from .coorte_service import atualizar_coortes, tabela_coortes, PERIODOS_RELATORIO
+from .link_service import limpar_links, LINKS_DIAS_RETENCAO
+from .historico_service import conteudo_recorrencia, nova_alteracao, registrar_alteracoes
+from .idempotencia_service import liberar as liberar_chaves
+from .importacao_service import (
+    importar_clientes as importar_clientes_asaas, importar_recorrencias as importar_recorrencias_asaas,
+)
+from .reajuste_service import calcular_reajuste, aplicar_reajuste, reverter_reajuste, propagar_reajuste, ITENS_PREVIA
 from datetime import datetime, timedelta
 from decimal import Decimal
+import csv
+import hmac
+import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +107,20 @@ def logout_view(request):
     return redirect('login')
 
 
+# ==================== CRIAÇÃO NO ASAAS ====================
+
+def _chave_envio(form, prefixo):
+    """Chave de idempotência da criação: o token do formulário (reenvio não duplica) ou, sem ele, uma nova"""
+    return f'{prefixo}:form:{form.cleaned_data.get("chave_envio") or uuid.uuid4().hex}'
+
+
+def _ja_registrado(modelo, result):
+    """Registro local do objeto devolvido por uma criação reaproveitada (ex: formulário reenviado), se já existir"""
+    if result.get('success') and result.get('reaproveitada'):
+        return modelo.objects.filter(asaas_id=result['data'].get('id')).first()
+    return None
+
+
 # ==================== HOME ====================
 
 @login_required(login_url='login')
@@ -141,30 +194,22 @@ def cliente_create(request):
             
             # Tenta criar o cliente no Asaas
             asaas_service = AsaasService()
-            customer_data = {
-                'name': cliente.name,
-                'cpfCnpj': cliente.cpfCnpj,
-                'email': cliente.email,
-                'phone': cliente.phone or '',
-                'mobilePhone': cliente.mobilePhone or '',
-                'address': cliente.address or '',
-                'addressNumber': cliente.addressNumber or '',
-                'complement': cliente.complement or '',
-                'province': cliente.province or '',
-                'postalCode': cliente.postalCode or '',
-                'observations': cliente.observations or '',
-            }
-            
-            result = asaas_service.create_customer(customer_data)
+            result = asaas_service.create_customer(
+                dados_cliente(cliente), chave_idempotencia=_chave_envio(form, 'cliente')
+            )
+            if _ja_registrado(Cliente, result):
+                messages.info(request, 'Este cadastro já tinha sido enviado; nenhum cliente foi duplicado.')
+                return redirect('cliente_list')
             
             if result.get('success'):
                 cliente.asaas_id = result['data']['id']
-                cliente.synced_with_asaas = True
                 messages.success(request, 'Cliente cadastrado com sucesso no Asaas!')
             else:
                 messages.warning(request, f'Cliente salvo localmente, mas não foi possível sincronizar com Asaas: {result.get("error")}')
             
             cliente.save()
+            if result.get('success'):
+                cliente.marcar_sincronizado(timezone.now())
             return redirect('cliente_list')
     else:
         form = ClienteForm()
@@ -183,30 +228,20 @@ def cliente_edit(request, pk):
             cliente = form.save(commit=False)
             
             # Se já está sincronizado, atualiza no Asaas
+            sincronizado = False
             if cliente.asaas_id:
                 asaas_service = AsaasService()
-                customer_data = {
-                    'name': cliente.name,
-                    'cpfCnpj': cliente.cpfCnpj,
-                    'email': cliente.email,
-                    'phone': cliente.phone or '',
-                    'mobilePhone': cliente.mobilePhone or '',
-                    'address': cliente.address or '',
-                    'addressNumber': cliente.addressNumber or '',
-                    'complement': cliente.complement or '',
-                    'province': cliente.province or '',
-                    'postalCode': cliente.postalCode or '',
-                    'observations': cliente.observations or '',
-                }
-                
-                result = asaas_service.update_customer(cliente.asaas_id, customer_data)
+                result = asaas_service.update_customer(cliente.asaas_id, dados_cliente(cliente))
+                sincronizado = result.get('success')
                 
-                if result.get('success'):
+                if sincronizado:
                     messages.success(request, 'Cliente atualizado com sucesso!')
                 else:
                     messages.warning(request, f'Cliente atualizado localmente, mas não foi possível sincronizar com Asaas: {result.get("error")}')
             
             cliente.save()
+            if sincronizado:
+                cliente.marcar_sincronizado(timezone.now())
             return redirect('cliente_list')
     else:
         form = ClienteForm(instance=cliente)
@@ -240,33 +275,9 @@ def cliente_sync(request, pk):
     """Sincroniza um cliente com o Asaas"""
     cliente = get_object_or_404(Cliente, pk=pk)
     
-    asaas_service = AsaasService()
-    customer_data = {
-        'name': cliente.name,
-        'cpfCnpj': cliente.cpfCnpj,
-        'email': cliente.email,
-        'phone': cliente.phone or '',
-        'mobilePhone': cliente.mobilePhone or '',
-        'address': cliente.address or '',
-        'addressNumber': cliente.addressNumber or '',
-        'complement': cliente.complement or '',
-        'province': cliente.province or '',
-        'postalCode': cliente.postalCode or '',
-        'observations': cliente.observations or '',
-    }
-    
-    if cliente.asaas_id:
-        # Atualiza
-        result = asaas_service.update_customer(cliente.asaas_id, customer_data)
-    else:
-        # Cria
-        result = asaas_service.create_customer(customer_data)
-        if result.get('success'):
-            cliente.asaas_id = result['data']['id']
+    result = sincronizar_objeto(cliente)
     
     if result.get('success'):
-        cliente.synced_with_asaas = True
-        cliente.save()
         messages.success(request, 'Cliente sincronizado com sucesso!')
     else:
         messages.error(request, f'Erro ao sincronizar cliente: {result.get("error")}')
@@ -280,7 +291,7 @@ def cliente_sync(request, pk):
 def recorrencia_list(request):
     """Lista todas as recorrências com filtros e pesquisa"""
     try:
-        recorrencias = Recorrencia.objects.select_related('cliente').all()
+        recorrencias = Recorrencia.objects.select_related('cliente', 'link_pagamento').all()
         
         # Pesquisa por nome do cliente ou descrição
         search_query = request.GET.get('search', '').strip()
@@ -345,26 +356,19 @@ def recorrencia_create(request):
             
             # Tenta criar a assinatura no Asaas
             asaas_service = AsaasService()
-            subscription_data = {
-                'customer': recorrencia.cliente.asaas_id,
-                'billingType': recorrencia.billing_type,
-                'value': float(recorrencia.value),
-                'nextDueDate': recorrencia.next_due_date.strftime('%Y-%m-%d'),
-                'cycle': recorrencia.cycle,
-                'description': recorrencia.description,
-            }
-            
-            if recorrencia.end_date:
-                subscription_data['endDate'] = recorrencia.end_date.strftime('%Y-%m-%d')
-            
-            if recorrencia.max_payments:
-                subscription_data['maxPayments'] = recorrencia.max_payments
-            
-            result = asaas_service.create_subscription(subscription_data)
+            result = asaas_service.create_subscription(
+                dados_recorrencia(recorrencia), chave_idempotencia=_chave_envio(form, 'recorrencia')
+            )
+            if _ja_registrado(Recorrencia, result):
+                messages.info(request, 'Esta recorrência já tinha sido enviada; nenhuma assinatura foi duplicada.')
+                return redirect('recorrencia_list')
             
             if result.get('success'):
+                # Grava antes do link e da mensagem, que referenciam a recorrência
                 recorrencia.asaas_id = result['data']['id']
-                recorrencia.synced_with_asaas = True
+                recorrencia.save()
+                recorrencia.marcar_sincronizado(timezone.now())
+                atualizar_projecoes([recorrencia.pk])
                 messages.success(request, 'Recorrência cadastrada com sucesso no Asaas!')
                 
                 # Cria link de pagamento automaticamente
@@ -373,9 +377,10 @@ def recorrencia_create(request):
                 # Envia mensagem WhatsApp para o cliente
                 enviar_whatsapp_recorrencia(recorrencia)
             else:
+                recorrencia.save()
+                atualizar_projecoes([recorrencia.pk])
                 messages.warning(request, f'Recorrência salva localmente, mas não foi possível sincronizar com Asaas: {result.get("error")}')
             
-            recorrencia.save()
             return redirect('recorrencia_list')
     else:
         form = RecorrenciaForm()
@@ -389,31 +394,28 @@ def recorrencia_edit(request, pk):
     recorrencia = get_object_or_404(Recorrencia, pk=pk)
     
     if request.method == 'POST':
+        anterior = conteudo_recorrencia(recorrencia)
         form = RecorrenciaForm(request.POST, instance=recorrencia)
         if form.is_valid():
             recorrencia = form.save(commit=False)
             
             # Se já está sincronizado, atualiza no Asaas
+            sincronizado = False
             if recorrencia.asaas_id:
                 asaas_service = AsaasService()
-                subscription_data = {
-                    'billingType': recorrencia.billing_type,
-                    'value': float(recorrencia.value),
-                    'nextDueDate': recorrencia.next_due_date.strftime('%Y-%m-%d'),
-                    'description': recorrencia.description,
-                }
-                
-                if recorrencia.end_date:
-                    subscription_data['endDate'] = recorrencia.end_date.strftime('%Y-%m-%d')
+                result = asaas_service.update_subscription(recorrencia.asaas_id, dados_recorrencia(recorrencia))
+                sincronizado = result.get('success')
                 
-                result = asaas_service.update_subscription(recorrencia.asaas_id, subscription_data)
-                
-                if result.get('success'):
+                if sincronizado:
                     messages.success(request, 'Recorrência atualizada com sucesso!')
                 else:
                     messages.warning(request, f'Recorrência atualizada localmente, mas não foi possível sincronizar com Asaas: {result.get("error")}')
             
             recorrencia.save()
+            registrar_alteracoes([nova_alteracao(recorrencia.pk, 'EDICAO', anterior, conteudo_recorrencia(recorrencia))])
+            atualizar_projecoes([recorrencia.pk])
+            if sincronizado:
+                recorrencia.marcar_sincronizado(timezone.now())
             return redirect('recorrencia_list')
     else:
         form = RecorrenciaForm(instance=recorrencia)
@@ -435,7 +437,9 @@ def recorrencia_delete(request, pk):
             if not result.get('success'):
                 messages.warning(request, f'Recorrência removida localmente, mas não foi possível remover do Asaas: {result.get("error")}')
         
+        pk = recorrencia.pk
         recorrencia.delete()
+        atualizar_projecoes([pk])
         messages.success(request, 'Recorrência removida com sucesso!')
         return redirect('recorrencia_list')
     
@@ -453,25 +457,11 @@ def recorrencia_boletos(request, pk):
         messages.error(request, 'Esta recorrência precisa estar sincronizada com o Asaas para visualizar os boletos.')
         return redirect('recorrencia_list')
     
-    # Busca as cobranças da assinatura no Asaas
-    asaas_service = AsaasService()
-    result = asaas_service.list_subscription_payments(recorrencia.asaas_id)
-    
-    boletos = []
-    if result.get('success'):
-        payments = result['data'].get('data', [])
-        for payment in payments:
-            boletos.append({
-                'id': payment.get('id'),
-                'value': payment.get('value'),
-                'dueDate': payment.get('dueDate'),
-                'status': payment.get('status'),
-                'bankSlipUrl': payment.get('bankSlipUrl'),
-                'invoiceUrl': payment.get('invoiceUrl'),
-                'billingType': payment.get('billingType'),
-            })
-    else:
-        messages.error(request, f'Erro ao buscar boletos: {result.get("error")}')
+    # Cobranças do espelho local; ?atualizar=1 busca novamente no Asaas
+    if request.GET.get('atualizar'):
+        if not sincronizar_recorrencia(recorrencia):
+            messages.error(request, 'Erro ao buscar boletos no Asaas.')
+    boletos = cobrancas_da_recorrencia(recorrencia).order_by('-vencimento')
     
     context = {
         'recorrencia': recorrencia,
@@ -489,9 +479,9 @@ def recorrencia_enviar_boleto_whatsapp(request, pk):
     recorrencia = get_object_or_404(Recorrencia, pk=pk)
     
     # Verifica se tem telefone
-    telefone = recorrencia.cliente.mobilePhone or recorrencia.cliente.phone
+    telefone = recorrencia.cliente.telefone_e164
     if not telefone:
-        messages.error(request, 'Cliente não possui telefone cadastrado.')
+        messages.error(request, 'Cliente não possui telefone válido cadastrado.')
         return redirect('recorrencia_list')
     
     # Verifica se está sincronizada
@@ -500,52 +490,29 @@ def recorrencia_enviar_boleto_whatsapp(request, pk):
         return redirect('recorrencia_list')
     
     # Busca o último boleto
-    asaas_service = AsaasService()
-    result = asaas_service.list_subscription_payments(recorrencia.asaas_id, limit=1)
+    cobranca = cobrancas_da_recorrencia(recorrencia).order_by('-vencimento').first()
     
-    if not result.get('success') or not result['data'].get('data'):
+    if cobranca is None:
         messages.error(request, 'Nenhum boleto encontrado para esta recorrência.')
         return redirect('recorrencia_list')
     
-    boleto = result['data']['data'][0]
-    bank_slip_url = boleto.get('bankSlipUrl')
-    
-    if not bank_slip_url:
+    if not cobranca.url_boleto:
         messages.error(request, 'Boleto não possui URL de download.')
         return redirect('recorrencia_list')
     
-    # Formata a mensagem
-    cliente_nome = recorrencia.cliente.name.split()[0]  # Primeiro nome
-    valor = boleto.get('value', recorrencia.value)
-    vencimento = boleto.get('dueDate', recorrencia.next_due_date)
-    
-    mensagem = f"""Olá *{cliente_nome}*! 👋
-
-🔔 *Cobrança Recorrente - {recorrencia.description}*
-
-💰 Valor: R$ {valor}
-📅 Vencimento: {vencimento}
-
-📄 *Acesse seu boleto:*
-{bank_slip_url}
-
-Você também pode pagar via PIX usando o QR Code que está no boleto.
-
-✅ Após o pagamento, você receberá a confirmação automaticamente.
-
-Dúvidas? Estamos à disposição!
-
-Atenciosamente,
-Equipe de Cobrança"""
+    boleto = cobranca.como_payment()
     
-    # Envia pelo WhatsApp
-    whatsapp_service = WhatsAppService()
-    result_whatsapp = whatsapp_service.send_message(telefone, mensagem)
+    # Formata a mensagem
+    mensagem = mensagem_boleto(recorrencia, boleto)
     
-    if result_whatsapp.get('success'):
-        messages.success(request, f'Boleto enviado com sucesso para {telefone}!')
+    # Enfileira para envio pelo WhatsApp
+    _, criada = enfileirar_mensagem(
+        telefone, mensagem, origem='boleto_recorrencia', recorrencia=recorrencia, referencia=boleto.get('id')
+    )
+    if criada:
+        messages.success(request, f'Boleto enfileirado para envio a {telefone}!')
     else:
-        messages.error(request, f'Erro ao enviar WhatsApp: {result_whatsapp.get("error")}')
+        messages.info(request, f'Este boleto já foi enviado recentemente para {telefone}.')
     
     return redirect('recorrencia_list')
 
@@ -558,54 +525,29 @@ def recorrencia_enviar_link_whatsapp(request, pk):
     recorrencia = get_object_or_404(Recorrencia, pk=pk)
     
     # Verifica se tem telefone
-    telefone = recorrencia.cliente.mobilePhone or recorrencia.cliente.phone
+    telefone = recorrencia.cliente.telefone_e164
     if not telefone:
-        messages.error(request, 'Cliente não possui telefone cadastrado.')
+        messages.error(request, 'Cliente não possui telefone válido cadastrado.')
         return redirect('recorrencia_list')
     
-    # Busca o link de pagamento desta recorrência
-    link = LinkPagamento.objects.filter(
-        cliente=recorrencia.cliente,
-        nome__icontains=recorrencia.description
-    ).first()
+    # Link de pagamento desta recorrência
+    link = recorrencia.link_pagamento
     
     if not link or not link.url:
         messages.error(request, 'Nenhum link de pagamento encontrado. Crie um link primeiro.')
         return redirect('recorrencia_list')
     
     # Formata a mensagem
-    cliente_nome = recorrencia.cliente.name.split()[0]  # Primeiro nome
-    
-    mensagem = f"""Olá *{cliente_nome}*! 👋
-
-🔗 *Link de Pagamento - {recorrencia.description}*
-
-💰 Valor: R$ {recorrencia.value}
-🔄 Frequência: {recorrencia.get_cycle_display()}
-
-📲 *Clique no link abaixo para pagar:*
-{link.url}
-
-✅ Escolha sua forma de pagamento preferida:
-• PIX (instantâneo)
-• Boleto Bancário
-• Cartão de Crédito
-
-Após o pagamento, você receberá a confirmação automaticamente.
-
-Dúvidas? Estamos à disposição!
-
-Atenciosamente,
-Equipe de Cobrança"""
-    
-    # Envia pelo WhatsApp
-    whatsapp_service = WhatsAppService()
-    result_whatsapp = whatsapp_service.send_message(telefone, mensagem)
+    mensagem = mensagem_link(recorrencia, link)
     
-    if result_whatsapp.get('success'):
-        messages.success(request, f'Link de pagamento enviado com sucesso para {telefone}!')
+    # Enfileira para envio pelo WhatsApp
+    _, criada = enfileirar_mensagem(
+        telefone, mensagem, origem='link_recorrencia', recorrencia=recorrencia, referencia=link.pk
+    )
+    if criada:
+        messages.success(request, f'Link de pagamento enfileirado para envio a {telefone}!')
     else:
-        messages.error(request, f'Erro ao enviar WhatsApp: {result_whatsapp.get("error")}')
+        messages.info(request, f'Este link já foi enviado recentemente para {telefone}.')
     
     return redirect('recorrencia_list')
 
@@ -619,34 +561,9 @@ def recorrencia_sync(request, pk):
         messages.error(request, 'O cliente precisa estar sincronizado com o Asaas primeiro.')
         return redirect('recorrencia_list')
     
-    asaas_service = AsaasService()
-    subscription_data = {
-        'customer': recorrencia.cliente.asaas_id,
-        'billingType': recorrencia.billing_type,
-        'value': float(recorrencia.value),
-        'nextDueDate': recorrencia.next_due_date.strftime('%Y-%m-%d'),
-        'cycle': recorrencia.cycle,
-        'description': recorrencia.description,
-    }
-    
-    if recorrencia.end_date:
-        subscription_data['endDate'] = recorrencia.end_date.strftime('%Y-%m-%d')
-    
-    if recorrencia.max_payments:
-        subscription_data['maxPayments'] = recorrencia.max_payments
-    
-    if recorrencia.asaas_id:
-        # Atualiza
-        result = asaas_service.update_subscription(recorrencia.asaas_id, subscription_data)
-    else:
-        # Cria
-        result = asaas_service.create_subscription(subscription_data)
-        if result.get('success'):
-            recorrencia.asaas_id = result['data']['id']
+    result = sincronizar_objeto(recorrencia)
     
     if result.get('success'):
-        recorrencia.synced_with_asaas = True
-        recorrencia.save()
         messages.success(request, 'Recorrência sincronizada com sucesso!')
     else:
         messages.error(request, f'Erro ao sincronizar recorrência: {result.get("error")}')
@@ -654,60 +571,164 @@ def recorrencia_sync(request, pk):
     return redirect('recorrencia_list')
 
 
+
+# Tempo máximo de uma sincronização em lote disparada pela tela (o restante é retomado depois)
+SINCRONIZACAO_TEMPO_MAXIMO_TELA = 25
+
+
+@login_required(login_url='login')
+def sincronizacao_list(request):
+    """
+    Sincronização em lote das alterações locais de clientes e recorrências
+    
+    O POST processa o lote em andamento (ou cria um novo) por até
+    SINCRONIZACAO_TEMPO_MAXIMO_TELA segundos; lotes maiores são concluídos
+    pelo comando sincronizar_alteracoes ou clicando novamente.
+    """
+    if request.method == 'POST':
+        lote = sincronizar_alteracoes(tempo_maximo=SINCRONIZACAO_TEMPO_MAXIMO_TELA)
+        if lote is None:
+            messages.info(request, 'Nenhuma alteração pendente de sincronização.')
+            return redirect('sincronizacao_list')
+        if lote.status == 'CONCLUIDA':
+            messages.success(
+                request, f'Sincronização concluída: {lote.total_sincronizados} registro(s) sincronizado(s), {lote.total_erros} erro(s).'
+            )
+        else:
+            messages.warning(request, f'Sincronização parcial: {lote.pendentes} registro(s) pendente(s). Clique novamente para continuar.')
+        return redirect('sincronizacao_detail', pk=lote.pk)
+    
+    context = {
+        'pendencias': pendencias(),
+        'em_andamento': lote_em_andamento(),
+        'lotes': SincronizacaoLote.objects.all()[:20],
+    }
+    return render(request, 'sincronizacao/list.html', context)
+
+
+@login_required(login_url='login')
+def sincronizacao_detail(request, pk):
+    """Resultado por registro de uma sincronização em lote"""
+    lote = get_object_or_404(SincronizacaoLote, pk=pk)
+    itens = lote.itens.all()
+    status = request.GET.get('status', '')
+    if status:
+        itens = itens.filter(status=status)
+    
+    context = {
+        'lote': lote,
+        'itens': Paginator(itens, 50).get_page(request.GET.get('page')),
+        'status': status,
+    }
+    return render(request, 'sincronizacao/detail.html', context)
+
+# ==================== REAJUSTE DE PREÇOS ====================
+
+@login_required(login_url='login')
+def reajuste_list(request):
+    """Lista os reajustes de preço em massa"""
+    return render(request, 'reajustes/list.html', {'reajustes': Reajuste.objects.all()[:50]})
+
+
+def _mensagem_envio_reajuste(request, reajuste):
+    """Resultado do envio ao Asaas de um reajuste"""
+    pendentes = reajuste.itens_a_enviar().count()
+    if pendentes:
+        messages.warning(request, f'Envio parcial: {pendentes} recorrência(s) pendente(s). Clique em continuar.')
+    elif reajuste.total_erros:
+        messages.warning(request, f'{reajuste.total_erros} recorrência(s) recusada(s) pelo Asaas voltaram ao valor anterior.')
+    else:
+        messages.success(request, f'Reajuste "{reajuste.nome}": {reajuste.get_status_display().lower()}.')
+
+
+@login_required(login_url='login')
+def reajuste_create(request):
+    """
+    Prévia e aplicação de um reajuste de preço em massa
+    
+    O botão "Pré-visualizar" mostra o impacto na receita sem gravar nada;
+    "Aplicar" grava os novos valores e envia ao Asaas por até
+    SINCRONIZACAO_TEMPO_MAXIMO_TELA segundos (o restante continua pela tela
+    do reajuste ou pelo comando propagar_reajustes).
+    """
+    previa = None
+    if request.method == 'POST':
+        form = ReajusteForm(request.POST)
+        if form.is_valid():
+            reajuste = form.save(commit=False)
+            if request.POST.get('acao') == 'aplicar':
+                reajuste = aplicar_reajuste(reajuste, usuario=request.user)
+                if reajuste is None:
+                    messages.info(request, 'Nenhuma recorrência muda de valor com este reajuste.')
+                    return redirect('reajuste_create')
+                propagar_reajuste(reajuste, tempo_maximo=SINCRONIZACAO_TEMPO_MAXIMO_TELA)
+                _mensagem_envio_reajuste(request, reajuste)
+                return redirect('reajuste_detail', pk=reajuste.pk)
+            
+            itens, resumo = calcular_reajuste(reajuste)
+            previa = {'itens': itens[:ITENS_PREVIA], **resumo}
+    else:
+        form = ReajusteForm()
+    
+    return render(request, 'reajustes/form.html', {'form': form, 'previa': previa})
+
+
+@login_required(login_url='login')
+def reajuste_detail(request, pk):
+    """Progresso do envio ao Asaas de um reajuste, com as ações de continuar e reverter"""
+    reajuste = get_object_or_404(Reajuste, pk=pk)
+    
+    if request.method == 'POST':
+        if request.POST.get('acao') == 'reverter':
+            reajuste = reverter_reajuste(reajuste)
+        if reajuste.status in ('ENVIANDO', 'REVERTENDO'):
+            propagar_reajuste(reajuste, tempo_maximo=SINCRONIZACAO_TEMPO_MAXIMO_TELA)
+            _mensagem_envio_reajuste(request, reajuste)
+        return redirect('reajuste_detail', pk=reajuste.pk)
+    
+    itens = reajuste.itens.select_related('recorrencia__cliente')
+    status = request.GET.get('status', '')
+    if status:
+        itens = itens.filter(status=status)
+    
+    context = {
+        'reajuste': reajuste,
+        'contagem': dict(reajuste.itens.values_list('status').annotate(total=Count('pk'))),
+        'pendentes': reajuste.itens_a_enviar().count(),
+        'itens': Paginator(itens, 50).get_page(request.GET.get('page')),
+        'status': status,
+    }
+    return render(request, 'reajustes/detail.html', context)
+
 # ==================== IMPORTAÇÃO ====================
 
 @login_required(login_url='login')
 def import_clientes(request):
-    """Importa clientes do Asaas"""
+    """
+    Importa todos os clientes do Asaas
+    
+    As páginas que não couberem em SINCRONIZACAO_TEMPO_MAXIMO_TELA ficam
+    para o comando importar_asaas (ou uma nova importação).
+    """
     if request.method == 'POST':
-        asaas_service = AsaasService()
-        result = asaas_service.list_customers(limit=100)
+        resultado = importar_clientes_asaas(tempo_maximo=SINCRONIZACAO_TEMPO_MAXIMO_TELA)
         
-        if not result.get('success'):
-            messages.error(request, f'Erro ao buscar clientes do Asaas: {result.get("error")}')
+        if not resultado['completa'] and not resultado['total']:
+            messages.error(request, 'Erro ao buscar clientes do Asaas.')
             return redirect('cliente_list')
         
-        clientes_data = result['data'].get('data', [])
-        importados = 0
-        atualizados = 0
-        erros = 0
-        
-        for customer_data in clientes_data:
-            try:
-                # Verifica se já existe pelo asaas_id
-                cliente, created = Cliente.objects.update_or_create(
-                    asaas_id=customer_data['id'],
-                    defaults={
-                        'name': customer_data.get('name', ''),
-                        'cpfCnpj': customer_data.get('cpfCnpj', ''),
-                        'email': customer_data.get('email', ''),
-                        'phone': customer_data.get('phone', ''),
-                        'mobilePhone': customer_data.get('mobilePhone', ''),
-                        'address': customer_data.get('address', ''),
-                        'addressNumber': customer_data.get('addressNumber', ''),
-                        'complement': customer_data.get('complement', ''),
-                        'province': customer_data.get('province', ''),
-                        'postalCode': customer_data.get('postalCode', ''),
-                        'observations': customer_data.get('observations', ''),
-                        'synced_with_asaas': True,
-                    }
-                )
-                
-                if created:
-                    importados += 1
-                else:
-                    atualizados += 1
-                    
-            except Exception as e:
-                logger.error(f'Erro ao importar cliente {customer_data.get("id")}: {str(e)}')
-                erros += 1
-        
-        if importados > 0:
-            messages.success(request, f'{importados} cliente(s) importado(s) com sucesso!')
-        if atualizados > 0:
-            messages.info(request, f'{atualizados} cliente(s) atualizado(s).')
-        if erros > 0:
-            messages.warning(request, f'{erros} erro(s) durante a importação.')
+        if resultado['importados'] > 0:
+            messages.success(request, f'{resultado["importados"]} cliente(s) importado(s) com sucesso!')
+        if resultado['atualizados'] > 0:
+            messages.info(request, f'{resultado["atualizados"]} cliente(s) atualizado(s).')
+        if resultado['inalterados'] > 0:
+            messages.info(request, f'{resultado["inalterados"]} cliente(s) sem alterações.')
+        if resultado['conflitos'] > 0:
+            messages.warning(request, f'{resultado["conflitos"]} cliente(s) mantido(s) com as alterações locais, ainda não enviadas ao Asaas.')
+        if resultado['erros'] > 0:
+            messages.warning(request, f'{resultado["erros"]} erro(s) durante a importação.')
+        if not resultado['completa']:
+            messages.warning(request, 'Nem todas as páginas do Asaas foram lidas. Importe novamente ou execute o comando importar_asaas.')
         
         return redirect('cliente_list')
     
@@ -716,97 +737,35 @@ def import_clientes(request):
 
 @login_required(login_url='login')
 def import_recorrencias(request):
-    """Importa recorrências do Asaas"""
+    """
+    Importa todas as recorrências do Asaas (e os clientes delas que ainda não existem)
+    
+    As páginas que não couberem em SINCRONIZACAO_TEMPO_MAXIMO_TELA ficam
+    para o comando importar_asaas (ou uma nova importação).
+    """
     if request.method == 'POST':
-        asaas_service = AsaasService()
-        result = asaas_service.list_subscriptions(limit=100)
+        resultado = importar_recorrencias_asaas(tempo_maximo=SINCRONIZACAO_TEMPO_MAXIMO_TELA)
         
-        if not result.get('success'):
-            messages.error(request, f'Erro ao buscar recorrências do Asaas: {result.get("error")}')
+        if not resultado['completa'] and not resultado['total']:
+            messages.error(request, 'Erro ao buscar recorrências do Asaas.')
             return redirect('recorrencia_list')
         
-        subscriptions_data = result['data'].get('data', [])
-        importadas = 0
-        atualizadas = 0
-        erros = 0
-        sem_cliente = 0
-        
-        for subscription_data in subscriptions_data:
-            try:
-                # Busca o cliente pelo asaas_id
-                customer_id = subscription_data.get('customer')
-                if not customer_id:
-                    sem_cliente += 1
-                    continue
-                
-                try:
-                    cliente = Cliente.objects.get(asaas_id=customer_id)
-                except Cliente.DoesNotExist:
-                    # Tenta importar o cliente primeiro
-                    customer_result = asaas_service.get_customer(customer_id)
-                    if customer_result.get('success'):
-                        customer_data = customer_result['data']
-                        cliente = Cliente.objects.create(
-                            asaas_id=customer_data['id'],
-                            name=customer_data.get('name', ''),
-                            cpfCnpj=customer_data.get('cpfCnpj', ''),
-                            email=customer_data.get('email', ''),
-                            phone=customer_data.get('phone', ''),
-                            mobilePhone=customer_data.get('mobilePhone', ''),
-                            address=customer_data.get('address', ''),
-                            addressNumber=customer_data.get('addressNumber', ''),
-                            complement=customer_data.get('complement', ''),
-                            province=customer_data.get('province', ''),
-                            postalCode=customer_data.get('postalCode', ''),
-                            observations=customer_data.get('observations', ''),
-                            synced_with_asaas=True,
-                        )
-                    else:
-                        sem_cliente += 1
-                        continue
-                
-                # Converte a data
-                from datetime import datetime
-                next_due_date = datetime.strptime(subscription_data.get('nextDueDate'), '%Y-%m-%d').date()
-                
-                end_date = None
-                if subscription_data.get('endDate'):
-                    end_date = datetime.strptime(subscription_data.get('endDate'), '%Y-%m-%d').date()
-                
-                # Verifica se já existe pelo asaas_id
-                recorrencia, created = Recorrencia.objects.update_or_create(
-                    asaas_id=subscription_data['id'],
-                    defaults={
-                        'cliente': cliente,
-                        'value': subscription_data.get('value', 0),
-                        'cycle': subscription_data.get('cycle', 'MONTHLY'),
-                        'billing_type': subscription_data.get('billingType', 'BOLETO'),
-                        'description': subscription_data.get('description', 'Importado do Asaas'),
-                        'next_due_date': next_due_date,
-                        'end_date': end_date,
-                        'max_payments': subscription_data.get('maxPayments'),
-                        'status': subscription_data.get('status', 'ACTIVE'),
-                        'synced_with_asaas': True,
-                    }
-                )
-                
-                if created:
-                    importadas += 1
-                else:
-                    atualizadas += 1
-                    
-            except Exception as e:
-                logger.error(f'Erro ao importar recorrência {subscription_data.get("id")}: {str(e)}')
-                erros += 1
-        
-        if importadas > 0:
-            messages.success(request, f'{importadas} recorrência(s) importada(s) com sucesso!')
-        if atualizadas > 0:
-            messages.info(request, f'{atualizadas} recorrência(s) atualizada(s).')
-        if sem_cliente > 0:
-            messages.warning(request, f'{sem_cliente} recorrência(s) não importadas (cliente não encontrado).')
-        if erros > 0:
-            messages.warning(request, f'{erros} erro(s) durante a importação.')
+        if resultado['importadas'] > 0:
+            messages.success(request, f'{resultado["importadas"]} recorrência(s) importada(s) com sucesso!')
+        if resultado['atualizadas'] > 0:
+            messages.info(request, f'{resultado["atualizadas"]} recorrência(s) atualizada(s).')
+        if resultado['inalteradas'] > 0:
+            messages.info(request, f'{resultado["inalteradas"]} recorrência(s) sem alterações.')
+        if resultado['clientes_importados'] > 0:
+            messages.info(request, f'{resultado["clientes_importados"]} cliente(s) importado(s) junto com as recorrências.')
+        if resultado['conflitos'] > 0:
+            messages.warning(request, f'{resultado["conflitos"]} recorrência(s) mantida(s) com as alterações locais, ainda não enviadas ao Asaas.')
+        if resultado['sem_cliente'] > 0:
+            messages.warning(request, f'{resultado["sem_cliente"]} recorrência(s) não importadas (cliente não encontrado).')
+        if resultado['erros'] > 0:
+            messages.warning(request, f'{resultado["erros"]} erro(s) durante a importação.')
+        if not resultado['completa']:
+            messages.warning(request, 'Nem todas as páginas do Asaas foram lidas. Importe novamente ou execute o comando importar_asaas.')
         
         return redirect('recorrencia_list')
     
@@ -1303,6 +1262,51 @@ def relatorios(request):
     return render(request, 'financeiro/relatorios.html', context)
 
 
+PROJECAO_MESES_OPCOES = [6, 12, 24]
+
+
+@login_required(login_url='login')
+def projecao_receita(request):
+    """Projeção da receita recorrente (MRR/ARR) a partir das projeções gravadas das recorrências ativas"""
+    try:
+        meses = int(request.GET.get('meses', 12))
+    except ValueError:
+        meses = 12
+    if meses not in PROJECAO_MESES_OPCOES:
+        meses = 12
+    
+    context = {
+        'projecao': calcular_projecao_receita(meses),
+        'meses': meses,
+        'opcoes': PROJECAO_MESES_OPCOES,
+    }
+    return render(request, 'financeiro/projecao.html', context)
+
+
+@login_required(login_url='login')
+def relatorio_coortes(request):
+    """
+    Retenção das recorrências por mês de entrada ou por parceiro indicador
+    
+    Lê apenas as tabelas de resumo; o POST aplica o recálculo incremental
+    (o comando atualizar_coortes faz o mesmo periodicamente).
+    """
+    if request.method == 'POST':
+        atualizacao = atualizar_coortes()
+        messages.success(request, f'Coortes atualizadas: {atualizacao.recorrencias_recalculadas} recorrência(s) recalculada(s).')
+        return redirect(f"{reverse('relatorio_coortes')}?por={request.POST.get('por', 'mes')}")
+    
+    por = request.GET.get('por', 'mes')
+    dimensao = 'PARCEIRO' if por == 'parceiro' else 'MES'
+    context = {
+        'linhas': tabela_coortes(dimensao),
+        'periodos': range(PERIODOS_RELATORIO),
+        'por': por,
+        'ultima_atualizacao': AtualizacaoCoortes.objects.filter(concluida_em__isnull=False).first(),
+    }
+    return render(request, 'financeiro/coortes.html', context)
+
+
 # ==================== LINKS DE PAGAMENTO ====================
 
 @login_required(login_url='login')
@@ -1331,6 +1335,7 @@ def link_pagamento_list(request):
         'search_query': search_query,
         'status_filter': status_filter,
         'charge_type_filter': charge_type_filter,
+        'dias_retencao': LINKS_DIAS_RETENCAO,
     }
     return render(request, 'links_pagamento/list.html', context)
 
@@ -1369,7 +1374,12 @@ def link_pagamento_create(request):
                 payment_link_data['customer'] = link.cliente.asaas_id
             
             # Cria no Asaas
-            result = asaas_service.create_payment_link(payment_link_data)
+            result = asaas_service.create_payment_link(
+                payment_link_data, chave_idempotencia=_chave_envio(form, 'link')
+            )
+            if _ja_registrado(LinkPagamento, result):
+                messages.info(request, 'Este link já tinha sido enviado; nenhum link foi duplicado.')
+                return redirect('link_pagamento_list')
             
             if result.get('success'):
                 data = result['data']
@@ -1443,7 +1453,9 @@ def link_pagamento_delete(request, pk):
             asaas_service = AsaasService()
             result = asaas_service.delete_payment_link(link.asaas_id)
             
-            if not result.get('success'):
+            if result.get('success'):
+                liberar_chaves([link.asaas_id])
+            else:
                 messages.warning(request, f'Link removido localmente, mas não foi possível remover do Asaas: {result.get("error")}')
         
         link.delete()
@@ -1482,6 +1494,27 @@ def link_pagamento_sync(request, pk):
     return redirect('link_pagamento_list')
 
 
+@login_required(login_url='login')
+def link_pagamento_limpar(request):
+    """
+    Reconcilia os links com o Asaas e remove os duplicados e os inativos antigos
+    
+    Limitada a SINCRONIZACAO_TEMPO_MAXIMO_TELA segundos; o que sobrar é
+    removido pelo comando limpar_links_pagamento ou clicando novamente.
+    """
+    if request.method == 'POST':
+        resultado = limpar_links(tempo_maximo=SINCRONIZACAO_TEMPO_MAXIMO_TELA)
+        limpos = resultado['removidos'] + resultado['removidos_no_asaas']
+        messages.success(
+            request, f'{limpos} link(s) removido(s) e {resultado["atualizados"]} atualizado(s) conforme o Asaas.'
+        )
+        if resultado['erros']:
+            messages.warning(request, f'{resultado["erros"]} link(s) não puderam ser removidos no Asaas.')
+        if resultado['pendentes'] or not resultado['completa']:
+            messages.warning(request, 'A limpeza não terminou no tempo da tela. Clique novamente para continuar.')
+    return redirect('link_pagamento_list')
+
+
 @login_required(login_url='login')
 def import_link_pagamento(request):
     """Importa links de pagamento do Asaas"""
@@ -1585,12 +1618,7 @@ def recorrencia_criar_link(request, pk):
     recorrencia = get_object_or_404(Recorrencia, pk=pk)
     
     # Verifica se já existe um link para esta recorrência
-    link_existente = LinkPagamento.objects.filter(
-        cliente=recorrencia.cliente,
-        nome__icontains=recorrencia.description
-    ).first()
-    
-    if link_existente:
+    if recorrencia.link_pagamento_id:
         messages.info(request, f'Já existe um link de pagamento para esta recorrência. Redirecionando para a lista de links.')
         return redirect('link_pagamento_list')
     
@@ -1614,14 +1642,9 @@ def criar_link_pagamento_recorrencia(recorrencia):
     """
     try:
         # Verifica se já existe um link para esta recorrência
-        link_existente = LinkPagamento.objects.filter(
-            cliente=recorrencia.cliente,
-            nome__icontains=recorrencia.description
-        ).first()
-        
-        if link_existente:
+        if recorrencia.link_pagamento_id:
             logger.info(f'Link de pagamento já existe para recorrência {recorrencia.asaas_id}')
-            return link_existente
+            return recorrencia.link_pagamento
         
         # Prepara dados do link de pagamento
         asaas_service = AsaasService()
@@ -1640,30 +1663,23 @@ def criar_link_pagamento_recorrencia(recorrencia):
         else:
             # Se cliente não tem asaas_id, sincroniza primeiro
             logger.warning(f'Cliente {recorrencia.cliente.name} não tem asaas_id. Tentando sincronizar...')
-            customer_data = {
-                'name': recorrencia.cliente.name,
-                'cpfCnpj': recorrencia.cliente.cpfCnpj,
-                'email': recorrencia.cliente.email,
-                'mobilePhone': recorrencia.cliente.mobilePhone or recorrencia.cliente.phone,
-            }
-            customer_result = asaas_service.create_customer(customer_data)
+            customer_result = sincronizar_objeto(recorrencia.cliente)
             if customer_result.get('success'):
-                recorrencia.cliente.asaas_id = customer_result['data']['id']
-                recorrencia.cliente.synced_with_asaas = True
-                recorrencia.cliente.save()
                 payment_link_data['customer'] = recorrencia.cliente.asaas_id
                 logger.info(f'Cliente {recorrencia.cliente.name} sincronizado com sucesso!')
             else:
                 logger.error(f'Erro ao sincronizar cliente: {customer_result.get("error")}')
         
-        # Cria o link no Asaas
-        result = asaas_service.create_payment_link(payment_link_data)
+        # Cria o link no Asaas (uma vez por recorrência, mesmo que a criação seja repetida)
+        result = asaas_service.create_payment_link(
+            payment_link_data, chave_idempotencia=f'link:recorrencia:{recorrencia.pk}'
+        )
         
         if result.get('success'):
             data = result['data']
             
-            # Cria o link no banco local
-            link = LinkPagamento.objects.create(
+            # Cria o link no banco local (o de uma criação reaproveitada pode já existir)
+            link = _ja_registrado(LinkPagamento, result) or LinkPagamento.objects.create(
                 nome=payment_link_data['name'],
                 descricao=payment_link_data['description'],
                 valor=recorrencia.value,
@@ -1676,6 +1692,8 @@ def criar_link_pagamento_recorrencia(recorrencia):
                 status=data.get('status', 'ACTIVE'),
                 synced_with_asaas=True,
             )
+            recorrencia.link_pagamento = link
+            recorrencia.save(update_fields=['link_pagamento', 'updated_at'])
             
             logger.info(f'Link de pagamento criado automaticamente para recorrência {recorrencia.asaas_id}: {link.url}')
             return link
@@ -1699,97 +1717,210 @@ def enviar_whatsapp_recorrencia(recorrencia):
     """
     # Verifica se o cliente tem telefone cadastrado
     cliente = recorrencia.cliente
-    telefone = cliente.mobilePhone or cliente.phone
+    telefone = cliente.telefone_e164
     
     if not telefone:
-        logger.warning(f'Cliente {cliente.name} não possui telefone cadastrado para envio de WhatsApp')
+        logger.warning(f'Cliente {cliente.name} não possui telefone válido cadastrado para envio de WhatsApp')
         return
     
-    # Busca o link de pagamento criado para esta recorrência
-    link_pagamento = LinkPagamento.objects.filter(
-        cliente=recorrencia.cliente,
-        nome__icontains=recorrencia.description
-    ).first()
+    # Link de pagamento criado para esta recorrência
+    contexto = contexto_nova_recorrencia(recorrencia, recorrencia.link_pagamento)
     
-    # Formata a mensagem
-    ciclo_nome = dict(Recorrencia.CYCLE_CHOICES).get(recorrencia.cycle, recorrencia.cycle)
-    forma_pagamento = dict(Recorrencia.BILLING_TYPE_CHOICES).get(recorrencia.billing_type, recorrencia.billing_type)
+    # Enfileira a mensagem para o cliente (enviada pelo worker processar_fila_whatsapp)
+    mensagem = renderizar('nova_recorrencia', contexto)
+    enfileirar_mensagem(telefone, mensagem, origem='nova_recorrencia', recorrencia=recorrencia, referencia=recorrencia.pk)
     
-    mensagem = f"""Olá {cliente.name}! 👋
+    # Enfileira notificação para números configurados em WHATSAPP_NUMBERS
+    # (no modo resumo, a notificação sai agrupada pelo comando enviar_resumo_recorrencias)
+    from django.conf import settings as django_settings
+    test_numbers = getattr(django_settings, 'WHATSAPP_NUMBERS', [])
+    if test_numbers and not getattr(django_settings, 'WHATSAPP_NOTIFICACAO_RESUMO', False):
+        notification_message = renderizar('notificacao_recorrencia', contexto)
+        enfileirar_para_numeros_notificacao(
+            notification_message, origem='notificacao_recorrencia', recorrencia=recorrencia, referencia=recorrencia.pk
+        )
 
-Sua recorrência foi criada com sucesso! ✅
 
-📋 *Detalhes da Recorrência:*
-• Descrição: {recorrencia.description}
-• Valor: R$ {recorrencia.value:.2f}
-• Ciclo: {ciclo_nome}
-• Forma de Pagamento: {forma_pagamento}
-• Próximo Vencimento: {recorrencia.next_due_date.strftime('%d/%m/%Y')}
-"""
-    
-    if recorrencia.end_date:
-        mensagem += f"• Data de Término: {recorrencia.end_date.strftime('%d/%m/%Y')}\n"
+# ==================== CAMPANHAS DE COBRANÇA ====================
+
+@login_required(login_url='login')
+def campanha_list(request):
+    """Lista as campanhas de cobrança"""
+    campanhas = CampanhaCobranca.objects.annotate(
+        qtd_enviadas=Count('mensagens', filter=Q(mensagens__status='ENVIADA')),
+        qtd_falhas=Count('mensagens', filter=Q(mensagens__status='FALHA')),
+    )
+    return render(request, 'campanhas/list.html', {'campanhas': campanhas})
+
+
+@login_required(login_url='login')
+def campanha_create(request):
+    """Cria uma campanha e enfileira as mensagens das recorrências selecionadas"""
+    if request.method == 'POST':
+        form = CampanhaCobrancaForm(request.POST)
+        if form.is_valid():
+            campanha = form.save()
+            try:
+                executar_campanha(campanha)
+                messages.success(
+                    request,
+                    f'Campanha criada: {campanha.total_enfileiradas} mensagem(ns) enfileirada(s), '
+                    f'{campanha.total_ignoradas} recorrência(s) ignorada(s).'
+                )
+            except Exception as e:
+                logger.error(f'Erro ao executar campanha {campanha.pk}: {str(e)}')
+                campanha.status = 'ERRO'
+                campanha.save(update_fields=['status', 'updated_at'])
+                messages.error(request, f'Erro ao executar campanha: {str(e)}')
+            return redirect('campanha_detail', pk=campanha.pk)
+    else:
+        form = CampanhaCobrancaForm()
     
-    if recorrencia.max_payments:
-        mensagem += f"• Total de Cobranças: {recorrencia.max_payments}\n"
+    return render(request, 'campanhas/form.html', {'form': form})
+
+
+@login_required(login_url='login')
+def campanha_detail(request, pk):
+    """Relatório de entrega de uma campanha"""
+    campanha = get_object_or_404(CampanhaCobranca, pk=pk)
+    mensagens = Paginator(
+        campanha.mensagens.select_related('recorrencia__cliente').order_by('proxima_tentativa', 'pk'), 50
+    ).get_page(request.GET.get('page'))
     
-    # Adiciona link de pagamento se disponível
-    if link_pagamento and link_pagamento.url:
-        mensagem += f"""
-🔗 *Link de Pagamento:*
-{link_pagamento.url}
+    context = {
+        'campanha': campanha,
+        'relatorio': relatorio_campanha(campanha),
+        'mensagens': mensagens,
+    }
+    return render(request, 'campanhas/detail.html', context)
+
 
-💡 *Como usar:*
-Clique no link acima para realizar o pagamento da sua recorrência.
-"""
+# ==================== MÉTRICAS E WEBHOOK DO WHATSAPP ====================
+
+@login_required(login_url='login')
+def whatsapp_metricas(request):
+    """Painel de vazão, latência, falhas e entregas das mensagens WhatsApp"""
+    try:
+        dias = min(max(int(request.GET.get('dias', 30)), 1), 365)
+    except ValueError:
+        dias = 30
+    return render(request, 'campanhas/metricas.html', metricas_whatsapp(dias))
+
+
+def _token_valido(recebido, token):
+    """Compara o token recebido com o configurado em tempo constante"""
+    return hmac.compare_digest((recebido or '').encode(), token.encode())
+
+
+def _payload_webhook(request):
+    """Corpo JSON do webhook; None se não for um objeto JSON"""
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+@csrf_exempt
+def whatsapp_webhook(request):
+    """
+    Recebe os callbacks de status de entrega do provedor de WhatsApp
+    
+    Autenticado pelo WHATSAPP_WEBHOOK_TOKEN (parâmetro ?token= ou header
+    X-Webhook-Token); o GET atende a verificação do webhook da Meta.
+    """
+    token = getattr(settings, 'WHATSAPP_WEBHOOK_TOKEN', '')
+    if not token:
+        return HttpResponse(status=403)
     
-    mensagem += f"""
-📌 *Próximos Passos:*
-Fique atento ao vencimento para garantir o pagamento em dia.
+    if request.method == 'GET':
+        if _token_valido(request.GET.get('hub.verify_token'), token):
+            return HttpResponse(request.GET.get('hub.challenge', ''))
+        return HttpResponse(status=403)
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método não permitido'}, status=405)
+    if not (_token_valido(request.GET.get('token'), token) or _token_valido(request.headers.get('X-Webhook-Token'), token)):
+        return HttpResponse(status=403)
+    
+    payload = _payload_webhook(request)
+    if payload is None:
+        return JsonResponse({'success': False, 'message': 'JSON inválido'}, status=400)
+    
+    atualizadas = atualizar_status_entrega(WhatsAppService().provedor.extrair_status(payload))
+    return JsonResponse({'success': True, 'atualizadas': atualizadas})
 
-Em caso de dúvidas, entre em contato conosco.
 
-Atenciosamente,
-Equipe de Cobrança
-"""
+
+@csrf_exempt
+def asaas_webhook(request):
+    """
+    Recebe os eventos de cobrança do Asaas (PAYMENT_*) e atualiza o espelho local
+    
+    Autenticado pelo ASAAS_WEBHOOK_TOKEN, enviado pelo Asaas no header
+    asaas-access-token.
+    """
+    token = getattr(settings, 'ASAAS_WEBHOOK_TOKEN', '')
+    if not token or not _token_valido(request.headers.get('asaas-access-token'), token):
+        return HttpResponse(status=403)
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método não permitido'}, status=405)
     
-    # Envia via WhatsApp para o cliente
-    whatsapp_service = WhatsAppService()
-    result = whatsapp_service.send_message(telefone, mensagem)
+    payload = _payload_webhook(request)
+    if payload is None:
+        return JsonResponse({'success': False, 'message': 'JSON inválido'}, status=400)
     
-    if result.get('success'):
-        logger.info(f'Mensagem WhatsApp enviada para {cliente.name} ({telefone}) sobre recorrência {recorrencia.asaas_id}')
+    return JsonResponse({'success': True, 'atualizada': processar_webhook(payload)})
+
+# ==================== MODELOS DE MENSAGEM ====================
+
+@login_required(login_url='login')
+def modelo_mensagem_list(request):
+    """Lista os modelos de mensagem WhatsApp"""
+    modelos = [obter_modelo(codigo) for codigo in PADROES]
+    return render(request, 'modelos_mensagem/list.html', {'modelos': modelos})
+
+
+@login_required(login_url='login')
+def modelo_mensagem_edit(request, codigo):
+    """Edita o texto de um modelo de mensagem (cada alteração gera nova versão)"""
+    if codigo not in PADROES:
+        return redirect('modelo_mensagem_list')
+    modelo = obter_modelo(codigo)
+    
+    if request.method == 'POST':
+        form = ModeloMensagemForm(request.POST, instance=modelo)
+        if form.is_valid():
+            modelo = form.save()
+            messages.success(request, f'Modelo "{modelo.nome}" atualizado (versão {modelo.versao}).')
+            return redirect('modelo_mensagem_list')
     else:
-        logger.error(f'Erro ao enviar WhatsApp para {cliente.name}: {result.get("error")}')
+        form = ModeloMensagemForm(instance=modelo)
     
-    # Envia notificação para números configurados em WHATSAPP_NUMBERS
-    from django.conf import settings as django_settings
-    test_numbers = getattr(django_settings, 'WHATSAPP_NUMBERS', [])
-    if test_numbers:
-        notification_message = f"""🔔 *Nova Recorrência Criada*
-
-📋 *Detalhes:*
-• Cliente: {cliente.name}
-• Descrição: {recorrencia.description}
-• Valor: R$ {recorrencia.value:.2f}
-• Ciclo: {ciclo_nome}
-• Próximo Vencimento: {recorrencia.next_due_date.strftime('%d/%m/%Y')}
-"""
-        if link_pagamento and link_pagamento.url:
-            notification_message += f"• Link de Pagamento: {link_pagamento.url}\n"
-        
-        notification_message += f"""
-Sistema de Gestão Asaas
-"""
-        
-        for number in test_numbers:
-            number = number.strip()
-            if number:
-                result_notif = whatsapp_service.send_message(number, notification_message)
-                if result_notif.get('success'):
-                    logger.info(f'Notificação enviada para número de teste {number}')
-                else:
-                    logger.warning(f'Erro ao enviar notificação para {number}: {result_notif.get("error")}')
+    context = {
+        'form': form,
+        'modelo': modelo,
+        'variaveis': VARIAVEIS[codigo],
+        'recorrencias': Recorrencia.objects.select_related('cliente').order_by('-created_at')[:20],
+    }
+    return render(request, 'modelos_mensagem/form.html', context)
+
+
+@login_required(login_url='login')
+def modelo_mensagem_preview(request, codigo):
+    """Pré-visualiza o conteúdo informado com os dados de uma recorrência (ou de exemplo)"""
+    if request.method != 'POST' or codigo not in PADROES:
+        return JsonResponse({'success': False, 'message': 'Método não permitido'})
+    
+    recorrencia = None
+    if request.POST.get('recorrencia'):
+        recorrencia = Recorrencia.objects.select_related('cliente').filter(pk=request.POST['recorrencia']).first()
+    
+    try:
+        texto = renderizar_texto(request.POST.get('conteudo', ''), contexto_exemplo(codigo, recorrencia))
+    except TemplateSyntaxError as e:
+        return JsonResponse({'success': False, 'message': f'Modelo inválido: {e}'})
+    return JsonResponse({'success': True, 'mensagem': texto})
 
 
 # ==================== LINKS DE PAGAMENTO INICIAL DA RECORRÊNCIA ====================
@@ -1805,44 +1936,16 @@ def recorrencia_link_primeira_cobranca(request, pk):
         messages.error(request, 'Esta recorrência não está sincronizada com o Asaas.')
         return redirect('recorrencia_list')
     
-    try:
-        asaas_service = AsaasService()
-        
-        # Buscar as cobranças da assinatura
-        result = asaas_service.list_subscription_payments(recorrencia.asaas_id, limit=1)
-        
-        if not result.get('success'):
-            messages.error(request, f'Erro ao buscar cobranças: {result.get("error")}')
-            return redirect('recorrencia_list')
-        
-        payments = result.get('data', [])
-        if not payments:
-            messages.warning(request, 'Nenhuma cobrança encontrada para esta recorrência.')
-            return redirect('recorrencia_list')
-        
-        # Pegar a primeira cobrança
-        first_payment = payments[0]
-        payment_id = first_payment.get('id')
-        
-        # Buscar detalhes da cobrança para pegar a URL
-        payment_details = asaas_service.get_payment(payment_id)
-        
-        if payment_details.get('success'):
-            data = payment_details['data']
-            invoice_url = data.get('invoiceUrl')
-            
-            if invoice_url:
-                messages.success(request, f'Link da primeira cobrança gerado com sucesso!')
-                # Redirecionar para a URL ou mostrar em uma modal
-                return redirect(invoice_url)
-            else:
-                messages.warning(request, 'URL de pagamento não disponível ainda.')
-        else:
-            messages.error(request, f'Erro ao buscar detalhes da cobrança: {payment_details.get("error")}')
+    # Primeira cobrança da assinatura (espelho local)
+    cobranca = cobrancas_da_recorrencia(recorrencia).order_by('vencimento').first()
     
-    except Exception as e:
-        logger.error(f'Erro ao gerar link da primeira cobrança: {str(e)}')
-        messages.error(request, f'Erro ao gerar link: {str(e)}')
+    if cobranca is None:
+        messages.warning(request, 'Nenhuma cobrança encontrada para esta recorrência.')
+    elif cobranca.url_fatura:
+        messages.success(request, f'Link da primeira cobrança gerado com sucesso!')
+        return redirect(cobranca.url_fatura)
+    else:
+        messages.warning(request, 'URL de pagamento não disponível ainda.')
     
     return redirect('recorrencia_list')
 
@@ -1863,70 +1966,34 @@ def recorrencia_enviar_link_inicial_whatsapp(request, pk):
         return redirect('recorrencia_list')
     
     # Verificar se cliente tem telefone
-    phone = recorrencia.cliente.mobilePhone or recorrencia.cliente.phone
+    phone = recorrencia.cliente.telefone_e164
     if not phone:
-        messages.error(request, 'Cliente não possui telefone cadastrado.')
+        messages.error(request, 'Cliente não possui telefone válido cadastrado.')
         return redirect('recorrencia_list')
     
     try:
-        asaas_service = AsaasService()
-        whatsapp_service = WhatsAppService()
-        
-        # Buscar primeira cobrança
-        result = asaas_service.list_subscription_payments(recorrencia.asaas_id, limit=1)
-        
-        if not result.get('success'):
-            messages.error(request, f'Erro ao buscar cobranças: {result.get("error")}')
-            return redirect('recorrencia_list')
+        # Buscar primeira cobrança (espelho local)
+        cobranca = cobrancas_da_recorrencia(recorrencia).order_by('vencimento').first()
         
-        payments = result.get('data', [])
-        if not payments:
+        if cobranca is None:
             messages.warning(request, 'Nenhuma cobrança encontrada.')
             return redirect('recorrencia_list')
         
-        first_payment = payments[0]
-        payment_id = first_payment.get('id')
-        
-        # Buscar detalhes
-        payment_details = asaas_service.get_payment(payment_id)
-        
-        if not payment_details.get('success'):
-            messages.error(request, f'Erro ao buscar detalhes: {payment_details.get("error")}')
-            return redirect('recorrencia_list')
-        
-        data = payment_details['data']
-        invoice_url = data.get('invoiceUrl')
-        due_date = data.get('dueDate')
-        value = data.get('value')
-        
-        if not invoice_url:
+        if not cobranca.url_fatura:
             messages.warning(request, 'URL de pagamento não disponível.')
             return redirect('recorrencia_list')
         
         # Montar mensagem
-        message = f"""🔔 *Primeira Cobrança da sua Assinatura*
-
-Olá, {recorrencia.cliente.name}!
-
-📋 *Detalhes:*
-• Descrição: {recorrencia.description}
-• Valor: R$ {value:.2f}
-• Vencimento: {datetime.strptime(due_date, '%Y-%m-%d').strftime('%d/%m/%Y')}
-
-💳 *Link de Pagamento:*
-{invoice_url}
-
-Esta é a primeira cobrança da sua assinatura.
-
-_Sistema de Gestão Asaas_"""
-        
-        # Enviar WhatsApp
-        result_whats = whatsapp_service.send_message(phone, message)
+        message = renderizar('link_inicial_recorrencia', contexto_primeira_cobranca(recorrencia, cobranca.como_payment()))
         
-        if result_whats.get('success'):
-            messages.success(request, f'Link enviado com sucesso para {phone}!')
+        # Enfileirar WhatsApp
+        _, criada = enfileirar_mensagem(
+            phone, message, origem='link_inicial_recorrencia', recorrencia=recorrencia, referencia=cobranca.asaas_id
+        )
+        if criada:
+            messages.success(request, f'Link enfileirado para envio a {phone}!')
         else:
-            messages.error(request, f'Erro ao enviar WhatsApp: {result_whats.get("error")}')
+            messages.info(request, f'Este link já foi enviado recentemente para {phone}.')
     
     except Exception as e:
         logger.error(f'Erro ao enviar link inicial: {str(e)}')
@@ -1946,6 +2013,14 @@ def recorrencia_checkout_assinatura(request, pk):
         messages.error(request, 'Esta recorrência não está sincronizada com o Asaas.')
         return redirect('recorrencia_list')
     
+    # Reaproveita o checkout ativo desta assinatura em vez de criar um link a cada clique
+    existente = LinkPagamento.objects.filter(
+        cliente=recorrencia.cliente, nome=f"Checkout - {recorrencia.description}", charge_type='RECURRENT',
+        valor=recorrencia.value, billing_type=recorrencia.billing_type, status='ACTIVE',
+    ).exclude(url='').exclude(url__isnull=True).first()
+    if existente:
+        return redirect(existente.url)
+    
     try:
         asaas_service = AsaasService()
         
@@ -1963,8 +2038,14 @@ def recorrencia_checkout_assinatura(request, pk):
         if recorrencia.cliente and recorrencia.cliente.asaas_id:
             payment_link_data['customer'] = recorrencia.cliente.asaas_id
         
-        # Criar link
-        result = asaas_service.create_payment_link(payment_link_data)
+        # Criar link (a chave acompanha valor e forma: a assinatura reajustada ganha outro checkout)
+        result = asaas_service.create_payment_link(
+            payment_link_data,
+            chave_idempotencia=f'checkout:recorrencia:{recorrencia.pk}:{recorrencia.value}:{recorrencia.billing_type}',
+        )
+        existente = _ja_registrado(LinkPagamento, result)
+        if existente and existente.url:
+            return redirect(existente.url)
         
         if result.get('success'):
             data = result['data']
@@ -2005,7 +2086,7 @@ def recorrencia_checkout_assinatura(request, pk):
 def parceiro_list(request):
     """Lista de parceiros com filtro por tipo"""
     tipo_filtro = request.GET.get('tipo', '')
-    parceiros = Parceiro.objects.all()
+    parceiros = Parceiro.objects.select_related('saldo').all()
     
     if tipo_filtro:
         parceiros = parceiros.filter(tipo=tipo_filtro)
@@ -2071,30 +2152,80 @@ def parceiro_detail(request, pk):
     
     context = {'parceiro': parceiro}
     
+    saldo = get_saldo(parceiro)
+    context.update({
+        'saldo': saldo,
+        'total_comissoes': saldo.total_acumulado,
+        'total_pendente': saldo.total_pendente,
+    })
+    
     if parceiro.tipo == 'INDICADOR':
         clientes = Cliente.objects.filter(parceiro_indicador=parceiro)
-        comissoes = ComissaoIndicador.objects.filter(parceiro=parceiro)
-        total_comissoes = comissoes.aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00')
-        total_pendente = comissoes.filter(status='PENDENTE').aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00')
+        comissoes = list(ComissaoIndicador.objects.filter(parceiro=parceiro).select_related('cliente')[:20])
+        # Completa com comissões de fechamentos arquivados, se necessário
+        if len(comissoes) < 20:
+            for comissao in iterar_comissoes_arquivadas(parceiro.pk):
+                comissoes.append(comissao)
+                if len(comissoes) >= 20:
+                    break
         context.update({
             'clientes_indicados': clientes,
-            'comissoes': comissoes[:20],
-            'total_comissoes': total_comissoes,
-            'total_pendente': total_pendente,
+            'comissoes': comissoes,
         })
     else:
-        comissoes = ComissaoSocio.objects.filter(parceiro=parceiro)
-        total_comissoes = comissoes.aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00')
-        total_pendente = comissoes.filter(status='PENDENTE').aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00')
+        comissoes = ComissaoSocio.objects.filter(parceiro=parceiro).select_related('fechamento')
         context.update({
             'comissoes': comissoes[:20],
-            'total_comissoes': total_comissoes,
-            'total_pendente': total_pendente,
         })
     
     return render(request, 'parceiros/detail.html', context)
 
 
+class _Echo:
+    """Pseudo-buffer para o csv.writer: devolve a linha em vez de armazená-la"""
+    
+    def write(self, value):
+        return value
+
+
+def _extrato_csv_response(linhas, filename):
+    """
+    Monta a resposta em streaming do extrato de comissões
+    CSV com ';' e vírgula decimal (abre direto no Excel em pt-BR)
+    """
+    writer = csv.writer(_Echo(), delimiter=';')
+    
+    def formatar(valor):
+        if isinstance(valor, Decimal):
+            return str(valor).replace('.', ',')
+        return valor
+    
+    def gerar():
+        yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+        yield writer.writerow(EXTRATO_CABECALHO)
+        for linha in linhas:
+            yield writer.writerow([formatar(v) for v in linha])
+    
+    response = StreamingHttpResponse(gerar(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def parceiro_extrato(request, pk):
+    """Exporta o extrato completo de comissões de um parceiro (CSV em streaming)"""
+    parceiro = get_object_or_404(Parceiro, pk=pk)
+    filename = f'extrato_comissoes_{parceiro.pk}_{datetime.now():%Y%m%d}.csv'
+    return _extrato_csv_response(iterar_extrato(parceiro), filename)
+
+
+@login_required
+def parceiros_extrato(request):
+    """Exporta o extrato completo de comissões de todos os parceiros (CSV em streaming)"""
+    filename = f'extrato_comissoes_{datetime.now():%Y%m%d}.csv'
+    return _extrato_csv_response(iterar_extrato(), filename)
+
+
 # ==================== CONFIGURAÇÃO FINANCEIRA ====================
 
 @login_required
@@ -2161,40 +2292,80 @@ def fechamento_mensal_criar(request):
     return render(request, 'fechamentos/form.html', context)
 
 
+FECHAMENTO_CACHE_TIMEOUT = 60 * 60 * 24
+MOVIMENTACOES_POR_PAGINA = 50
+
+
+def _fechamento_cache_key(fechamento):
+    """Chave do cache do detalhe do fechamento (muda junto com o status)"""
+    return f'fechamento_detail:{fechamento.pk}:{fechamento.status}'
+
+
+def _resumo_fechamento(fechamento):
+    """
+    Monta as partes do detalhe do fechamento que não dependem de paginação:
+    comissões, totais e contagens das movimentações (as três contagens saem
+    de uma única agregação condicional)
+    """
+    comissoes_indicador, total_comissoes_indicador = comissoes_indicador_fechamento(fechamento)
+    comissoes_socio = list(ComissaoSocio.objects.filter(fechamento=fechamento).select_related('parceiro'))
+    
+    total_comissoes_indicador = round(total_comissoes_indicador, 2)
+    total_comissoes_socio = round(sum((c.valor_comissao for c in comissoes_socio), Decimal('0.00')), 2)
+    
+    excluida = Q(plano_contas__excluir_do_fechamento=True)
+    contagens = Movimentacao.objects.filter(
+        data__month=fechamento.mes, data__year=fechamento.ano, status='CONFIRMED'
+    ).aggregate(
+        qtd_receitas=Count('id', filter=~excluida & Q(valor__gt=0)),
+        qtd_despesas=Count('id', filter=~excluida & Q(valor__lt=0)),
+        qtd_excluidas=Count('id', filter=excluida),
+    )
+    
+    return {
+        'comissoes_indicador': list(comissoes_indicador),
+        'comissoes_socio': comissoes_socio,
+        'total_comissoes_indicador': total_comissoes_indicador,
+        'total_comissoes_socio': total_comissoes_socio,
+        'total_geral_comissoes': round(total_comissoes_indicador + total_comissoes_socio, 2),
+        **contagens,
+    }
+
+
 @login_required
 def fechamento_mensal_detail(request, pk):
     """Detalhes do fechamento mensal"""
     fechamento = get_object_or_404(FechamentoMensal, pk=pk)
-    comissoes_indicador = ComissaoIndicador.objects.filter(fechamento=fechamento).select_related('parceiro', 'cliente')
-    comissoes_socio = ComissaoSocio.objects.filter(fechamento=fechamento).select_related('parceiro')
     
-    total_comissoes_indicador = round(comissoes_indicador.aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00'), 2)
-    total_comissoes_socio = round(comissoes_socio.aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00'), 2)
+    # Só o fechamento pago (FECHADO) é definitivo: nos demais as movimentações do mês
+    # ainda mudam, e o resumo precisa bater com as listas paginadas, lidas ao vivo
+    if fechamento.status == 'FECHADO':
+        chave = _fechamento_cache_key(fechamento)
+        resumo = cache.get(chave)
+        if resumo is None:
+            resumo = _resumo_fechamento(fechamento)
+            cache.set(chave, resumo, FECHAMENTO_CACHE_TIMEOUT)
+    else:
+        resumo = _resumo_fechamento(fechamento)
     
-    # Movimentações base do fechamento (para conferência)
-    categorias_excluidas = PlanoContas.objects.filter(excluir_do_fechamento=True).values_list('id', flat=True)
+    # Movimentações base do fechamento (para conferência), paginadas
     movimentacoes = Movimentacao.objects.filter(
         data__month=fechamento.mes, data__year=fechamento.ano, status='CONFIRMED'
-    ).exclude(plano_contas__in=categorias_excluidas).select_related('plano_contas', 'cliente').order_by('-data')
+    ).select_related('plano_contas').order_by('-data', '-id')
+    excluida = Q(plano_contas__excluir_do_fechamento=True)
+    incluidas = movimentacoes.exclude(excluida)
     
-    movimentacoes_excluidas = Movimentacao.objects.filter(
-        data__month=fechamento.mes, data__year=fechamento.ano, status='CONFIRMED',
-        plano_contas__in=categorias_excluidas
-    ).select_related('plano_contas', 'cliente').order_by('-data')
-    
-    receitas = movimentacoes.filter(valor__gt=0)
-    despesas = movimentacoes.filter(valor__lt=0)
+    receitas = Paginator(incluidas.filter(valor__gt=0), MOVIMENTACOES_POR_PAGINA).get_page(request.GET.get('pagina_receitas'))
+    despesas = Paginator(incluidas.filter(valor__lt=0), MOVIMENTACOES_POR_PAGINA).get_page(request.GET.get('pagina_despesas'))
+    movimentacoes_excluidas = Paginator(movimentacoes.filter(excluida), MOVIMENTACOES_POR_PAGINA).get_page(request.GET.get('pagina_excluidas'))
     
     context = {
         'fechamento': fechamento,
-        'comissoes_indicador': comissoes_indicador,
-        'comissoes_socio': comissoes_socio,
-        'total_comissoes_indicador': total_comissoes_indicador,
-        'total_comissoes_socio': total_comissoes_socio,
-        'total_geral_comissoes': round(total_comissoes_indicador + total_comissoes_socio, 2),
+        **resumo,
         'receitas': receitas,
         'despesas': despesas,
         'movimentacoes_excluidas': movimentacoes_excluidas,
+        'secao_aberta': next((p for p in ('receitas', 'despesas', 'excluidas') if f'pagina_{p}' in request.GET), ''),
     }
     return render(request, 'fechamentos/detail.html', context)
 
@@ -2210,11 +2381,13 @@ def fechamento_recalcular(request, pk):
     
     if request.method == 'POST':
         try:
-            ComissaoIndicador.objects.filter(fechamento=fechamento).delete()
-            ComissaoSocio.objects.filter(fechamento=fechamento).delete()
-            fechamento.delete()
-            
-            novo_fechamento = _calcular_fechamento(fechamento.mes, fechamento.ano)
+            with transaction.atomic():
+                estornar_comissoes(fechamento)
+                ComissaoIndicador.objects.filter(fechamento=fechamento).delete()
+                ComissaoSocio.objects.filter(fechamento=fechamento).delete()
+                fechamento.delete()
+                
+                novo_fechamento = _calcular_fechamento(fechamento.mes, fechamento.ano)
             messages.success(request, f'Prévia {novo_fechamento.mes:02d}/{novo_fechamento.ano} recalculada com sucesso!')
             return redirect('fechamento_mensal_detail', pk=novo_fechamento.pk)
         except Exception as e:
@@ -2251,10 +2424,10 @@ def fechamento_marcar_pago(request, pk):
         return redirect('fechamento_mensal_detail', pk=pk)
     
     if request.method == 'POST':
-        ComissaoIndicador.objects.filter(fechamento=fechamento, status='PENDENTE').update(status='PAGO')
-        ComissaoSocio.objects.filter(fechamento=fechamento, status='PENDENTE').update(status='PAGO')
-        fechamento.status = 'FECHADO'
-        fechamento.save()
+        with transaction.atomic():
+            liquidar_comissoes(fechamento)
+            fechamento.status = 'FECHADO'
+            fechamento.save()
         messages.success(request, f'Comissões do fechamento {fechamento.mes:02d}/{fechamento.ano} marcadas como pagas!')
     
     return redirect('fechamento_mensal_detail', pk=pk)
@@ -2262,106 +2435,126 @@ def fechamento_marcar_pago(request, pk):
 
 # ==================== LÓGICA DE CÁLCULO ====================
 
-def _calcular_fechamento(mes, ano):
-    """Calcula e cria o fechamento mensal com todas as comissões"""
+@transaction.atomic
+def _calcular_fechamento(mes, ano, perfil=None):
+    """
+    Calcula e cria o fechamento mensal com todas as comissões
+    
+    Cada etapa é instrumentada (tempo e consultas SQL) e o perfil é salvo
+    no próprio fechamento para diagnóstico.
+    """
     from dateutil.relativedelta import relativedelta
     
+    perfil = perfil or PerfilCalculo()
     config = ConfiguracaoFinanceira.get_config()
     
     # 1. Buscar movimentações do mês (excluindo categorias marcadas como 'excluir do fechamento')
-    categorias_excluidas = PlanoContas.objects.filter(excluir_do_fechamento=True).values_list('id', flat=True)
-    movimentacoes = Movimentacao.objects.filter(
-        data__month=mes, data__year=ano, status='CONFIRMED'
-    ).exclude(plano_contas__in=categorias_excluidas)
-    
-    # 2. Calcular receitas e despesas
-    # Receitas: valores positivos (pagamentos recebidos)
-    total_receitas = movimentacoes.filter(valor__gt=0).aggregate(
-        total=Sum('valor'))['total'] or Decimal('0.00')
-    
-    # Despesas: valores negativos (taxas, transferências, etc)
-    total_despesas = movimentacoes.filter(valor__lt=0).aggregate(
-        total=Sum('valor'))['total'] or Decimal('0.00')
-    total_despesas = abs(total_despesas)
-    
-    # 3. Resultado líquido
-    resultado_liquido = total_receitas - total_despesas
-    
-    # 4. Calcular reserva de caixa
-    meses_media = config.meses_media_reserva
-    percentual_seg = config.percentual_seguranca_reserva
-    
-    data_inicio = datetime(ano, mes, 1) - relativedelta(months=meses_media)
-    data_fim = datetime(ano, mes, 1) - relativedelta(days=1)
-    
-    despesas_anteriores = Movimentacao.objects.filter(
-        data__gte=data_inicio.date(),
-        data__lte=data_fim.date(),
-        status='CONFIRMED',
-        valor__lt=0
-    ).exclude(plano_contas__in=categorias_excluidas).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
-    despesas_anteriores = abs(despesas_anteriores)
-    
-    media_despesas = despesas_anteriores / Decimal(str(meses_media)) if meses_media > 0 else Decimal('0.00')
-    valor_reserva = media_despesas * (Decimal('1') + Decimal(str(percentual_seg)) / Decimal('100'))
-    resultado_distribuivel = max(resultado_liquido - valor_reserva, Decimal('0.00'))
-    
-    # 5. Criar fechamento
-    fechamento = FechamentoMensal.objects.create(
-        mes=mes,
-        ano=ano,
-        total_receitas=total_receitas,
-        total_despesas=total_despesas,
-        resultado_liquido=resultado_liquido,
-        media_despesas_6m=media_despesas,
-        percentual_seguranca=percentual_seg,
-        valor_reserva=valor_reserva,
-        resultado_distribuivel=resultado_distribuivel,
-    )
-    
-    # 6. Comissões de indicadores
-    indicadores = Parceiro.objects.filter(tipo='INDICADOR', ativo=True)
-    for indicador in indicadores:
-        clientes_indicados = Cliente.objects.filter(parceiro_indicador=indicador)
+    #    e calcular receitas e despesas; o queryset é preguiçoso, então a leitura
+    #    acontece nos agregados e fica medida nesta mesma etapa
+    with perfil.etapa('movimentacoes'):
+        categorias_excluidas = list(PlanoContas.objects.filter(excluir_do_fechamento=True).values_list('id', flat=True))
+        movimentacoes = Movimentacao.objects.filter(
+            data__month=mes, data__year=ano, status='CONFIRMED'
+        ).exclude(plano_contas__in=categorias_excluidas)
         
-        for cliente in clientes_indicados:
-            pagamentos_cliente = movimentacoes.filter(
-                tipo='PAYMENT', cliente=cliente
-            )
-            
-            for mov in pagamentos_cliente:
-                valor_comissao = round(mov.valor * indicador.percentual_comissao / Decimal('100'), 2)
-                ComissaoIndicador.objects.create(
-                    parceiro=indicador,
-                    cliente=cliente,
-                    movimentacao=mov,
-                    fechamento=fechamento,
-                    valor_pagamento=mov.valor,
-                    percentual=indicador.percentual_comissao,
-                    valor_comissao=valor_comissao,
-                    mes_referencia=mes,
-                    ano_referencia=ano,
-                )
+        # Receitas: valores positivos (pagamentos recebidos)
+        total_receitas = movimentacoes.filter(valor__gt=0).aggregate(
+            total=Sum('valor'))['total'] or Decimal('0.00')
+        
+        # Despesas: valores negativos (taxas, transferências, etc)
+        total_despesas = movimentacoes.filter(valor__lt=0).aggregate(
+            total=Sum('valor'))['total'] or Decimal('0.00')
+        total_despesas = abs(total_despesas)
+        
+        # 2. Resultado líquido
+        resultado_liquido = total_receitas - total_despesas
     
-    # 7. Comissões de sócios
-    socios = Parceiro.objects.filter(tipo='SOCIO', ativo=True)
-    for socio in socios:
-        if socio.majoritario:
-            base_calculo = resultado_distribuivel
-        else:
-            base_calculo = resultado_liquido
+    # 3. Calcular reserva de caixa
+    with perfil.etapa('reserva'):
+        meses_media = config.meses_media_reserva
+        percentual_seg = config.percentual_seguranca_reserva
         
-        valor_comissao = base_calculo * socio.percentual_comissao / Decimal('100')
-        valor_comissao = round(max(valor_comissao, Decimal('0.00')), 2)
+        data_inicio = datetime(ano, mes, 1) - relativedelta(months=meses_media)
+        data_fim = datetime(ano, mes, 1) - relativedelta(days=1)
         
-        ComissaoSocio.objects.create(
-            parceiro=socio,
-            fechamento=fechamento,
-            resultado_distribuivel=base_calculo,
-            percentual=socio.percentual_comissao,
-            valor_comissao=valor_comissao,
+        despesas_anteriores = Movimentacao.objects.filter(
+            data__gte=data_inicio.date(),
+            data__lte=data_fim.date(),
+            status='CONFIRMED',
+            valor__lt=0
+        ).exclude(plano_contas__in=categorias_excluidas).aggregate(total=Sum('valor'))['total'] or Decimal('0.00')
+        despesas_anteriores = abs(despesas_anteriores)
+        
+        media_despesas = despesas_anteriores / Decimal(str(meses_media)) if meses_media > 0 else Decimal('0.00')
+        valor_reserva = media_despesas * (Decimal('1') + Decimal(str(percentual_seg)) / Decimal('100'))
+        resultado_distribuivel = max(resultado_liquido - valor_reserva, Decimal('0.00'))
+    
+    # 4. Criar fechamento
+    with perfil.etapa('fechamento'):
+        fechamento = FechamentoMensal.objects.create(
+            mes=mes,
+            ano=ano,
+            total_receitas=total_receitas,
+            total_despesas=total_despesas,
+            resultado_liquido=resultado_liquido,
+            media_despesas_6m=media_despesas,
+            percentual_seguranca=percentual_seg,
+            valor_reserva=valor_reserva,
+            resultado_distribuivel=resultado_distribuivel,
         )
     
+    # 5. Comissões de indicadores
+    with perfil.etapa('comissoes_indicadores'):
+        indicadores = Parceiro.objects.filter(tipo='INDICADOR', ativo=True)
+        for indicador in indicadores:
+            clientes_indicados = Cliente.objects.filter(parceiro_indicador=indicador)
+            
+            for cliente in clientes_indicados:
+                pagamentos_cliente = movimentacoes.filter(
+                    tipo='PAYMENT', cliente=cliente
+                )
+                
+                for mov in pagamentos_cliente:
+                    valor_comissao = round(mov.valor * indicador.percentual_comissao / Decimal('100'), 2)
+                    ComissaoIndicador.objects.create(
+                        parceiro=indicador,
+                        cliente=cliente,
+                        movimentacao=mov,
+                        fechamento=fechamento,
+                        valor_pagamento=mov.valor,
+                        percentual=indicador.percentual_comissao,
+                        valor_comissao=valor_comissao,
+                        mes_referencia=mes,
+                        ano_referencia=ano,
+                    )
+    
+    # 6. Comissões de sócios
+    with perfil.etapa('comissoes_socios'):
+        socios = Parceiro.objects.filter(tipo='SOCIO', ativo=True)
+        for socio in socios:
+            if socio.majoritario:
+                base_calculo = resultado_distribuivel
+            else:
+                base_calculo = resultado_liquido
+            
+            valor_comissao = base_calculo * socio.percentual_comissao / Decimal('100')
+            valor_comissao = round(max(valor_comissao, Decimal('0.00')), 2)
+            
+            ComissaoSocio.objects.create(
+                parceiro=socio,
+                fechamento=fechamento,
+                resultado_distribuivel=base_calculo,
+                percentual=socio.percentual_comissao,
+                valor_comissao=valor_comissao,
+            )
+    
+    # 7. Lançar comissões no saldo dos parceiros
+    with perfil.etapa('saldos'):
+        registrar_comissoes(fechamento)
+    
+    fechamento.perfil_calculo = perfil.resumo()
+    FechamentoMensal.objects.filter(pk=fechamento.pk).update(perfil_calculo=fechamento.perfil_calculo)
+    
     return fechamento
 
 
@@ -2381,8 +2574,9 @@ def socio_dashboard(request):
         return redirect('home')
     
     comissoes = ComissaoSocio.objects.filter(parceiro=parceiro).select_related('fechamento')
-    total_recebido = comissoes.filter(status='PAGO').aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00')
-    total_pendente = comissoes.filter(status='PENDENTE').aggregate(total=Sum('valor_comissao'))['total'] or Decimal('0.00')
+    saldo = get_saldo(parceiro)
+    total_recebido = saldo.total_pago
+    total_pendente = saldo.total_pendente
     
     context = {
         'parceiro': parceiro,
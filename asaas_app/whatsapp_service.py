@@ -1,14 +1,234 @@
 """
 Serviço de integração com API de WhatsApp
 Suporta Evolution API, WhatsApp Business API e outras APIs similares
+
+Cada provedor é um adaptador (headers, endpoints e payloads); todos
+compartilham uma única sessão HTTP com pool de conexões.
 """
+import re
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from typing import Dict, Optional
+from django.core.cache import cache
+from typing import Dict, List, Optional
+from .limite_service import reservar_envio
+from .telefone_service import normalizar_telefone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Por quanto tempo o estado de conexão da instância Evolution é considerado válido
+ESTADO_CONEXAO_TTL = getattr(settings, 'WHATSAPP_STATUS_CACHE_TTL', 300)
+# Por quanto tempo a variante de URL que funcionou (ex: com ou sem /api) fica memorizada
+VARIANTE_URL_TTL = 60 * 60 * 24
+# Conexões mantidas abertas com o provedor (por processo)
+POOL_CONEXOES = getattr(settings, 'WHATSAPP_POOL_CONEXOES', 10)
+# Telefone já normalizado (+55 + DDD + número)
+E164 = re.compile(r'^\+55\d{10,11}$')
+# Envios simultâneos no disparo em lote (enviar_lote)
+CONCORRENCIA_LOTE = getattr(settings, 'WHATSAPP_CONCORRENCIA_LOTE', 4)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Sessão HTTP compartilhada (keep-alive e pool de conexões) para o provedor de WhatsApp"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONEXOES, pool_maxsize=POOL_CONEXOES)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+class ProvedorWhatsApp:
+    """Adaptador base: API genérica com autenticação Bearer"""
+    
+    def __init__(self, service):
+        self.service = service
+    
+    def headers(self) -> Dict:
+        return {
+            'Authorization': f'Bearer {self.service.api_key}',
+            'Content-Type': 'application/json'
+        }
+    
+    def formatar_numero(self, numero: str) -> str:
+        return f"{numero}@s.whatsapp.net"
+    
+    def variantes_url(self) -> List[str]:
+        """URLs base candidatas, na ordem em que devem ser testadas"""
+        return [self.service.api_url.rstrip('/')]
+    
+    def endpoint_texto(self) -> str:
+        return '/send'
+    
+    def payload_texto(self, phone: str, message: str) -> Dict:
+        return {
+            'phone': phone,
+            'message': message
+        }
+    
+    def endpoint_template(self) -> Optional[str]:
+        """Endpoint de templates (None = provedor não suporta templates)"""
+        return None
+    
+    def payload_template(self, phone: str, template_name: str, variables: Dict) -> Dict:
+        raise NotImplementedError
+    
+    def extrair_id(self, resposta: Dict) -> str:
+        """Id da mensagem no provedor, a partir da resposta do envio"""
+        if not isinstance(resposta, dict):
+            return ''
+        return str(resposta.get('id') or resposta.get('messageId') or '')
+    
+    def extrair_status(self, payload: Dict) -> List:
+        """Lista de (id no provedor, status de entrega) de um callback do provedor"""
+        return []
+
+
+class ProvedorEvolution(ProvedorWhatsApp):
+    """Evolution API: autenticação por apikey e endpoints por nome da instância"""
+    
+    def headers(self) -> Dict:
+        return {
+            'apikey': self.service.api_key,
+            'Content-Type': 'application/json'
+        }
+    
+    def formatar_numero(self, numero: str) -> str:
+        return numero
+    
+    def variantes_url(self) -> List[str]:
+        # Algumas instalações expõem a API sob /api
+        base_url = self.service.api_url.rstrip('/')
+        if base_url.endswith('/api'):
+            return [base_url, base_url[:-len('/api')]]
+        return [base_url, f'{base_url}/api']
+    
+    def endpoint_texto(self) -> str:
+        # O endpoint usa o NOME da instância, não o ID
+        return f'/message/sendText/{self.service.instance_id}'
+    
+    def payload_texto(self, phone: str, message: str) -> Dict:
+        return {
+            'number': phone,
+            'text': message
+        }
+    
+    def endpoint_template(self) -> Optional[str]:
+        return f'/message/sendTemplate/{self.service.instance_id}'
+    
+    def payload_template(self, phone: str, template_name: str, variables: Dict) -> Dict:
+        return {
+            'number': phone,
+            'template': template_name,
+            'params': variables
+        }
+    
+    # Status do evento messages.update (v2 envia o nome, v1 envia o código numérico)
+    STATUS_ENTREGA = {
+        'SERVER_ACK': 'SERVIDOR', 2: 'SERVIDOR',
+        'DELIVERY_ACK': 'ENTREGUE', 3: 'ENTREGUE',
+        'READ': 'LIDA', 'PLAYED': 'LIDA', 4: 'LIDA', 5: 'LIDA',
+        'ERROR': 'ERRO', 0: 'ERRO',
+    }
+    
+    def extrair_id(self, resposta: Dict) -> str:
+        if isinstance(resposta, dict) and isinstance(resposta.get('key'), dict):
+            return str(resposta['key'].get('id') or '')
+        return super().extrair_id(resposta)
+    
+    def extrair_status(self, payload: Dict) -> List:
+        if str(payload.get('event', '')).lower().replace('_', '.') != 'messages.update':
+            return []
+        itens = payload.get('data') or []
+        if isinstance(itens, dict):
+            itens = [itens]
+        
+        atualizacoes = []
+        for item in itens:
+            provedor_id = item.get('keyId') or (item.get('key') or {}).get('id')
+            status = self.STATUS_ENTREGA.get(item.get('status', (item.get('update') or {}).get('status')))
+            if provedor_id and status:
+                atualizacoes.append((provedor_id, status))
+        return atualizacoes
+
+
+class ProvedorWhatsAppBusiness(ProvedorWhatsApp):
+    """WhatsApp Business API (Cloud API da Meta)"""
+    
+    def headers(self) -> Dict:
+        return {
+            'Authorization': f'Bearer {self.service.token}',
+            'Content-Type': 'application/json'
+        }
+    
+    def endpoint_texto(self) -> str:
+        return '/messages'
+    
+    def payload_texto(self, phone: str, message: str) -> Dict:
+        return {
+            'messaging_product': 'whatsapp',
+            'to': phone.split('@')[0],
+            'type': 'text',
+            'text': {
+                'body': message
+            }
+        }
+    
+    def endpoint_template(self) -> Optional[str]:
+        return '/messages'
+    
+    def payload_template(self, phone: str, template_name: str, variables: Dict) -> Dict:
+        return {
+            'messaging_product': 'whatsapp',
+            'to': phone.split('@')[0],
+            'type': 'template',
+            'template': {
+                'name': template_name,
+                'language': {'code': 'pt_BR'},
+                'components': [
+                    {
+                        'type': 'body',
+                        'parameters': [
+                            {'type': 'text', 'text': str(var)} for var in variables.values()
+                        ]
+                    }
+                ]
+            }
+        }
+    
+    STATUS_ENTREGA = {'sent': 'SERVIDOR', 'delivered': 'ENTREGUE', 'read': 'LIDA', 'failed': 'ERRO'}
+    
+    def extrair_id(self, resposta: Dict) -> str:
+        if isinstance(resposta, dict) and resposta.get('messages'):
+            return str(resposta['messages'][0].get('id') or '')
+        return super().extrair_id(resposta)
+    
+    def extrair_status(self, payload: Dict) -> List:
+        atualizacoes = []
+        for entry in payload.get('entry', []):
+            for change in entry.get('changes', []):
+                for status in change.get('value', {}).get('statuses', []):
+                    if status.get('id') and status.get('status') in self.STATUS_ENTREGA:
+                        atualizacoes.append((status['id'], self.STATUS_ENTREGA[status['status']]))
+        return atualizacoes
+
+
+PROVEDORES = {
+    'EVOLUTION': ProvedorEvolution,
+    'WHATSAPP_BUSINESS': ProvedorWhatsAppBusiness,
+}
+
 
 class WhatsAppService:
     """Classe para gerenciar o envio de mensagens via WhatsApp"""
@@ -20,53 +240,59 @@ class WhatsAppService:
         self.token = getattr(settings, 'WHATSAPP_TOKEN', '')
         self.provider = getattr(settings, 'WHATSAPP_PROVIDER', 'evolution').upper()
         
-        # Headers baseado no provedor
-        if self.provider == 'EVOLUTION':
-            self.headers = {
-                'apikey': self.api_key,
-                'Content-Type': 'application/json'
-            }
-        elif self.provider == 'WHATSAPP_BUSINESS':
-            self.headers = {
-                'Authorization': f'Bearer {self.token}',
-                'Content-Type': 'application/json'
-            }
-        else:
-            self.headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
+        # Adaptador do provedor (headers, endpoints e payloads)
+        self.provedor = PROVEDORES.get(self.provider, ProvedorWhatsApp)(self)
+        self.headers = self.provedor.headers()
+        self.session = get_session()
+    
+    def _variante_url_key(self) -> str:
+        return f'whatsapp:variante_url:{self.provider}:{self.api_url}'
+    
+    def _base_url(self) -> str:
+        """URL base que já funcionou (ou a primeira candidata)"""
+        return cache.get(self._variante_url_key()) or self.provedor.variantes_url()[0]
+    
+    def _get(self, endpoint: str, timeout: int = 10):
+        return self.session.get(f'{self._base_url()}{endpoint}', headers=self.headers, timeout=timeout)
+    
+    def _post(self, endpoint: str, data: Dict, timeout: int = 30):
+        """
+        POST no provedor usando a variante de URL já descoberta
+        
+        As demais variantes só são testadas quando a atual responde 404; a que
+        funcionar fica memorizada, então o fallback é pago uma única vez. A
+        resposta é marcada com `url_alternativa` quando o fallback foi usado.
+        """
+        conhecida = cache.get(self._variante_url_key())
+        variantes = self.provedor.variantes_url()
+        if conhecida:
+            variantes = [conhecida] + [v for v in variantes if v != conhecida]
+        
+        for i, base_url in enumerate(variantes):
+            response = self.session.post(f'{base_url}{endpoint}', headers=self.headers, json=data, timeout=timeout)
+            if response.status_code == 404 and i < len(variantes) - 1:
+                logger.warning(f'Endpoint não encontrado em {base_url}, tentando URL alternativa...')
+                cache.delete(self._variante_url_key())
+                continue
+            if response.status_code != 404 and base_url != conhecida:
+                logger.info(f'Variante de URL do WhatsApp memorizada: {base_url}')
+                cache.set(self._variante_url_key(), base_url, VARIANTE_URL_TTL)
+            response.url_alternativa = i > 0
+            return response
     
     def _format_phone(self, phone: str) -> str:
         """
-        Formata o número de telefone para o padrão internacional
-        Remove caracteres não numéricos e adiciona código do país se necessário
-        Baseado no código que funciona em outro projeto
+        Formata o número de telefone para o padrão do provedor
+        Números já normalizados (E.164, como os da fila) não passam pela limpeza de novo
         """
         if not phone:
             return ''
         
-        # Remove caracteres não numéricos
-        import re
-        clean_number = re.sub(r'\D', '', phone)
-        
-        # Verifica tamanho mínimo
-        if len(clean_number) < 10:
-            return clean_number
-        
-        # Adiciona código do país se necessário
-        if not clean_number.startswith('55'):
-            clean_number = '55' + clean_number
-        
-        # Valida formato brasileiro (55 + DDD + número)
-        # Aceita 12 ou 13 dígitos (55 + 2 dígitos DDD + 8 ou 9 dígitos)
-        if len(clean_number) not in [12, 13]:
-            logger.warning(f'Número formatado pode estar incorreto: {clean_number} (tamanho: {len(clean_number)})')
-        
-        if self.provider == 'EVOLUTION':
-            return clean_number
-        else:
-            return f"{clean_number}@s.whatsapp.net"
+        telefone = phone if E164.match(phone) else normalizar_telefone(phone)
+        if not telefone:
+            logger.warning(f'Número de telefone inválido: {phone}')
+            return ''
+        return self.provedor.formatar_numero(telefone[1:])
     
     def check_instance_status(self) -> Dict:
         """
@@ -82,10 +308,7 @@ class WhatsAppService:
             return {'success': False, 'error': 'Status check disponível apenas para Evolution API'}
         
         try:
-            base_url = self.api_url.rstrip('/')
-            url = f"{base_url}/instance/fetchInstances"
-            
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get('/instance/fetchInstances')
             response.raise_for_status()
             
             instances = response.json()
@@ -108,6 +331,7 @@ class WhatsAppService:
                 # Evolution API retorna 'connectionStatus' não 'status'
                 status = instance_data.get('connectionStatus') or instance_data.get('status', 'unknown')
                 connected = status == 'open' or status == 'connected'
+                cache.set(self._estado_conexao_key(), connected, ESTADO_CONEXAO_TTL)
                 
                 return {
                     'success': True,
@@ -118,14 +342,33 @@ class WhatsAppService:
                     'disconnection_at': instance_data.get('disconnectionAt')
                 }
             else:
+                self.invalidar_estado_conexao()
                 return {
                     'success': False,
                     'error': f'Instância {self.instance_id} não encontrada'
                 }
         except Exception as e:
             logger.error(f'Erro ao verificar status da instância: {str(e)}')
+            self.invalidar_estado_conexao()
             return {'success': False, 'error': str(e)}
     
+    def _estado_conexao_key(self) -> str:
+        return f'whatsapp:conectada:{self.instance_id}'
+    
+    def instancia_conectada(self) -> bool:
+        """
+        Indica se a instância Evolution está conectada, usando o estado em cache
+        Quando o cache expira, consulta a API uma vez (check_instance_status) e renova o cache
+        """
+        conectada = cache.get(self._estado_conexao_key())
+        if conectada is None:
+            conectada = bool(self.check_instance_status().get('connected'))
+        return conectada
+    
+    def invalidar_estado_conexao(self):
+        """Descarta o estado de conexão em cache (ex: após falha de envio)"""
+        cache.delete(self._estado_conexao_key())
+    
     def reconnect_instance(self) -> Dict:
         """
         Reconecta a instância Evolution API se necessário
@@ -140,11 +383,8 @@ class WhatsAppService:
             return {'success': False, 'error': 'Reconexão disponível apenas para Evolution API'}
         
         try:
-            base_url = self.api_url.rstrip('/')
             # Tenta restaurar/reconectar a instância
-            url = f"{base_url}/instance/restore/{self.instance_id}"
-            
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(f'/instance/restore/{self.instance_id}')
             response.raise_for_status()
             
             result = response.json()
@@ -169,11 +409,8 @@ class WhatsAppService:
             return {'success': False, 'error': 'Conexão disponível apenas para Evolution API'}
         
         try:
-            base_url = self.api_url.rstrip('/')
             # Tenta conectar a instância
-            url = f"{base_url}/instance/connect/{self.instance_id}"
-            
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(f'/instance/connect/{self.instance_id}')
             response.raise_for_status()
             
             result = response.json()
@@ -184,13 +421,27 @@ class WhatsAppService:
             logger.error(f'Erro ao conectar instância: {str(e)}')
             return {'success': False, 'error': str(e)}
     
-    def send_message(self, phone: str, message: str) -> Dict:
+    def garantir_conexao(self):
+        """
+        Se Evolution API, só conecta a instância quando ela não está conectada
+        (estado em cache), para garantir que a conexão WebSocket está ativa
+        """
+        if self.provider == 'EVOLUTION' and not self.instancia_conectada():
+            logger.info('Instância desconectada, conectando antes de enviar...')
+            connect_result = self.connect_instance()
+            self.invalidar_estado_conexao()
+            if connect_result.get('success'):
+                logger.info('Conexão solicitada, aguardando 2 segundos...')
+                time.sleep(2)  # Aguarda conexão estabilizar
+    
+    def send_message(self, phone: str, message: str, verificar_conexao: bool = True) -> Dict:
         """
         Envia uma mensagem de texto via WhatsApp
         
         Args:
             phone: Número do telefone (com ou sem formatação)
             message: Mensagem a ser enviada
+            verificar_conexao: False quando a conexão já foi garantida para o lote (enviar_lote)
         
         Returns:
             Dict com o resultado da operação
@@ -205,64 +456,38 @@ class WhatsAppService:
             logger.error(f'Número de telefone inválido: {phone}')
             return {'success': False, 'error': 'Número de telefone inválido'}
         
-        # Se Evolution API, tenta conectar a instância antes de enviar
-        # para garantir que a conexão WebSocket está ativa
-        if self.provider == 'EVOLUTION':
-            logger.info('Verificando conexão da instância antes de enviar...')
-            connect_result = self.connect_instance()
-            if connect_result.get('success'):
-                logger.info('Conexão verificada/atualizada, aguardando 2 segundos...')
-                import time
-                time.sleep(2)  # Aguarda conexão estabilizar
+        # Limite de envios (global e por destinatário), compartilhado entre os processos
+        espera = reservar_envio(formatted_phone)
+        if espera:
+            return {
+                'success': False,
+                'error': f'Limite de envio atingido, tente novamente em {espera:.0f}s',
+                'limitado': True,
+                'aguardar': espera,
+            }
+        
+        if verificar_conexao:
+            self.garantir_conexao()
         
+        inicio = time.monotonic()
         try:
-            if self.provider == 'EVOLUTION':
-                # Evolution API - formato correto sem /api
-                # O endpoint usa o NOME da instância, não o ID
-                base_url = self.api_url.rstrip('/')
-                # Tenta usar o nome da instância (atitude) como está configurado
-                url = f"{base_url}/message/sendText/{self.instance_id}"
-                
-                # Log detalhado para debug
-                logger.info(f'URL completa: {url}')
-                logger.info(f'Instance ID configurado: {self.instance_id}')
-                
-                data = {
-                    'number': formatted_phone,
-                    'text': message
-                }
-                
-                logger.info(f'Tentando enviar via Evolution API: {url}')
-                logger.info(f'Headers: {self.headers}')
-                logger.info(f'Data: {data}')
-            elif self.provider == 'WHATSAPP_BUSINESS':
-                # WhatsApp Business API
-                url = f"{self.api_url}/messages"
-                data = {
-                    'messaging_product': 'whatsapp',
-                    'to': formatted_phone.split('@')[0],
-                    'type': 'text',
-                    'text': {
-                        'body': message
-                    }
-                }
-            else:
-                # API genérica
-                url = f"{self.api_url}/send"
-                data = {
-                    'phone': formatted_phone,
-                    'message': message
-                }
-            
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
+            data = self.provedor.payload_texto(formatted_phone, message)
+            response = self._post(self.provedor.endpoint_texto(), data)
+            metricas = {
+                'latencia_ms': int((time.monotonic() - inicio) * 1000),
+                'url_alternativa': getattr(response, 'url_alternativa', False),
+            }
             
-            logger.info(f'Resposta Evolution: status={response.status_code}')
+            logger.info(f'Resposta {self.provider}: status={response.status_code}')
             
             if response.status_code in [200, 201]:
                 result = response.json()
                 logger.info(f'Mensagem WhatsApp enviada para {phone}: {message[:50]}...')
-                return {'success': True, 'data': result}
+                if self.provider == 'EVOLUTION':
+                    cache.set(self._estado_conexao_key(), True, ESTADO_CONEXAO_TTL)
+                return {'success': True, 'data': result, 'provedor_id': self.provedor.extrair_id(result), **metricas}
             else:
+                self.invalidar_estado_conexao()
                 error_text = response.text
                 logger.error(f'Erro ao enviar WhatsApp: {response.status_code} - {error_text}')
                 try:
@@ -270,10 +495,11 @@ class WhatsAppService:
                     error_message = error_data.get('error', {}).get('message', error_text)
                 except:
                     error_message = error_text
-                return {'success': False, 'error': error_message}
+                return {'success': False, 'error': error_message, **metricas}
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Erro ao enviar mensagem WhatsApp: {str(e)}")
+            self.invalidar_estado_conexao()
             error_message = str(e)
             
             if hasattr(e, 'response') and e.response is not None:
@@ -286,25 +512,7 @@ class WhatsAppService:
                     error_message = e.response.text or str(e)
                     logger.error(f'Resposta da API (texto): {error_message}')
             
-            # Se erro 404, tenta versão alternativa da URL (com /api)
-            if hasattr(e, 'response') and e.response is not None and e.response.status_code == 404:
-                if self.provider == 'EVOLUTION':
-                    logger.warning(f'Tentando URL alternativa com /api...')
-                    base_url = self.api_url.rstrip('/')
-                    if '/api' not in base_url:
-                        url_alt = f"{base_url}/api/message/sendText/{self.instance_id}"
-                    else:
-                        url_alt = f"{base_url}/message/sendText/{self.instance_id}"
-                    try:
-                        response_alt = requests.post(url_alt, headers=self.headers, json=data, timeout=30)
-                        response_alt.raise_for_status()
-                        result = response_alt.json()
-                        logger.info(f'Sucesso com URL alternativa: {url_alt}')
-                        return {'success': True, 'data': result}
-                    except Exception as e2:
-                        logger.error(f'Erro também na URL alternativa: {str(e2)}')
-            
-            return {'success': False, 'error': error_message}
+            return {'success': False, 'error': error_message, 'latencia_ms': int((time.monotonic() - inicio) * 1000)}
     
     def send_template_message(self, phone: str, template_name: str, variables: Dict) -> Dict:
         """
@@ -320,40 +528,14 @@ class WhatsAppService:
         """
         formatted_phone = self._format_phone(phone)
         
+        endpoint = self.provedor.endpoint_template()
+        if endpoint is None:
+            # Fallback para mensagem simples
+            return self.send_message(phone, f"Template: {template_name}")
+        
         try:
-            if self.provider == 'EVOLUTION':
-                # Evolution API com template
-                url = f"{self.api_url}/message/sendTemplate/{self.instance_id}"
-                data = {
-                    'number': formatted_phone,
-                    'template': template_name,
-                    'params': variables
-                }
-            elif self.provider == 'WHATSAPP_BUSINESS':
-                # WhatsApp Business API
-                url = f"{self.api_url}/messages"
-                data = {
-                    'messaging_product': 'whatsapp',
-                    'to': formatted_phone.split('@')[0],
-                    'type': 'template',
-                    'template': {
-                        'name': template_name,
-                        'language': {'code': 'pt_BR'},
-                        'components': [
-                            {
-                                'type': 'body',
-                                'parameters': [
-                                    {'type': 'text', 'text': str(var)} for var in variables.values()
-                                ]
-                            }
-                        ]
-                    }
-                }
-            else:
-                # Fallback para mensagem simples
-                return self.send_message(phone, f"Template: {template_name}")
-            
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
+            data = self.provedor.payload_template(formatted_phone, template_name, variables)
+            response = self._post(endpoint, data)
             response.raise_for_status()
             
             result = response.json()
@@ -393,18 +575,37 @@ Atenciosamente,
 Sistema de Gestão Asaas
 """
         
-        results = []
-        for number in test_numbers:
-            number = number.strip()
-            if number:
-                result = self.send_message(number, test_message)
-                results.append({
-                    'number': number,
-                    'success': result.get('success', False),
-                    'error': result.get('error')
-                })
-        
-        success_count = sum(1 for r in results if r['success'])
+        return self.enviar_lote([(n.strip(), test_message) for n in test_numbers if n.strip()])
+    
+    def enviar_lote(self, envios: List, concorrencia: int = None) -> Dict:
+        """
+        Envia várias mensagens em paralelo, verificando a conexão uma única vez
+        
+        Args:
+            envios: Lista de tuplas (telefone, mensagem)
+            concorrencia: Envios simultâneos (padrão: WHATSAPP_CONCORRENCIA_LOTE)
+        
+        Returns:
+            Dict com o resultado de cada envio e o resumo agregado
+        """
+        if not envios:
+            return {'success': False, 'results': [], 'summary': '0/0 mensagens enviadas com sucesso'}
+        
+        self.garantir_conexao()
+        
+        def enviar(envio):
+            number, message = envio
+            try:
+                result = self.send_message(number, message, verificar_conexao=False)
+            except Exception as e:
+                logger.error(f'Erro inesperado ao enviar WhatsApp para {number}: {str(e)}')
+                result = {'success': False, 'error': str(e)}
+            return {'number': number, **result}
+        
+        with ThreadPoolExecutor(max_workers=min(concorrencia or CONCORRENCIA_LOTE, len(envios))) as executor:
+            results = list(executor.map(enviar, envios))
+        
+        success_count = sum(1 for r in results if r.get('success'))
         total_count = len(results)
         
         return {
@@ -114,6 +114,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Asaas API Configuration
 ASAAS_API_KEY = config('ASAAS_API_KEY', default='')
 ASAAS_API_URL = config('ASAAS_API_URL', default='https://sandbox.asaas.com/api/v3')
+# Token de autenticação do webhook de cobranças (header asaas-access-token)
+ASAAS_WEBHOOK_TOKEN = config('ASAAS_WEBHOOK_TOKEN', default='')
+# Sincronização em lote com o Asaas: chamadas por minuto (todos os processos) e simultâneas
+ASAAS_LIMITE_POR_MINUTO = config('ASAAS_LIMITE_POR_MINUTO', default=60, cast=int)
+ASAAS_CONCORRENCIA = config('ASAAS_CONCORRENCIA', default=8, cast=int)
 
 # WhatsApp API Configuration
 # Suporta tanto EVOLUTION_* quanto WHATSAPP_* para compatibilidade
@@ -124,6 +129,24 @@ WHATSAPP_TOKEN = config('WHATSAPP_TOKEN', default='')
 WHATSAPP_PROVIDER = config('WHATSAPP_PROVIDER', default='evolution')  # evolution, whatsapp_business, ou custom
 # Lista de números para receber notificações/testes (separados por vírgula)
 WHATSAPP_NUMBERS = config('WHATSAPP_NUMBERS', default='').split(',') if config('WHATSAPP_NUMBERS', default='') else []
+# Segundos em que o estado de conexão da instância Evolution fica em cache
+WHATSAPP_STATUS_CACHE_TTL = config('WHATSAPP_STATUS_CACHE_TTL', default=300, cast=int)
+# Conexões HTTP mantidas abertas com o provedor de WhatsApp (por processo)
+WHATSAPP_POOL_CONEXOES = config('WHATSAPP_POOL_CONEXOES', default=10, cast=int)
+# Limites de envio de WhatsApp (compartilhados entre processos via banco)
+WHATSAPP_LIMITE_GLOBAL_POR_MINUTO = config('WHATSAPP_LIMITE_GLOBAL_POR_MINUTO', default=30, cast=int)
+WHATSAPP_LIMITE_DESTINO_POR_HORA = config('WHATSAPP_LIMITE_DESTINO_POR_HORA', default=5, cast=int)
+# Segundos em que a mesma mensagem (telefone + origem + referência) não é reenviada
+WHATSAPP_JANELA_DEDUPLICACAO = config('WHATSAPP_JANELA_DEDUPLICACAO', default=1800, cast=int)
+# Envios simultâneos nos disparos em lote (ex: notificações para WHATSAPP_NUMBERS)
+WHATSAPP_CONCORRENCIA_LOTE = config('WHATSAPP_CONCORRENCIA_LOTE', default=4, cast=int)
+# Agrupa as notificações de novas recorrências em um resumo periódico (comando enviar_resumo_recorrencias)
+WHATSAPP_NOTIFICACAO_RESUMO = config('WHATSAPP_NOTIFICACAO_RESUMO', default=False, cast=bool)
+# Token exigido pelo webhook de status de entrega (/whatsapp/webhook/?token=...)
+WHATSAPP_WEBHOOK_TOKEN = config('WHATSAPP_WEBHOOK_TOKEN', default='')
+# Régua de cobrança: dias em relação ao vencimento (negativo = antes) e tempo máximo por execução (segundos)
+WHATSAPP_REGUA_COBRANCA = config('WHATSAPP_REGUA_COBRANCA', default='-3,0,3,10', cast=lambda v: [int(d) for d in v.split(',') if d.strip()])
+WHATSAPP_REGUA_TEMPO_MAXIMO = config('WHATSAPP_REGUA_TEMPO_MAXIMO', default=300, cast=int)
 
 # Subdiretório (para deploy em http://IP/asaas/)
 FORCE_SCRIPT_NAME = config('FORCE_SCRIPT_NAME', default='')